@@ -38,6 +38,42 @@ class Wallet:
     balances_updated_at: Optional[datetime] = None
 
 
+@dataclass(frozen=True)
+class WalletProfile:
+    """Default-wallet fields that change rarely and carry no secrets."""
+
+    id: int
+    user_id: int
+    public_key: str
+    is_free: bool
+    use_pin: int
+    assets_visibility: Optional[str]
+
+    @classmethod
+    def from_wallet(cls, wallet: Wallet) -> "WalletProfile":
+        return cls(
+            id=wallet.id,
+            user_id=wallet.user_id,
+            public_key=wallet.public_key,
+            is_free=wallet.is_free,
+            use_pin=wallet.use_pin,
+            assets_visibility=wallet.assets_visibility,
+        )
+
+
+@dataclass(frozen=True)
+class UserProfile:
+    """User fields read on nearly every update."""
+
+    id: int
+    username: Optional[str]
+    language: str
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserProfile":
+        return cls(id=user.id, username=user.username, language=user.language)
+
+
 @dataclass
 class AddressBookEntry:
     id: int
@@ -1,6 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Any, TYPE_CHECKING, Callable
-from core.domain.entities import User, Wallet, AddressBookEntry, Cheque
+from typing import List, Optional, Any, TYPE_CHECKING, Awaitable, Callable, Iterable
+from core.domain.entities import (
+    User,
+    Wallet,
+    AddressBookEntry,
+    Cheque,
+    UserProfile,
+    WalletProfile,
+)
 
 if TYPE_CHECKING:
     from db.models import NotificationFilter, MyMtlWalletBotMessages
@@ -12,6 +19,11 @@ class IUserRepository(ABC):
         """Retrieve a user by their Telegram ID."""
         pass
 
+    async def get_profile(self, user_id: int) -> Optional[UserProfile]:
+        """Retrieve the user's profile; implementations may serve it from a cache."""
+        user = await self.get_by_id(user_id)
+        return UserProfile.from_user(user) if user else None
+
     @abstractmethod
     async def create(self, user: User) -> User:
         """Create a new user."""
@@ -125,6 +137,11 @@ class IWalletRepository(ABC):
         """Retrieve the default wallet for a user."""
         pass
 
+    async def get_default_wallet_profile(self, user_id: int) -> Optional[WalletProfile]:
+        """Retrieve the default wallet's profile; implementations may cache it."""
+        wallet = await self.get_default_wallet(user_id)
+        return WalletProfile.from_wallet(wallet) if wallet else None
+
     @abstractmethod
     async def create(self, wallet: Wallet) -> Wallet:
         """Create a new wallet."""
@@ -196,6 +213,11 @@ class IWalletRepository(ABC):
         """Get all wallets marked for deletion."""
         pass
 
+    @abstractmethod
+    async def mark_deleted_by_id(self, wallet_id: int) -> bool:
+        """Soft-delete one active wallet by primary key."""
+        pass
+
 
 class IAddressBookRepository(ABC):
     """Interface for address book operations."""
@@ -345,6 +367,39 @@ class IMessageRepository(ABC):
         """Get a batch of unsent messages."""
         pass
 
+    @abstractmethod
+    async def claim_unsent(
+        self,
+        limit: int,
+        *,
+        skip_locked: bool = False,
+        before_commit: Optional[Callable[[List[int]], Awaitable[None]]] = None,
+    ) -> List["MyMtlWalletBotMessages"]:
+        """Lock up to ``limit`` unsent messages and mark them claimed.
+
+        With ``skip_locked`` rows locked by another sender are skipped.
+        ``before_commit`` gets the claimed IDs before the claim is committed;
+        if it raises, nothing is claimed.
+        """
+        pass
+
+    @abstractmethod
+    async def mark_results(
+        self, sent_ids: Iterable[int], failed_ids: Iterable[int]
+    ) -> None:
+        """Mark claimed messages as sent or failed in one transaction."""
+        pass
+
+    @abstractmethod
+    async def release_claims(self, message_ids: Iterable[int]) -> None:
+        """Return claimed messages that were not attempted to the queue."""
+        pass
+
+    @abstractmethod
+    async def count_pending(self) -> int:
+        """Count unsent and claimed messages."""
+        pass
+
     @abstractmethod
     async def mark_sent(self, message_id: int) -> None:
         """Mark a message as sent."""
@@ -50,7 +50,7 @@ class GetWalletBalance:
 
             # Check Cache (only for default wallet)
             if not force_refresh and self._is_cache_fresh(wallet):
-                # Assuming balances are list of Balance objects (handled by Repo/jsonpickle)
+                # Assuming balances are list of Balance objects (decoded by the repository)
                 # Need to filter output based on is_free??
                 # Legacy: if free_wallet, filter XLM? NO, separate logic in stellar_get_balance_str handles display.
                 # stellar_get_balances logic actually filtered Native if free_wallet==0?
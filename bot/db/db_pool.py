@@ -12,6 +12,7 @@ from sqlalchemy import event
 
 from other.config_reader import config
 from db.models import MyMtlWalletBot
+from db.session import LazyAsyncSession
 
 
 @dataclass(frozen=True)
@@ -112,7 +113,7 @@ class DatabasePool:
         )
 
         self.session_factory = async_sessionmaker(
-            bind=self.engine, expire_on_commit=False, class_=AsyncSession
+            bind=self.engine, expire_on_commit=False, class_=LazyAsyncSession
         )
         self.active_connections = 0
         self.pool_connections = 0
@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime
-from sqlalchemy import String, func, SmallInteger, Float, ForeignKey, Enum, Text
+from sqlalchemy import String, func, SmallInteger, Float, ForeignKey, Enum, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, Integer, BigInteger, DateTime
 
@@ -10,6 +10,10 @@ metadata = Base.metadata
 
 class MyMtlWalletBot(Base):
     __tablename__ = "MYMTLWALLETBOT"
+    __table_args__ = (
+        Index("IX_MMWB_PUBLIC_KEY", "public_key"),
+        Index("IX_MMWB_USER_DEFAULT", "user_id", "default_wallet", "need_delete"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(BigInteger, nullable=False)
@@ -45,6 +49,7 @@ class MyMtlWalletBot(Base):
 
 class MyMtlWalletBotLog(Base):
     __tablename__ = "MYMTLWALLETBOT_LOG"
+    __table_args__ = (Index("IX_MMWB_LOG_DT", "LOG_DT"),)
 
     log_id = Column("LOG_ID", Integer, primary_key=True)
     user_id = Column("USER_ID", BigInteger)
@@ -94,6 +99,7 @@ class MyMtlWalletBotChequeHistory(Base):
 
 class MyMtlWalletBotMessages(Base):
     __tablename__ = "MYMTLWALLETBOT_MESSAGES"
+    __table_args__ = (Index("IX_MMWB_MESSAGES_WAS_SEND", "was_send"),)
 
     message_id = Column(Integer, primary_key=True)
     user_message = Column(String(5000), nullable=False)
@@ -155,6 +161,7 @@ class TMessage(Base):
 
 class NotificationFilter(Base):
     __tablename__ = "NOTIFICATION_FILTERS"
+    __table_args__ = (Index("IX_NOTIFICATION_FILTERS_USER", "user_id"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(
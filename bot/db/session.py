@@ -0,0 +1,96 @@
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransactionOrigin
+
+
+_TRANSACTION_WRITES_KEY = "mmwb_transaction_writes"
+_AFTER_COMMIT_KEY = "mmwb_after_commit"
+
+
+def call_after_commit(session: Any, callback: Callable[[], Awaitable[None]]) -> None:
+    """Await ``callback`` after the next explicit ``commit()`` of ``session``.
+
+    Only ``LazyAsyncSession`` runs these callbacks, and a rollback drops them.
+    """
+    session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+
+
+class _WriteTrackingSession(Session):
+    """Sync session that notes when its transaction writes or locks rows."""
+
+
+@event.listens_for(_WriteTrackingSession, "do_orm_execute")
+def _mark_writing_statement(orm_execute_state) -> None:
+    statement = orm_execute_state.statement
+    if (
+        not orm_execute_state.is_select
+        or getattr(statement, "_for_update_arg", None) is not None
+    ):
+        orm_execute_state.session.info[_TRANSACTION_WRITES_KEY] = True
+
+
+@event.listens_for(_WriteTrackingSession, "after_flush")
+def _mark_flush(session, flush_context) -> None:
+    session.info[_TRANSACTION_WRITES_KEY] = True
+
+
+@event.listens_for(_WriteTrackingSession, "after_transaction_end")
+def _forget_writes(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_TRANSACTION_WRITES_KEY, None)
+
+
+class LazyAsyncSession(AsyncSession):
+    """Session that holds a pool connection only while a transaction needs it.
+
+    Like any ``AsyncSession``, it checks out a connection on the first SQL
+    statement. It also ends an implicit transaction as soon as a read returns
+    and nothing has been written, flushed, or locked. So a handler that reads
+    a row and then waits on Horizon does not pin a connection meanwhile. The
+    next statement checks a connection out again. Requires
+    ``expire_on_commit=False``, so loaded objects stay usable. Callbacks
+    registered with ``call_after_commit`` run after each explicit ``commit()``.
+    """
+
+    sync_session_class = _WriteTrackingSession
+
+    async def commit(self) -> None:
+        await super().commit()
+        for callback in self.info.pop(_AFTER_COMMIT_KEY, ()):
+            await callback()
+
+    async def rollback(self) -> None:
+        self.info.pop(_AFTER_COMMIT_KEY, None)
+        await super().rollback()
+
+    async def execute(self, *args, **kwargs):
+        result = await super().execute(*args, **kwargs)
+        await self._release_read_only_transaction()
+        return result
+
+    async def scalar(self, *args, **kwargs):
+        result = await super().scalar(*args, **kwargs)
+        await self._release_read_only_transaction()
+        return result
+
+    async def get(self, *args, **kwargs):
+        result = await super().get(*args, **kwargs)
+        await self._release_read_only_transaction()
+        return result
+
+    async def _release_read_only_transaction(self) -> None:
+        session = self.sync_session
+        transaction = session.get_transaction()
+        if (
+            transaction is None
+            or transaction.origin is not SessionTransactionOrigin.AUTOBEGIN
+            or session.info.get(_TRANSACTION_WRITES_KEY)
+            or session.new
+            or session.dirty
+            or session.deleted
+        ):
+            return
+        # Nothing was written, so callbacks wait for the commit of the write.
+        await super().commit()
@@ -0,0 +1,124 @@
+"""Session-scoped cache of wallet and user entities, plus a query counter."""
+
+import copy
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core.domain.entities import User, Wallet
+from db.session import LazyAsyncSession, call_after_commit
+from infrastructure.services.profile_cache import ProfileCache
+
+IDENTITY_MAP_KEY = "mmwb_identity_map"
+QUERY_COUNT_KEY = "mmwb_query_count"
+PROFILE_WRITES_KEY = "mmwb_profile_writes"
+
+
+class RepositoryIdentityMap:
+    """Entities already loaded through the repositories of one session.
+
+    A session covers one update, so entries live for that update only. Every
+    write through a wallet or user repository drops that repository's entries.
+    Callers get copies, so a caller that changes an entity cannot change what
+    the next caller sees.
+    """
+
+    def __init__(self) -> None:
+        self.default_wallets: dict[int, Wallet | None] = {}
+        self.wallets: dict[int, Wallet | None] = {}
+        self.users: dict[int, User | None] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def cached(
+        self,
+        entries: dict[int, Any],
+        key: int,
+        load: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        if key in entries:
+            self.hits += 1
+        else:
+            self.misses += 1
+            entries[key] = await load()
+        return copy.deepcopy(entries[key])
+
+    def forget_wallets(self) -> None:
+        self.default_wallets.clear()
+        self.wallets.clear()
+
+    def forget_users(self) -> None:
+        self.users.clear()
+
+    def clear(self) -> None:
+        self.forget_wallets()
+        self.forget_users()
+
+
+def identity_map_for(session: Any) -> RepositoryIdentityMap | None:
+    """Return the session's identity map, creating it on first use."""
+    info = getattr(session, "info", None)
+    if not isinstance(info, dict):
+        return None
+    identity_map = info.get(IDENTITY_MAP_KEY)
+    if identity_map is None:
+        identity_map = info[IDENTITY_MAP_KEY] = RepositoryIdentityMap()
+    return identity_map
+
+
+def session_query_count(session: Any) -> int:
+    """ORM statements the session has run so far."""
+    info = getattr(session, "info", None)
+    if not isinstance(info, dict):
+        return 0
+    return info.get(QUERY_COUNT_KEY, 0)
+
+
+def profile_write_pending(session: Any, user_id: int) -> bool:
+    """Whether this session changed the user's profile and has not committed."""
+    info = getattr(session, "info", None)
+    return isinstance(info, dict) and user_id in info.get(PROFILE_WRITES_KEY, ())
+
+
+async def profile_written(session: Any, cache: ProfileCache, user_id: int) -> None:
+    """Publish a profile change once the session commits it.
+
+    Until then, reads in this session skip the shared cache for ``user_id``,
+    and other sessions keep seeing the committed profile. A session that
+    cannot run after-commit callbacks invalidates right away.
+    """
+    if not isinstance(session, LazyAsyncSession):
+        await cache.invalidate(user_id)
+        return
+    pending = session.info.setdefault(PROFILE_WRITES_KEY, set())
+    if user_id in pending:
+        return
+    pending.add(user_id)
+
+    async def publish() -> None:
+        pending.discard(user_id)
+        try:
+            await cache.invalidate(user_id)
+        except RedisError:
+            logger.bind(event="profile_invalidation_failed", user_id=user_id).exception(
+                "profile cache invalidation failed"
+            )
+
+    call_after_commit(session, publish)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _count_query(orm_execute_state) -> None:
+    info = orm_execute_state.session.info
+    info[QUERY_COUNT_KEY] = info.get(QUERY_COUNT_KEY, 0) + 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_entities(session) -> None:
+    identity_map = session.info.get(IDENTITY_MAP_KEY)
+    if identity_map is not None:
+        identity_map.clear()
+    session.info.pop(PROFILE_WRITES_KEY, None)
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.interfaces.repositories import (
@@ -10,6 +10,8 @@ from core.interfaces.repositories import (
     INotificationRepository,
     IMessageRepository,
 )
+from infrastructure.persistence.identity_map import identity_map_for
+from infrastructure.services.profile_cache import ProfileCache
 from infrastructure.persistence.sqlalchemy_wallet_repository import (
     SqlAlchemyWalletRepository,
 )
@@ -34,21 +36,33 @@ from infrastructure.persistence.sqlalchemy_message_repository import (
 class SqlAlchemyRepositoryFactory(IRepositoryFactory):
     """
     Factory for creating SQLAlchemy implementations of repositories.
+
+    Wallet and user repositories for one session share that session's
+    identity map, so an update loads the default wallet and user once. With a
+    ``profile_cache``, their profiles are also shared across updates and
+    instances.
     """
 
+    def __init__(self, profile_cache: Optional[ProfileCache] = None):
+        self.profile_cache = profile_cache
+
     def get_wallet_repository(self, session: Any) -> IWalletRepository:
         if not isinstance(session, AsyncSession):
             raise ValueError(
                 "SqlAlchemyRepositoryFactory requires a SQLAlchemy AsyncSession"
             )
-        return SqlAlchemyWalletRepository(session)
+        return SqlAlchemyWalletRepository(
+            session, identity_map_for(session), self.profile_cache
+        )
 
     def get_user_repository(self, session: Any) -> IUserRepository:
         if not isinstance(session, AsyncSession):
             raise ValueError(
                 "SqlAlchemyRepositoryFactory requires a SQLAlchemy AsyncSession"
             )
-        return SqlAlchemyUserRepository(session)
+        return SqlAlchemyUserRepository(
+            session, identity_map_for(session), self.profile_cache
+        )
 
     def get_addressbook_repository(self, session: Any) -> IAddressBookRepository:
         if not isinstance(session, AsyncSession):
@@ -1,9 +1,15 @@
-from typing import List, Optional
+from typing import Awaitable, Callable, Iterable, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import func, select, update
 from core.interfaces.repositories import IMessageRepository
 from db.models import MyMtlWalletBotMessages
 
+# Values of MYMTLWALLETBOT_MESSAGES.was_send.
+MESSAGE_UNSENT = 0
+MESSAGE_SENT = 1
+MESSAGE_FAILED = 2
+MESSAGE_CLAIMED = 3
+
 
 class SqlAlchemyMessageRepository(IMessageRepository):
     def __init__(self, session: AsyncSession):
@@ -18,7 +24,7 @@ class SqlAlchemyMessageRepository(IMessageRepository):
         button_json: Optional[str] = None,
     ) -> None:
         new_message = MyMtlWalletBotMessages(
-            user_id=user_id, user_message=text, was_send=0
+            user_id=user_id, user_message=text, was_send=MESSAGE_UNSENT
         )
         self.session.add(new_message)
         await self.session.commit()
@@ -26,27 +32,94 @@ class SqlAlchemyMessageRepository(IMessageRepository):
     async def get_unsent(self, limit: int = 10) -> List[MyMtlWalletBotMessages]:
         stmt = (
             select(MyMtlWalletBotMessages)
-            .where(MyMtlWalletBotMessages.was_send == 0)
+            .where(MyMtlWalletBotMessages.was_send == MESSAGE_UNSENT)
             .limit(limit)
         )
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
+    async def claim_unsent(
+        self,
+        limit: int,
+        *,
+        skip_locked: bool = False,
+        before_commit: Optional[Callable[[List[int]], Awaitable[None]]] = None,
+    ) -> List[MyMtlWalletBotMessages]:
+        stmt = (
+            select(MyMtlWalletBotMessages)
+            .where(MyMtlWalletBotMessages.was_send == MESSAGE_UNSENT)
+            .order_by(MyMtlWalletBotMessages.message_id)
+            .limit(limit)
+            .with_for_update(skip_locked=skip_locked)
+        )
+        if self.session.get_bind().dialect.name.startswith("firebird"):
+            # The Firebird dialect renders a bare FOR UPDATE, which locks nothing.
+            stmt = stmt.suffix_with(
+                "WITH LOCK SKIP LOCKED" if skip_locked else "WITH LOCK"
+            )
+        result = await self.session.execute(stmt)
+        rows = list(result.scalars().all())
+        if not rows:
+            return rows
+        message_ids = [row.message_id for row in rows if row.message_id is not None]
+        await self.session.execute(
+            update(MyMtlWalletBotMessages)
+            .where(MyMtlWalletBotMessages.message_id.in_(message_ids))
+            .values(was_send=MESSAGE_CLAIMED)
+        )
+        if before_commit is not None:
+            await before_commit(message_ids)
+        await self.session.commit()
+        return rows
+
+    async def mark_results(
+        self, sent_ids: Iterable[int], failed_ids: Iterable[int]
+    ) -> None:
+        for message_ids, state in (
+            (list(sent_ids), MESSAGE_SENT),
+            (list(failed_ids), MESSAGE_FAILED),
+        ):
+            if message_ids:
+                await self._set_claimed_state(message_ids, state)
+        await self.session.commit()
+
+    async def release_claims(self, message_ids: Iterable[int]) -> None:
+        message_ids = list(message_ids)
+        if not message_ids:
+            return
+        await self._set_claimed_state(message_ids, MESSAGE_UNSENT)
+        await self.session.commit()
+
+    async def count_pending(self) -> int:
+        stmt = select(func.count(MyMtlWalletBotMessages.message_id)).where(
+            MyMtlWalletBotMessages.was_send.in_([MESSAGE_UNSENT, MESSAGE_CLAIMED])
+        )
+        return int(await self.session.scalar(stmt) or 0)
+
+    async def _set_claimed_state(self, message_ids: list[int], state: int) -> None:
+        await self.session.execute(
+            update(MyMtlWalletBotMessages)
+            .where(
+                MyMtlWalletBotMessages.message_id.in_(message_ids),
+                MyMtlWalletBotMessages.was_send == MESSAGE_CLAIMED,
+            )
+            .values(was_send=state)
+        )
+
     async def mark_sent(self, message_id: int) -> None:
         stmt = (
             update(MyMtlWalletBotMessages)
             .where(MyMtlWalletBotMessages.message_id == message_id)
-            .values(was_send=1)
+            .values(was_send=MESSAGE_SENT)
         )
         await self.session.execute(stmt)
         await self.session.commit()
 
     async def mark_failed(self, message_id: int) -> None:
-        # Mark as 2 (failed/retry later?)
         stmt = (
             update(MyMtlWalletBotMessages)
             .where(MyMtlWalletBotMessages.message_id == message_id)
-            .values(was_send=2)
+            .values(was_send=MESSAGE_FAILED)
         )
         await self.session.execute(stmt)
         await self.session.commit()
@@ -2,20 +2,53 @@ from typing import Optional, List, Callable
 from datetime import datetime, timedelta
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from core.domain.entities import User
+from core.domain.entities import User, UserProfile
 from core.interfaces.repositories import IUserRepository
 from db.models import MyMtlWalletBotUsers
+from infrastructure.persistence.identity_map import (
+    RepositoryIdentityMap,
+    profile_write_pending,
+    profile_written,
+)
+from infrastructure.services.profile_cache import ProfileCache
 from other.tron_tools import create_trc_private_key
 
 MAX_USERNAME_SEARCH_QUERY_LENGTH = 58
 
 
 class SqlAlchemyUserRepository(IUserRepository):
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        identity_map: Optional[RepositoryIdentityMap] = None,
+        profile_cache: Optional[ProfileCache] = None,
+    ):
         self.session = session
+        self.identity_map = identity_map
+        self.profile_cache = profile_cache
 
     async def get_by_id(self, user_id: int) -> Optional[User]:
+        if self.identity_map is None:
+            return await self._load_by_id(user_id)
+        return await self.identity_map.cached(
+            self.identity_map.users, user_id, lambda: self._load_by_id(user_id)
+        )
+
+    async def get_profile(self, user_id: int) -> Optional[UserProfile]:
+        if self.profile_cache is None or profile_write_pending(self.session, user_id):
+            return await super().get_profile(user_id)
+
+        async def load() -> Optional[UserProfile]:
+            # Whatever is loaded here is shared, so skip this session's copies.
+            user = await self._load_by_id(user_id, fresh=True)
+            return UserProfile.from_user(user) if user else None
+
+        return await self.profile_cache.user_profile(user_id, load)
+
+    async def _load_by_id(self, user_id: int, *, fresh: bool = False) -> Optional[User]:
         stmt = select(MyMtlWalletBotUsers).where(MyMtlWalletBotUsers.user_id == user_id)
+        if fresh:
+            stmt = stmt.execution_options(populate_existing=True)
         result = await self.session.execute(stmt)
         db_user = result.scalar_one_or_none()
         if db_user:
@@ -23,6 +56,7 @@ class SqlAlchemyUserRepository(IUserRepository):
         return None
 
     async def create(self, user: User) -> User:
+        self._forget_users()
         db_user = MyMtlWalletBotUsers(
             user_id=user.id,
             user_name=user.username,
@@ -34,9 +68,11 @@ class SqlAlchemyUserRepository(IUserRepository):
         # but for now we might rely on auto-flush or manual commit calls in services/tests.
         # We'll assume the session manager handles commits.
         await self.session.flush()
+        await self._profile_changed(user.id)
         return self._to_entity(db_user)
 
     async def update(self, user: User) -> User:
+        self._forget_users()
         stmt = select(MyMtlWalletBotUsers).where(MyMtlWalletBotUsers.user_id == user.id)
         result = await self.session.execute(stmt)
         db_user = result.scalar_one_or_none()
@@ -47,6 +83,7 @@ class SqlAlchemyUserRepository(IUserRepository):
             db_user.can_5000 = user.can_5000
             # session.add(db_user) is not strictly needed if it's already attached, but safe.
             await self.session.flush()
+            await self._profile_changed(user.id)
             return self._to_entity(db_user)
         else:
             # Fallback to create if not exists? Or raise error? Repository pattern usually implies update updates existing.
@@ -54,6 +91,7 @@ class SqlAlchemyUserRepository(IUserRepository):
             raise ValueError(f"User with id {user.id} not found for update")
 
     async def update_lang(self, user_id: int, lang: str):
+        self._forget_users()
         stmt = select(MyMtlWalletBotUsers).where(MyMtlWalletBotUsers.user_id == user_id)
         result = await self.session.execute(stmt)
         user = result.scalar_one_or_none()
@@ -63,6 +101,7 @@ class SqlAlchemyUserRepository(IUserRepository):
             user = MyMtlWalletBotUsers(user_id=user_id, lang=lang)
             self.session.add(user)
         await self.session.flush()
+        await self._profile_changed(user_id)
 
     async def get_account_by_username(
         self, username: str
@@ -124,11 +163,13 @@ class SqlAlchemyUserRepository(IUserRepository):
 
     async def delete(self, user_id: int) -> None:
         """Delete a user."""
+        self._forget_users()
         stmt = select(MyMtlWalletBotUsers).where(MyMtlWalletBotUsers.user_id == user_id)
         result = await self.session.execute(stmt)
         db_user = result.scalar_one_or_none()
         if db_user:
             await self.session.delete(db_user)
+            await self._profile_changed(user_id)
             await self.session.commit()
 
     async def get_usdt_key(
@@ -216,6 +257,14 @@ class SqlAlchemyUserRepository(IUserRepository):
         result = await self.session.execute(stmt)
         return [(row.user_name, row.usdt_amount, row.user_id) for row in result.all()]
 
+    def _forget_users(self) -> None:
+        if self.identity_map is not None:
+            self.identity_map.forget_users()
+
+    async def _profile_changed(self, user_id: int) -> None:
+        if self.profile_cache is not None:
+            await profile_written(self.session, self.profile_cache, user_id)
+
     def _to_entity(self, db_user: MyMtlWalletBotUsers) -> User:
         from typing import cast
 
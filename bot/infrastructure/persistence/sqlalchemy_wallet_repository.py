@@ -1,12 +1,20 @@
+from datetime import datetime
 from typing import List, Optional
 from sqlalchemy import update, func, CursorResult
 from sqlalchemy.exc import DBAPIError
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
-from core.domain.entities import Wallet
+from core.domain.entities import Wallet, WalletProfile
 from core.interfaces.repositories import IWalletRepository
 from db.models import MyMtlWalletBot
+from infrastructure.persistence.identity_map import (
+    RepositoryIdentityMap,
+    profile_write_pending,
+    profile_written,
+)
+from infrastructure.services.profile_cache import ProfileCache
+from infrastructure.utils.serialization import dump_values, load_values
 
 
 def _is_firebird_update_conflict(exc: DBAPIError) -> bool:
@@ -17,8 +25,15 @@ def _is_firebird_update_conflict(exc: DBAPIError) -> bool:
 
 
 class SqlAlchemyWalletRepository(IWalletRepository):
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        identity_map: Optional[RepositoryIdentityMap] = None,
+        profile_cache: Optional[ProfileCache] = None,
+    ):
         self.session = session
+        self.identity_map = identity_map
+        self.profile_cache = profile_cache
 
     async def get_by_user_id(self, user_id: int) -> List[Wallet]:
         stmt = select(MyMtlWalletBot).where(MyMtlWalletBot.user_id == user_id)
@@ -27,6 +42,13 @@ class SqlAlchemyWalletRepository(IWalletRepository):
         return [self._to_entity(w) for w in db_wallets]
 
     async def get_by_id(self, wallet_id: int) -> Optional[Wallet]:
+        if self.identity_map is None:
+            return await self._load_by_id(wallet_id)
+        return await self.identity_map.cached(
+            self.identity_map.wallets, wallet_id, lambda: self._load_by_id(wallet_id)
+        )
+
+    async def _load_by_id(self, wallet_id: int) -> Optional[Wallet]:
         stmt = select(MyMtlWalletBot).where(MyMtlWalletBot.id == wallet_id)
         result = await self.session.execute(stmt)
         db_wallet = result.scalar_one_or_none()
@@ -43,6 +65,28 @@ class SqlAlchemyWalletRepository(IWalletRepository):
         return None
 
     async def get_default_wallet(self, user_id: int) -> Optional[Wallet]:
+        if self.identity_map is None:
+            return await self._load_default_wallet(user_id)
+        return await self.identity_map.cached(
+            self.identity_map.default_wallets,
+            user_id,
+            lambda: self._load_default_wallet(user_id),
+        )
+
+    async def get_default_wallet_profile(self, user_id: int) -> Optional[WalletProfile]:
+        if self.profile_cache is None or profile_write_pending(self.session, user_id):
+            return await super().get_default_wallet_profile(user_id)
+
+        async def load() -> Optional[WalletProfile]:
+            # Whatever is loaded here is shared, so skip this session's copies.
+            wallet = await self._load_default_wallet(user_id, fresh=True)
+            return WalletProfile.from_wallet(wallet) if wallet else None
+
+        return await self.profile_cache.wallet_profile(user_id, load)
+
+    async def _load_default_wallet(
+        self, user_id: int, *, fresh: bool = False
+    ) -> Optional[Wallet]:
         stmt = (
             select(MyMtlWalletBot)
             .where(MyMtlWalletBot.user_id == user_id)
@@ -50,6 +94,8 @@ class SqlAlchemyWalletRepository(IWalletRepository):
             .where(MyMtlWalletBot.need_delete == 0)
             .order_by(MyMtlWalletBot.id.desc())
         )
+        if fresh:
+            stmt = stmt.execution_options(populate_existing=True)
         result = await self.session.execute(stmt)
         db_wallets = result.scalars().all()
         if len(db_wallets) > 1:
@@ -75,6 +121,7 @@ class SqlAlchemyWalletRepository(IWalletRepository):
         return [self._to_entity(w) for w in db_wallets]
 
     async def create(self, wallet: Wallet) -> Wallet:
+        self._forget_wallets()
         db_wallet = MyMtlWalletBot(
             user_id=wallet.user_id,
             public_key=wallet.public_key,
@@ -92,9 +139,11 @@ class SqlAlchemyWalletRepository(IWalletRepository):
         )
         self.session.add(db_wallet)
         await self.session.flush()
+        await self._profile_changed(wallet.user_id)
         return self._to_entity(db_wallet)
 
     async def update(self, wallet: Wallet) -> Wallet:
+        self._forget_wallets()
         stmt = select(MyMtlWalletBot).where(MyMtlWalletBot.id == wallet.id)
         result = await self.session.execute(stmt)
         db_wallet = result.scalar_one_or_none()
@@ -104,9 +153,7 @@ class SqlAlchemyWalletRepository(IWalletRepository):
 
             # Serialize balances
             if wallet.balances is not None:
-                import jsonpickle  # type: ignore
-
-                db_wallet.balances = jsonpickle.encode(wallet.balances)
+                db_wallet.balances = dump_values(wallet.balances)
                 db_wallet.balances_updated_at = wallet.balances_updated_at
             else:
                 db_wallet.balances = None
@@ -128,6 +175,7 @@ class SqlAlchemyWalletRepository(IWalletRepository):
             db_wallet.free_wallet = 1 if wallet.is_free else 0
 
             await self.session.flush()
+            await self._profile_changed(wallet.user_id)
             return self._to_entity(db_wallet)
         raise ValueError(f"Wallet with id {wallet.id} not found for update")
 
@@ -137,16 +185,13 @@ class SqlAlchemyWalletRepository(IWalletRepository):
         Balance cache is non-authoritative. A transient Firebird write conflict
         should not fail the user-facing live balance response.
         """
-        import jsonpickle  # type: ignore
-
         if wallet.id is None:
             raise ValueError("Wallet id is required for balance cache update")
+        self._forget_wallets()
 
         values = {
             "balances": (
-                jsonpickle.encode(wallet.balances)
-                if wallet.balances is not None
-                else None
+                dump_values(wallet.balances) if wallet.balances is not None else None
             ),
             "balances_event_id": str(wallet.balances_event_id),
             "balances_updated_at": wallet.balances_updated_at,
@@ -175,6 +220,7 @@ class SqlAlchemyWalletRepository(IWalletRepository):
 
     async def reset_balance_cache(self, user_id: int) -> None:
         """Reset the cached balance for the user's default wallet."""
+        self._forget_wallets()
         stmt = (
             select(MyMtlWalletBot)
             .where(MyMtlWalletBot.user_id == user_id)
@@ -191,6 +237,7 @@ class SqlAlchemyWalletRepository(IWalletRepository):
 
     async def reset_balance_cache_by_wallet_id(self, wallet_id: int) -> bool:
         """Reset cached balance fields for one wallet without loading the row."""
+        self._forget_wallets()
         stmt = (
             update(MyMtlWalletBot)
             .where(MyMtlWalletBot.id == wallet_id)
@@ -215,6 +262,7 @@ class SqlAlchemyWalletRepository(IWalletRepository):
         wallet_id: Optional[int] = None,
     ) -> None:
         """Delete or soft-delete a wallet."""
+        self._forget_wallets()
         if user_id < 1:
             return
         stmt = (
@@ -230,9 +278,35 @@ class SqlAlchemyWalletRepository(IWalletRepository):
             if erase:
                 await self.session.delete(db_wallet)
             else:
+                # last_use_day marks when the wallet was deleted for the
+                # incremental notifier subscription sync.
                 db_wallet.need_delete = 1
+                db_wallet.last_use_day = datetime.now()
+            await self._profile_changed(user_id)
             await self.session.commit()
 
+    async def mark_deleted_by_id(self, wallet_id: int) -> bool:
+        """Soft-delete one active wallet by primary key and commit.
+
+        Returns False when there is no such wallet or it is already deleted.
+        """
+        self._forget_wallets()
+        stmt = (
+            select(MyMtlWalletBot)
+            .where(MyMtlWalletBot.id == wallet_id)
+            .where(MyMtlWalletBot.need_delete == 0)
+        )
+        result = await self.session.execute(stmt)
+        db_wallet = result.scalar_one_or_none()
+        if db_wallet is None:
+            return False
+        db_wallet.need_delete = 1
+        db_wallet.last_use_day = datetime.now()
+        if db_wallet.user_id is not None:
+            await self._profile_changed(db_wallet.user_id)
+        await self.session.commit()
+        return True
+
     async def count_free_wallets(self, user_id: int) -> int:
         """Count the number of active free wallets for a user."""
         stmt = (
@@ -246,6 +320,7 @@ class SqlAlchemyWalletRepository(IWalletRepository):
 
     async def set_default_wallet(self, user_id: int, public_key: str) -> bool:
         """Set a wallet as default for the user."""
+        self._forget_wallets()
         stmt_target = (
             select(MyMtlWalletBot)
             .where(MyMtlWalletBot.user_id == user_id)
@@ -277,6 +352,7 @@ class SqlAlchemyWalletRepository(IWalletRepository):
         # We usually let the service layer commit, but here we might need flush to ensure updates are ready?
         # db/requests.py committed immediately.
         await self.session.flush()
+        await self._profile_changed(user_id)
         if isinstance(result, CursorResult):
             return result.rowcount > 0
         return False
@@ -295,6 +371,7 @@ class SqlAlchemyWalletRepository(IWalletRepository):
         if len(default_wallets) <= 1:
             return False
 
+        self._forget_wallets()
         keep_wallet = default_wallets[0]
         stmt_unset_duplicates = (
             update(MyMtlWalletBot)
@@ -306,6 +383,7 @@ class SqlAlchemyWalletRepository(IWalletRepository):
         )
         await self.session.execute(stmt_unset_duplicates)
         await self.session.flush()
+        await self._profile_changed(user_id)
         logger.warning(
             "Normalized duplicate default wallets for user_id={}; kept wallet_id={}; duplicates={}",
             user_id,
@@ -316,15 +394,17 @@ class SqlAlchemyWalletRepository(IWalletRepository):
 
     async def delete_all_by_user(self, user_id: int) -> None:
         """Delete (soft-delete) all wallets for a user."""
+        self._forget_wallets()
         if user_id < 1:
             return
 
         stmt = (
             update(MyMtlWalletBot)
             .where(MyMtlWalletBot.user_id == user_id)
-            .values(need_delete=1)
+            .values(need_delete=1, last_use_day=datetime.now())
         )
         await self.session.execute(stmt)
+        await self._profile_changed(user_id)
         await self.session.commit()
 
     async def get_info(self, user_id: int, public_key: str) -> str:
@@ -354,15 +434,21 @@ class SqlAlchemyWalletRepository(IWalletRepository):
         else:
             return "(?)"
 
+    def _forget_wallets(self) -> None:
+        if self.identity_map is not None:
+            self.identity_map.forget_wallets()
+
+    async def _profile_changed(self, user_id: int) -> None:
+        if self.profile_cache is not None:
+            await profile_written(self.session, self.profile_cache, user_id)
+
     def _to_entity(self, db_wallet: MyMtlWalletBot) -> Wallet:
         from typing import cast
 
         balances = None
         if db_wallet.balances:
             try:
-                import jsonpickle
-
-                balances = jsonpickle.decode(db_wallet.balances)
+                balances = load_values(db_wallet.balances)
             except Exception:
                 balances = []
 
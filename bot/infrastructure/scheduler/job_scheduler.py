@@ -1,8 +1,19 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
 from aiogram import Dispatcher
 from apscheduler.schedulers.asyncio import AsyncIOScheduler  # type: ignore[import-untyped]
 
 from db.db_pool import DatabasePool
+from infrastructure.services.log_archive import LogArchive
+from infrastructure.workers.log_retention_worker import (
+    CallbackLogRetention,
+    RetentionRunLease,
+    cmd_archive_callback_log,
+)
 from infrastructure.workers.message_worker import cmd_send_message_1m
+from infrastructure.workers.stats_worker import cmd_refresh_stats_totals
+from other.config_reader import config
 from infrastructure.services.app_context import AppContext
 
 
@@ -19,4 +30,35 @@ def scheduler_jobs(
         args=(app_context,),
         misfire_grace_time=60,
     )
+    scheduler.add_job(
+        cmd_refresh_stats_totals,
+        "interval",
+        minutes=config.stats_totals_refresh_minutes,
+        args=(app_context,),
+        next_run_time=datetime.now(timezone.utc),
+        misfire_grace_time=60,
+    )
+    if config.log_retention_days > 0:
+        retention = CallbackLogRetention(
+            db_pool,
+            LogArchive(Path(config.log_archive_dir)),
+            retention_days=config.log_retention_days,
+            batch_size=config.log_retention_batch_size,
+            batch_pause_seconds=config.log_retention_batch_pause_seconds,
+            max_batches=config.log_retention_max_batches,
+            max_run_seconds=config.log_retention_max_run_seconds,
+        )
+        # Without Redis there is no lease; run the bot on a single instance then.
+        lease = (
+            RetentionRunLease(app_context.notification_redis)
+            if app_context.notification_redis is not None
+            else None
+        )
+        scheduler.add_job(
+            cmd_archive_callback_log,
+            "interval",
+            minutes=config.log_retention_interval_minutes,
+            args=(retention, lease),
+            misfire_grace_time=60,
+        )
     # scheduler.add_job(cmd_send_message_events, "interval", seconds=8, args=(db_pool, dp), misfire_grace_time=60)
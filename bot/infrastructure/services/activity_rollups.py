@@ -0,0 +1,185 @@
+"""Hourly and daily activity rollups behind the admin ``/stats`` command."""
+
+from collections import Counter
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import (
+    MyMtlWalletBot,
+    MyMtlWalletBotCheque,
+    MyMtlWalletBotLog,
+    MyMtlWalletBotTransactions,
+    MyMtlWalletBotUsers,
+)
+from infrastructure.log_models import LogQuery
+
+TOP_OPERATIONS = 5
+HOURS_PER_DAY = 24
+DAYS_PER_WEEK = 7
+# Buckets outlive the windows that read them by at least one bucket.
+HOURLY_TTL_SECONDS = 2 * 24 * 60 * 60
+DAILY_TTL_SECONDS = 9 * 24 * 60 * 60
+
+TOTAL_MODELS = {
+    "users": MyMtlWalletBotUsers,
+    "wallets": MyMtlWalletBot,
+    "transactions": MyMtlWalletBotTransactions,
+    "cheques": MyMtlWalletBotCheque,
+    "log": MyMtlWalletBotLog,
+}
+
+_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+@dataclass(frozen=True)
+class ActivitySnapshot:
+    totals: dict[str, int]
+    totals_refreshed_at: Optional[datetime]
+    actions_24h: int
+    users_24h: int
+    actions_7d: int
+    users_7d: int
+    top_operations_7d: list[tuple[str, int]]
+    counting_since: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return None if value is None else datetime.strptime(value, _TIME_FORMAT)
+
+
+class ActivityRollups:
+    """Activity counters kept in Redis as the callback log is written.
+
+    Each flushed log batch adds to hourly and daily buckets: an action
+    counter, a HyperLogLog of user ids and, per day, a sorted set of
+    operations. The 24 h figures read the current hour and the 23 before
+    it. The 7 day figures read today and the 6 days before it. Unique users
+    are HyperLogLog estimates, within about 1%. Table totals are counted by
+    a scheduled ``refresh_totals``. Reading a snapshot costs the same however
+    large ``MYMTLWALLETBOT_LOG`` grows. Buckets use the local time of
+    ``log_dt``, the same clock the log rows carry.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        key_prefix: str = "",
+        clock: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        self._redis = redis
+        self._prefix = f"{key_prefix}stats:"
+        self._clock = clock
+
+    async def record(self, items: Sequence[LogQuery]) -> None:
+        """Add written log rows to the buckets; Redis errors are logged only."""
+        if not items:
+            return
+        actions: Counter[str] = Counter()
+        users: dict[str, set[int]] = {}
+        operations: dict[str, Counter[str]] = {}
+        for item in items:
+            hour, day = self._hour_key(item.log_dt), self._day_key(item.log_dt)
+            for bucket in (hour, day):
+                actions[bucket] += 1
+                users.setdefault(bucket, set()).add(item.user_id)
+            operations.setdefault(day, Counter())[item.log_operation_info[:32]] += 1
+        now = self._clock().strftime(_TIME_FORMAT)
+        pipeline = self._redis.pipeline(transaction=False)
+        for bucket, count in actions.items():
+            ttl = HOURLY_TTL_SECONDS if ":h:" in bucket else DAILY_TTL_SECONDS
+            pipeline.incrby(f"{self._prefix}actions{bucket}", count)
+            pipeline.expire(f"{self._prefix}actions{bucket}", ttl)
+            pipeline.pfadd(f"{self._prefix}users{bucket}", *users[bucket])
+            pipeline.expire(f"{self._prefix}users{bucket}", ttl)
+        for bucket, counts in operations.items():
+            key = f"{self._prefix}operations{bucket}"
+            for operation, count in counts.items():
+                pipeline.zincrby(key, count, operation)
+            pipeline.expire(key, DAILY_TTL_SECONDS)
+        pipeline.set(f"{self._prefix}counting_since", now, nx=True)
+        pipeline.set(f"{self._prefix}updated_at", now)
+        try:
+            await pipeline.execute()
+        except RedisError:
+            logger.bind(event="activity_rollup_failed", rows=len(items)).opt(
+                exception=True
+            ).warning("activity rollup was not updated")
+
+    async def refresh_totals(self, session: AsyncSession) -> dict[str, int]:
+        """Count the table totals and store them with the time of counting."""
+        totals: dict[str, int] = {}
+        for name, model in TOTAL_MODELS.items():
+            totals[name] = (
+                await session.scalar(select(func.count()).select_from(model)) or 0
+            )
+        mapping: dict[str | bytes, int | str] = {
+            name: count for name, count in totals.items()
+        }
+        mapping["refreshed_at"] = self._clock().strftime(_TIME_FORMAT)
+        await self._redis.hset(f"{self._prefix}totals", mapping=mapping)
+        return totals
+
+    async def snapshot(self) -> ActivitySnapshot:
+        now = self._clock()
+        hours = [
+            self._hour_key(now - timedelta(hours=offset))
+            for offset in range(HOURS_PER_DAY)
+        ]
+        days = [
+            self._day_key(now - timedelta(days=offset))
+            for offset in range(DAYS_PER_WEEK)
+        ]
+        pipeline = self._redis.pipeline(transaction=False)
+        pipeline.hgetall(f"{self._prefix}totals")
+        pipeline.mget([f"{self._prefix}actions{bucket}" for bucket in hours])
+        pipeline.pfcount(*[f"{self._prefix}users{bucket}" for bucket in hours])
+        pipeline.mget([f"{self._prefix}actions{bucket}" for bucket in days])
+        pipeline.pfcount(*[f"{self._prefix}users{bucket}" for bucket in days])
+        pipeline.zunion(
+            [f"{self._prefix}operations{bucket}" for bucket in days], withscores=True
+        )
+        pipeline.get(f"{self._prefix}counting_since")
+        pipeline.get(f"{self._prefix}updated_at")
+        (
+            totals,
+            hourly_actions,
+            users_24h,
+            daily_actions,
+            users_7d,
+            operations,
+            counting_since,
+            updated_at,
+        ) = await pipeline.execute()
+        refreshed_at = totals.pop("refreshed_at", None)
+        top = sorted(operations, key=lambda item: (-item[1], item[0]))
+        return ActivitySnapshot(
+            totals={name: int(value) for name, value in totals.items()},
+            totals_refreshed_at=_parse_time(refreshed_at),
+            actions_24h=sum(int(value or 0) for value in hourly_actions),
+            users_24h=int(users_24h),
+            actions_7d=sum(int(value or 0) for value in daily_actions),
+            users_7d=int(users_7d),
+            top_operations_7d=[
+                (operation, int(score)) for operation, score in top[:TOP_OPERATIONS]
+            ],
+            counting_since=_parse_time(counting_since),
+            updated_at=_parse_time(updated_at),
+        )
+
+    @staticmethod
+    def _hour_key(moment: datetime) -> str:
+        return f":h:{moment:%Y%m%d%H}"
+
+    @staticmethod
+    def _day_key(moment: datetime) -> str:
+        return f":d:{moment:%Y%m%d}"
@@ -0,0 +1,161 @@
+"""AIMD concurrency limit with a bounded wait queue for inbound requests."""
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+
+MAX_RETRY_AFTER_SECONDS = 60
+# Weight of the newest sample in the smoothed processing latency.
+LATENCY_SMOOTHING = 0.2
+
+
+class ConcurrencyLimitExceeded(RuntimeError):
+    """The wait queue is full or the wait timed out; retry after ``retry_after``."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"concurrency limit exceeded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdaptiveConcurrencyLimiter:
+    """Admit work up to a limit that adapts to observed processing latency.
+
+    Each completion under ``latency_target_seconds`` raises the limit by
+    ``1 / limit``, so it grows by about one per full round of requests. A slow
+    or failed completion multiplies it by ``backoff_ratio``, at most once per
+    target interval so one burst counts as one congestion signal. Callers over
+    the limit wait in FIFO order. They are rejected when ``max_queue`` callers
+    are already waiting, or after ``queue_timeout_seconds``.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        max_queue: int = 100,
+        queue_timeout_seconds: float = 5.0,
+        latency_target_seconds: float = 1.0,
+        backoff_ratio: float = 0.7,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        if not 0 < min_limit <= initial_limit <= max_limit:
+            raise ValueError("limits must satisfy 0 < min <= initial <= max")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+        for name, value in (
+            ("queue_timeout_seconds", queue_timeout_seconds),
+            ("latency_target_seconds", latency_target_seconds),
+        ):
+            if not math.isfinite(value) or value <= 0:
+                raise ValueError(f"{name} must be finite and positive")
+        if not 0 < backoff_ratio < 1:
+            raise ValueError("backoff_ratio must be between 0 and 1")
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._max_queue = max_queue
+        self._queue_timeout_seconds = queue_timeout_seconds
+        self._latency_target_seconds = latency_target_seconds
+        self._backoff_ratio = backoff_ratio
+        self._clock = clock
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._last_backoff_at: float | None = None
+        self._latency_seconds = latency_target_seconds / 2
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained."""
+        drain = self._latency_seconds * (self.queued + 1) / self.limit
+        return max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(drain)))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one unit of concurrency; raise ``ConcurrencyLimitExceeded``."""
+        await self._acquire()
+        started = self._clock()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self._release(self._clock() - started, failed=failed)
+
+    def as_dict(self) -> dict[str, float | int]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "latency_ms": round(self._latency_seconds * 1000, 3),
+        }
+
+    async def _acquire(self) -> None:
+        if not self._waiters and self.in_flight < self.limit:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self._max_queue:
+            self.rejected += 1
+            raise ConcurrencyLimitExceeded(self.retry_after())
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(waiter), timeout=self._queue_timeout_seconds
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            if waiter.done():
+                # The slot was handed over just as the wait ended; pass it on.
+                self.in_flight -= 1
+                self._wake()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(error, asyncio.TimeoutError):
+                self.rejected += 1
+                self.timed_out += 1
+                raise ConcurrencyLimitExceeded(self.retry_after()) from None
+            raise
+
+    def _release(self, seconds: float, *, failed: bool) -> None:
+        self.in_flight -= 1
+        self.completed += 1
+        self._latency_seconds += LATENCY_SMOOTHING * (seconds - self._latency_seconds)
+        if failed or seconds > self._latency_target_seconds:
+            now = self._clock()
+            if (
+                self._last_backoff_at is None
+                or now - self._last_backoff_at >= self._latency_target_seconds
+            ):
+                self._last_backoff_at = now
+                self._limit = max(
+                    float(self._min_limit), self._limit * self._backoff_ratio
+                )
+        else:
+            self._limit = min(float(self._max_limit), self._limit + 1 / self._limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
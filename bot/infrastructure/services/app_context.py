@@ -20,12 +20,22 @@ if TYPE_CHECKING:
     )
     from infrastructure.services.notification_history_service import (
         NotificationHistoryService,
+        RedisNotificationHistoryService,
     )
     from infrastructure.services.notification_service import NotificationService
     from infrastructure.services.bot_health_service import BotHealthService
     from infrastructure.workers.notification_delivery_worker import (
         NotificationDeliveryWorker,
     )
+    from infrastructure.workers.notification_ingest_worker import (
+        NotificationIngestWorker,
+    )
+    from infrastructure.workers.notification_compaction_worker import (
+        NotificationCompactionWorker,
+    )
+    from infrastructure.workers.log_writer import CallbackLogWriter
+    from infrastructure.services.activity_rollups import ActivityRollups
+    from infrastructure.workers.message_worker import MessageOutbox
     from redis.asyncio import Redis
 
 
@@ -41,7 +51,7 @@ class AppContext:
         db_pool: DatabasePool,
         admin_id: int,
         cheque_queue: asyncio.Queue,
-        log_queue: asyncio.Queue,
+        log_writer: "CallbackLogWriter",
         repository_factory: IRepositoryFactory,
         stellar_service: IStellarService,
         encryption_service: IEncryptionService,
@@ -50,20 +60,26 @@ class AppContext:
         localization_service: Optional[LocalizationService] = None,
         dispatcher: Optional[Dispatcher] = None,
         notification_service: Optional["NotificationService"] = None,
-        notification_history: Optional["NotificationHistoryService"] = None,
+        notification_history: Optional[
+            "NotificationHistoryService | RedisNotificationHistoryService"
+        ] = None,
         notification_coordinator: Optional["NotificationCoordinator"] = None,
         notification_redis: Optional["Redis"] = None,
         notification_store: Optional["NotificationRedisStore"] = None,
         notification_delivery_worker: Optional["NotificationDeliveryWorker"] = None,
         notification_badge_service: Optional["NotificationBadgeService"] = None,
+        notification_ingest_worker: Optional["NotificationIngestWorker"] = None,
+        notification_compaction_worker: Optional["NotificationCompactionWorker"] = None,
         bot_health_service: Optional["BotHealthService"] = None,
         stellar_sealedbox_service: Optional[IStellarSealedBoxService] = None,
+        message_outbox: Optional["MessageOutbox"] = None,
+        activity_rollups: Optional["ActivityRollups"] = None,
     ):
         self.bot = bot
         self.db_pool = db_pool
         self.admin_id = admin_id
         self.cheque_queue = cheque_queue
-        self.log_queue = log_queue
+        self.log_writer = log_writer
         self.repository_factory = repository_factory
         self.stellar_service = stellar_service
         self.encryption_service = encryption_service
@@ -78,5 +94,9 @@ class AppContext:
         self.notification_store = notification_store
         self.notification_delivery_worker = notification_delivery_worker
         self.notification_badge_service = notification_badge_service
+        self.notification_ingest_worker = notification_ingest_worker
+        self.notification_compaction_worker = notification_compaction_worker
         self.bot_health_service = bot_health_service
         self.stellar_sealedbox_service = stellar_sealedbox_service
+        self.message_outbox = message_outbox
+        self.activity_rollups = activity_rollups
@@ -1,9 +1,56 @@
+from collections import OrderedDict
+from collections.abc import Iterable
 import json
 import os
-from typing import Dict, Union, Tuple
+import time
+from typing import Any, Callable, Dict, Optional, Union, Tuple
 from sqlalchemy.future import select
 from db.models import MyMtlWalletBotUsers
 
+DEFAULT_LANGUAGE = "en"
+# One IN (...) query per chunk keeps the statement size bounded.
+PRELOAD_CHUNK_SIZE = 500
+
+
+class UserLanguageCache:
+    """Bounded LRU of user languages whose entries expire after ``ttl_seconds``."""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self._entries: OrderedDict[int, Tuple[str, float]] = OrderedDict()
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+
+    def get(self, user_id: int) -> Optional[str]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        lang, expires_at = entry
+        if expires_at <= self._clock():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return lang
+
+    def set(self, user_id: int, lang: str) -> None:
+        self._entries[user_id] = (lang, self._clock() + self._ttl_seconds)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.get(user_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
 
 class LocalizationService:
     """
@@ -11,10 +58,18 @@ class LocalizationService:
     Replaces global_data.lang_dict and global_data.user_lang_dic.
     """
 
-    def __init__(self, db_pool):
+    def __init__(
+        self,
+        db_pool,
+        *,
+        user_cache_size: int = 100_000,
+        user_cache_ttl_seconds: float = 6 * 60 * 60,
+    ):
         # db_pool is expected to be DatabasePool or object with get_session async context manager
         self.lang_dict: Dict[str, Dict] = {}
-        self.user_lang_cache: Dict[int, str] = {}
+        self.user_lang_cache = UserLanguageCache(
+            user_cache_size, user_cache_ttl_seconds
+        )
         self.db_pool = db_pool
 
     async def load_languages(self, lang_dir: str):
@@ -34,8 +89,9 @@ class LocalizationService:
 
     async def get_user_language_async(self, user_id: int) -> str:
         """Get user's language (cached or from DB asynchronously)"""
-        if user_id in self.user_lang_cache:
-            return self.user_lang_cache[user_id]
+        cached = self.user_lang_cache.get(user_id)
+        if cached is not None:
+            return cached
 
         # If not in cache, try to fetch from DB
         async with self.db_pool.get_session() as session:
@@ -49,16 +105,50 @@ class LocalizationService:
             except Exception:
                 lang = "en"
 
-        self.user_lang_cache[user_id] = lang
+        self.user_lang_cache.set(user_id, lang)
         return lang
 
+    async def preload_user_languages(
+        self, user_ids: Iterable[int], *, session: Any = None
+    ) -> None:
+        """Cache languages of uncached users with batched IN (...) queries.
+
+        Lets background rendering (webhook notifications) use the cache-only
+        ``get_user_language`` for users who have not written to the bot since
+        the last restart. Pass ``session`` to reuse an open DB session.
+        """
+        missing = sorted(
+            {user_id for user_id in user_ids if user_id not in self.user_lang_cache}
+        )
+        if not missing:
+            return
+        if session is None:
+            async with self.db_pool.get_session() as own_session:
+                await self._load_user_languages(own_session, missing)
+        else:
+            await self._load_user_languages(session, missing)
+
+    async def _load_user_languages(self, session: Any, user_ids: list[int]) -> None:
+        for start in range(0, len(user_ids), PRELOAD_CHUNK_SIZE):
+            chunk = user_ids[start : start + PRELOAD_CHUNK_SIZE]
+            stmt = select(MyMtlWalletBotUsers.user_id, MyMtlWalletBotUsers.lang).where(
+                MyMtlWalletBotUsers.user_id.in_(chunk)
+            )
+            result = await session.execute(stmt)
+            found = {int(user_id): lang for user_id, lang in result.all()}
+            for user_id in chunk:
+                # Unknown users are cached as English so they are not re-queried.
+                self.user_lang_cache.set(
+                    user_id, found.get(user_id) or DEFAULT_LANGUAGE
+                )
+
     def get_user_language(self, user_id: int) -> str:
         """Get user's language from CACHE ONLY. Fallback to 'en'."""
-        return self.user_lang_cache.get(user_id, "en")
+        return self.user_lang_cache.get(user_id) or DEFAULT_LANGUAGE
 
     def set_user_language(self, user_id: int, lang: str):
         """Update user's language in cache."""
-        self.user_lang_cache[user_id] = lang
+        self.user_lang_cache.set(user_id, lang)
 
     def get_text(self, user_id: Union[int, str], key: str, params: Tuple = ()) -> str:
         """Get localized text for user (synchronous, cache-based)"""
@@ -0,0 +1,150 @@
+"""Daily gzip CSV archive of expired callback log rows."""
+
+import csv
+import gzip
+import io
+import os
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional
+
+COLUMNS = ("log_id", "user_id", "log_dt", "log_operation", "log_operation_info")
+SIZE_HISTORY_COLUMNS = ("taken_at", "rows", "oldest", "archived")
+_FILE_PREFIX = "callback-log-"
+_FILE_SUFFIX = ".csv.gz"
+_SIZE_HISTORY = "table-size.csv"
+_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+@dataclass(frozen=True)
+class ArchivedLogRow:
+    log_id: int
+    user_id: Optional[int]
+    log_dt: datetime
+    log_operation: str
+    log_operation_info: str
+
+
+@dataclass(frozen=True)
+class TableSizeSample:
+    taken_at: datetime
+    rows: int
+    oldest: Optional[datetime]
+    archived: int
+
+
+def _parse_time(value: str) -> Optional[datetime]:
+    return datetime.strptime(value, _TIME_FORMAT) if value else None
+
+
+class LogArchive:
+    """One gzip CSV file per day of ``log_dt``, without a header row.
+
+    ``append`` adds a new gzip member to the day's file and syncs it to disk
+    before returning, so rows are deleted from the table only after they
+    are safe. A crash between the two steps archives the same rows again.
+    ``read`` skips a ``log_id`` it has already returned from that day's file.
+    The directory also keeps a CSV history of table size samples.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+
+    def append(self, day: date, rows: Iterable[ArchivedLogRow]) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(
+                (
+                    row.log_id,
+                    "" if row.user_id is None else row.user_id,
+                    row.log_dt.strftime(_TIME_FORMAT),
+                    row.log_operation,
+                    row.log_operation_info,
+                )
+            )
+        self._directory.mkdir(parents=True, exist_ok=True)
+        with open(self.path_for(day), "ab") as file:
+            file.write(gzip.compress(buffer.getvalue().encode()))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def read(
+        self,
+        start: date,
+        end: date,
+        *,
+        user_id: Optional[int] = None,
+        operation: Optional[str] = None,
+    ) -> Iterator[ArchivedLogRow]:
+        """Rows archived for the days ``start`` to ``end`` inclusive."""
+        for day, path, _ in self.day_files():
+            if not start <= day <= end:
+                continue
+            seen: set[int] = set()
+            with gzip.open(path, "rt", newline="") as file:
+                for values in csv.reader(file):
+                    row = ArchivedLogRow(
+                        log_id=int(values[0]),
+                        user_id=int(values[1]) if values[1] else None,
+                        log_dt=datetime.strptime(values[2], _TIME_FORMAT),
+                        log_operation=values[3],
+                        log_operation_info=values[4],
+                    )
+                    if row.log_id in seen:
+                        continue
+                    seen.add(row.log_id)
+                    if user_id is not None and row.user_id != user_id:
+                        continue
+                    if operation is not None and row.log_operation_info != operation:
+                        continue
+                    yield row
+
+    def day_files(self) -> list[tuple[date, Path, int]]:
+        """Archived days with their file and its size in bytes, oldest first."""
+        if not self._directory.is_dir():
+            return []
+        files = []
+        for path in self._directory.glob(f"{_FILE_PREFIX}*{_FILE_SUFFIX}"):
+            stamp = path.name[len(_FILE_PREFIX) : -len(_FILE_SUFFIX)]
+            files.append((date.fromisoformat(stamp), path, path.stat().st_size))
+        return sorted(files)
+
+    def path_for(self, day: date) -> Path:
+        return self._directory / f"{_FILE_PREFIX}{day.isoformat()}{_FILE_SUFFIX}"
+
+    def record_size(self, sample: TableSizeSample) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._directory / _SIZE_HISTORY
+        is_new = not path.exists()
+        with open(path, "a", newline="") as file:
+            writer = csv.writer(file)
+            if is_new:
+                writer.writerow(SIZE_HISTORY_COLUMNS)
+            writer.writerow(
+                (
+                    sample.taken_at.strftime(_TIME_FORMAT),
+                    sample.rows,
+                    ""
+                    if sample.oldest is None
+                    else sample.oldest.strftime(_TIME_FORMAT),
+                    sample.archived,
+                )
+            )
+
+    def size_history(self) -> list[TableSizeSample]:
+        path = self._directory / _SIZE_HISTORY
+        if not path.exists():
+            return []
+        with open(path, newline="") as file:
+            return [
+                TableSizeSample(
+                    taken_at=datetime.strptime(record["taken_at"], _TIME_FORMAT),
+                    rows=int(record["rows"]),
+                    oldest=_parse_time(record["oldest"]),
+                    archived=int(record["archived"]),
+                )
+                for record in csv.DictReader(file)
+            ]
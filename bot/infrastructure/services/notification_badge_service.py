@@ -15,21 +15,36 @@ from loguru import logger
 from redis.asyncio import Redis
 from redis.exceptions import ResponseError, WatchError
 
+from infrastructure.services.notification_metrics import (
+    STAGE_UI_LOCK_WAIT,
+    NotificationMetrics,
+)
 from infrastructure.services.notification_redis_store import NotificationRedisStore
 
 
 BADGE_CALLBACK_DATA = "notification_pending:flush"
 BASE_MARKUP_KEY_PREFIX = "notification:base_markup:"
 UI_MARKUP_LOCK_KEY_PREFIX = "notification:ui_markup_lock:"
+UI_MARKUP_WAKE_KEY_PREFIX = "notification:ui_markup_wake:"
 UI_MARKUP_LOCK_TTL_SECONDS = 15
 UI_MARKUP_LOCK_WAIT_SECONDS = 5
-UI_MARKUP_LOCK_RETRY_SECONDS = 0.05
-
+# Longest single BLPOP on the wake list. It bounds the extra wait when a holder
+# dies and its lease has to expire instead of being released.
+UI_MARKUP_LOCK_BLOCK_SECONDS = 0.5
+# Redis reads a BLPOP timeout in milliseconds and 0 means block forever, so a
+# wait shorter than this counts as timed out.
+UI_MARKUP_LOCK_MIN_BLOCK_SECONDS = 0.01
+
+# Release pushes a single wake token so one waiter on another instance retries
+# at once. The token expires so it cannot wake a much later contender.
 _RELEASE_UI_MARKUP_LOCK = """
 if redis.call('GET', KEYS[1]) ~= ARGV[1] then
     return 0
 end
 redis.call('DEL', KEYS[1])
+redis.call('DEL', KEYS[2])
+redis.call('RPUSH', KEYS[2], '1')
+redis.call('PEXPIRE', KEYS[2], ARGV[2])
 return 1
 """
 
@@ -122,45 +137,102 @@ class BaseMarkup:
     reply_markup: InlineKeyboardMarkup
 
 
+@dataclass
+class _LocalUiLock:
+    lock: asyncio.Lock
+    users: int = 0
+
+
 class NotificationBadgeService:
     """Store base keyboards and derive a pending count badge when refreshing."""
 
     def __init__(
-        self, *, bot: Bot, redis: Redis, store: NotificationRedisStore
+        self,
+        *,
+        bot: Bot,
+        redis: Redis,
+        store: NotificationRedisStore,
+        metrics: NotificationMetrics | None = None,
     ) -> None:
         self._bot = bot
         self._redis = redis
         self._store = store
+        self._metrics = metrics
+        self._local_ui_locks: dict[int, _LocalUiLock] = {}
 
     @asynccontextmanager
     async def ui_markup_lock(self, user_id: int):
-        """Serialize a user's UI markup mutations across all bot instances."""
-        token = uuid.uuid4().hex
-        key = self._ui_lock_key(user_id)
-        deadline = time.monotonic() + UI_MARKUP_LOCK_WAIT_SECONDS
+        """Serialize a user's UI markup mutations across all bot instances.
+
+        Contenders in this process queue on an in-process lock, so only one of
+        them at a time competes for the Redis lease. Contenders on other
+        instances block on the wake list that the holder pushes on release.
+        """
+        started = time.monotonic()
+        deadline = started + UI_MARKUP_LOCK_WAIT_SECONDS
+        async with self._local_ui_lock(user_id, deadline):
+            token = uuid.uuid4().hex
+            key = self._ui_lock_key(user_id)
+            await self._acquire_ui_markup_lock(user_id, key, token, deadline)
+            if self._metrics is not None:
+                self._metrics.observe(STAGE_UI_LOCK_WAIT, time.monotonic() - started)
+
+            lease_lost = asyncio.Event()
+            heartbeat = asyncio.create_task(
+                self._heartbeat_ui_markup_lock(key, token, lease_lost),
+                name=f"notification-ui-markup-lock-heartbeat-{user_id}",
+            )
+            try:
+                yield lease_lost
+            finally:
+                heartbeat.cancel()
+                try:
+                    await heartbeat
+                except asyncio.CancelledError:
+                    pass
+                await self._release_ui_markup_lock(key, token, user_id)
+
+    @asynccontextmanager
+    async def _local_ui_lock(self, user_id: int, deadline: float):
+        entry = self._local_ui_locks.get(user_id)
+        if entry is None:
+            entry = self._local_ui_locks[user_id] = _LocalUiLock(asyncio.Lock())
+        entry.users += 1
+        try:
+            try:
+                await asyncio.wait_for(
+                    entry.lock.acquire(), timeout=deadline - time.monotonic()
+                )
+            except asyncio.TimeoutError:
+                self._ui_lock_unavailable(user_id)
+            try:
+                yield
+            finally:
+                entry.lock.release()
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._local_ui_locks[user_id]
+
+    async def _acquire_ui_markup_lock(
+        self, user_id: int, key: str, token: str, deadline: float
+    ) -> None:
+        wake_key = self._ui_wake_key(user_id)
         while not await self._redis.set(
             key, token, nx=True, px=UI_MARKUP_LOCK_TTL_SECONDS * 1000
         ):
-            if time.monotonic() >= deadline:
-                raise UiMarkupLockUnavailable(
-                    f"timed out waiting for UI markup lock for user {user_id}"
-                )
-            await asyncio.sleep(UI_MARKUP_LOCK_RETRY_SECONDS)
+            remaining = deadline - time.monotonic()
+            if remaining < UI_MARKUP_LOCK_MIN_BLOCK_SECONDS:
+                self._ui_lock_unavailable(user_id)
+            await self._redis.blpop(
+                [wake_key], timeout=min(remaining, UI_MARKUP_LOCK_BLOCK_SECONDS)
+            )
 
-        lease_lost = asyncio.Event()
-        heartbeat = asyncio.create_task(
-            self._heartbeat_ui_markup_lock(key, token, lease_lost),
-            name=f"notification-ui-markup-lock-heartbeat-{user_id}",
+    @staticmethod
+    def _ui_lock_unavailable(user_id: int) -> None:
+        raise UiMarkupLockUnavailable(
+            f"timed out waiting for UI markup lock for user {user_id}"
         )
-        try:
-            yield lease_lost
-        finally:
-            heartbeat.cancel()
-            try:
-                await heartbeat
-            except asyncio.CancelledError:
-                pass
-            await self._release_ui_markup_lock(key, token)
 
     async def capture_base_markup(
         self, user_id: int, message_id: int, reply_markup: object | None
@@ -320,9 +392,15 @@ class NotificationBadgeService:
             lease_lost.set()
             logger.exception("notification UI markup lock heartbeat failed")
 
-    async def _release_ui_markup_lock(self, key: str, token: str) -> bool:
+    async def _release_ui_markup_lock(self, key: str, token: str, user_id: int) -> bool:
+        wake_key = self._ui_wake_key(user_id)
+        wake_ttl_ms = int(UI_MARKUP_LOCK_WAIT_SECONDS * 1000)
         try:
-            return bool(await self._redis.eval(_RELEASE_UI_MARKUP_LOCK, 1, key, token))
+            return bool(
+                await self._redis.eval(
+                    _RELEASE_UI_MARKUP_LOCK, 2, key, wake_key, token, wake_ttl_ms
+                )
+            )
         except ResponseError as error:
             if "unknown command 'eval'" not in str(error).lower():
                 raise
@@ -333,7 +411,9 @@ class NotificationBadgeService:
                     if await pipeline.get(key) != token:
                         return False
                     pipeline.multi()
-                    pipeline.delete(key)
+                    pipeline.delete(key, wake_key)
+                    pipeline.rpush(wake_key, "1")
+                    pipeline.pexpire(wake_key, wake_ttl_ms)
                     await pipeline.execute()
                     return True
                 except WatchError:
@@ -374,6 +454,10 @@ class NotificationBadgeService:
     def _ui_lock_key(user_id: int) -> str:
         return f"{UI_MARKUP_LOCK_KEY_PREFIX}{user_id}"
 
+    @staticmethod
+    def _ui_wake_key(user_id: int) -> str:
+        return f"{UI_MARKUP_WAKE_KEY_PREFIX}{user_id}"
+
 
 def append_notification_badge(
     base_markup: InlineKeyboardMarkup, pending_count: int
@@ -5,13 +5,24 @@ from contextlib import suppress
 import math
 import time
 import uuid
-from collections.abc import Callable
+from collections.abc import Callable, Sequence
 from contextvars import ContextVar, Token
+from dataclasses import dataclass
 from typing import Protocol
 
 from loguru import logger
 
 from core.models.blockchain_notification import BlockchainNotification
+from infrastructure.services.notification_digest import DIGEST_PEEK_LIMIT, take_digest
+from infrastructure.services.notification_metrics import (
+    STAGE_BADGE_REFRESH,
+    STAGE_CLAIM_ACCEPT,
+    STAGE_FLUSH,
+    STAGE_HOLD_WAIT,
+    STAGE_LEDGER_TO_DELIVERED,
+    NotificationMetrics,
+)
+from infrastructure.services.notification_redis_store import NotificationClaim
 
 DEFAULT_DELIVERY_TIMEOUT_SECONDS = 30.0
 DEFAULT_LOCK_LIFETIME_SECONDS = 90.0
@@ -64,6 +75,48 @@ class NotificationStore(Protocol):
     ) -> bool: ...
 
 
+class NotificationDigestStore(Protocol):
+    """Per-user digest preference and multi-item queue operations."""
+
+    async def digest_enabled(self, user_id: int) -> bool: ...
+
+    async def peek_many(
+        self, user_id: int, limit: int
+    ) -> list[BlockchainNotification]: ...
+
+    async def acknowledge_many_if_lock_owned(
+        self,
+        user_id: int,
+        expected_head: Sequence[BlockchainNotification],
+        token: str,
+    ) -> bool: ...
+
+
+class NotificationClaimStore(NotificationDigestStore, Protocol):
+    """Fused flush steps: one store round trip per delivered notification."""
+
+    async def claim_next(
+        self,
+        user_id: int,
+        token: str,
+        *,
+        now: int,
+        check_hold: bool,
+        limit: int,
+    ) -> NotificationClaim: ...
+
+    async def acknowledge_and_claim_next(
+        self,
+        user_id: int,
+        expected_head: Sequence[BlockchainNotification],
+        token: str,
+        *,
+        now: int,
+        check_hold: bool,
+        limit: int,
+    ) -> NotificationClaim | None: ...
+
+
 class NotificationBadgeRefresher(Protocol):
     """Best-effort UI badge update owned by the presentation adapter."""
 
@@ -75,6 +128,33 @@ class NotificationSender(Protocol):
 
     async def send_notification(self, notification: BlockchainNotification) -> None: ...
 
+    async def send_notification_digest(
+        self, notifications: Sequence[BlockchainNotification]
+    ) -> None: ...
+
+
+# Update-local fence: (user_id, hold generation, hold deadline).
+FlowGeneration = tuple[int, int | None, int | None]
+
+
+@dataclass
+class TouchStats:
+    """Per-process hold touch counters; each debounced touch saves one eval."""
+
+    updates: int = 0
+    touches: int = 0
+    debounced: int = 0
+
+    def as_dict(self) -> dict[str, float | int]:
+        return {
+            "updates": self.updates,
+            "touches": self.touches,
+            "debounced": self.debounced,
+            "redis_calls_saved_per_update": (
+                round(self.debounced / self.updates, 3) if self.updates else 0.0
+            ),
+        }
+
 
 class NotificationCoordinator:
     """Own notification hold, queue, and delivery behavior."""
@@ -92,6 +172,11 @@ class NotificationCoordinator:
         delivery_timeout_seconds: float = DEFAULT_DELIVERY_TIMEOUT_SECONDS,
         lock_lifetime_seconds: float = DEFAULT_LOCK_LIFETIME_SECONDS,
         badge_timeout_seconds: float = DEFAULT_BADGE_TIMEOUT_SECONDS,
+        digest_store: NotificationDigestStore | None = None,
+        claim_store: NotificationClaimStore | None = None,
+        hold_seconds: int | None = None,
+        touch_debounce_fraction: float = 0.0,
+        metrics: NotificationMetrics | None = None,
     ) -> None:
         if lock_ttl_seconds <= 0:
             raise ValueError("lock_ttl_seconds must be positive")
@@ -111,6 +196,10 @@ class NotificationCoordinator:
             raise ValueError("lock_lifetime_seconds must be finite and positive")
         if not math.isfinite(badge_timeout_seconds) or badge_timeout_seconds <= 0:
             raise ValueError("badge_timeout_seconds must be finite and positive")
+        if not math.isfinite(touch_debounce_fraction) or not (
+            0 <= touch_debounce_fraction < 1
+        ):
+            raise ValueError("touch_debounce_fraction must be in [0, 1)")
         self._store = store
         self._sender = sender
         self._badge_refresher = badge_refresher
@@ -120,16 +209,29 @@ class NotificationCoordinator:
         self._delivery_timeout_seconds = delivery_timeout_seconds
         self._lock_lifetime_seconds = lock_lifetime_seconds
         self._badge_timeout_seconds = badge_timeout_seconds
-        self._flow_generation_context: ContextVar[tuple[int, int | None] | None] = (
-            ContextVar(f"notification_flow_generation_{id(self)}", default=None)
+        self._digest_store = digest_store or claim_store
+        self._claim_store = claim_store
+        self._flow_generation_context: ContextVar[FlowGeneration | None] = ContextVar(
+            f"notification_flow_generation_{id(self)}", default=None
         )
+        self._hold_seconds = hold_seconds or 0
+        self._touch_debounce_seconds = self._hold_seconds * touch_debounce_fraction
+        self._updates_in_flight: dict[int, int] = {}
+        self.touch_stats = TouchStats()
+        self.metrics = metrics or NotificationMetrics()
 
     async def touch(self, user_id: int) -> int:
         """Start or extend the user's sliding activity hold."""
+        captured = self._flow_generation_context.get()
+        if self._touch_is_redundant(user_id, captured):
+            assert captured is not None and captured[2] is not None
+            self.touch_stats.debounced += 1
+            return captured[2]
         hold_until, generation = await self._store.touch_with_generation(
             user_id, now=self._clock()
         )
-        self._flow_generation_context.set((user_id, generation))
+        self.touch_stats.touches += 1
+        self._flow_generation_context.set((user_id, generation, hold_until))
         logger.bind(event="notification_hold_touched", user_id=user_id).info(
             "notification hold touched"
         )
@@ -137,23 +239,50 @@ class NotificationCoordinator:
 
     async def capture_flow_generation(
         self, user_id: int
-    ) -> Token[tuple[int, int | None] | None]:
+    ) -> Token[FlowGeneration | None]:
         """Fence completion to the hold observed when this update began."""
         snapshot = await self._store.hold_snapshot(user_id)
-        generation = None if snapshot is None else snapshot[1]
-        return self._flow_generation_context.set((user_id, generation))
+        hold_until, generation = (None, None) if snapshot is None else snapshot
+        self.touch_stats.updates += 1
+        self._updates_in_flight[user_id] = self._updates_in_flight.get(user_id, 0) + 1
+        return self._flow_generation_context.set((user_id, generation, hold_until))
 
-    def reset_flow_generation(
-        self, token: Token[tuple[int, int | None] | None]
-    ) -> None:
+    def reset_flow_generation(self, token: Token[FlowGeneration | None]) -> None:
         """Restore the task-local completion fence after an update finishes."""
+        captured = self._flow_generation_context.get()
+        if captured is not None and captured[0] in self._updates_in_flight:
+            remaining = self._updates_in_flight[captured[0]] - 1
+            if remaining > 0:
+                self._updates_in_flight[captured[0]] = remaining
+            else:
+                del self._updates_in_flight[captured[0]]
         self._flow_generation_context.reset(token)
 
+    def _touch_is_redundant(
+        self, user_id: int, captured: FlowGeneration | None
+    ) -> bool:
+        """Whether the hold seen by this update was extended moments ago.
+
+        Reusing its generation is only safe while no other update of the user
+        is in flight here: concurrent updates must keep distinct fences so an
+        older one cannot complete the newer flow.
+        """
+        if self._touch_debounce_seconds <= 0 or captured is None:
+            return False
+        captured_user_id, generation, hold_until = captured
+        if captured_user_id != user_id or generation is None or hold_until is None:
+            return False
+        if self._updates_in_flight.get(user_id, 0) > 1:
+            return False
+        remaining = hold_until - self._clock()
+        return remaining >= self._hold_seconds - self._touch_debounce_seconds
+
     async def accept(self, notification: BlockchainNotification) -> None:
         """Atomically claim an event, retaining it before any Telegram send."""
-        result = await self._store.claim_accept(
-            notification.user_id, notification, now=self._clock()
-        )
+        with self.metrics.span(STAGE_CLAIM_ACCEPT):
+            result = await self._store.claim_accept(
+                notification.user_id, notification, now=self._clock()
+            )
         if result == "direct":
             await self.flush(notification.user_id, reason="accepted")
             logger.bind(
@@ -209,12 +338,19 @@ class NotificationCoordinator:
         progress: dict[str, object] | None = None,
     ) -> bool:
         """Flush with an already-held lock, rechecking the hold per item."""
+        if self._claim_store is not None:
+            return await self._flush_claimed(
+                user_id,
+                token,
+                ignore_hold=ignore_hold,
+                reason=reason,
+                lease_lost=lease_lost,
+                progress=progress,
+            )
         badge_refresh_needed = False
 
         def mark_stage(stage: str, notification_id: str | None = None) -> None:
-            if progress is not None:
-                progress["stage"] = stage
-                progress["notification_id"] = notification_id
+            _mark_stage(progress, stage, notification_id)
 
         expired_hold_until: int | None = None
         if not ignore_hold:
@@ -226,11 +362,16 @@ class NotificationCoordinator:
                 ).info("notification flush deferred by active hold")
                 return badge_refresh_needed
 
+        digest = (
+            self._digest_store is not None
+            and await self._digest_store.digest_enabled(user_id)
+        )
         while True:
             mark_stage("peek")
-            notification = await self._store.peek(user_id)
-            if notification is None:
+            batch = await self._peek_batch(user_id, digest=digest)
+            if not batch:
                 break
+            notification = batch[0]
             mark_stage("renew", notification.notification_id)
             if lease_lost is not None and lease_lost.is_set():
                 return badge_refresh_needed
@@ -256,57 +397,167 @@ class NotificationCoordinator:
             if lease_lost is not None and lease_lost.is_set():
                 return badge_refresh_needed
 
-            try:
-                mark_stage("send", notification.notification_id)
-                async with asyncio.timeout(self._delivery_timeout_seconds):
-                    await self._sender.send_notification(notification)
-            except TimeoutError:
+            if not await self._deliver_batch(user_id, batch, reason, progress):
+                return badge_refresh_needed
+
+            mark_stage("ack", notification.notification_id)
+            if not await self._acknowledge_batch(user_id, batch, token):
+                await self._handle_lost_acknowledgement(user_id, batch, reason)
+                return badge_refresh_needed
+
+            badge_refresh_needed = True
+            self._log_delivered(user_id, batch, reason)
+
+        mark_stage("cleanup")
+        await self._finish_flush(user_id, token, expired_hold_until)
+        return badge_refresh_needed
+
+    async def _flush_claimed(
+        self,
+        user_id: int,
+        token: str,
+        *,
+        ignore_hold: bool,
+        reason: str,
+        lease_lost: asyncio.Event | None,
+        progress: dict[str, object] | None,
+    ) -> bool:
+        """Flush with fused store steps.
+
+        Each claim renews the lease, rechecks the hold, and reads the next
+        head; each acknowledgement also claims the following head, so a
+        delivered notification costs one store round trip instead of four.
+        """
+        assert self._claim_store is not None
+        badge_refresh_needed = False
+        expired_hold_until: int | None = None
+        _mark_stage(progress, "claim")
+        claim: NotificationClaim | None = await self._claim_store.claim_next(
+            user_id,
+            token,
+            now=self._clock(),
+            check_hold=not ignore_hold,
+            limit=DIGEST_PEEK_LIMIT,
+        )
+        while True:
+            assert claim is not None
+            if claim.status == "lost":
                 logger.bind(
-                    event="notification_delivery_timed_out",
-                    user_id=user_id,
-                    notification_id=notification.notification_id,
-                    reason=reason,
-                    timeout_seconds=self._delivery_timeout_seconds,
-                ).warning(
-                    f"notification delivery timed out; queue head retained: "
-                    f"user_id={user_id} "
-                    f"notification_id={notification.notification_id} "
-                    f"reason={reason} "
-                    f"timeout_seconds={self._delivery_timeout_seconds}"
-                )
+                    event="notification_flush_lock_lost", user_id=user_id, reason=reason
+                ).warning("notification flush stopped after lock ownership was lost")
                 return badge_refresh_needed
-            except Exception:
+            if claim.status == "held":
                 logger.bind(
-                    event="notification_delivery_failed",
-                    user_id=user_id,
-                    notification_id=notification.notification_id,
-                    reason=reason,
-                ).exception("notification delivery failed; queue head retained")
+                    event="notification_flush_held", user_id=user_id, reason=reason
+                ).info("notification flush deferred by active hold")
+                return badge_refresh_needed
+            if claim.hold_until is not None:
+                expired_hold_until = claim.hold_until
+            batch = (
+                take_digest(claim.notifications)
+                if claim.digest
+                else claim.notifications[:1]
+            )
+            if not batch:
+                break
+            if lease_lost is not None and lease_lost.is_set():
                 return badge_refresh_needed
 
-            mark_stage("ack", notification.notification_id)
-            if not await self._store.acknowledge_if_lock_owned(
-                user_id, notification, token
-            ):
-                if await self._acknowledge_after_lease_loss(user_id, notification):
-                    return badge_refresh_needed
-                logger.bind(
-                    event="notification_acknowledgement_lost",
-                    user_id=user_id,
-                    notification_id=notification.notification_id,
-                    reason=reason,
-                ).warning("notification acknowledgement did not match queue head")
+            if not await self._deliver_batch(user_id, batch, reason, progress):
+                return badge_refresh_needed
+
+            _mark_stage(progress, "ack", batch[0].notification_id)
+            claim = await self._claim_store.acknowledge_and_claim_next(
+                user_id,
+                batch,
+                token,
+                now=self._clock(),
+                check_hold=not ignore_hold,
+                limit=DIGEST_PEEK_LIMIT,
+            )
+            if claim is None:
+                await self._handle_lost_acknowledgement(user_id, batch, reason)
                 return badge_refresh_needed
 
             badge_refresh_needed = True
+            self._log_delivered(user_id, batch, reason)
+
+        _mark_stage(progress, "cleanup")
+        await self._finish_flush(user_id, token, expired_hold_until)
+        return badge_refresh_needed
+
+    async def _deliver_batch(
+        self,
+        user_id: int,
+        batch: list[BlockchainNotification],
+        reason: str,
+        progress: dict[str, object] | None,
+    ) -> bool:
+        """Send a claimed batch; on failure the queue head is retained."""
+        notification = batch[0]
+        try:
+            _mark_stage(progress, "send", notification.notification_id)
+            async with asyncio.timeout(self._delivery_timeout_seconds):
+                if len(batch) == 1:
+                    await self._sender.send_notification(notification)
+                else:
+                    await self._sender.send_notification_digest(batch)
+        except TimeoutError:
+            logger.bind(
+                event="notification_delivery_timed_out",
+                user_id=user_id,
+                notification_id=notification.notification_id,
+                reason=reason,
+                timeout_seconds=self._delivery_timeout_seconds,
+            ).warning(
+                f"notification delivery timed out; queue head retained: "
+                f"user_id={user_id} "
+                f"notification_id={notification.notification_id} "
+                f"reason={reason} "
+                f"timeout_seconds={self._delivery_timeout_seconds}"
+            )
+            return False
+        except Exception:
             logger.bind(
-                event="notification_delivered",
+                event="notification_delivery_failed",
                 user_id=user_id,
                 notification_id=notification.notification_id,
                 reason=reason,
-            ).info("notification delivered and acknowledged")
+            ).exception("notification delivery failed; queue head retained")
+            return False
+        return True
 
-        mark_stage("cleanup")
+    async def _handle_lost_acknowledgement(
+        self, user_id: int, batch: list[BlockchainNotification], reason: str
+    ) -> None:
+        if await self._acknowledge_after_lease_loss(user_id, batch):
+            return
+        logger.bind(
+            event="notification_acknowledgement_lost",
+            user_id=user_id,
+            notification_id=batch[0].notification_id,
+            reason=reason,
+        ).warning("notification acknowledgement did not match queue head")
+
+    def _log_delivered(
+        self, user_id: int, batch: list[BlockchainNotification], reason: str
+    ) -> None:
+        for notification in batch:
+            self.metrics.observe_since(STAGE_HOLD_WAIT, notification.created_at)
+            closed_at = notification.data.get("ledger_closed_at")
+            if isinstance(closed_at, (int, float)) and not isinstance(closed_at, bool):
+                self.metrics.observe_since(STAGE_LEDGER_TO_DELIVERED, closed_at)
+        logger.bind(
+            event="notification_delivered",
+            user_id=user_id,
+            notification_id=batch[0].notification_id,
+            reason=reason,
+            digest_size=len(batch),
+        ).info("notification delivered and acknowledged")
+
+    async def _finish_flush(
+        self, user_id: int, token: str, expired_hold_until: int | None
+    ) -> None:
         if expired_hold_until is not None:
             await self._store.release_hold_if_unchanged(
                 user_id, expired_hold_until, now=self._clock()
@@ -314,7 +565,6 @@ class NotificationCoordinator:
         await self._store.clear_immediate_due_if_empty_and_lock_owned(
             user_id, token, now=self._clock()
         )
-        return badge_refresh_needed
 
     async def complete_flow(self, user_id: int) -> None:
         """Release the update-entry flow generation for durable worker delivery."""
@@ -341,8 +591,28 @@ class NotificationCoordinator:
             "notification hold released for worker delivery"
         )
 
+    async def _peek_batch(
+        self, user_id: int, *, digest: bool
+    ) -> list[BlockchainNotification]:
+        """Return the queue head, or the head digest when the user opted in."""
+        if digest and self._digest_store is not None:
+            return take_digest(
+                await self._digest_store.peek_many(user_id, DIGEST_PEEK_LIMIT)
+            )
+        notification = await self._store.peek(user_id)
+        return [] if notification is None else [notification]
+
+    async def _acknowledge_batch(
+        self, user_id: int, batch: list[BlockchainNotification], token: str
+    ) -> bool:
+        if len(batch) == 1 or self._digest_store is None:
+            return await self._store.acknowledge_if_lock_owned(user_id, batch[0], token)
+        return await self._digest_store.acknowledge_many_if_lock_owned(
+            user_id, batch, token
+        )
+
     async def _acknowledge_after_lease_loss(
-        self, user_id: int, notification: BlockchainNotification
+        self, user_id: int, batch: list[BlockchainNotification]
     ) -> bool:
         """Avoid a known successful Telegram send being retried when ownership changed."""
         token = self._token_factory()
@@ -350,9 +620,7 @@ class NotificationCoordinator:
             return False
         acknowledged = False
         try:
-            acknowledged = await self._store.acknowledge_if_lock_owned(
-                user_id, notification, token
-            )
+            acknowledged = await self._acknowledge_batch(user_id, batch, token)
         finally:
             await self._store.release_lock(user_id, token)
         if acknowledged:
@@ -384,14 +652,15 @@ class NotificationCoordinator:
         try:
             try:
                 async with asyncio.timeout(self._lock_lifetime_seconds):
-                    badge_refresh_needed = await self._flush_owned(
-                        user_id,
-                        token,
-                        ignore_hold=ignore_hold,
-                        reason=reason,
-                        lease_lost=lease_lost,
-                        progress=progress,
-                    )
+                    with self.metrics.span(STAGE_FLUSH):
+                        badge_refresh_needed = await self._flush_owned(
+                            user_id,
+                            token,
+                            ignore_hold=ignore_hold,
+                            reason=reason,
+                            lease_lost=lease_lost,
+                            progress=progress,
+                        )
             except TimeoutError:
                 logger.bind(
                     event="notification_flush_timed_out",
@@ -469,9 +738,12 @@ class NotificationCoordinator:
             ).exception("notification lock heartbeat failed")
 
     async def _refresh_badge(self, user_id: int) -> None:
+        started = time.perf_counter()
+        failed = True
         try:
             async with asyncio.timeout(self._badge_timeout_seconds):
                 await self._badge_refresher.refresh(user_id)
+            failed = False
         except TimeoutError:
             logger.bind(
                 event="notification_badge_refresh_timed_out",
@@ -483,6 +755,10 @@ class NotificationCoordinator:
             logger.bind(
                 event="notification_badge_refresh_failed", user_id=user_id
             ).exception("notification badge refresh failed")
+        finally:
+            self.metrics.observe(
+                STAGE_BADGE_REFRESH, time.perf_counter() - started, failed=failed
+            )
 
     async def _hold_allows_flush(self, user_id: int) -> tuple[bool, int | None]:
         """Return whether delivery may proceed and an expired deadline to clean."""
@@ -494,6 +770,16 @@ class NotificationCoordinator:
         return True, hold_until
 
 
+def _mark_stage(
+    progress: dict[str, object] | None,
+    stage: str,
+    notification_id: str | None = None,
+) -> None:
+    if progress is not None:
+        progress["stage"] = stage
+        progress["notification_id"] = notification_id
+
+
 def _unix_time() -> int:
     return int(time.time())
 
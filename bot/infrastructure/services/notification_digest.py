@@ -0,0 +1,36 @@
+"""Group queued blockchain notifications into Telegram-sized digest messages."""
+
+from collections.abc import Sequence
+
+from core.models.blockchain_notification import BlockchainNotification
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+DIGEST_SEPARATOR = "\n\n"
+# Upper bound on queue items read per digest; longer queues take several rounds.
+DIGEST_PEEK_LIMIT = 50
+
+
+def take_digest(
+    notifications: Sequence[BlockchainNotification],
+    *,
+    max_length: int = TELEGRAM_MESSAGE_LIMIT,
+) -> list[BlockchainNotification]:
+    """Return the longest queue prefix whose digest text fits one message.
+
+    The head is always included so an oversized notification is still sent on
+    its own instead of blocking the queue.
+    """
+    if not notifications:
+        return []
+    digest = [notifications[0]]
+    length = len(notifications[0].text)
+    for notification in notifications[1:]:
+        length += len(DIGEST_SEPARATOR) + len(notification.text)
+        if length > max_length:
+            break
+        digest.append(notification)
+    return digest
+
+
+def format_digest(notifications: Sequence[BlockchainNotification]) -> str:
+    return DIGEST_SEPARATOR.join(notification.text for notification in notifications)
@@ -1,13 +1,22 @@
 """
-Notification History Service - stores sent notifications in memory with TTL.
+Notification History Service - stores sent notifications with TTL.
 Used for creating filters from recent notifications.
+
+``NotificationHistoryService`` keeps records in process memory;
+``RedisNotificationHistoryService`` keeps them in Redis so they survive
+restarts and are shared between instances.
 """
 
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+import json
+import time
+from typing import Callable, Dict, List, Optional
 import uuid
 
+from redis.asyncio import Redis
+
 from core.models.notification import NotificationOperation
 from core.models.blockchain_notification import BlockchainNotification
 
@@ -26,6 +35,33 @@ class NotificationRecord:
     created_at: datetime = field(default_factory=datetime.utcnow)
 
 
+def record_from_notification(
+    notification: BlockchainNotification,
+) -> NotificationRecord:
+    """Build the filter-relevant history record of a delivered notification."""
+    data = notification.data
+    wallet_id = data.get("wallet_id")
+    public_key = data.get("public_key")
+    operation_type = data.get("operation_type")
+    asset_code = data.get("asset_code")
+    amount = data.get("amount")
+    if not isinstance(wallet_id, int) or not isinstance(public_key, str):
+        raise ValueError("delivered notification is missing wallet metadata")
+    try:
+        parsed_amount = float(amount or 0)
+    except (ValueError, TypeError):
+        parsed_amount = 0.0
+    return NotificationRecord(
+        id=str(uuid.uuid4())[:8],
+        operation_type=str(operation_type or notification.event_type),
+        asset_code=str(asset_code or "XLM"),
+        amount=parsed_amount,
+        wallet_id=wallet_id,
+        public_key=public_key,
+        notification_id=notification.notification_id,
+    )
+
+
 class NotificationHistoryService:
     """
     Stores recent notifications in memory for creating filters.
@@ -80,41 +116,21 @@ class NotificationHistoryService:
         if len(self._history[user_id]) > self._max_per_user:
             self._history[user_id] = self._history[user_id][: self._max_per_user]
 
-    def add_delivered(self, notification: BlockchainNotification) -> None:
+    async def add_delivered(self, notification: BlockchainNotification) -> None:
         """Record a durable event only after its Telegram delivery succeeds."""
-        data = notification.data
-        wallet_id = data.get("wallet_id")
-        public_key = data.get("public_key")
-        operation_type = data.get("operation_type")
-        asset_code = data.get("asset_code")
-        amount = data.get("amount")
-        if not isinstance(wallet_id, int) or not isinstance(public_key, str):
-            raise ValueError("delivered notification is missing wallet metadata")
-        try:
-            parsed_amount = float(amount or 0)
-        except (ValueError, TypeError):
-            parsed_amount = 0.0
+        record = record_from_notification(notification)
         self._cleanup_user(notification.user_id)
         records = self._history.setdefault(notification.user_id, [])
         if any(
-            record.notification_id == notification.notification_id for record in records
+            existing.notification_id == record.notification_id for existing in records
         ):
             return
-        records.insert(
-            0,
-            NotificationRecord(
-                id=str(uuid.uuid4())[:8],
-                operation_type=str(operation_type or notification.event_type),
-                asset_code=str(asset_code or "XLM"),
-                amount=parsed_amount,
-                wallet_id=wallet_id,
-                public_key=public_key,
-                notification_id=notification.notification_id,
-            ),
-        )
+        records.insert(0, record)
         del records[self._max_per_user :]
 
-    def get_recent(self, user_id: int, limit: int = 10) -> List[NotificationRecord]:
+    async def get_recent(
+        self, user_id: int, limit: int = 10
+    ) -> List[NotificationRecord]:
         """
         Get the most recent N notifications for a user.
         Returns empty list if no records found.
@@ -124,7 +140,9 @@ class NotificationHistoryService:
         records = self._history.get(user_id, [])
         return records[:limit]
 
-    def get_by_id(self, user_id: int, record_id: str) -> Optional[NotificationRecord]:
+    async def get_by_id(
+        self, user_id: int, record_id: str
+    ) -> Optional[NotificationRecord]:
         """Get a specific notification record by its ID."""
         self._cleanup_user(user_id)
 
@@ -152,3 +170,148 @@ class NotificationHistoryService:
         user_ids = list(self._history.keys())
         for user_id in user_ids:
             self._cleanup_user(user_id)
+
+
+class RedisNotificationHistoryService:
+    """
+    Stores recent notifications in Redis, one capped list per user.
+
+    - Each record is a compact JSON array, newest first
+    - The list is trimmed to ``max_per_user`` and expires ``ttl_hours`` after
+      the last notification; older records are skipped on read
+    - Hot users are served from a small in-process LRU; cached lists are
+      reused by ``get_recent`` only for ``cache_ttl_seconds`` because other
+      instances may append, while ``get_by_id`` can always use them since
+      records never change
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        ttl_hours: int = 12,
+        max_per_user: int = 50,
+        cache_size: int = 1000,
+        cache_ttl_seconds: float = 5.0,
+        key_prefix: str = "",
+        clock: Callable[[], float] = time.time,
+    ):
+        self._redis = redis
+        self._ttl = timedelta(hours=ttl_hours)
+        self._max_per_user = max_per_user
+        self._cache_size = cache_size
+        self._cache_ttl_seconds = cache_ttl_seconds
+        self._key_prefix = key_prefix
+        self._clock = clock
+        self._cache: OrderedDict[int, tuple[float, List[NotificationRecord]]] = (
+            OrderedDict()
+        )
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    async def add_delivered(self, notification: BlockchainNotification) -> None:
+        """Record a durable event only after its Telegram delivery succeeds."""
+        record = record_from_notification(notification)
+        key = self._key(notification.user_id)
+        records = await self._load(notification.user_id)
+        # Resends after lease loss are sequential, so a read-then-push suffices.
+        if any(
+            existing.notification_id == record.notification_id for existing in records
+        ):
+            return
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.lpush(key, self._encode(record))
+            pipeline.ltrim(key, 0, self._max_per_user - 1)
+            pipeline.expire(key, int(self._ttl.total_seconds()))
+            await pipeline.execute()
+        self._remember(notification.user_id, [record, *records])
+
+    async def get_recent(
+        self, user_id: int, limit: int = 10
+    ) -> List[NotificationRecord]:
+        """
+        Get the most recent N notifications for a user.
+        Returns empty list if no records found.
+        """
+        cached = self._cache.get(user_id)
+        if cached and self._clock() - cached[0] < self._cache_ttl_seconds:
+            self._cache.move_to_end(user_id)
+            self.cache_hits += 1
+            return self._fresh(cached[1])[:limit]
+        return (await self._load(user_id))[:limit]
+
+    async def get_by_id(
+        self, user_id: int, record_id: str
+    ) -> Optional[NotificationRecord]:
+        """Get a specific notification record by its ID."""
+        cached = self._cache.get(user_id)
+        if cached:
+            self._cache.move_to_end(user_id)
+            for record in self._fresh(cached[1]):
+                if record.id == record_id:
+                    self.cache_hits += 1
+                    return record
+        for record in await self._load(user_id):
+            if record.id == record_id:
+                return record
+        return None
+
+    async def _load(self, user_id: int) -> List[NotificationRecord]:
+        self.cache_misses += 1
+        raw = await self._redis.lrange(self._key(user_id), 0, self._max_per_user - 1)
+        records = self._fresh([self._decode(item) for item in raw])
+        self._remember(user_id, records)
+        return records
+
+    def _remember(self, user_id: int, records: List[NotificationRecord]) -> None:
+        if self._cache_size <= 0:
+            return
+        self._cache[user_id] = (self._clock(), records[: self._max_per_user])
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _fresh(self, records: List[NotificationRecord]) -> List[NotificationRecord]:
+        cutoff = datetime.utcfromtimestamp(self._clock()) - self._ttl
+        return [record for record in records if record.created_at > cutoff]
+
+    def _encode(self, record: NotificationRecord) -> str:
+        return json.dumps(
+            [
+                record.id,
+                record.operation_type,
+                record.asset_code,
+                record.amount,
+                record.wallet_id,
+                record.public_key,
+                record.notification_id,
+                int(record.created_at.replace(tzinfo=timezone.utc).timestamp()),
+            ],
+            separators=(",", ":"),
+        )
+
+    @staticmethod
+    def _decode(value: str) -> NotificationRecord:
+        (
+            record_id,
+            operation_type,
+            asset_code,
+            amount,
+            wallet_id,
+            public_key,
+            notification_id,
+            created_at,
+        ) = json.loads(value)
+        return NotificationRecord(
+            id=record_id,
+            operation_type=operation_type,
+            asset_code=asset_code,
+            amount=amount,
+            wallet_id=wallet_id,
+            public_key=public_key,
+            notification_id=notification_id,
+            created_at=datetime.utcfromtimestamp(created_at),
+        )
+
+    def _key(self, user_id: int) -> str:
+        return f"{self._key_prefix}notification:history:{user_id}"
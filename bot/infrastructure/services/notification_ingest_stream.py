@@ -0,0 +1,220 @@
+"""Redis Stream buffering verified notifier webhooks before processing."""
+
+from dataclasses import dataclass
+import time
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+
+DEFAULT_INGEST_STREAM_MAX_LEN = 100_000
+BODY_FIELD = "body"
+RECEIVED_AT_FIELD = "received_at"
+
+
+@dataclass(frozen=True)
+class IngestEntry:
+    """One raw webhook body appended by the HTTP listener."""
+
+    entry_id: str
+    body: str
+    received_at: float | None
+    deliveries: int = 1
+
+
+@dataclass(frozen=True)
+class IngestLag:
+    """Backlog observed for the processing consumer group."""
+
+    length: int
+    pending: int
+    lag: int | None
+    oldest_pending_idle_ms: int | None
+
+    def as_dict(self) -> dict[str, int | None]:
+        return {
+            "length": self.length,
+            "pending": self.pending,
+            "lag": self.lag,
+            "oldest_pending_idle_ms": self.oldest_pending_idle_ms,
+        }
+
+
+class NotificationIngestStream:
+    """Append raw webhooks and hand them to a consumer group of processors.
+
+    The stream is the durable hand-off between the webhook listener and the
+    processing workers: an entry stays in the group's pending list until a
+    worker acknowledges it, so a crashed consumer's entries can be reclaimed.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        group: str = "notification-processors",
+        max_len: int = DEFAULT_INGEST_STREAM_MAX_LEN,
+        key_prefix: str = "",
+        clock=time.time,
+    ) -> None:
+        if max_len <= 0:
+            raise ValueError("max_len must be positive")
+        self._redis = redis
+        self._group = group
+        self._max_len = max_len
+        self._key_prefix = key_prefix
+        self._clock = clock
+        self._group_ready = False
+
+    async def append(self, body: str) -> str:
+        """Durably retain a verified webhook body and return its entry ID."""
+        entry_id = await self._redis.xadd(
+            self._stream_key(),
+            {BODY_FIELD: body, RECEIVED_AT_FIELD: f"{self._clock():.3f}"},
+            maxlen=self._max_len,
+            approximate=True,
+        )
+        return self._as_str(entry_id)
+
+    async def ensure_group(self) -> None:
+        """Create the consumer group once; existing groups keep their cursor."""
+        if self._group_ready:
+            return
+        try:
+            await self._redis.xgroup_create(
+                self._stream_key(), self._group, id="0", mkstream=True
+            )
+        except ResponseError as error:
+            if "BUSYGROUP" not in str(error):
+                raise
+        self._group_ready = True
+
+    async def read(
+        self, consumer: str, *, count: int, block_ms: int | None
+    ) -> list[IngestEntry]:
+        """Deliver never-seen entries to ``consumer`` and mark them pending."""
+        await self.ensure_group()
+        response = await self._redis.xreadgroup(
+            self._group,
+            consumer,
+            {self._stream_key(): ">"},
+            count=count,
+            block=block_ms,
+        )
+        entries: list[IngestEntry] = []
+        for _stream, messages in response or []:
+            entries.extend(
+                self._entry(entry_id, fields) for entry_id, fields in messages
+            )
+        return entries
+
+    async def claim_stale(
+        self, consumer: str, *, min_idle_ms: int, count: int
+    ) -> list[IngestEntry]:
+        """Take over entries left pending by consumers that stopped acking."""
+        await self.ensure_group()
+        pending = await self._redis.xpending_range(
+            self._stream_key(),
+            self._group,
+            min="-",
+            max="+",
+            count=count,
+            idle=min_idle_ms,
+        )
+        if not pending:
+            return []
+        deliveries = {
+            self._as_str(item["message_id"]): int(item["times_delivered"]) + 1
+            for item in pending
+        }
+        claimed = await self._redis.xclaim(
+            self._stream_key(),
+            self._group,
+            consumer,
+            min_idle_time=min_idle_ms,
+            message_ids=list(deliveries),
+        )
+        entries: list[IngestEntry] = []
+        for entry_id, fields in claimed:
+            if fields is None:
+                # Trimmed by MAXLEN while pending; nothing is left to process.
+                await self.ack(self._as_str(entry_id))
+                continue
+            entry = self._entry(entry_id, fields)
+            entries.append(
+                IngestEntry(
+                    entry_id=entry.entry_id,
+                    body=entry.body,
+                    received_at=entry.received_at,
+                    deliveries=deliveries.get(entry.entry_id, 1),
+                )
+            )
+        return entries
+
+    async def ack(self, entry_id: str) -> None:
+        """Acknowledge an entry; MAXLEN trimming reclaims its memory later."""
+        await self._redis.xack(self._stream_key(), self._group, entry_id)
+
+    async def dead_letter(self, entry: IngestEntry, reason: str) -> None:
+        """Park a poison entry for inspection and release it from the group."""
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.xadd(
+                self._dead_letter_key(),
+                {
+                    BODY_FIELD: entry.body,
+                    "entry_id": entry.entry_id,
+                    "reason": reason,
+                    "deliveries": str(entry.deliveries),
+                },
+                maxlen=self._max_len,
+                approximate=True,
+            )
+            pipeline.xack(self._stream_key(), self._group, entry.entry_id)
+            await pipeline.execute()
+
+    async def lag(self) -> IngestLag:
+        """Report unread and unacknowledged backlog for the consumer group."""
+        await self.ensure_group()
+        length = int(await self._redis.xlen(self._stream_key()))
+        group_lag: int | None = None
+        pending = 0
+        for group in await self._redis.xinfo_groups(self._stream_key()):
+            if self._as_str(group["name"]) != self._group:
+                continue
+            pending = int(group.get("pending") or 0)
+            raw_lag = group.get("lag")
+            group_lag = None if raw_lag is None else int(raw_lag)
+        oldest_idle: int | None = None
+        if pending:
+            oldest = await self._redis.xpending_range(
+                self._stream_key(), self._group, min="-", max="+", count=1
+            )
+            if oldest:
+                oldest_idle = int(oldest[0]["time_since_delivered"])
+        return IngestLag(
+            length=length,
+            pending=pending,
+            lag=group_lag,
+            oldest_pending_idle_ms=oldest_idle,
+        )
+
+    def _entry(self, entry_id: str | bytes, fields: dict) -> IngestEntry:
+        decoded = {
+            self._as_str(key): self._as_str(value) for key, value in fields.items()
+        }
+        received_at = decoded.get(RECEIVED_AT_FIELD)
+        return IngestEntry(
+            entry_id=self._as_str(entry_id),
+            body=decoded.get(BODY_FIELD, ""),
+            received_at=float(received_at) if received_at else None,
+        )
+
+    @staticmethod
+    def _as_str(value: str | bytes) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    def _stream_key(self) -> str:
+        return f"{self._key_prefix}notification:ingest"
+
+    def _dead_letter_key(self) -> str:
+        return f"{self._key_prefix}notification:ingest:dead"
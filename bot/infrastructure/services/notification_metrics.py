@@ -0,0 +1,157 @@
+"""In-process latency histograms for the blockchain notification pipeline."""
+
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+STAGE_WEBHOOK = "webhook"
+STAGE_ACCOUNT_LOOKUP = "account_lookup"
+STAGE_DECODE = "decode"
+STAGE_CLAIM_ACCEPT = "claim_accept"
+STAGE_HOLD_WAIT = "hold_wait"
+STAGE_FLUSH = "flush"
+STAGE_SEND = "send"
+STAGE_BADGE_REFRESH = "badge_refresh"
+STAGE_LEDGER_TO_DELIVERED = "ledger_to_delivered"
+STAGE_UI_LOCK_WAIT = "ui_lock_wait"
+
+DEFAULT_SAMPLE_SIZE = 2048
+QUANTILES = (50, 95, 99)
+# Payload fields that carry the ledger close time, most specific first.
+LEDGER_TIME_FIELDS = (
+    ("transaction", "closed_at"),
+    ("transaction", "created_at"),
+    ("ledger", "closed_at"),
+    ("operation", "created_at"),
+)
+
+
+class StageHistogram:
+    """Counts plus a sliding window of recent durations for quantiles."""
+
+    def __init__(self, sample_size: int = DEFAULT_SAMPLE_SIZE) -> None:
+        if sample_size <= 0:
+            raise ValueError("sample_size must be positive")
+        self.count = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self._samples: deque[float] = deque(maxlen=sample_size)
+
+    def observe(self, seconds: float, *, failed: bool = False) -> None:
+        seconds = max(0.0, seconds)
+        self.count += 1
+        self.total_seconds += seconds
+        self._samples.append(seconds)
+        if failed:
+            self.failures += 1
+
+    def quantile(self, percent: float) -> float | None:
+        """Nearest-rank quantile over the retained window."""
+        return _nearest_rank(sorted(self._samples), percent)
+
+    def as_dict(self) -> dict[str, float | int | None]:
+        summary: dict[str, float | int | None] = {
+            "count": self.count,
+            "failures": self.failures,
+            "mean_ms": _ms(self.total_seconds / self.count) if self.count else None,
+        }
+        ordered = sorted(self._samples)
+        for percent in QUANTILES:
+            value = _nearest_rank(ordered, percent)
+            summary[f"p{percent}_ms"] = None if value is None else _ms(value)
+        summary["max_ms"] = _ms(ordered[-1]) if ordered else None
+        return summary
+
+
+class NotificationMetrics:
+    """Per-stage timing spans shared by the webhook service and coordinator."""
+
+    def __init__(
+        self,
+        *,
+        sample_size: int = DEFAULT_SAMPLE_SIZE,
+        clock: Callable[[], float] = time.perf_counter,
+        wall_clock: Callable[[], float] = time.time,
+    ) -> None:
+        if sample_size <= 0:
+            raise ValueError("sample_size must be positive")
+        self._sample_size = sample_size
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._stages: dict[str, StageHistogram] = {}
+
+    def histogram(self, stage: str) -> StageHistogram:
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            histogram = StageHistogram(self._sample_size)
+            self._stages[stage] = histogram
+        return histogram
+
+    def observe(self, stage: str, seconds: float, *, failed: bool = False) -> None:
+        self.histogram(stage).observe(seconds, failed=failed)
+
+    def observe_since(self, stage: str, started_at: float) -> None:
+        """Record the wall-clock age of a unix timestamp, e.g. a ledger close."""
+        self.observe(stage, self._wall_clock() - started_at)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block; an escaping exception counts as a failure."""
+        started = self._clock()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.observe(stage, self._clock() - started, failed=failed)
+
+    def as_dict(self) -> dict[str, dict[str, float | int | None]]:
+        return {
+            stage: histogram.as_dict()
+            for stage, histogram in sorted(self._stages.items())
+        }
+
+
+def ledger_closed_at(payload: Mapping[str, object]) -> float | None:
+    """Read the ledger close time from a notifier payload as unix seconds."""
+    for section, field in LEDGER_TIME_FIELDS:
+        container = payload.get(section)
+        if not isinstance(container, Mapping):
+            continue
+        value = _unix_seconds(container.get(field))
+        if value is not None:
+            return value
+    return None
+
+
+def _unix_seconds(value: object) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)) and math.isfinite(value) and value > 0:
+        # Millisecond timestamps are common in JS-based notifiers.
+        return float(value / 1000 if value > 10**11 else value)
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    return None
+
+
+def _nearest_rank(ordered: list[float], percent: float) -> float | None:
+    if not ordered:
+        return None
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[min(len(ordered), max(rank, 1)) - 1]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
@@ -1,6 +1,13 @@
 """Redis persistence for delayed blockchain notification delivery."""
 
+import hashlib
+import math
+import time
+from collections.abc import AsyncIterator, Iterable, Sequence
+from dataclasses import dataclass, field
+
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
 from redis.exceptions import ResponseError, WatchError
 
 from core.models.blockchain_notification import BlockchainNotification
@@ -47,26 +54,53 @@ end
 return 1
 """
 
-_ENQUEUE = """
-if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1
-    or redis.call('SISMEMBER', KEYS[2], ARGV[1]) == 1 then
+# KEYS[1] is the legacy exact dedupe set, KEYS[2] the pending IDs, and
+# KEYS[first]..KEYS[#KEYS] the dedupe buckets, current bucket first.
+_DEDUPE_FUNCTIONS = """
+local function seen(first, idempotency_key, short_id)
+    if redis.call('SISMEMBER', KEYS[1], idempotency_key) == 1
+        or redis.call('SISMEMBER', KEYS[2], idempotency_key) == 1 then
+        return true
+    end
+    for index = first, #KEYS do
+        if redis.call('SISMEMBER', KEYS[index], short_id) == 1 then
+            return true
+        end
+    end
+    return false
+end
+
+local function remember(first, idempotency_key, short_id, ttl_ms)
+    redis.call('SADD', KEYS[first], short_id)
+    redis.call('PEXPIRE', KEYS[first], ttl_ms)
+    redis.call('SADD', KEYS[2], idempotency_key)
+end
+"""
+
+# KEYS: legacy dedupe, pending ids, pending, dedupe buckets. ARGV: idempotency
+# key, serialized notification, bucket ttl in ms, short ID.
+_ENQUEUE = (
+    _DEDUPE_FUNCTIONS
+    + """
+if seen(4, ARGV[1], ARGV[4]) then
     return 0
 end
-redis.call('SADD', KEYS[1], ARGV[1])
-redis.call('EXPIRE', KEYS[1], ARGV[3])
-redis.call('SADD', KEYS[2], ARGV[1])
+remember(4, ARGV[1], ARGV[4], ARGV[3])
 redis.call('RPUSH', KEYS[3], ARGV[2])
 return 1
 """
-
-_CLAIM_ACCEPT = """
-if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1
-    or redis.call('SISMEMBER', KEYS[2], ARGV[1]) == 1 then
+)
+
+# KEYS: legacy dedupe, pending ids, pending, hold, due, dedupe buckets. ARGV:
+# idempotency key, serialized notification, bucket ttl in ms, now, user ID,
+# short ID.
+_CLAIM_ACCEPT = (
+    _DEDUPE_FUNCTIONS
+    + """
+if seen(6, ARGV[1], ARGV[6]) then
     return 'duplicate'
 end
-redis.call('SADD', KEYS[1], ARGV[1])
-redis.call('EXPIRE', KEYS[1], ARGV[3])
-redis.call('SADD', KEYS[2], ARGV[1])
+remember(6, ARGV[1], ARGV[6], ARGV[3])
 redis.call('RPUSH', KEYS[3], ARGV[2])
 local hold_until = redis.call('GET', KEYS[4])
 if hold_until and tonumber(hold_until) > tonumber(ARGV[4]) then
@@ -75,6 +109,7 @@ end
 redis.call('ZADD', KEYS[5], ARGV[4], ARGV[5])
 return 'direct'
 """
+)
 
 _ACKNOWLEDGE_HEAD = """
 if redis.call('LINDEX', KEYS[1], 0) ~= ARGV[1] then
@@ -97,6 +132,29 @@ redis.call('SREM', KEYS[2], ARGV[2])
 return 1
 """
 
+# ARGV: lock token, count, then count serialized notifications, then their
+# idempotency keys. The whole prefix is removed or nothing is.
+_ACKNOWLEDGE_PREFIX_IF_LOCK_OWNED = """
+if redis.call('GET', KEYS[3]) ~= ARGV[1] then
+    return 0
+end
+local count = tonumber(ARGV[2])
+local head = redis.call('LRANGE', KEYS[1], 0, count - 1)
+if #head ~= count then
+    return 0
+end
+for index = 1, count do
+    if head[index] ~= ARGV[2 + index] then
+        return 0
+    end
+end
+redis.call('LTRIM', KEYS[1], count, -1)
+for index = 1, count do
+    redis.call('SREM', KEYS[2], ARGV[2 + count + index])
+end
+return 1
+"""
+
 _DUE_USERS = """
 local due_users = {}
 local stale_users = {}
@@ -157,6 +215,106 @@ end
 return 0
 """
 
+# Shared by the fused flush steps. Verifies and renews the lease, checks the
+# hold when asked, and reads the head (the digest prefix if the user opted in).
+# Returns {status, hold, digest, items...}; hold is '' or the observed deadline.
+_CLAIM_FUNCTION = """
+local function claim(lock_key, hold_key, pending_key, digest_key, token, ttl,
+                     now, check_hold, limit)
+    if redis.call('GET', lock_key) ~= token then
+        return {'lost', '', 0}
+    end
+    redis.call('EXPIRE', lock_key, ttl)
+    local hold = false
+    if check_hold == '1' then
+        hold = redis.call('GET', hold_key)
+        if hold and tonumber(hold) > tonumber(now) then
+            return {'held', hold, 0}
+        end
+    end
+    local digest = redis.call('EXISTS', digest_key)
+    local last = 0
+    if digest == 1 then
+        last = tonumber(limit) - 1
+    end
+    local result = {'ready', hold or '', digest}
+    for _, item in ipairs(redis.call('LRANGE', pending_key, 0, last)) do
+        table.insert(result, item)
+    end
+    return result
+end
+"""
+
+# KEYS: lock, hold, pending, digest. ARGV: token, lock ttl, now, check hold,
+# digest limit.
+_CLAIM_NEXT = (
+    _CLAIM_FUNCTION
+    + """
+return claim(KEYS[1], KEYS[2], KEYS[3], KEYS[4], ARGV[1], ARGV[2], ARGV[3],
+             ARGV[4], ARGV[5])
+"""
+)
+
+# KEYS: lock, hold, pending, digest, pending ids. ARGV: as _CLAIM_NEXT, then
+# count, count serialized notifications, and their idempotency keys. Returns
+# {0} when the lease or the acknowledged prefix no longer matches.
+_ACKNOWLEDGE_AND_CLAIM_NEXT = (
+    _CLAIM_FUNCTION
+    + """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return {0}
+end
+local count = tonumber(ARGV[6])
+local head = redis.call('LRANGE', KEYS[3], 0, count - 1)
+if #head ~= count then
+    return {0}
+end
+for index = 1, count do
+    if head[index] ~= ARGV[6 + index] then
+        return {0}
+    end
+end
+redis.call('LTRIM', KEYS[3], count, -1)
+for index = 1, count do
+    redis.call('SREM', KEYS[5], ARGV[6 + count + index])
+end
+local result = claim(KEYS[1], KEYS[2], KEYS[3], KEYS[4], ARGV[1], ARGV[2],
+                     ARGV[3], ARGV[4], ARGV[5])
+table.insert(result, 1, 1)
+return result
+"""
+)
+
+# KEYS: pending, pending ids, lock, archive. ARGV: token, count, summary,
+# summary idempotency key, archive max length, archive ttl, then count
+# serialized notifications and their idempotency keys. The prefix moves to the
+# archive and the summary takes its place, or nothing changes.
+_COMPACT_PREFIX_IF_LOCK_OWNED = """
+if redis.call('GET', KEYS[3]) ~= ARGV[1] then
+    return 0
+end
+local count = tonumber(ARGV[2])
+local head = redis.call('LRANGE', KEYS[1], 0, count - 1)
+if #head ~= count then
+    return 0
+end
+for index = 1, count do
+    if head[index] ~= ARGV[6 + index] then
+        return 0
+    end
+end
+redis.call('LTRIM', KEYS[1], count, -1)
+for index = 1, count do
+    redis.call('SREM', KEYS[2], ARGV[6 + count + index])
+    redis.call('RPUSH', KEYS[4], head[index])
+end
+redis.call('LTRIM', KEYS[4], -tonumber(ARGV[5]), -1)
+redis.call('EXPIRE', KEYS[4], ARGV[6])
+redis.call('LPUSH', KEYS[1], ARGV[3])
+redis.call('SADD', KEYS[2], ARGV[4])
+return 1
+"""
+
 _RELEASE_LOCK = """
 if redis.call('GET', KEYS[1]) ~= ARGV[1] then
     return 0
@@ -174,9 +332,42 @@ return 1
 """
 
 DEFAULT_DEDUPE_TTL_SECONDS = 30 * 24 * 60 * 60
+DEFAULT_DEDUPE_BUCKETS = 6
+DEFAULT_DEDUPE_FALSE_POSITIVE_RATE = 1e-9
+# Accepted IDs per user within one dedupe window that the hash width is sized
+# for. Short IDs stay below 2**63 so Redis can keep small buckets as intsets.
+DEDUPE_CAPACITY_PER_USER = 100_000
+MIN_DEDUPE_HASH_BITS = 16
+MAX_DEDUPE_HASH_BITS = 63
 MAX_DUE_SCAN_PAGES = 10
 
 
+@dataclass(frozen=True)
+class PendingQueueInfo:
+    """Size of one pending queue; ``bytes`` is None without ``MEMORY USAGE``."""
+
+    user_id: int
+    length: int
+    head: BlockchainNotification | None
+    head_size: int
+    bytes: int | None
+
+
+@dataclass(frozen=True)
+class NotificationClaim:
+    """Result of one fused flush step.
+
+    ``status`` is ``ready`` (the lease was renewed and ``notifications`` holds
+    the queue head), ``held`` (``hold_until`` is still active), or ``lost``.
+    For ``ready``, ``hold_until`` is an expired deadline left to clean up.
+    """
+
+    status: str
+    notifications: list[BlockchainNotification] = field(default_factory=list)
+    hold_until: int | None = None
+    digest: bool = False
+
+
 class NotificationRedisStore:
     """Stores holds, FIFO notifications, and distributed flush locks in Redis."""
 
@@ -188,13 +379,24 @@ class NotificationRedisStore:
         lock_ttl_seconds: int,
         dedupe_ttl_seconds: int = DEFAULT_DEDUPE_TTL_SECONDS,
         key_prefix: str = "",
+        due_shards: int = 1,
+        dedupe_buckets: int = DEFAULT_DEDUPE_BUCKETS,
+        dedupe_false_positive_rate: float = DEFAULT_DEDUPE_FALSE_POSITIVE_RATE,
     ) -> None:
         if hold_seconds <= 0:
             raise ValueError("hold_seconds must be positive")
+        if due_shards <= 0:
+            raise ValueError("due_shards must be positive")
         if lock_ttl_seconds <= 0:
             raise ValueError("lock_ttl_seconds must be positive")
         if dedupe_ttl_seconds <= 0:
             raise ValueError("dedupe_ttl_seconds must be positive")
+        if dedupe_buckets <= 0:
+            raise ValueError("dedupe_buckets must be positive")
+        if not math.isfinite(dedupe_false_positive_rate) or not (
+            0 < dedupe_false_positive_rate < 1
+        ):
+            raise ValueError("dedupe_false_positive_rate must be between 0 and 1")
         self._redis = redis
         self._hold_seconds = hold_seconds
         self._lock_ttl_seconds = lock_ttl_seconds
@@ -202,7 +404,30 @@ class NotificationRedisStore:
         # 30-day dedupe window. Successful queue cleanup may later remove the
         # matching dedupe metadata; retention is conservative to limit retries.
         self._dedupe_ttl_seconds = dedupe_ttl_seconds
+        # Accepted IDs go into time buckets that each expire one window after
+        # they close, so an ID is remembered for between one window and one
+        # window plus a bucket. Buckets hold short hashes, not full IDs.
+        self._dedupe_buckets = dedupe_buckets
+        self._dedupe_bucket_ms = -(-dedupe_ttl_seconds * 1000 // dedupe_buckets)
+        self._dedupe_hash_bits = min(
+            MAX_DEDUPE_HASH_BITS,
+            max(
+                MIN_DEDUPE_HASH_BITS,
+                math.ceil(
+                    math.log2(DEDUPE_CAPACITY_PER_USER / dedupe_false_positive_rate)
+                ),
+            ),
+        )
         self._key_prefix = key_prefix
+        self._due_shards = due_shards
+
+    @property
+    def due_shards(self) -> int:
+        return self._due_shards
+
+    def shard_of(self, user_id: int) -> int:
+        """The due-set shard that schedules ``user_id``."""
+        return user_id % self._due_shards
 
     async def touch(self, user_id: int, *, now: int) -> int:
         """Create or extend a user's absolute hold and reschedule its deadline."""
@@ -217,7 +442,7 @@ class NotificationRedisStore:
                 _TOUCH_HOLD,
                 4,
                 self._hold_key(user_id),
-                self._due_key(),
+                self._due_key(user_id),
                 self._hold_generation_key(user_id),
                 self._hold_generation_sequence_key(),
                 hold_until,
@@ -239,7 +464,7 @@ class NotificationRedisStore:
         async with self._redis.pipeline(transaction=True) as pipeline:
             pipeline.delete(self._hold_key(user_id))
             pipeline.delete(self._hold_generation_key(user_id))
-            pipeline.zrem(self._due_key(), str(user_id))
+            pipeline.zrem(self._due_key(user_id), str(user_id))
             await pipeline.execute()
 
     async def release_due_hold_if_unchanged(
@@ -257,7 +482,7 @@ class NotificationRedisStore:
                 _RELEASE_DUE_HOLD_IF_UNCHANGED,
                 4,
                 self._hold_key(user_id),
-                self._due_key(),
+                self._due_key(user_id),
                 self._pending_key(user_id),
                 self._hold_generation_key(user_id),
                 expected_hold_until,
@@ -289,7 +514,7 @@ class NotificationRedisStore:
                 _RELEASE_HOLD_GENERATION_IF_UNCHANGED,
                 4,
                 self._hold_key(user_id),
-                self._due_key(),
+                self._due_key(user_id),
                 self._pending_key(user_id),
                 self._hold_generation_key(user_id),
                 expected_generation,
@@ -317,25 +542,38 @@ class NotificationRedisStore:
             return None
         return int(self._as_str(hold_until)), int(self._as_str(generation))
 
-    async def enqueue(self, user_id: int, notification: BlockchainNotification) -> bool:
+    async def enqueue(
+        self,
+        user_id: int,
+        notification: BlockchainNotification,
+        *,
+        now: float | None = None,
+    ) -> bool:
         """Atomically deduplicate and append a notification to the FIFO queue."""
         if user_id != notification.user_id:
             raise ValueError("user_id must match notification.user_id")
+        bucket_keys, bucket_ttl_ms = self._dedupe_window(
+            user_id, time.time() if now is None else now
+        )
         try:
             result = await self._redis.eval(
                 _ENQUEUE,
-                3,
-                self._dedupe_key(user_id),
+                3 + len(bucket_keys),
+                self._legacy_dedupe_key(user_id),
                 self._pending_id_key(user_id),
                 self._pending_key(user_id),
+                *bucket_keys,
                 notification.idempotency_key,
                 notification.to_json(),
-                self._dedupe_ttl_seconds,
+                bucket_ttl_ms,
+                self._dedupe_id(notification),
             )
         except ResponseError as error:
             if not self._is_unsupported_eval(error):
                 raise
-            return await self._enqueue_without_lua(user_id, notification)
+            return await self._enqueue_without_lua(
+                user_id, notification, bucket_keys, bucket_ttl_ms
+            )
         return bool(result)
 
     async def claim_accept(
@@ -349,25 +587,30 @@ class NotificationRedisStore:
         """
         if user_id != notification.user_id:
             raise ValueError("user_id must match notification.user_id")
+        bucket_keys, bucket_ttl_ms = self._dedupe_window(user_id, now)
         try:
             result = await self._redis.eval(
                 _CLAIM_ACCEPT,
-                5,
-                self._dedupe_key(user_id),
+                5 + len(bucket_keys),
+                self._legacy_dedupe_key(user_id),
                 self._pending_id_key(user_id),
                 self._pending_key(user_id),
                 self._hold_key(user_id),
-                self._due_key(),
+                self._due_key(user_id),
+                *bucket_keys,
                 notification.idempotency_key,
                 notification.to_json(),
-                self._dedupe_ttl_seconds,
+                bucket_ttl_ms,
                 now,
                 str(user_id),
+                self._dedupe_id(notification),
             )
         except ResponseError as error:
             if not self._is_unsupported_eval(error):
                 raise
-            return await self._claim_accept_without_lua(user_id, notification, now)
+            return await self._claim_accept_without_lua(
+                user_id, notification, now, bucket_keys, bucket_ttl_ms
+            )
         return self._as_str(result)
 
     async def clear_immediate_due_if_empty_and_lock_owned(
@@ -386,7 +629,7 @@ class NotificationRedisStore:
                 4,
                 self._pending_key(user_id),
                 self._hold_key(user_id),
-                self._due_key(),
+                self._due_key(user_id),
                 self._lock_key(user_id),
                 token,
                 str(user_id),
@@ -406,6 +649,15 @@ class NotificationRedisStore:
             return None
         return BlockchainNotification.from_json(self._as_str(value))
 
+    async def peek_many(self, user_id: int, limit: int) -> list[BlockchainNotification]:
+        """Return up to ``limit`` queued notifications from the head, in order."""
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        values = await self._redis.lrange(self._pending_key(user_id), 0, limit - 1)
+        return [
+            BlockchainNotification.from_json(self._as_str(value)) for value in values
+        ]
+
     async def pending_count(self, user_id: int) -> int:
         return int(await self._redis.llen(self._pending_key(user_id)))
 
@@ -451,18 +703,230 @@ class NotificationRedisStore:
             )
         return bool(result)
 
-    async def due_users(self, *, now: int, limit: int = 100) -> list[int]:
+    async def acknowledge_many_if_lock_owned(
+        self,
+        user_id: int,
+        expected_head: Sequence[BlockchainNotification],
+        token: str,
+    ) -> bool:
+        """Remove a delivered digest only if it is still the exact queue prefix."""
+        if not expected_head:
+            return True
+        serialized = [notification.to_json() for notification in expected_head]
+        idempotency_keys = [
+            notification.idempotency_key for notification in expected_head
+        ]
+        try:
+            result = await self._redis.eval(
+                _ACKNOWLEDGE_PREFIX_IF_LOCK_OWNED,
+                3,
+                self._pending_key(user_id),
+                self._pending_id_key(user_id),
+                self._lock_key(user_id),
+                token,
+                len(serialized),
+                *serialized,
+                *idempotency_keys,
+            )
+        except ResponseError as error:
+            if not self._is_unsupported_eval(error):
+                raise
+            return await self._acknowledge_many_if_lock_owned_without_lua(
+                user_id, serialized, idempotency_keys, token
+            )
+        return bool(result)
+
+    async def scan_pending_queues(
+        self, *, batch_size: int = 500
+    ) -> AsyncIterator[PendingQueueInfo]:
+        """Yield the length, head, and memory of every non-empty pending queue."""
+        prefix = self._pending_key_prefix()
+        keys: list[str] = []
+        async for key in self._redis.scan_iter(match=f"{prefix}*", count=batch_size):
+            keys.append(self._as_str(key))
+            if len(keys) >= batch_size:
+                for info in await self._pending_queue_infos(prefix, keys):
+                    yield info
+                keys = []
+        for info in await self._pending_queue_infos(prefix, keys):
+            yield info
+
+    async def compact_if_lock_owned(
+        self,
+        user_id: int,
+        expected_head: Sequence[BlockchainNotification],
+        summary: BlockchainNotification,
+        token: str,
+        *,
+        archive_max_length: int,
+        archive_ttl_seconds: int,
+    ) -> bool:
+        """Move a queue prefix to the cold archive list and queue ``summary``.
+
+        Like :meth:`acknowledge_many_if_lock_owned`, this changes nothing unless
+        the lease is still held and ``expected_head`` is the exact prefix.
+        """
+        if summary.user_id != user_id:
+            raise ValueError("user_id must match summary.user_id")
+        if not expected_head:
+            return False
+        serialized = [notification.to_json() for notification in expected_head]
+        idempotency_keys = [
+            notification.idempotency_key for notification in expected_head
+        ]
+        try:
+            result = await self._redis.eval(
+                _COMPACT_PREFIX_IF_LOCK_OWNED,
+                4,
+                self._pending_key(user_id),
+                self._pending_id_key(user_id),
+                self._lock_key(user_id),
+                self._archive_key(user_id),
+                token,
+                len(serialized),
+                summary.to_json(),
+                summary.idempotency_key,
+                archive_max_length,
+                archive_ttl_seconds,
+                *serialized,
+                *idempotency_keys,
+            )
+        except ResponseError as error:
+            if not self._is_unsupported_eval(error):
+                raise
+            return await self._compact_if_lock_owned_without_lua(
+                user_id,
+                serialized,
+                idempotency_keys,
+                summary,
+                token,
+                archive_max_length,
+                archive_ttl_seconds,
+            )
+        return bool(result)
+
+    async def archived(self, user_id: int, limit: int) -> list[BlockchainNotification]:
+        """Newest ``limit`` notifications moved out of the queue by compaction."""
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        values = await self._redis.lrange(self._archive_key(user_id), -limit, -1)
+        return [
+            BlockchainNotification.from_json(self._as_str(value)) for value in values
+        ]
+
+    async def claim_next(
+        self,
+        user_id: int,
+        token: str,
+        *,
+        now: int,
+        check_hold: bool,
+        limit: int,
+    ) -> NotificationClaim:
+        """Renew the lease, check the hold, and read the head in one step."""
+        try:
+            result = await self._redis.eval(
+                _CLAIM_NEXT,
+                4,
+                *self._claim_keys(user_id),
+                *self._claim_args(token, now, check_hold, limit),
+            )
+        except ResponseError as error:
+            if not self._is_unsupported_eval(error):
+                raise
+            claim = await self._claim_next_without_lua(
+                user_id, token, now, check_hold, limit, ()
+            )
+            # Only an acknowledged prefix can fail to match.
+            assert claim is not None
+            return claim
+        return self._parse_claim(result)
+
+    async def acknowledge_and_claim_next(
+        self,
+        user_id: int,
+        expected_head: Sequence[BlockchainNotification],
+        token: str,
+        *,
+        now: int,
+        check_hold: bool,
+        limit: int,
+    ) -> NotificationClaim | None:
+        """Acknowledge a delivered prefix and claim the next head together.
+
+        Returns ``None`` without changes when the lease or the prefix no
+        longer matches, like ``acknowledge_many_if_lock_owned``.
+        """
+        serialized = [notification.to_json() for notification in expected_head]
+        idempotency_keys = [
+            notification.idempotency_key for notification in expected_head
+        ]
+        try:
+            result = await self._redis.eval(
+                _ACKNOWLEDGE_AND_CLAIM_NEXT,
+                5,
+                *self._claim_keys(user_id),
+                self._pending_id_key(user_id),
+                *self._claim_args(token, now, check_hold, limit),
+                len(serialized),
+                *serialized,
+                *idempotency_keys,
+            )
+        except ResponseError as error:
+            if not self._is_unsupported_eval(error):
+                raise
+            return await self._claim_next_without_lua(
+                user_id,
+                token,
+                now,
+                check_hold,
+                limit,
+                tuple(zip(serialized, idempotency_keys)),
+            )
+        if not int(result[0]):
+            return None
+        return self._parse_claim(result[1:])
+
+    async def digest_enabled(self, user_id: int) -> bool:
+        """Whether the user asked for queued notifications as one digest."""
+        return bool(await self._redis.exists(self._digest_key(user_id)))
+
+    async def set_digest_enabled(self, user_id: int, enabled: bool) -> None:
+        if enabled:
+            await self._redis.set(self._digest_key(user_id), "1")
+        else:
+            await self._redis.delete(self._digest_key(user_id))
+
+    async def due_users(
+        self, *, now: int, limit: int = 100, shards: Iterable[int] | None = None
+    ) -> list[int]:
         """Atomically return currently due users while cleaning stale schedules.
 
         A user whose hold was renewed is rescheduled to the actual deadline.
         A no-hold user remains due while its pending queue is nonempty; stale
-        no-hold users without pending work are removed.
+        no-hold users without pending work are removed. ``shards`` limits the
+        scan to the due sets owned by the caller; by default all are scanned.
         """
+        selected = list(range(self._due_shards) if shards is None else shards)
+        due_keys = [self._due_shard_key(shard) for shard in selected]
+        if self._due_shards > 1 and 0 in selected:
+            # Entries scheduled before sharding was enabled drain from shard 0.
+            due_keys.append(self._legacy_due_key())
+        users: list[str | bytes] = []
+        for due_key in due_keys:
+            if len(users) >= limit:
+                break
+            users.extend(await self._due_users_in(due_key, now, limit - len(users)))
+        return [int(self._as_str(user)) for user in users]
+
+    async def _due_users_in(
+        self, due_key: str, now: int, limit: int
+    ) -> list[str | bytes]:
         try:
-            users = await self._redis.eval(
+            return await self._redis.eval(
                 _DUE_USERS,
                 1,
-                self._due_key(),
+                due_key,
                 now,
                 limit,
                 self._hold_key_prefix(),
@@ -472,8 +936,7 @@ class NotificationRedisStore:
         except ResponseError as error:
             if not self._is_unsupported_eval(error):
                 raise
-            users = await self._due_users_without_lua(now, limit)
-        return [int(self._as_str(user)) for user in users]
+            return await self._due_users_without_lua(due_key, now, limit)
 
     async def acquire_lock(self, user_id: int, token: str) -> bool:
         """Acquire a per-user lock whose owner is identified by ``token``."""
@@ -533,7 +996,7 @@ class NotificationRedisStore:
                     pipeline.set(hold_key, actual_hold, ex=self._hold_seconds)
                     pipeline.set(generation_key, generation, ex=self._hold_seconds)
                     pipeline.set(sequence_key, generation)
-                    pipeline.zadd(self._due_key(), {str(user_id): actual_hold})
+                    pipeline.zadd(self._due_key(user_id), {str(user_id): actual_hold})
                     await pipeline.execute()
                     return actual_hold, generation
             except WatchError:
@@ -544,7 +1007,7 @@ class NotificationRedisStore:
     ) -> bool:
         hold_key = self._hold_key(user_id)
         generation_key = self._hold_generation_key(user_id)
-        due_key = self._due_key()
+        due_key = self._due_key(user_id)
         pending_key = self._pending_key(user_id)
         while True:
             try:
@@ -574,7 +1037,7 @@ class NotificationRedisStore:
     ) -> bool:
         hold_key = self._hold_key(user_id)
         generation_key = self._hold_generation_key(user_id)
-        due_key = self._due_key()
+        due_key = self._due_key(user_id)
         pending_key = self._pending_key(user_id)
         while True:
             try:
@@ -600,25 +1063,29 @@ class NotificationRedisStore:
                 continue
 
     async def _enqueue_without_lua(
-        self, user_id: int, notification: BlockchainNotification
+        self,
+        user_id: int,
+        notification: BlockchainNotification,
+        bucket_keys: list[str],
+        bucket_ttl_ms: int,
     ) -> bool:
-        dedupe_key = self._dedupe_key(user_id)
+        legacy_dedupe_key = self._legacy_dedupe_key(user_id)
         pending_id_key = self._pending_id_key(user_id)
         pending_key = self._pending_key(user_id)
         while True:
             try:
                 async with self._redis.pipeline() as pipeline:
-                    await pipeline.watch(dedupe_key, pending_id_key)
-                    if await pipeline.sismember(
-                        dedupe_key, notification.idempotency_key
-                    ) or await pipeline.sismember(
-                        pending_id_key, notification.idempotency_key
+                    await pipeline.watch(
+                        legacy_dedupe_key, pending_id_key, *bucket_keys
+                    )
+                    if await self._seen_without_lua(
+                        pipeline, user_id, notification, bucket_keys
                     ):
                         return False
                     pipeline.multi()
-                    pipeline.sadd(dedupe_key, notification.idempotency_key)
-                    pipeline.expire(dedupe_key, self._dedupe_ttl_seconds)
-                    pipeline.sadd(pending_id_key, notification.idempotency_key)
+                    self._remember_without_lua(
+                        pipeline, user_id, notification, bucket_keys, bucket_ttl_ms
+                    )
                     pipeline.rpush(pending_key, notification.to_json())
                     await pipeline.execute()
                     return True
@@ -626,28 +1093,37 @@ class NotificationRedisStore:
                 continue
 
     async def _claim_accept_without_lua(
-        self, user_id: int, notification: BlockchainNotification, now: int
+        self,
+        user_id: int,
+        notification: BlockchainNotification,
+        now: int,
+        bucket_keys: list[str],
+        bucket_ttl_ms: int,
     ) -> str:
-        dedupe_key = self._dedupe_key(user_id)
+        legacy_dedupe_key = self._legacy_dedupe_key(user_id)
         pending_id_key = self._pending_id_key(user_id)
         pending_key = self._pending_key(user_id)
         hold_key = self._hold_key(user_id)
-        due_key = self._due_key()
+        due_key = self._due_key(user_id)
         while True:
             try:
                 async with self._redis.pipeline() as pipeline:
-                    await pipeline.watch(dedupe_key, pending_id_key, hold_key, due_key)
-                    if await pipeline.sismember(
-                        dedupe_key, notification.idempotency_key
-                    ) or await pipeline.sismember(
-                        pending_id_key, notification.idempotency_key
+                    await pipeline.watch(
+                        legacy_dedupe_key,
+                        pending_id_key,
+                        hold_key,
+                        due_key,
+                        *bucket_keys,
+                    )
+                    if await self._seen_without_lua(
+                        pipeline, user_id, notification, bucket_keys
                     ):
                         return "duplicate"
                     hold_until = await pipeline.get(hold_key)
                     pipeline.multi()
-                    pipeline.sadd(dedupe_key, notification.idempotency_key)
-                    pipeline.expire(dedupe_key, self._dedupe_ttl_seconds)
-                    pipeline.sadd(pending_id_key, notification.idempotency_key)
+                    self._remember_without_lua(
+                        pipeline, user_id, notification, bucket_keys, bucket_ttl_ms
+                    )
                     pipeline.rpush(pending_key, notification.to_json())
                     if hold_until is None or int(self._as_str(hold_until)) <= now:
                         pipeline.zadd(due_key, {str(user_id): now})
@@ -658,12 +1134,40 @@ class NotificationRedisStore:
             except WatchError:
                 continue
 
+    async def _seen_without_lua(
+        self,
+        pipeline: Pipeline,
+        user_id: int,
+        notification: BlockchainNotification,
+        bucket_keys: list[str],
+    ) -> bool:
+        for key in (self._legacy_dedupe_key(user_id), self._pending_id_key(user_id)):
+            if await pipeline.sismember(key, notification.idempotency_key):
+                return True
+        short_id = self._dedupe_id(notification)
+        for key in bucket_keys:
+            if await pipeline.sismember(key, short_id):
+                return True
+        return False
+
+    def _remember_without_lua(
+        self,
+        pipeline: Pipeline,
+        user_id: int,
+        notification: BlockchainNotification,
+        bucket_keys: list[str],
+        bucket_ttl_ms: int,
+    ) -> None:
+        pipeline.sadd(bucket_keys[0], self._dedupe_id(notification))
+        pipeline.pexpire(bucket_keys[0], bucket_ttl_ms)
+        pipeline.sadd(self._pending_id_key(user_id), notification.idempotency_key)
+
     async def _clear_immediate_due_if_empty_and_lock_owned_without_lua(
         self, user_id: int, token: str, now: int
     ) -> bool:
         pending_key = self._pending_key(user_id)
         hold_key = self._hold_key(user_id)
-        due_key = self._due_key()
+        due_key = self._due_key(user_id)
         lock_key = self._lock_key(user_id)
         while True:
             try:
@@ -736,8 +1240,171 @@ class NotificationRedisStore:
             except WatchError:
                 continue
 
-    async def _due_users_without_lua(self, now: int, limit: int) -> list[str | bytes]:
-        due_key = self._due_key()
+    async def _acknowledge_many_if_lock_owned_without_lua(
+        self,
+        user_id: int,
+        serialized: list[str],
+        idempotency_keys: list[str],
+        token: str,
+    ) -> bool:
+        pending_key = self._pending_key(user_id)
+        pending_id_key = self._pending_id_key(user_id)
+        lock_key = self._lock_key(user_id)
+        while True:
+            try:
+                async with self._redis.pipeline() as pipeline:
+                    await pipeline.watch(pending_key, pending_id_key, lock_key)
+                    owner = await pipeline.get(lock_key)
+                    head = await pipeline.lrange(pending_key, 0, len(serialized) - 1)
+                    if (
+                        owner is None
+                        or self._as_str(owner) != token
+                        or [self._as_str(value) for value in head] != serialized
+                    ):
+                        return False
+                    pipeline.multi()
+                    pipeline.ltrim(pending_key, len(serialized), -1)
+                    pipeline.srem(pending_id_key, *idempotency_keys)
+                    await pipeline.execute()
+                    return True
+            except WatchError:
+                continue
+
+    async def _compact_if_lock_owned_without_lua(
+        self,
+        user_id: int,
+        serialized: list[str],
+        idempotency_keys: list[str],
+        summary: BlockchainNotification,
+        token: str,
+        archive_max_length: int,
+        archive_ttl_seconds: int,
+    ) -> bool:
+        pending_key = self._pending_key(user_id)
+        pending_id_key = self._pending_id_key(user_id)
+        lock_key = self._lock_key(user_id)
+        archive_key = self._archive_key(user_id)
+        while True:
+            try:
+                async with self._redis.pipeline() as pipeline:
+                    await pipeline.watch(pending_key, pending_id_key, lock_key)
+                    owner = await pipeline.get(lock_key)
+                    head = await pipeline.lrange(pending_key, 0, len(serialized) - 1)
+                    if (
+                        owner is None
+                        or self._as_str(owner) != token
+                        or [self._as_str(value) for value in head] != serialized
+                    ):
+                        return False
+                    pipeline.multi()
+                    pipeline.ltrim(pending_key, len(serialized), -1)
+                    pipeline.srem(pending_id_key, *idempotency_keys)
+                    pipeline.rpush(archive_key, *serialized)
+                    pipeline.ltrim(archive_key, -archive_max_length, -1)
+                    pipeline.expire(archive_key, archive_ttl_seconds)
+                    pipeline.lpush(pending_key, summary.to_json())
+                    pipeline.sadd(pending_id_key, summary.idempotency_key)
+                    await pipeline.execute()
+                    return True
+            except WatchError:
+                continue
+
+    async def _pending_queue_infos(
+        self, prefix: str, keys: list[str]
+    ) -> list[PendingQueueInfo]:
+        if not keys:
+            return []
+        async with self._redis.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.llen(key)
+                pipeline.lindex(key, 0)
+                pipeline.memory_usage(key)
+            results = await pipeline.execute(raise_on_error=False)
+        infos = []
+        for index, key in enumerate(keys):
+            length, head, size = results[3 * index : 3 * index + 3]
+            if not isinstance(length, int) or length == 0 or head is None:
+                continue
+            try:
+                user_id = int(key[len(prefix) :])
+            except ValueError:
+                continue
+            head = self._as_str(head)
+            try:
+                notification = BlockchainNotification.from_json(head)
+            except (TypeError, ValueError):
+                notification = None
+            infos.append(
+                PendingQueueInfo(
+                    user_id,
+                    length,
+                    notification,
+                    len(head),
+                    size if isinstance(size, int) else None,
+                )
+            )
+        return infos
+
+    async def _claim_next_without_lua(
+        self,
+        user_id: int,
+        token: str,
+        now: int,
+        check_hold: bool,
+        limit: int,
+        acknowledged: tuple[tuple[str, str], ...],
+    ) -> NotificationClaim | None:
+        lock_key, hold_key, pending_key, digest_key = self._claim_keys(user_id)
+        pending_id_key = self._pending_id_key(user_id)
+        while True:
+            try:
+                async with self._redis.pipeline() as pipeline:
+                    await pipeline.watch(
+                        lock_key, hold_key, pending_key, digest_key, pending_id_key
+                    )
+                    owner = await pipeline.get(lock_key)
+                    owned = owner is not None and self._as_str(owner) == token
+                    if acknowledged:
+                        head = await pipeline.lrange(
+                            pending_key, 0, len(acknowledged) - 1
+                        )
+                        if not owned or [self._as_str(value) for value in head] != [
+                            serialized for serialized, _ in acknowledged
+                        ]:
+                            return None
+                    if not owned:
+                        return NotificationClaim("lost")
+                    hold_until = None
+                    if check_hold:
+                        hold = await pipeline.get(hold_key)
+                        hold_until = None if hold is None else int(hold)
+                    digest = bool(await pipeline.exists(digest_key))
+                    skip = len(acknowledged)
+                    last = skip + (limit if digest else 1) - 1
+                    values = await pipeline.lrange(pending_key, skip, last)
+                    pipeline.multi()
+                    if acknowledged:
+                        pipeline.ltrim(pending_key, skip, -1)
+                        pipeline.srem(pending_id_key, *(key for _, key in acknowledged))
+                    pipeline.expire(lock_key, self._lock_ttl_seconds)
+                    await pipeline.execute()
+            except WatchError:
+                continue
+            if hold_until is not None and hold_until > now:
+                return NotificationClaim("held", hold_until=hold_until)
+            return NotificationClaim(
+                "ready",
+                [
+                    BlockchainNotification.from_json(self._as_str(value))
+                    for value in values
+                ],
+                hold_until,
+                digest,
+            )
+
+    async def _due_users_without_lua(
+        self, due_key: str, now: int, limit: int
+    ) -> list[str | bytes]:
         while True:
             try:
                 async with self._redis.pipeline() as pipeline:
@@ -823,6 +1490,31 @@ class NotificationRedisStore:
             except WatchError:
                 continue
 
+    def _claim_keys(self, user_id: int) -> tuple[str, str, str, str]:
+        return (
+            self._lock_key(user_id),
+            self._hold_key(user_id),
+            self._pending_key(user_id),
+            self._digest_key(user_id),
+        )
+
+    def _claim_args(
+        self, token: str, now: int, check_hold: bool, limit: int
+    ) -> tuple[str, int, int, str, int]:
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        return token, self._lock_ttl_seconds, now, "1" if check_hold else "0", limit
+
+    def _parse_claim(self, result: Sequence) -> NotificationClaim:
+        status, hold, digest, *values = result
+        hold = self._as_str(hold)
+        return NotificationClaim(
+            self._as_str(status),
+            [BlockchainNotification.from_json(self._as_str(value)) for value in values],
+            int(hold) if hold else None,
+            bool(int(digest)),
+        )
+
     @staticmethod
     def _is_unsupported_eval(error: ResponseError) -> bool:
         return "unknown command 'eval'" in str(error).lower()
@@ -846,16 +1538,52 @@ class NotificationRedisStore:
     def _pending_key_prefix(self) -> str:
         return f"{self._key_prefix}notification:pending:"
 
-    def _dedupe_key(self, user_id: int) -> str:
+    def _dedupe_id(self, notification: BlockchainNotification) -> str:
+        """Short hashed ID kept in the dedupe buckets, as a decimal integer."""
+        digest = hashlib.blake2b(
+            notification.idempotency_key.encode(), digest_size=8
+        ).digest()
+        return str(int.from_bytes(digest, "big") >> (64 - self._dedupe_hash_bits))
+
+    def _dedupe_window(self, user_id: int, now: float) -> tuple[list[str], int]:
+        """Bucket keys that may hold a live ID, newest first, and its ttl in ms."""
+        now_ms = int(now * 1000)
+        bucket = now_ms // self._dedupe_bucket_ms
+        keys = [
+            self._dedupe_bucket_key(user_id, bucket - age)
+            for age in range(self._dedupe_buckets + 1)
+        ]
+        closes_at = (bucket + 1) * self._dedupe_bucket_ms
+        return keys, closes_at + self._dedupe_ttl_seconds * 1000 - now_ms
+
+    def _legacy_dedupe_key(self, user_id: int) -> str:
+        # Exact IDs written before bucketing; read until the set expires.
         return f"{self._key_prefix}notification:dedupe:{user_id}"
 
+    def _dedupe_bucket_key(self, user_id: int, bucket: int) -> str:
+        return f"{self._key_prefix}notification:dedupe:{user_id}:{bucket}"
+
+    def _archive_key(self, user_id: int) -> str:
+        return f"{self._key_prefix}notification:archive:{user_id}"
+
     def _pending_id_key(self, user_id: int) -> str:
         return f"{self._key_prefix}notification:pending_ids:{user_id}"
 
+    def _digest_key(self, user_id: int) -> str:
+        return f"{self._key_prefix}notification:digest:{user_id}"
+
     def _lock_key(self, user_id: int) -> str:
         return f"{self._key_prefix}notification:flush_lock:{user_id}"
 
-    def _due_key(self) -> str:
+    def _due_key(self, user_id: int) -> str:
+        return self._due_shard_key(self.shard_of(user_id))
+
+    def _due_shard_key(self, shard: int) -> str:
+        if self._due_shards == 1:
+            return self._legacy_due_key()
+        return f"{self._legacy_due_key()}:{shard}"
+
+    def _legacy_due_key(self) -> str:
         return f"{self._key_prefix}notification:due"
 
     def _hold_key_prefix(self) -> str:
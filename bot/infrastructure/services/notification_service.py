@@ -9,9 +9,10 @@ import asyncio
 import aiohttp
 from aiohttp import web
 from loguru import logger
-from sqlalchemy import select, update
+from sqlalchemy import select
 from typing import Optional, Any
-from datetime import datetime
+from collections.abc import Sequence
+from datetime import datetime, timezone
 from urllib.parse import quote
 import base64
 import sentry_sdk
@@ -26,6 +27,29 @@ from aiogram.exceptions import TelegramForbiddenError
 from routers.start_msg import cmd_info_message
 from infrastructure.utils.telegram_utils import clear_last_message_id
 from infrastructure.utils.notification_utils import decode_db_effect
+from infrastructure.services.adaptive_concurrency import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyLimitExceeded,
+)
+from infrastructure.services.notification_digest import format_digest
+from infrastructure.services.notification_metrics import (
+    STAGE_ACCOUNT_LOOKUP,
+    STAGE_DECODE,
+    STAGE_SEND,
+    STAGE_WEBHOOK,
+    NotificationMetrics,
+    ledger_closed_at,
+)
+from infrastructure.services.notification_subscription_sync import (
+    NotificationSubscriptionSync,
+    SubscriptionSyncProgress,
+    SubscriptionSyncStateStore,
+)
+from infrastructure.services.profile_cache import ProfileCache
+from infrastructure.services.telegram_send_scheduler import (
+    SendPriority,
+    telegram_send_priority,
+)
 from stellar_sdk import Keypair
 import time
 import json
@@ -63,6 +87,10 @@ class NotificationService:
         notification_history: Any = None,
         notification_coordinator: Any = None,
         bot_health_service: Any = None,
+        notification_ingest_stream: Any = None,
+        metrics: NotificationMetrics | None = None,
+        webhook_limiter: AdaptiveConcurrencyLimiter | None = None,
+        profile_cache: ProfileCache | None = None,
     ):
         self.config = config
         self.db_pool = db_pool
@@ -72,6 +100,11 @@ class NotificationService:
         self.notification_history = notification_history
         self.notification_coordinator = notification_coordinator
         self.bot_health_service = bot_health_service
+        self.notification_ingest_stream = notification_ingest_stream
+        self.subscription_sync: NotificationSubscriptionSync | None = None
+        self.metrics = metrics or NotificationMetrics()
+        self.fsm_stats: Any = None
+        self.profile_cache = profile_cache
 
         self.runner: Optional[web.AppRunner] = None
         self.site: Optional[web.TCPSite] = None
@@ -85,7 +118,7 @@ class NotificationService:
         self._notification_watchdog_task: Optional[asyncio.Task] = None
         self._notification_silence_threshold = 60 * 60
         self._notification_watchdog_interval = 5 * 60
-        self._webhook_processing_semaphore = asyncio.Semaphore(10)
+        self.webhook_limiter = webhook_limiter or AdaptiveConcurrencyLimiter()
 
         # Log initialization
         if not self.bot:
@@ -98,8 +131,40 @@ class NotificationService:
         """Inject the coordinator after Redis delivery is initialized."""
         self.notification_coordinator = coordinator
 
+    def set_notification_ingest_stream(self, stream: Any) -> None:
+        """Buffer verified webhooks in the ingest stream instead of processing inline."""
+        self.notification_ingest_stream = stream
+
+    def set_fsm_stats(self, stats: Any) -> None:
+        """Report the bot's per-update FSM round trips on ``/metrics``."""
+        self.fsm_stats = stats
+
     async def send_notification(self, notification: BlockchainNotification) -> None:
         """Deliver through the original notification UI path after Redis releases it."""
+        if await self._send_notification_message(notification, notification.text):
+            await self._after_notification_delivery(notification)
+
+    async def send_notification_digest(
+        self, notifications: Sequence[BlockchainNotification]
+    ) -> None:
+        """Deliver several queued notifications as one grouped message."""
+        latest = notifications[-1]
+        if not await self._send_notification_message(
+            latest, format_digest(notifications)
+        ):
+            return
+        reset_wallet_ids: set[object] = set()
+        for notification in notifications:
+            wallet_id = notification.data.get("wallet_id")
+            await self._after_notification_delivery(
+                notification, reset_balance_cache=wallet_id not in reset_wallet_ids
+            )
+            reset_wallet_ids.add(wallet_id)
+
+    async def _send_notification_message(
+        self, notification: BlockchainNotification, text: str
+    ) -> bool:
+        """Send ``text`` with ``notification``'s keyboard; False if the bot is blocked."""
         if not self.bot:
             raise RuntimeError("Bot not initialized for notification delivery")
 
@@ -112,38 +177,41 @@ class NotificationService:
             await clear_last_message_id(notification.user_id, app_context=app_context)
 
         try:
-            await cmd_info_message(
-                None,
-                notification.user_id,
-                notification.text,
-                operation_id=str(notification.data.get("operation_id", "")),
-                public_key=str(notification.data.get("public_key", "")),
-                wallet_id=int(notification.data.get("wallet_id", 0) or 0),
-                bot=self.bot,
-                dispatcher=self.dispatcher,
-                localization_service=self.localization_service,
-                app_context=app_context,
-            )
+            with (
+                self.metrics.span(STAGE_SEND),
+                telegram_send_priority(SendPriority.NOTIFICATION),
+            ):
+                await cmd_info_message(
+                    None,
+                    notification.user_id,
+                    text,
+                    operation_id=str(notification.data.get("operation_id", "")),
+                    public_key=str(notification.data.get("public_key", "")),
+                    wallet_id=int(notification.data.get("wallet_id", 0) or 0),
+                    bot=self.bot,
+                    dispatcher=self.dispatcher,
+                    localization_service=self.localization_service,
+                    app_context=app_context,
+                )
         except TelegramForbiddenError as error:
             await self._mark_notification_wallet_deleted(notification, error)
-            return
-
-        await self._after_notification_delivery(notification)
+            return False
+        return True
 
     async def _after_notification_delivery(
-        self, notification: BlockchainNotification
+        self, notification: BlockchainNotification, *, reset_balance_cache: bool = True
     ) -> None:
         """Persist effects that are valid only after Telegram accepted the message."""
         if self.notification_history:
             try:
-                self.notification_history.add_delivered(notification)
+                await self.notification_history.add_delivered(notification)
             except Exception as history_error:
                 logger.warning(
                     f"Failed to save notification to history: {history_error}"
                 )
 
         wallet_id = notification.data.get("wallet_id")
-        if not isinstance(wallet_id, int) or wallet_id <= 0:
+        if not reset_balance_cache or not isinstance(wallet_id, int) or wallet_id <= 0:
             return
         try:
             from infrastructure.persistence.sqlalchemy_wallet_repository import (
@@ -173,13 +241,13 @@ class NotificationService:
         logger.warning(
             f"Telegram blocked bot for user {notification.user_id}, marking wallet as deleted: {error}"
         )
+        from infrastructure.persistence.sqlalchemy_wallet_repository import (
+            SqlAlchemyWalletRepository,
+        )
+
         async with self.db_pool.get_session() as session:
-            await session.execute(
-                update(MyMtlWalletBot)
-                .where(MyMtlWalletBot.id == wallet_id)
-                .values(need_delete=1)
-            )
-            await session.commit()
+            repo = SqlAlchemyWalletRepository(session, profile_cache=self.profile_cache)
+            await repo.mark_deleted_by_id(wallet_id)
 
     async def _alert_admins_about_notification_silence(self, now: datetime) -> None:
         admins = getattr(self.config, "admins", []) or []
@@ -187,8 +255,9 @@ class NotificationService:
             return
 
         text = "No webhook notifications received for the last hour"
-        for admin_id in admins:
-            await self.bot.send_message(chat_id=admin_id, text=text)
+        with telegram_send_priority(SendPriority.NOTIFICATION):
+            for admin_id in admins:
+                await self.bot.send_message(chat_id=admin_id, text=text)
 
         self._mark_notification_activity(now)
 
@@ -233,7 +302,7 @@ class NotificationService:
             raise e
 
     # ... (skipping lines)
-    # _get_active_subscriptions moved to end of class to unify implementation
+    # list_subscriptions lives at the end of the class with the other notifier calls
 
     async def _fetch_notifier_public_key(self):
         """Fetches the Notifier's public key from /api/status."""
@@ -405,6 +474,7 @@ class NotificationService:
         app = web.Application()
         app.router.add_post("/webhook", self.handle_webhook)
         app.router.add_get("/health", self.handle_health)
+        app.router.add_get("/metrics", self.handle_metrics)
 
         self.runner = web.AppRunner(app)
         await self.runner.setup()
@@ -434,6 +504,16 @@ class NotificationService:
             await self.runner.cleanup()
 
     async def handle_webhook(self, request: web.Request):
+        started = time.perf_counter()
+        response = await self._handle_webhook(request)
+        self.metrics.observe(
+            STAGE_WEBHOOK,
+            time.perf_counter() - started,
+            failed=response.status >= 500,
+        )
+        return response
+
+    async def _handle_webhook(self, request: web.Request) -> web.Response:
         try:
             # 1. Читаем байты (нужны для проверки подписи)
             body_bytes = await request.read()
@@ -453,10 +533,27 @@ class NotificationService:
 
             # 4. Обрабатываем
             self._mark_notification_activity()
-            async with self._webhook_processing_semaphore:
+            if self.notification_ingest_stream is not None:
+                if not isinstance(payload, dict):
+                    return web.Response(text="Invalid JSON", status=400)
+                # Ответ нотифаеру только после XADD: дальше событие переживёт рестарт.
+                await self.notification_ingest_stream.append(body_bytes.decode())
+                return web.Response(text="OK")
+            async with self.webhook_limiter.slot():
                 await self.process_notification(payload)
             return web.Response(text="OK")
 
+        except ConcurrencyLimitExceeded as overloaded:
+            logger.bind(
+                event="notification_webhook_overloaded",
+                retry_after=overloaded.retry_after,
+                **self.webhook_limiter.as_dict(),
+            ).warning("notification webhook overloaded")
+            return web.Response(
+                text="Overloaded",
+                status=503,
+                headers={"Retry-After": str(overloaded.retry_after)},
+            )
         except Exception as e:
             logger.error(f"Error handling webhook: {e}")
             return web.Response(text=f"Error: {e}", status=500)
@@ -476,6 +573,18 @@ class NotificationService:
             status=200 if report.healthy else 503,
         )
 
+    async def handle_metrics(self, _request: web.Request) -> web.Response:
+        report: dict[str, Any] = {
+            "stages": self.metrics.as_dict(),
+            "webhook_concurrency": self.webhook_limiter.as_dict(),
+        }
+        touch_stats = getattr(self.notification_coordinator, "touch_stats", None)
+        if touch_stats is not None:
+            report["touch"] = touch_stats.as_dict()
+        if self.fsm_stats is not None:
+            report["fsm"] = self.fsm_stats.as_dict()
+        return web.json_response(report)
+
     async def process_notification(self, payload: dict):
         """Process the notification payload."""
         op_info = payload.get("operation", {})
@@ -512,15 +621,18 @@ class NotificationService:
         if not involved_accounts:
             return
 
-        async with self.db_pool.get_session() as session:
-            stmt = select(MyMtlWalletBot).where(
-                MyMtlWalletBot.public_key.in_(involved_accounts),
-                MyMtlWalletBot.need_delete == 0,
-                MyMtlWalletBot.user_id > 0,
-            )
-            result = await session.execute(stmt)
-            wallets = [self._snapshot_wallet(w) for w in result.scalars().all()]
-            filters_by_user = await self._load_filters_by_user(session, wallets)
+        with self.metrics.span(STAGE_ACCOUNT_LOOKUP):
+            async with self.db_pool.get_session() as session:
+                stmt = select(MyMtlWalletBot).where(
+                    MyMtlWalletBot.public_key.in_(involved_accounts),
+                    MyMtlWalletBot.need_delete == 0,
+                    MyMtlWalletBot.user_id > 0,
+                )
+                result = await session.execute(stmt)
+                wallets = [self._snapshot_wallet(w) for w in result.scalars().all()]
+                filters_by_user = await self._load_filters_by_user(session, wallets)
+                await self._preload_languages(session, wallets)
+        closed_at = ledger_closed_at(payload)
 
         for wallet in wallets:
             await self._send_notification_to_user(
@@ -528,6 +640,7 @@ class NotificationService:
                 op_data_mapped,
                 event_index=self._event_index_from_payload(payload),
                 user_filters=filters_by_user.get(wallet.user_id, []),
+                closed_at=closed_at,
             )
 
             # Special case: Self-payment to the same wallet.
@@ -545,6 +658,7 @@ class NotificationService:
                     force_perspective="debit",
                     user_filters=filters_by_user.get(wallet.user_id, []),
                     event_index=self._event_index_from_payload(payload),
+                    closed_at=closed_at,
                 )
 
         # 4. Process internal trades (for Match Orders / Makers)
@@ -559,26 +673,30 @@ class NotificationService:
                         makers.add(seller)
 
             if makers:
-                async with self.db_pool.get_session() as session:
-                    stmt = select(MyMtlWalletBot).where(
-                        MyMtlWalletBot.public_key.in_(makers),
-                        MyMtlWalletBot.need_delete == 0,
-                        MyMtlWalletBot.user_id > 0,
-                    )
-                    result = await session.execute(stmt)
-                    maker_wallets = [
-                        self._snapshot_wallet(w) for w in result.scalars().all()
-                    ]
-                    maker_filters_by_user = await self._load_filters_by_user(
-                        session, maker_wallets
-                    )
+                with self.metrics.span(STAGE_ACCOUNT_LOOKUP):
+                    async with self.db_pool.get_session() as session:
+                        stmt = select(MyMtlWalletBot).where(
+                            MyMtlWalletBot.public_key.in_(makers),
+                            MyMtlWalletBot.need_delete == 0,
+                            MyMtlWalletBot.user_id > 0,
+                        )
+                        result = await session.execute(stmt)
+                        maker_wallets = [
+                            self._snapshot_wallet(w) for w in result.scalars().all()
+                        ]
+                        maker_filters_by_user = await self._load_filters_by_user(
+                            session, maker_wallets
+                        )
+                        await self._preload_languages(session, maker_wallets)
 
-                    # Create a map for quick lookup
-                    maker_map = {w.public_key: w for w in maker_wallets}
+                        # Create a map for quick lookup
+                        maker_map = {w.public_key: w for w in maker_wallets}
 
-                    # Prepare common data
-                    tx_hash = payload.get("transaction", {}).get("hash")
-                    op_info = payload.get("operation", {})  # Helper to create trade op
+                        # Prepare common data
+                        tx_hash = payload.get("transaction", {}).get("hash")
+                        op_info = payload.get(
+                            "operation", {}
+                        )  # Helper to create trade op
             for i, trade in enumerate(trades):
                 if trade.get("type") == "order_book":
                     seller = trade.get("seller_id")
@@ -639,6 +757,7 @@ class NotificationService:
                             event_index=self._event_index_from_payload(
                                 payload, offset=i + 1
                             ),
+                            closed_at=closed_at,
                         )
 
     def _snapshot_wallet(self, wallet: MyMtlWalletBot) -> NotificationWallet:
@@ -668,6 +787,18 @@ class NotificationService:
             )
         return filters_by_user
 
+    async def _preload_languages(
+        self, session: Any, wallets: list[NotificationWallet]
+    ) -> None:
+        """Warm the language cache so rendering below stays DB-free."""
+        preload = getattr(self.localization_service, "preload_user_languages", None)
+        if preload is None or not wallets:
+            return
+        try:
+            await preload({wallet.user_id for wallet in wallets}, session=session)
+        except Exception as error:
+            logger.warning(f"Failed to preload notification languages: {error}")
+
     def _map_payload_to_operation(
         self, payload: dict
     ) -> Optional[NotificationOperation]:
@@ -932,19 +1063,21 @@ class NotificationService:
         force_perspective: Optional[str] = None,
         user_filters: Optional[list[NotificationFilter]] = None,
         event_index: Optional[int] = None,
+        closed_at: Optional[float] = None,
     ):
         if wallet.user_id is None:
             return
         user_id = int(wallet.user_id)
 
         try:
-            message_text = decode_db_effect(
-                operation,
-                str(wallet.public_key),
-                user_id,
-                localization_service=self.localization_service,
-                force_perspective=force_perspective,
-            )
+            with self.metrics.span(STAGE_DECODE):
+                message_text = decode_db_effect(
+                    operation,
+                    str(wallet.public_key),
+                    user_id,
+                    localization_service=self.localization_service,
+                    force_perspective=force_perspective,
+                )
 
             if not message_text:
                 return
@@ -1000,6 +1133,16 @@ class NotificationService:
             notification_id = (
                 f"{transaction_hash}:{event_type}:{resolved_event_index}:{user_id}"
             )
+            data: dict[str, str | int | float] = {
+                "wallet_id": int(wallet.id) if wallet.id else 0,
+                "public_key": str(wallet.public_key),
+                "operation_id": str(operation.id),
+                "operation_type": operation.operation,
+                "asset_code": operation.display_asset_code,
+                "amount": str(operation.display_amount_value),
+            }
+            if closed_at is not None:
+                data["ledger_closed_at"] = closed_at
             try:
                 await self.notification_coordinator.accept(
                     BlockchainNotification(
@@ -1007,17 +1150,14 @@ class NotificationService:
                         user_id=user_id,
                         event_type=event_type,
                         text=message_text,
-                        created_at=int(operation.dt.timestamp()),
+                        # operation.dt is naive UTC; converting it as local
+                        # time skewed created_at by the host's UTC offset.
+                        created_at=int(
+                            operation.dt.replace(tzinfo=timezone.utc).timestamp()
+                        ),
                         transaction_hash=transaction_hash,
                         event_index=resolved_event_index,
-                        data={
-                            "wallet_id": int(wallet.id) if wallet.id else 0,
-                            "public_key": str(wallet.public_key),
-                            "operation_id": str(operation.id),
-                            "operation_type": operation.operation,
-                            "asset_code": operation.display_asset_code,
-                            "amount": str(operation.display_amount_value),
-                        },
+                        data=data,
                     )
                 )
             except Exception as error:
@@ -1084,6 +1224,10 @@ class NotificationService:
                 async with session.post(url, data=body_json, headers=headers) as resp:
                     if resp.status in (200, 201):
                         logger.debug(f"Subscribed {public_key}")
+                        if self.subscription_sync is not None:
+                            await self.subscription_sync.record_subscription(
+                                public_key, await self._subscription_id(resp)
+                            )
                     else:
                         text = await resp.text()
                         logger.error(
@@ -1098,112 +1242,59 @@ class NotificationService:
             except Exception as e:
                 logger.error(f"Exception subscribing {public_key}: {e}")
 
-    async def sync_subscriptions(self):
-        """Syncs all DB wallets with Notifier subscriptions.
-
-        Smart sync: deduplicates, removes stale subscriptions,
-        re-subscribes only when parameters differ.
-        Runs in background, does not block bot startup.
+    @staticmethod
+    async def _subscription_id(resp: aiohttp.ClientResponse) -> str:
+        """ID of the created subscription, or "" when the reply has none."""
+        try:
+            data = await resp.json(content_type=None)
+        except ValueError:
+            return ""
+        if isinstance(data, dict) and data.get("id") is not None:
+            return str(data["id"])
+        return ""
+
+    async def sync_subscriptions(
+        self,
+        *,
+        full: bool = False,
+        progress: SubscriptionSyncProgress | None = None,
+    ) -> SubscriptionSyncProgress:
+        """Syncs DB wallets with Notifier subscriptions.
+
+        Incremental when a persisted watermark exists, full otherwise or when
+        ``full`` is set. Runs in background, does not block bot startup.
         """
+        progress = progress or SubscriptionSyncProgress()
         if not self.config.notifier_url:
             logger.warning("Notifier URL not set, skipping sync")
-            return
-
-        logger.info("Starting subscription sync...")
-        try:
-            # 1. Get all active wallet keys from DB
-            async with self.db_pool.get_session() as session:
-                stmt = (
-                    select(MyMtlWalletBot.public_key)
-                    .where(
-                        MyMtlWalletBot.need_delete == 0,
-                        MyMtlWalletBot.user_id > 0,
-                        MyMtlWalletBot.public_key.like("G%"),
-                    )
-                    .group_by(MyMtlWalletBot.public_key)
-                )
-                result = await session.execute(stmt)
-                db_keys = set(result.scalars().all())
-
-            # 2. Get all subscriptions with full data
-            all_subs = await self._get_active_subscriptions()
-
-            # 3. Group subscriptions by account
-            subs_by_account: dict[str, list[dict]] = defaultdict(list)
-            for sub in all_subs:
-                subs_by_account[sub["account"]].append(sub)
-
-            subscribed_accounts = set(subs_by_account.keys())
-            webhook = self.config.webhook_public_url
-
-            # 4. Determine actions
-            to_delete: list[str] = []  # subscription IDs to delete
-            to_subscribe: list[str] = []  # account keys to subscribe
-
-            for account, subs in subs_by_account.items():
-                if account not in db_keys:
-                    # Subscription exists but wallet deleted from DB → remove
-                    for sub in subs:
-                        to_delete.append(sub["id"])
-                elif len(subs) > 1:
-                    # Duplicates → delete all, re-subscribe once
-                    for sub in subs:
-                        to_delete.append(sub["id"])
-                    to_subscribe.append(account)
-                elif subs[0]["reaction_url"] != webhook:
-                    # Single sub but wrong webhook → delete, re-subscribe
-                    to_delete.append(subs[0]["id"])
-                    to_subscribe.append(account)
-                # else: single sub, correct webhook → skip
-
-            # Wallets in DB but not subscribed
-            for key in db_keys - subscribed_accounts:
-                if key:
-                    to_subscribe.append(key)
-
-            logger.info(
-                f"Sync plan: DB={len(db_keys)} wallets, "
-                f"existing={len(all_subs)} subs, "
-                f"to_delete={len(to_delete)}, to_subscribe={len(to_subscribe)}"
-            )
-
-            if not to_delete and not to_subscribe:
-                logger.info("All subscriptions are up to date, nothing to do.")
-                return
-
-            # 5. Execute deletions, then bulk subscribe
-            delete_errors = 0
-            async with aiohttp.ClientSession() as http_session:
-                for i, sub_id in enumerate(to_delete):
-                    try:
-                        await self._unsubscribe_with_session(http_session, sub_id)
-                    except Exception as e:
-                        delete_errors += 1
-                        logger.error(f"Failed to unsubscribe {sub_id}: {e}")
-                    if (i + 1) % 10 == 0:
-                        await asyncio.sleep(1)
-
-                # Bulk subscribe in chunks of 5000
-                subscribed = 0
-                batch_size = 5000
-                for i in range(0, len(to_subscribe), batch_size):
-                    chunk = to_subscribe[i : i + batch_size]
-                    try:
-                        subscribed += await self._subscribe_batch_with_session(
-                            http_session, chunk
-                        )
-                    except Exception as e:
-                        logger.error(
-                            f"Bulk subscribe failed for chunk {i // batch_size}: {e}"
-                        )
+            progress.phase = "skipped"
+            return progress
+        if self.subscription_sync is None:
+            self.subscription_sync = self.build_subscription_sync()
+        return await self.subscription_sync.run(full=full, progress=progress)
+
+    def build_subscription_sync(
+        self, state_store: SubscriptionSyncStateStore | None = None
+    ) -> NotificationSubscriptionSync:
+        return NotificationSubscriptionSync(
+            notifier=self,
+            db_pool=self.db_pool,
+            webhook_url=self.config.webhook_public_url,
+            state_store=state_store,
+            delete_concurrency=self.config.notification_sync_delete_concurrency,
+            delete_rate_per_second=self.config.notification_sync_delete_rate,
+        )
 
-            logger.info(
-                f"Sync completed: {len(to_delete)} deleted ({delete_errors} errors), "
-                f"{subscribed}/{len(to_subscribe)} subscribed."
-            )
+    def set_subscription_sync(
+        self, subscription_sync: NotificationSubscriptionSync
+    ) -> None:
+        """Inject the sync with persisted watermark state once Redis is available."""
+        self.subscription_sync = subscription_sync
 
-        except Exception as e:
-            logger.error(f"Sync failed: {e}")
+    @property
+    def uses_signed_nonce(self) -> bool:
+        """Signed requests carry a sequential nonce and must not be reordered."""
+        return not getattr(self.config, "notifier_auth_token", None)
 
     async def _subscribe_with_session(
         self, http_session: aiohttp.ClientSession, public_key: str
@@ -1232,7 +1323,7 @@ class NotificationService:
                 text = await resp.text()
                 logger.error(f"Failed to subscribe {public_key}: {resp.status} {text}")
 
-    async def _subscribe_batch_with_session(
+    async def subscribe_batch(
         self, http_session: aiohttp.ClientSession, keys: list[str]
     ) -> int:
         """Subscribe multiple accounts in a single bulk POST. Returns count of successful subscriptions."""
@@ -1265,9 +1356,9 @@ class NotificationService:
                 )
                 return 0
 
-    async def _unsubscribe_with_session(
+    async def unsubscribe(
         self, http_session: aiohttp.ClientSession, subscription_id: str
-    ):
+    ) -> bool:
         """Delete a subscription by ID using a shared aiohttp session."""
         url = f"{self.config.notifier_url}/api/subscription/{subscription_id}"
 
@@ -1288,8 +1379,10 @@ class NotificationService:
                 logger.error(
                     f"Failed to unsubscribe {subscription_id}: {resp.status} {text}"
                 )
+                return False
+        return True
 
-    async def _get_active_subscriptions(self) -> list[dict]:
+    async def list_subscriptions(self) -> list[dict]:
         """Fetch all active subscriptions with full data (id, account, reaction_url)."""
         nonce = await self._get_next_nonce()
 
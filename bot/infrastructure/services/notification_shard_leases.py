@@ -0,0 +1,205 @@
+"""Lease-based assignment of notification due-set shards to bot instances."""
+
+import math
+import os
+import socket
+import time
+import uuid
+from collections.abc import Callable
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError, WatchError
+
+DEFAULT_SHARD_LEASE_SECONDS = 30.0
+
+_CLAIM_SHARD = """
+local owner = redis.call('GET', KEYS[1])
+if owner == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if owner then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return 1
+"""
+
+_RELEASE_SHARD = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+
+class NotificationShardLeases:
+    """Split due-set shards between live delivery instances.
+
+    Every instance heartbeats into a membership set. Live members, sorted by
+    ID, take shards round-robin, so each instance targets ``shards / members``
+    of them. A target shard is owned only while this instance holds its Redis
+    lease. When an instance joins or leaves, the others release the shards
+    they no longer target, and the new target picks them up on its next
+    refresh. A crashed instance's shards move once its lease expires.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        shard_count: int,
+        instance_id: str | None = None,
+        lease_seconds: float = DEFAULT_SHARD_LEASE_SECONDS,
+        key_prefix: str = "",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if shard_count <= 0:
+            raise ValueError("shard_count must be positive")
+        if not math.isfinite(lease_seconds) or lease_seconds <= 0:
+            raise ValueError("lease_seconds must be finite and positive")
+        self._redis = redis
+        self._shard_count = shard_count
+        self.instance_id = instance_id or _default_instance_id()
+        self._lease_ms = int(lease_seconds * 1000)
+        self._refresh_interval = lease_seconds / 3
+        self._key_prefix = key_prefix
+        self._clock = clock
+        self._owned: set[int] = set()
+        self._refreshed_at: float | None = None
+
+    @property
+    def owned(self) -> list[int]:
+        return sorted(self._owned)
+
+    async def current(self) -> list[int]:
+        """Owned shards, refreshing the leases once a third of their TTL passed."""
+        if (
+            self._refreshed_at is None
+            or self._clock() - self._refreshed_at >= self._refresh_interval
+        ):
+            await self.refresh()
+        return self.owned
+
+    async def refresh(self) -> list[int]:
+        """Heartbeat, rebalance against live members, and renew owned leases."""
+        now = self._clock()
+        members = await self._heartbeat(now)
+        targets = self._targets(members)
+        for shard in sorted(self._owned - targets):
+            await self._release(shard)
+            self._owned.discard(shard)
+        previous = set(self._owned)
+        for shard in sorted(targets):
+            if await self._claim(shard):
+                self._owned.add(shard)
+            else:
+                self._owned.discard(shard)
+        self._refreshed_at = now
+        if self._owned != previous:
+            logger.bind(
+                event="notification_shards_rebalanced",
+                instance_id=self.instance_id,
+                members=len(members),
+                shards=self.owned,
+            ).info("notification delivery shards rebalanced")
+        return self.owned
+
+    async def release_all(self) -> None:
+        """Leave the membership and hand every owned shard over immediately."""
+        for shard in sorted(self._owned):
+            await self._release(shard)
+        self._owned.clear()
+        self._refreshed_at = None
+        await self._redis.zrem(self._members_key(), self.instance_id)
+
+    async def _heartbeat(self, now: float) -> list[str]:
+        members_key = self._members_key()
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.zadd(members_key, {self.instance_id: now + self._lease_ms / 1000})
+            pipeline.zremrangebyscore(members_key, "-inf", now)
+            pipeline.zrange(members_key, 0, -1)
+            *_, members = await pipeline.execute()
+        return sorted(_as_str(member) for member in members)
+
+    def _targets(self, members: list[str]) -> set[int]:
+        position = members.index(self.instance_id)
+        return set(range(position, self._shard_count, len(members)))
+
+    async def _claim(self, shard: int) -> bool:
+        try:
+            result = await self._redis.eval(
+                _CLAIM_SHARD,
+                1,
+                self._lease_key(shard),
+                self.instance_id,
+                self._lease_ms,
+            )
+        except ResponseError as error:
+            if not _is_unsupported_eval(error):
+                raise
+            return await self._claim_without_lua(shard)
+        return bool(result)
+
+    async def _release(self, shard: int) -> bool:
+        try:
+            result = await self._redis.eval(
+                _RELEASE_SHARD, 1, self._lease_key(shard), self.instance_id
+            )
+        except ResponseError as error:
+            if not _is_unsupported_eval(error):
+                raise
+            return await self._release_without_lua(shard)
+        return bool(result)
+
+    async def _claim_without_lua(self, shard: int) -> bool:
+        lease_key = self._lease_key(shard)
+        while True:
+            try:
+                async with self._redis.pipeline() as pipeline:
+                    await pipeline.watch(lease_key)
+                    owner = await pipeline.get(lease_key)
+                    if owner is not None and _as_str(owner) != self.instance_id:
+                        return False
+                    pipeline.multi()
+                    pipeline.set(lease_key, self.instance_id, px=self._lease_ms)
+                    await pipeline.execute()
+                    return True
+            except WatchError:
+                continue
+
+    async def _release_without_lua(self, shard: int) -> bool:
+        lease_key = self._lease_key(shard)
+        while True:
+            try:
+                async with self._redis.pipeline() as pipeline:
+                    await pipeline.watch(lease_key)
+                    owner = await pipeline.get(lease_key)
+                    if owner is None or _as_str(owner) != self.instance_id:
+                        return False
+                    pipeline.multi()
+                    pipeline.delete(lease_key)
+                    await pipeline.execute()
+                    return True
+            except WatchError:
+                continue
+
+    def _members_key(self) -> str:
+        return f"{self._key_prefix}notification:delivery_members"
+
+    def _lease_key(self, shard: int) -> str:
+        return f"{self._key_prefix}notification:delivery_shard:{shard}"
+
+
+def _default_instance_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _is_unsupported_eval(error: ResponseError) -> bool:
+    return "unknown command 'eval'" in str(error).lower()
+
+
+def _as_str(value: str | bytes) -> str:
+    return value.decode() if isinstance(value, bytes) else value
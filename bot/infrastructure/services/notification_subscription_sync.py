@@ -0,0 +1,475 @@
+"""Incremental, rate-limited sync of wallet keys with notifier subscriptions."""
+
+import asyncio
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import math
+import time
+from typing import Protocol
+
+import aiohttp
+from loguru import logger
+from redis.asyncio import Redis
+from sqlalchemy import func, select
+
+from db.db_pool import DatabasePool
+from db.models import MyMtlWalletBot
+
+SUBSCRIBE_BATCH_SIZE = 5000
+ACTIVE_KEY_CHUNK_SIZE = 500
+STATE_WRITE_CHUNK_SIZE = 1000
+# Deletions stamped this long before the previous run are read again, so a
+# clock that runs behind on another instance does not hide them.
+DELETION_OVERLAP = timedelta(minutes=10)
+_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+class SubscriptionNotifier(Protocol):
+    """Notifier HTTP operations used by the sync."""
+
+    @property
+    def uses_signed_nonce(self) -> bool: ...
+
+    async def list_subscriptions(self) -> list[dict]: ...
+
+    async def subscribe_batch(
+        self, http_session: aiohttp.ClientSession, keys: list[str]
+    ) -> int: ...
+
+    async def unsubscribe(
+        self, http_session: aiohttp.ClientSession, subscription_id: str
+    ) -> bool: ...
+
+
+@dataclass
+class SubscriptionSyncProgress:
+    """Live counters of one sync run, readable while it is in progress."""
+
+    mode: str = "incremental"
+    phase: str = "starting"
+    started_at: float = field(default_factory=time.monotonic)
+    wallets: int = 0
+    subscriptions: int = 0
+    to_delete: int = 0
+    deleted: int = 0
+    delete_errors: int = 0
+    to_subscribe: int = 0
+    subscribed: int = 0
+    error: str = ""
+
+    def eta_seconds(self) -> float | None:
+        """Remaining delete time extrapolated from the rate observed so far."""
+        done = self.deleted + self.delete_errors
+        remaining = self.to_delete - done
+        elapsed = time.monotonic() - self.started_at
+        if self.phase != "deleting" or done == 0 or remaining <= 0:
+            return None
+        return remaining * elapsed / done
+
+    def as_text(self) -> str:
+        eta = self.eta_seconds()
+        lines = [
+            f"Sync ({self.mode}): {self.phase}",
+            f"wallets={self.wallets} subscriptions={self.subscriptions}",
+            f"deleted={self.deleted}/{self.to_delete} errors={self.delete_errors}",
+            f"subscribed={self.subscribed}/{self.to_subscribe}",
+        ]
+        if self.error:
+            lines.append(f"error={self.error}")
+        if eta is not None:
+            lines.append(f"eta={eta:.0f}s")
+        return "\n".join(lines)
+
+
+class SubscriptionSyncStateStore:
+    """Watermarks and known subscription IDs persisted between sync runs.
+
+    The wallet watermark is the highest wallet ID already examined. The
+    deletion watermark is the time of the previous run; wallets soft-deleted
+    since then are stamped with a later ``last_use_day``.
+    """
+
+    def __init__(self, redis: Redis, *, key_prefix: str = "") -> None:
+        self._redis = redis
+        self._key_prefix = key_prefix
+
+    async def watermark(self) -> int | None:
+        value = await self._redis.hget(self._state_key(), "wallet_watermark")
+        return None if value is None else int(value)
+
+    async def deleted_since(self) -> datetime | None:
+        value = await self._redis.hget(self._state_key(), "deleted_since")
+        return None if value is None else datetime.strptime(value, _TIME_FORMAT)
+
+    async def known(self, accounts: Iterable[str]) -> dict[str, list[str]]:
+        """Return stored subscription IDs for those ``accounts`` that are known."""
+        accounts = list(accounts)
+        known: dict[str, list[str]] = {}
+        for start in range(0, len(accounts), STATE_WRITE_CHUNK_SIZE):
+            chunk = accounts[start : start + STATE_WRITE_CHUNK_SIZE]
+            values = await self._redis.hmget(self._accounts_key(), chunk)
+            for account, value in zip(chunk, values):
+                if value is not None:
+                    known[account] = [item for item in value.split(",") if item]
+        return known
+
+    async def add(self, account: str, subscription_id: str = "") -> None:
+        """Record a subscription created outside the sync, e.g. by add_wallet."""
+        ids = (await self.known([account])).get(account, [])
+        if subscription_id and subscription_id not in ids:
+            ids.append(subscription_id)
+        await self._redis.hset(self._accounts_key(), account, ",".join(ids))
+
+    async def replace(
+        self,
+        accounts: dict[str, list[str]],
+        *,
+        watermark: int,
+        deleted_since: datetime,
+    ) -> None:
+        """Atomically swap in the state observed by a full sync."""
+        staging_key = f"{self._accounts_key()}:staging"
+        await self._redis.delete(staging_key)
+        items = list(accounts.items())
+        for start in range(0, len(items), STATE_WRITE_CHUNK_SIZE):
+            chunk = items[start : start + STATE_WRITE_CHUNK_SIZE]
+            await self._redis.hset(
+                staging_key,
+                mapping={account: ",".join(ids) for account, ids in chunk},
+            )
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            if items:
+                pipeline.rename(staging_key, self._accounts_key())
+            else:
+                pipeline.delete(self._accounts_key())
+            pipeline.hset(
+                self._state_key(),
+                mapping={
+                    "wallet_watermark": watermark,
+                    "deleted_since": deleted_since.strftime(_TIME_FORMAT),
+                },
+            )
+            await pipeline.execute()
+
+    async def apply(
+        self,
+        *,
+        added: Iterable[str],
+        removed: Iterable[str],
+        watermark: int,
+        deleted_since: datetime,
+    ) -> None:
+        added = list(added)
+        removed = list(removed)
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            if added:
+                # IDs of bulk-created subscriptions are unknown until a full sync.
+                pipeline.hset(
+                    self._accounts_key(), mapping={account: "" for account in added}
+                )
+            if removed:
+                pipeline.hdel(self._accounts_key(), *removed)
+            pipeline.hset(
+                self._state_key(),
+                mapping={
+                    "wallet_watermark": watermark,
+                    "deleted_since": deleted_since.strftime(_TIME_FORMAT),
+                },
+            )
+            await pipeline.execute()
+
+    def _state_key(self) -> str:
+        return f"{self._key_prefix}notification:subscription_sync"
+
+    def _accounts_key(self) -> str:
+        return f"{self._key_prefix}notification:subscription_sync:accounts"
+
+
+class NotificationSubscriptionSync:
+    """Reconcile notifier subscriptions with wallets.
+
+    A full sync lists every subscription and diffs it against all active
+    wallets. With a state store, later runs are incremental: only wallets with
+    an ID above the stored watermark and wallets deleted since the previous
+    run are examined. The notifier list is fetched only to resolve the IDs of
+    deleted accounts that were subscribed in bulk.
+    Deletes run with bounded concurrency and a start-rate limit; signed
+    requests carry a sequential nonce, so they are kept strictly sequential.
+    """
+
+    def __init__(
+        self,
+        *,
+        notifier: SubscriptionNotifier,
+        db_pool: DatabasePool,
+        webhook_url: str | None = None,
+        state_store: SubscriptionSyncStateStore | None = None,
+        delete_concurrency: int = 1,
+        delete_rate_per_second: float = 10.0,
+        session_factory: Callable[[], aiohttp.ClientSession] = aiohttp.ClientSession,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        clock: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        if delete_concurrency <= 0:
+            raise ValueError("delete_concurrency must be positive")
+        if not math.isfinite(delete_rate_per_second) or delete_rate_per_second <= 0:
+            raise ValueError("delete_rate_per_second must be finite and positive")
+        self._notifier = notifier
+        self._db_pool = db_pool
+        self._webhook_url = webhook_url
+        self._state_store = state_store
+        self._delete_concurrency = delete_concurrency
+        self._delete_interval = 1 / delete_rate_per_second
+        self._session_factory = session_factory
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = asyncio.Lock()
+        self.progress: SubscriptionSyncProgress | None = None
+
+    async def run(
+        self,
+        *,
+        full: bool = False,
+        progress: SubscriptionSyncProgress | None = None,
+    ) -> SubscriptionSyncProgress:
+        progress = progress or SubscriptionSyncProgress()
+        async with self._lock:
+            self.progress = progress
+            watermark = (
+                None
+                if self._state_store is None
+                else await self._state_store.watermark()
+            )
+            progress.mode = "full" if full or watermark is None else "incremental"
+            logger.bind(event="notification_sync_started", mode=progress.mode).info(
+                "notification subscription sync started"
+            )
+            try:
+                if watermark is None or full:
+                    await self._full_sync(progress)
+                else:
+                    await self._incremental_sync(progress, watermark)
+            except Exception as error:
+                # Startup runs this as a fire-and-forget task; report, don't raise.
+                progress.phase = "failed"
+                progress.error = str(error)
+                logger.bind(event="notification_sync_failed").exception(
+                    "notification subscription sync failed"
+                )
+                return progress
+            progress.phase = "done"
+            logger.bind(
+                event="notification_sync_completed",
+                mode=progress.mode,
+                deleted=progress.deleted,
+                delete_errors=progress.delete_errors,
+                subscribed=progress.subscribed,
+                to_subscribe=progress.to_subscribe,
+                seconds=round(time.monotonic() - progress.started_at, 1),
+            ).info("notification subscription sync completed")
+            return progress
+
+    async def record_subscription(self, account: str, subscription_id: str) -> None:
+        """Remember a subscription made outside the sync so it is not repeated."""
+        if self._state_store is not None:
+            await self._state_store.add(account, subscription_id)
+
+    async def _full_sync(self, progress: SubscriptionSyncProgress) -> None:
+        progress.phase = "loading"
+        started = self._clock()
+        db_keys, max_wallet_id = await self._active_wallet_keys()
+        subscriptions = await self._notifier.list_subscriptions()
+        progress.wallets = len(db_keys)
+        progress.subscriptions = len(subscriptions)
+
+        subs_by_account: dict[str, list[dict]] = defaultdict(list)
+        for sub in subscriptions:
+            subs_by_account[sub["account"]].append(sub)
+
+        to_delete: list[str] = []
+        to_subscribe: list[str] = []
+        kept: dict[str, list[str]] = {}
+        for account, subs in subs_by_account.items():
+            if account not in db_keys:
+                # Subscription exists but wallet deleted from DB → remove
+                to_delete.extend(sub["id"] for sub in subs)
+            elif len(subs) > 1:
+                # Duplicates → delete all, re-subscribe once
+                to_delete.extend(sub["id"] for sub in subs)
+                to_subscribe.append(account)
+            elif subs[0]["reaction_url"] != self._webhook_url:
+                # Single sub but wrong webhook → delete, re-subscribe
+                to_delete.append(subs[0]["id"])
+                to_subscribe.append(account)
+            else:
+                kept[account] = [subs[0]["id"]]
+        # Wallets in DB but not subscribed
+        to_subscribe.extend(key for key in db_keys - subs_by_account.keys() if key)
+
+        async with self._session_factory() as http_session:
+            await self._delete(http_session, to_delete, progress)
+            subscribed = await self._subscribe(http_session, to_subscribe, progress)
+        for account in subscribed:
+            kept[account] = []
+        if self._state_store is not None:
+            await self._state_store.replace(
+                kept, watermark=max_wallet_id, deleted_since=started
+            )
+
+    async def _incremental_sync(
+        self, progress: SubscriptionSyncProgress, watermark: int
+    ) -> None:
+        assert self._state_store is not None
+        progress.phase = "loading"
+        started = self._clock()
+        new_keys, max_wallet_id = await self._active_wallet_keys(after_id=watermark)
+        deleted_since = await self._state_store.deleted_since()
+        deleted_keys = await self._deleted_wallet_keys(
+            None if deleted_since is None else deleted_since - DELETION_OVERLAP
+        )
+        progress.wallets = len(new_keys)
+
+        known_new = await self._state_store.known(new_keys)
+        to_subscribe = sorted(new_keys - known_new.keys())
+        known_deleted = await self._state_store.known(deleted_keys)
+        still_active = await self._active_keys_among(known_deleted.keys())
+        gone = {
+            account: ids
+            for account, ids in known_deleted.items()
+            if account not in still_active
+        }
+        if any(not ids for ids in gone.values()):
+            # Bulk subscribe does not return IDs; look them up for these accounts.
+            subscriptions = await self._notifier.list_subscriptions()
+            progress.subscriptions = len(subscriptions)
+            for sub in subscriptions:
+                ids = gone.get(sub["account"])
+                if ids is not None and sub["id"] not in ids:
+                    ids.append(sub["id"])
+        to_delete = [sub_id for ids in gone.values() for sub_id in ids]
+
+        async with self._session_factory() as http_session:
+            failed = await self._delete(http_session, to_delete, progress)
+            subscribed = await self._subscribe(http_session, to_subscribe, progress)
+        removed = [
+            account for account, ids in gone.items() if not failed.intersection(ids)
+        ]
+        await self._state_store.apply(
+            added=subscribed,
+            removed=removed,
+            watermark=max(watermark, max_wallet_id),
+            deleted_since=started,
+        )
+
+    async def _delete(
+        self,
+        http_session: aiohttp.ClientSession,
+        subscription_ids: list[str],
+        progress: SubscriptionSyncProgress,
+    ) -> set[str]:
+        """Delete subscriptions; return the IDs that could not be deleted."""
+        progress.phase = "deleting"
+        progress.to_delete = len(subscription_ids)
+        concurrency = (
+            1 if self._notifier.uses_signed_nonce else self._delete_concurrency
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+        failed: set[str] = set()
+
+        async def delete_one(subscription_id: str) -> None:
+            try:
+                ok = await self._notifier.unsubscribe(http_session, subscription_id)
+            except Exception as error:
+                logger.error(f"Failed to unsubscribe {subscription_id}: {error}")
+                ok = False
+            if ok:
+                progress.deleted += 1
+            else:
+                progress.delete_errors += 1
+                failed.add(subscription_id)
+
+        tasks: list[asyncio.Task[None]] = []
+        try:
+            for subscription_id in subscription_ids:
+                await semaphore.acquire()
+                task = asyncio.create_task(delete_one(subscription_id))
+                task.add_done_callback(lambda _task: semaphore.release())
+                tasks.append(task)
+                await self._sleep(self._delete_interval)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return failed
+
+    async def _subscribe(
+        self,
+        http_session: aiohttp.ClientSession,
+        keys: list[str],
+        progress: SubscriptionSyncProgress,
+    ) -> list[str]:
+        """Bulk subscribe in chunks; return the keys that were accepted."""
+        progress.phase = "subscribing"
+        progress.to_subscribe = len(keys)
+        subscribed: list[str] = []
+        for start in range(0, len(keys), SUBSCRIBE_BATCH_SIZE):
+            chunk = keys[start : start + SUBSCRIBE_BATCH_SIZE]
+            try:
+                if await self._notifier.subscribe_batch(http_session, chunk):
+                    subscribed.extend(chunk)
+            except Exception as error:
+                logger.error(
+                    f"Bulk subscribe failed for chunk "
+                    f"{start // SUBSCRIBE_BATCH_SIZE}: {error}"
+                )
+        progress.subscribed = len(subscribed)
+        return subscribed
+
+    async def _active_wallet_keys(self, *, after_id: int = 0) -> tuple[set[str], int]:
+        """Active Stellar keys of wallets above ``after_id`` and the max wallet ID."""
+        async with self._db_pool.get_session() as session:
+            result = await session.execute(
+                select(MyMtlWalletBot.public_key).where(
+                    MyMtlWalletBot.id > after_id,
+                    MyMtlWalletBot.need_delete == 0,
+                    MyMtlWalletBot.user_id > 0,
+                    MyMtlWalletBot.public_key.like("G%"),
+                )
+            )
+            keys = {key for key in result.scalars() if key}
+            max_id = await session.scalar(select(func.max(MyMtlWalletBot.id)))
+        return keys, int(max_id or after_id)
+
+    async def _deleted_wallet_keys(self, since: datetime | None) -> set[str]:
+        """Keys of wallets soft-deleted at or after ``since``; all of them if None."""
+        query = select(MyMtlWalletBot.public_key).where(
+            MyMtlWalletBot.need_delete == 1,
+            MyMtlWalletBot.public_key.like("G%"),
+        )
+        if since is not None:
+            # Soft deletes stamp last_use_day, see SqlAlchemyWalletRepository.delete.
+            query = query.where(MyMtlWalletBot.last_use_day >= since)
+        async with self._db_pool.get_session() as session:
+            result = await session.execute(query.distinct())
+            return {key for key in result.scalars() if key}
+
+    async def _active_keys_among(self, keys: Iterable[str]) -> set[str]:
+        """The same key may back another user's active wallet; keep those."""
+        keys = list(keys)
+        active: set[str] = set()
+        async with self._db_pool.get_session() as session:
+            for start in range(0, len(keys), ACTIVE_KEY_CHUNK_SIZE):
+                chunk = keys[start : start + ACTIVE_KEY_CHUNK_SIZE]
+                result = await session.execute(
+                    select(MyMtlWalletBot.public_key)
+                    .where(
+                        MyMtlWalletBot.public_key.in_(chunk),
+                        MyMtlWalletBot.need_delete == 0,
+                        MyMtlWalletBot.user_id > 0,
+                    )
+                    .distinct()
+                )
+                active.update(key for key in result.scalars() if key)
+        return active
@@ -0,0 +1,141 @@
+"""Read-through cache of default-wallet and user profiles shared by instances."""
+
+import dataclasses
+import json
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from core.domain.entities import UserProfile, WalletProfile
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_LOCAL_ENTRIES = 10_000
+
+_Profile = TypeVar("_Profile", WalletProfile, UserProfile)
+
+
+def _version_key(user_id: int) -> str:
+    return f"profile:version:{user_id}"
+
+
+def _payload_key(kind: str, user_id: int) -> str:
+    return f"profile:{kind}:{user_id}"
+
+
+class ProfileCache:
+    """Versioned profile cache in Redis, mirrored in a small in-process LRU.
+
+    Each user has a version counter in Redis that never expires. A cached
+    payload records the version it was loaded under and is used only while
+    that version is current. Every read costs one ``MGET`` of the counter and
+    the payload. When the local copy already has the current version, the
+    payload is not even decoded. ``invalidate`` increments the counter, so
+    every instance drops its copies at once. A payload loaded while a write
+    was in progress carries the old version and is never served.
+    Redis errors fall back to the loader.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        local_entries: int = DEFAULT_LOCAL_ENTRIES,
+    ) -> None:
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+        if local_entries < 0:
+            raise ValueError("local_entries must not be negative")
+        self._redis = redis
+        self._ttl_seconds = ttl_seconds
+        self._local_entries = local_entries
+        self._local: OrderedDict[tuple[str, int], tuple[int, Any]] = OrderedDict()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def wallet_profile(
+        self,
+        user_id: int,
+        load: Callable[[], Awaitable[WalletProfile | None]],
+    ) -> WalletProfile | None:
+        return await self._get("wallet", WalletProfile, user_id, load)
+
+    async def user_profile(
+        self,
+        user_id: int,
+        load: Callable[[], Awaitable[UserProfile | None]],
+    ) -> UserProfile | None:
+        return await self._get("user", UserProfile, user_id, load)
+
+    async def invalidate(self, user_id: int) -> None:
+        """Retire every cached profile of ``user_id`` on all instances."""
+        self._local.pop(("wallet", user_id), None)
+        self._local.pop(("user", user_id), None)
+        await self._redis.incr(_version_key(user_id))
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "local_entries": len(self._local),
+        }
+
+    async def _get(
+        self,
+        kind: str,
+        profile_type: type[_Profile],
+        user_id: int,
+        load: Callable[[], Awaitable[_Profile | None]],
+    ) -> _Profile | None:
+        local_key = (kind, user_id)
+        try:
+            raw_version, raw_payload = await self._redis.mget(
+                _version_key(user_id), _payload_key(kind, user_id)
+            )
+        except RedisError:
+            logger.bind(event="profile_cache_unavailable", user_id=user_id).warning(
+                "profile cache unavailable; reading the database"
+            )
+            return await load()
+        version = int(raw_version or 0)
+        local = self._local.get(local_key)
+        if local is not None and local[0] == version:
+            self._local.move_to_end(local_key)
+            self.local_hits += 1
+            return local[1]
+        payload = json.loads(raw_payload) if raw_payload else None
+        if payload is not None and payload["version"] == version:
+            fields = payload["profile"]
+            profile = profile_type(**fields) if fields is not None else None
+            self.redis_hits += 1
+        else:
+            profile = await load()
+            self.misses += 1
+            payload = {
+                "version": version,
+                "profile": dataclasses.asdict(profile) if profile else None,
+            }
+            try:
+                await self._redis.set(
+                    _payload_key(kind, user_id),
+                    json.dumps(payload),
+                    ex=self._ttl_seconds,
+                )
+            except RedisError:
+                return profile
+        self._remember(local_key, version, profile)
+        return profile
+
+    def _remember(self, key: tuple[str, int], version: int, profile: Any) -> None:
+        if self._local_entries == 0:
+            return
+        self._local[key] = (version, profile)
+        self._local.move_to_end(key)
+        while len(self._local) > self._local_entries:
+            self._local.popitem(last=False)
@@ -0,0 +1,331 @@
+"""Proactive pacing of outbound Telegram sends shared across bot instances."""
+
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+import math
+import time
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError, WatchError
+
+
+class SendPriority(IntEnum):
+    """Lower values are granted first and may use the whole global bucket."""
+
+    INTERACTIVE = 0
+    NOTIFICATION = 1
+    BROADCAST = 2
+
+
+# Share of the global burst each class must leave untouched for higher classes.
+PRIORITY_RESERVE_SHARE = {
+    SendPriority.INTERACTIVE: 0.0,
+    SendPriority.NOTIFICATION: 0.2,
+    SendPriority.BROADCAST: 0.5,
+}
+MAX_IDLE_WAIT_SECONDS = 1.0
+
+_current_priority: ContextVar[SendPriority] = ContextVar(
+    "telegram_send_priority", default=SendPriority.INTERACTIVE
+)
+
+# KEYS: global bucket, chat bucket (may be ""). ARGV: now, global rate, global
+# burst, reserve, chat rate, chat burst, ttl ms. Returns {granted, wait ms, kind}.
+_TAKE_TOKEN = """
+local now = tonumber(ARGV[1])
+local function level(key, rate, burst)
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    return math.min(burst, tokens + math.max(0, now - ts) * rate)
+end
+local global_rate = tonumber(ARGV[2])
+local global_tokens = level(KEYS[1], global_rate, tonumber(ARGV[3]))
+local needed = 1 + tonumber(ARGV[4])
+if global_tokens < needed then
+    return {0, math.ceil((needed - global_tokens) / global_rate * 1000), 'global'}
+end
+local chat_tokens = nil
+if KEYS[2] ~= '' then
+    local chat_rate = tonumber(ARGV[5])
+    chat_tokens = level(KEYS[2], chat_rate, tonumber(ARGV[6]))
+    if chat_tokens < 1 then
+        return {0, math.ceil((1 - chat_tokens) / chat_rate * 1000), 'chat'}
+    end
+    redis.call('HSET', KEYS[2], 'tokens', tostring(chat_tokens - 1), 'ts', ARGV[1])
+    redis.call('PEXPIRE', KEYS[2], ARGV[7])
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(global_tokens - 1), 'ts', ARGV[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[7])
+return {1, 0, ''}
+"""
+
+
+@dataclass(frozen=True)
+class TokenGrant:
+    """Outcome of one bucket take; ``blocked_by`` is ``global`` or ``chat``."""
+
+    granted: bool
+    wait_seconds: float = 0.0
+    blocked_by: str = ""
+
+
+@contextmanager
+def telegram_send_priority(priority: SendPriority) -> Iterator[None]:
+    """Schedule Telegram requests made inside the block with ``priority``."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_send_priority() -> SendPriority:
+    return _current_priority.get()
+
+
+class RedisSendBuckets:
+    """Global and per-chat token buckets kept in Redis for all instances."""
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        global_rate: float,
+        chat_rate: float,
+        chat_burst: float,
+        key_prefix: str = "",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        for name, value in (
+            ("global_rate", global_rate),
+            ("chat_rate", chat_rate),
+            ("chat_burst", chat_burst),
+        ):
+            if not math.isfinite(value) or value <= 0:
+                raise ValueError(f"{name} must be finite and positive")
+        self._redis = redis
+        self._global_rate = global_rate
+        self._global_burst = global_rate
+        self._chat_rate = chat_rate
+        self._chat_burst = max(1.0, chat_burst)
+        self._key_prefix = key_prefix
+        self._clock = clock
+        # Idle buckets are full again after this long; the key is then redundant.
+        self._ttl_ms = (
+            int(
+                max(self._global_burst / global_rate, self._chat_burst / chat_rate)
+                * 1000
+            )
+            + 1000
+        )
+
+    async def take(self, chat_id: int | None, priority: SendPriority) -> TokenGrant:
+        """Consume one global token and, for chat sends, one chat token."""
+        reserve = self._global_burst * PRIORITY_RESERVE_SHARE[priority]
+        now = self._clock()
+        global_key = self._global_key()
+        chat_key = "" if chat_id is None else self._chat_key(chat_id)
+        try:
+            granted, wait_ms, blocked_by = await self._redis.eval(
+                _TAKE_TOKEN,
+                2,
+                global_key,
+                chat_key,
+                repr(now),
+                repr(self._global_rate),
+                repr(self._global_burst),
+                repr(reserve),
+                repr(self._chat_rate),
+                repr(self._chat_burst),
+                self._ttl_ms,
+            )
+            return TokenGrant(
+                bool(int(granted)), int(wait_ms) / 1000, self._as_str(blocked_by)
+            )
+        except ResponseError as error:
+            if not self._is_unsupported_eval(error):
+                raise
+        return await self._take_without_lua(global_key, chat_key, now, reserve)
+
+    async def _take_without_lua(
+        self, global_key: str, chat_key: str, now: float, reserve: float
+    ) -> TokenGrant:
+        keys = [global_key] + ([chat_key] if chat_key else [])
+        while True:
+            async with self._redis.pipeline(transaction=True) as pipeline:
+                try:
+                    await pipeline.watch(*keys)
+                    global_tokens = await self._level(
+                        pipeline, global_key, now, self._global_rate, self._global_burst
+                    )
+                    needed = 1 + reserve
+                    if global_tokens < needed:
+                        return TokenGrant(
+                            False,
+                            (needed - global_tokens) / self._global_rate,
+                            "global",
+                        )
+                    chat_tokens = 0.0
+                    if chat_key:
+                        chat_tokens = await self._level(
+                            pipeline, chat_key, now, self._chat_rate, self._chat_burst
+                        )
+                        if chat_tokens < 1:
+                            return TokenGrant(
+                                False, (1 - chat_tokens) / self._chat_rate, "chat"
+                            )
+                    pipeline.multi()
+                    pipeline.hset(
+                        global_key,
+                        mapping={"tokens": repr(global_tokens - 1), "ts": repr(now)},
+                    )
+                    pipeline.pexpire(global_key, self._ttl_ms)
+                    if chat_key:
+                        pipeline.hset(
+                            chat_key,
+                            mapping={"tokens": repr(chat_tokens - 1), "ts": repr(now)},
+                        )
+                        pipeline.pexpire(chat_key, self._ttl_ms)
+                    await pipeline.execute()
+                    return TokenGrant(True)
+                except WatchError:
+                    continue
+
+    @staticmethod
+    async def _level(
+        pipeline, key: str, now: float, rate: float, burst: float
+    ) -> float:
+        tokens, ts = await pipeline.hmget(key, ["tokens", "ts"])
+        tokens = burst if tokens is None else float(tokens)
+        ts = now if ts is None else float(ts)
+        return min(burst, tokens + max(0.0, now - ts) * rate)
+
+    @staticmethod
+    def _is_unsupported_eval(error: ResponseError) -> bool:
+        return "unknown command 'eval'" in str(error).lower()
+
+    @staticmethod
+    def _as_str(value: str | bytes) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    def _global_key(self) -> str:
+        return f"{self._key_prefix}telegram:send:global"
+
+    def _chat_key(self, chat_id: int) -> str:
+        return f"{self._key_prefix}telegram:send:chat:{chat_id}"
+
+
+class TelegramSendScheduler:
+    """Grant send slots by priority class, round-robin across chats.
+
+    Waiters queue per priority and per chat; one dispatcher task serves the
+    highest class first and rotates between chats inside a class so one chat's
+    burst cannot starve others. Redis failures fail open: a send is never held
+    back because the limiter itself is unavailable.
+    """
+
+    def __init__(self, buckets: RedisSendBuckets) -> None:
+        self._buckets = buckets
+        self._waiters: dict[
+            SendPriority, OrderedDict[int | None, deque[asyncio.Future[None]]]
+        ] = {priority: OrderedDict() for priority in SendPriority}
+        self._wakeup = asyncio.Event()
+        self._dispatcher: asyncio.Task[None] | None = None
+        self.granted = {priority: 0 for priority in SendPriority}
+        self.wait_seconds_total = 0.0
+
+    async def acquire(
+        self, chat_id: int | None, priority: SendPriority | None = None
+    ) -> None:
+        """Wait until a send to ``chat_id`` fits the global and chat budgets."""
+        priority = current_send_priority() if priority is None else priority
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters[priority].setdefault(chat_id, deque()).append(waiter)
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(
+                self._dispatch(), name="telegram-send-scheduler"
+            )
+        started = time.monotonic()
+        await waiter
+        self.wait_seconds_total += time.monotonic() - started
+
+    def stats(self) -> dict[str, float | int]:
+        waiting = sum(
+            len(queue) for chats in self._waiters.values() for queue in chats.values()
+        )
+        return {
+            "waiting": waiting,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            **{f"granted_{p.name.lower()}": count for p, count in self.granted.items()},
+        }
+
+    async def close(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+    async def _dispatch(self) -> None:
+        while self._has_waiters():
+            self._wakeup.clear()
+            delay = await self._grant_round()
+            if delay <= 0:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except TimeoutError:
+                pass
+
+    async def _grant_round(self) -> float:
+        """Grant at most one slot per waiting chat; return the next retry delay."""
+        granted_any = False
+        next_delay = MAX_IDLE_WAIT_SECONDS
+        for priority in SendPriority:
+            chats = self._waiters[priority]
+            for chat_id in list(chats):
+                queue = chats[chat_id]
+                while queue and queue[0].done():
+                    queue.popleft()
+                if not queue:
+                    del chats[chat_id]
+                    continue
+                try:
+                    grant = await self._buckets.take(chat_id, priority)
+                except Exception:
+                    logger.bind(event="telegram_send_scheduler_failed").exception(
+                        "telegram send scheduler failed open"
+                    )
+                    grant = TokenGrant(True)
+                if grant.granted:
+                    self._release(priority, chat_id)
+                    granted_any = True
+                    continue
+                if grant.blocked_by == "global":
+                    # Lower classes need even more headroom; nothing else can pass.
+                    return 0.0 if granted_any else grant.wait_seconds
+                next_delay = min(next_delay, grant.wait_seconds)
+        return 0.0 if granted_any else next_delay
+
+    def _release(self, priority: SendPriority, chat_id: int | None) -> None:
+        chats = self._waiters[priority]
+        queue = chats[chat_id]
+        waiter = queue.popleft()
+        if not waiter.done():
+            # A waiter cancelled during the Redis round trip just wastes its slot.
+            waiter.set_result(None)
+            self.granted[priority] += 1
+        if queue:
+            chats.move_to_end(chat_id)
+        else:
+            del chats[chat_id]
+
+    def _has_waiters(self) -> bool:
+        return any(self._waiters[priority] for priority in SendPriority)
@@ -0,0 +1,244 @@
+"""Registry-based serialization of FSM callbacks and cached value objects.
+
+Callbacks stored in FSM data or in Redis transaction hashes are written as
+``{"fn": "<module>.<qualname>"}`` and resolved only through functions
+registered with :func:`fsm_callback`. Value objects are written as compact
+JSON tagged with ``"$t"`` and rebuilt only for types registered with
+:func:`register_value_type`.
+
+Payloads written by jsonpickle before this module existed still decode.
+Before such a payload reaches jsonpickle, every class or function it names
+must be registered or listed in :data:`LEGACY_PATHS`, so stored data cannot
+import or run arbitrary code.
+"""
+
+import dataclasses
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional, TypeVar
+
+import jsonpickle  # type: ignore
+
+from core.domain.value_objects import Balance as DomainBalance
+from other.mytypes import Balance, MyAsset, MyOffer, Next, PriceR, RecordLinks
+
+_Func = TypeVar("_Func", bound=Callable)
+
+TYPE_KEY = "$t"
+CALLBACK_KEY = "fn"
+
+# Standard-library and dateutil types that legacy jsonpickle payloads name,
+# for example inside ``MyOffer.last_modified_time``.
+LEGACY_PATHS = frozenset(
+    {
+        "builtins.set",
+        "collections.defaultdict",
+        "copyreg._reconstructor",
+        "datetime.datetime",
+        "datetime.timedelta",
+        "datetime.timezone",
+        "datetime.tzinfo",
+        "dateutil.tz.tz.tzlocal",
+        "dateutil.tz.tz.tzutc",
+    }
+)
+
+_LEGACY_REFERENCE_KEYS = ("py/object", "py/type", "py/function", "py/mod")
+
+
+class SerializationError(ValueError):
+    """Payload names an unregistered callback or type, or is malformed."""
+
+
+@dataclass(frozen=True)
+class _ValueType:
+    cls: type
+    tag: str
+    to_dict: Callable[[Any], dict]
+    from_dict: Callable[[dict], Any]
+    drop_none: bool
+
+
+_callbacks: dict[str, Callable] = {}
+_types_by_tag: dict[str, _ValueType] = {}
+_types_by_class: dict[type, _ValueType] = {}
+_legacy_paths: set[str] = set(LEGACY_PATHS)
+
+
+def _path(obj: Any) -> str:
+    return f"{obj.__module__}.{obj.__qualname__}"
+
+
+def fsm_callback(func: _Func) -> _Func:
+    """Allow ``func`` to be stored in FSM data and called after signing."""
+    name = _path(func)
+    if "<locals>" in name:
+        raise ValueError("fsm callbacks must be module-level functions")
+    _callbacks[name] = func
+    _legacy_paths.add(name)
+    return func
+
+
+def dump_callback(func: Callable) -> str:
+    name = _path(func)
+    if _callbacks.get(name) is not func:
+        raise SerializationError(f"callback {name} is not registered")
+    return json.dumps({CALLBACK_KEY: name})
+
+
+def load_callback(payload: str) -> Callable:
+    """Resolve a stored callback; accepts the legacy jsonpickle form too."""
+    try:
+        data = json.loads(payload)
+    except (TypeError, ValueError) as exc:
+        raise SerializationError("callback payload is not JSON") from exc
+    name = None
+    if isinstance(data, dict):
+        name = data.get(CALLBACK_KEY) or data.get("py/function")
+    func = _callbacks.get(name) if isinstance(name, str) else None
+    if func is None:
+        raise SerializationError(f"unknown fsm callback {name!r}")
+    return func
+
+
+def register_value_type(
+    cls: type,
+    tag: str,
+    *,
+    to_dict: Optional[Callable[[Any], dict]] = None,
+    from_dict: Optional[Callable[[dict], Any]] = None,
+    legacy_types: Iterable[type] = (),
+) -> None:
+    """Register ``cls`` for :func:`dump_values` under the short ``tag``.
+
+    Without ``to_dict``/``from_dict`` the class must be a dataclass, and
+    fields equal to their default are left out. With them, ``None`` values
+    are left out at every level, so ``from_dict`` must treat a missing key
+    as ``None``. ``legacy_types`` lists nested classes that old jsonpickle
+    payloads of ``cls`` name.
+    """
+    if tag in _types_by_tag and _types_by_tag[tag].cls is not cls:
+        raise ValueError(f"tag {tag!r} is already registered")
+    if (to_dict is None) != (from_dict is None):
+        raise ValueError("to_dict and from_dict must be given together")
+    if to_dict is None or from_dict is None:
+        if not dataclasses.is_dataclass(cls):
+            raise ValueError("to_dict and from_dict are required for non-dataclasses")
+        value_type = _ValueType(
+            cls,
+            tag,
+            _dataclass_to_dict,
+            lambda fields: cls(**{k: _decode(v) for k, v in fields.items()}),
+            drop_none=False,
+        )
+    else:
+        value_type = _ValueType(cls, tag, to_dict, from_dict, drop_none=True)
+    _types_by_tag[tag] = value_type
+    _types_by_class[cls] = value_type
+    _legacy_paths.update(_path(legacy) for legacy in (cls, *legacy_types))
+
+
+def dump_values(value: Any) -> str:
+    """Encode registered value objects, possibly inside lists and dicts."""
+    return json.dumps(_encode(value), separators=(",", ":"))
+
+
+def load_values(payload: str) -> Any:
+    """Decode :func:`dump_values` output or a legacy jsonpickle payload."""
+    try:
+        data = json.loads(payload)
+    except (TypeError, ValueError) as exc:
+        raise SerializationError("value payload is not JSON") from exc
+    if _is_legacy(data):
+        _check_legacy_references(data)
+        return jsonpickle.decode(payload, safe=True)
+    return _decode(data)
+
+
+def _dataclass_to_dict(obj: Any) -> dict:
+    result = {}
+    for field in dataclasses.fields(obj):
+        value = getattr(obj, field.name)
+        if field.default is not dataclasses.MISSING and value == field.default:
+            continue
+        result[field.name] = _encode(value)
+    return result
+
+
+def _without_none(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _without_none(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_without_none(item) for item in value]
+    return value
+
+
+def _encode(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _encode(item) for key, item in value.items()}
+    value_type = _types_by_class.get(type(value))
+    if value_type is None:
+        raise SerializationError(f"{_path(type(value))} is not registered")
+    fields = value_type.to_dict(value)
+    if value_type.drop_none:
+        fields = _without_none(fields)
+    return {TYPE_KEY: value_type.tag, **fields}
+
+
+def _decode(data: Any) -> Any:
+    if isinstance(data, list):
+        return [_decode(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    if TYPE_KEY not in data:
+        return {key: _decode(item) for key, item in data.items()}
+    fields = dict(data)
+    tag = fields.pop(TYPE_KEY)
+    value_type = _types_by_tag.get(tag)
+    if value_type is None:
+        raise SerializationError(f"unknown value type {tag!r}")
+    return value_type.from_dict(fields)
+
+
+def _is_legacy(data: Any) -> bool:
+    if isinstance(data, list):
+        return any(_is_legacy(item) for item in data)
+    if isinstance(data, dict):
+        return any(key.startswith("py/") for key in data) or any(
+            _is_legacy(item) for item in data.values()
+        )
+    return False
+
+
+def _check_legacy_references(data: Any) -> None:
+    if isinstance(data, list):
+        for item in data:
+            _check_legacy_references(item)
+        return
+    if not isinstance(data, dict):
+        return
+    if "py/repr" in data:
+        raise SerializationError("legacy payload uses py/repr")
+    for key in _LEGACY_REFERENCE_KEYS:
+        path = data.get(key)
+        if path is not None and path not in _legacy_paths:
+            raise SerializationError(f"legacy payload names {path!r}")
+    for item in data.values():
+        _check_legacy_references(item)
+
+
+register_value_type(DomainBalance, "balance")
+register_value_type(
+    Balance, "horizon_balance", to_dict=Balance.to_dict, from_dict=Balance.from_dict
+)
+register_value_type(
+    MyOffer,
+    "offer",
+    to_dict=MyOffer.to_dict,
+    from_dict=MyOffer.from_dict,
+    legacy_types=(MyAsset, Next, PriceR, RecordLinks),
+)
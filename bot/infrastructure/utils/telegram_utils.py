@@ -22,6 +22,7 @@ from infrastructure.services.notification_badge_service import (
 )
 
 from infrastructure.utils.common_utils import get_user_id
+from middleware.fsm_cache import get_fsm_data, update_fsm_data
 
 TELEGRAM_API_ERROR: Any = object()
 TEXT_DOCUMENT_CAPTION_LIMIT = 1000
@@ -129,7 +130,7 @@ async def _send_ui_message(
     fsm_storage_key = StorageKey(
         bot_id=current_bot.id, user_id=user_id, chat_id=user_id
     )
-    data = await current_dispatcher.storage.get_data(key=fsm_storage_key)
+    data = await get_fsm_data(current_dispatcher.storage, fsm_storage_key)
     msg_id = data.get("last_message_id", 0)
     if need_new_msg:
         new_msg = await _await_telegram_ui_operation(
@@ -154,8 +155,11 @@ async def _send_ui_message(
                         user_id, msg_id
                     ),
                 )
-        await current_dispatcher.storage.update_data(
-            key=fsm_storage_key, data={"last_message_id": new_msg.message_id}
+        await update_fsm_data(
+            current_dispatcher.storage,
+            fsm_storage_key,
+            {"last_message_id": new_msg.message_id},
+            flush=True,
         )
         await _capture_base_markup(
             badge_service,
@@ -205,8 +209,11 @@ async def _send_ui_message(
                 disable_web_page_preview=True,
             ),
         )
-        await current_dispatcher.storage.update_data(
-            key=fsm_storage_key, data={"last_message_id": new_msg.message_id}
+        await update_fsm_data(
+            current_dispatcher.storage,
+            fsm_storage_key,
+            {"last_message_id": new_msg.message_id},
+            flush=True,
         )
         await _capture_base_markup(
             badge_service,
@@ -283,7 +290,7 @@ async def _send_ui_document(
     fsm_storage_key = StorageKey(
         bot_id=current_bot.id, user_id=user_id, chat_id=user_id
     )
-    data = await current_dispatcher.storage.get_data(key=fsm_storage_key)
+    data = await get_fsm_data(current_dispatcher.storage, fsm_storage_key)
     previous_message_id = int(data.get("last_message_id", 0))
     new_message = await _await_telegram_ui_operation(
         lease_lost,
@@ -307,8 +314,11 @@ async def _send_ui_document(
                     user_id, previous_message_id
                 ),
             )
-    await current_dispatcher.storage.update_data(
-        key=fsm_storage_key, data={"last_message_id": new_message.message_id}
+    await update_fsm_data(
+        current_dispatcher.storage,
+        fsm_storage_key,
+        {"last_message_id": new_message.message_id},
+        flush=True,
     )
     await _capture_base_markup(
         badge_service,
@@ -499,9 +509,8 @@ async def set_last_message_id(chat_id: int, msg_id: int, app_context: AppContext
     fsm_storage_key = StorageKey(
         bot_id=app_context.bot.id, user_id=chat_id, chat_id=chat_id
     )
-    # data = await dp.storage.get_data(key=fsm_storage_key)
-    await dispatcher.storage.update_data(
-        key=fsm_storage_key, data={"last_message_id": msg_id}
+    await update_fsm_data(
+        dispatcher.storage, fsm_storage_key, {"last_message_id": msg_id}, flush=True
     )
 
 
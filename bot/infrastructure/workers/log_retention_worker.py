@@ -0,0 +1,243 @@
+"""Move callback log rows past the retention window into the archive."""
+
+import asyncio
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+from sqlalchemy import delete, func, select
+
+from db.db_pool import DatabasePool
+from db.models import MyMtlWalletBotLog
+from infrastructure.services.log_archive import (
+    ArchivedLogRow,
+    LogArchive,
+    TableSizeSample,
+)
+from infrastructure.utils.async_utils import with_timeout
+from other.loguru_tools import safe_catch_async
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_PAUSE_SECONDS = 0.5
+DEFAULT_MAX_BATCHES = 100
+# Leaves the table size sample time to finish inside the job's 60 s budget.
+DEFAULT_MAX_RUN_SECONDS = 45.0
+# Firebird accepts at most 1500 values in one IN list.
+MAX_BATCH_SIZE = 1000
+# Outlasts the job's 60 s timeout, so a live run never loses its lease.
+DEFAULT_RUN_LEASE_SECONDS = 120
+
+
+@dataclass(frozen=True)
+class RetentionResult:
+    archived: int
+    batches: int
+    # True when no expired rows were left at the end of the run.
+    complete: bool
+    sample: TableSizeSample
+
+
+class CallbackLogRetention:
+    """Archive and delete ``MYMTLWALLETBOT_LOG`` rows older than the window.
+
+    Each batch reads the oldest expired rows through ``IX_MMWB_LOG_DT``. It
+    appends them to the day files of the archive and then deletes them by
+    ``log_id``. The read and the delete each use a short session of their
+    own. Batches are separated by a pause, so user updates keep getting
+    connections. One run handles at most ``max_batches`` batches and stops
+    before a batch that would start after ``max_run_seconds``. It then always
+    records a table size sample.
+    """
+
+    def __init__(
+        self,
+        db_pool: DatabasePool,
+        archive: LogArchive,
+        *,
+        retention_days: int,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_pause_seconds: float = DEFAULT_BATCH_PAUSE_SECONDS,
+        max_batches: int = DEFAULT_MAX_BATCHES,
+        max_run_seconds: float = DEFAULT_MAX_RUN_SECONDS,
+        clock: Callable[[], datetime] = datetime.now,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if retention_days <= 0:
+            raise ValueError("retention_days must be positive")
+        if not 0 < batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+        if batch_pause_seconds < 0:
+            raise ValueError("batch_pause_seconds must not be negative")
+        if max_batches <= 0:
+            raise ValueError("max_batches must be positive")
+        if max_run_seconds <= 0:
+            raise ValueError("max_run_seconds must be positive")
+        self._db_pool = db_pool
+        self._archive = archive
+        self._retention = timedelta(days=retention_days)
+        self._batch_size = batch_size
+        self._batch_pause_seconds = batch_pause_seconds
+        self._max_batches = max_batches
+        self._max_run_seconds = max_run_seconds
+        self._clock = clock
+        self._timer = timer
+
+    async def run_once(self) -> RetentionResult:
+        started = self._timer()
+        cutoff = self._clock() - self._retention
+        archived = 0
+        batches = 0
+        complete = False
+        while batches < self._max_batches:
+            moved = await self._archive_batch(cutoff)
+            if moved:
+                archived += moved
+                batches += 1
+            if moved < self._batch_size:
+                complete = True
+                break
+            elapsed = self._timer() - started
+            if elapsed + self._batch_pause_seconds >= self._max_run_seconds:
+                break
+            await asyncio.sleep(self._batch_pause_seconds)
+        sample = await self._sample(archived)
+        await asyncio.to_thread(self._archive.record_size, sample)
+        logger.bind(
+            event="callback_log_archived",
+            archived=archived,
+            batches=batches,
+            complete=complete,
+            rows=sample.rows,
+        ).info("callback log retention run finished")
+        return RetentionResult(
+            archived=archived, batches=batches, complete=complete, sample=sample
+        )
+
+    async def _archive_batch(self, cutoff: datetime) -> int:
+        async with self._db_pool.get_session() as session:
+            result = await session.execute(
+                select(MyMtlWalletBotLog)
+                .where(MyMtlWalletBotLog.log_dt < cutoff)
+                .order_by(MyMtlWalletBotLog.log_dt, MyMtlWalletBotLog.log_id)
+                .limit(self._batch_size)
+            )
+            rows = [
+                ArchivedLogRow(
+                    log_id=row.log_id,
+                    user_id=row.user_id,
+                    log_dt=row.log_dt,
+                    log_operation=row.log_operation or "",
+                    log_operation_info=row.log_operation_info or "",
+                )
+                for row in result.scalars()
+                # Always set: log_id is the key and log_dt matched the cutoff.
+                if row.log_id is not None and row.log_dt is not None
+            ]
+        if not rows:
+            return 0
+        # Files are written with no connection checked out.
+        by_day: dict[date, list[ArchivedLogRow]] = defaultdict(list)
+        for row in rows:
+            by_day[row.log_dt.date()].append(row)
+        for day, day_rows in by_day.items():
+            await asyncio.to_thread(self._archive.append, day, day_rows)
+        async with self._db_pool.get_session() as session:
+            await session.execute(
+                delete(MyMtlWalletBotLog).where(
+                    MyMtlWalletBotLog.log_id.in_([row.log_id for row in rows])
+                )
+            )
+            await session.commit()
+        return len(rows)
+
+    async def _sample(self, archived: int) -> TableSizeSample:
+        async with self._db_pool.get_session() as session:
+            total, oldest = (
+                await session.execute(
+                    select(
+                        func.count(MyMtlWalletBotLog.log_id),
+                        func.min(MyMtlWalletBotLog.log_dt),
+                    )
+                )
+            ).one()
+        return TableSizeSample(
+            taken_at=self._clock(), rows=total, oldest=oldest, archived=archived
+        )
+
+
+class RetentionRunLease:
+    """Redis lease that lets one instance at a time run log retention.
+
+    Every instance schedules the job. The instance that sets the key runs
+    the pass and the others skip it, so two instances never read and delete
+    the same rows or append them to the archive twice. A lease left by an
+    instance that died expires after ``lease_seconds``.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        lease_seconds: int = DEFAULT_RUN_LEASE_SECONDS,
+        key_prefix: str = "",
+    ) -> None:
+        if lease_seconds <= 0:
+            raise ValueError("lease_seconds must be positive")
+        self._redis = redis
+        self._lease_seconds = lease_seconds
+        self._key = f"{key_prefix}callback_log_retention:lease"
+
+    async def acquire(self) -> str | None:
+        """Take the lease and return its token, or None if it is held."""
+        token = uuid.uuid4().hex
+        acquired = await self._redis.set(
+            self._key, token, nx=True, ex=self._lease_seconds
+        )
+        return token if acquired else None
+
+    async def release(self, token: str) -> None:
+        """Drop the lease only while ``token`` still owns it."""
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            try:
+                await pipeline.watch(self._key)
+                if await pipeline.get(self._key) != token:
+                    return
+                pipeline.multi()
+                pipeline.delete(self._key)
+                await pipeline.execute()
+            except WatchError:
+                # The lease expired and was taken over; it is not ours.
+                return
+
+
+async def run_under_lease(
+    retention: CallbackLogRetention, lease: RetentionRunLease
+) -> RetentionResult | None:
+    """Run one pass while holding ``lease``; None when another instance has it."""
+    token = await lease.acquire()
+    if token is None:
+        logger.bind(event="callback_log_retention_skipped").debug(
+            "callback log retention is running on another instance"
+        )
+        return None
+    try:
+        return await retention.run_once()
+    finally:
+        await lease.release(token)
+
+
+@with_timeout(60)
+@safe_catch_async
+async def cmd_archive_callback_log(
+    retention: CallbackLogRetention, lease: RetentionRunLease | None = None
+):
+    if lease is None:
+        await retention.run_once()
+    else:
+        await run_under_lease(retention, lease)
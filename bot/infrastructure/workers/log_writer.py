@@ -0,0 +1,155 @@
+"""Buffered, batched writer for the callback and signing activity log."""
+
+import asyncio
+from collections import deque
+from contextlib import suppress
+from typing import TYPE_CHECKING, Optional
+
+from loguru import logger
+from sqlalchemy import insert
+
+from db.models import MyMtlWalletBotLog
+from infrastructure.log_models import LogQuery
+
+if TYPE_CHECKING:
+    from infrastructure.services.activity_rollups import ActivityRollups
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL_SECONDS = 1.0
+DEFAULT_MAX_PENDING = 10_000
+
+
+class CallbackLogWriter:
+    """Collect ``LogQuery`` rows in memory and insert them in batches.
+
+    ``put_nowait`` never blocks. At most ``max_pending`` rows wait in memory.
+    When the buffer is full, the oldest row is dropped and counted. ``run``
+    flushes once ``batch_size`` rows are waiting, and otherwise every
+    ``flush_interval_seconds``. Each flush inserts up to ``batch_size`` rows
+    with one executemany ``INSERT`` in one transaction. A batch that fails,
+    or a flush cancelled mid-insert, as on shutdown, goes back to the front
+    of the buffer, so rows are only lost to the ``max_pending`` bound. After
+    a failure ``run`` waits ``flush_interval_seconds`` before retrying.
+    Written batches are added to ``rollups`` when one is given. ``stop``
+    writes whatever is still buffered and gives up on the first failure.
+    """
+
+    def __init__(
+        self,
+        db_pool,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval_seconds: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        rollups: Optional["ActivityRollups"] = None,
+    ) -> None:
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        if flush_interval_seconds <= 0:
+            raise ValueError("flush_interval_seconds must be positive")
+        if max_pending < batch_size:
+            raise ValueError("max_pending must be at least batch_size")
+        self._db_pool = db_pool
+        self._batch_size = batch_size
+        self._flush_interval_seconds = flush_interval_seconds
+        self._rollups = rollups
+        self._pending: deque[LogQuery] = deque(maxlen=max_pending)
+        self._batch_ready = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def put_nowait(self, item: LogQuery) -> None:
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(item)
+        self.enqueued += 1
+        if len(self._pending) >= self._batch_size:
+            self._batch_ready.set()
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+    async def run(self) -> None:
+        while True:
+            if len(self._pending) < self._batch_size:
+                self._batch_ready.clear()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        self._batch_ready.wait(), self._flush_interval_seconds
+                    )
+            while self._pending:
+                if not await self.flush():
+                    # The batch is back in the buffer; let the database recover.
+                    await asyncio.sleep(self._flush_interval_seconds)
+                    break
+
+    async def flush(self) -> int:
+        """Insert one batch of buffered rows and return how many were written."""
+        async with self._flush_lock:
+            batch = [
+                self._pending.popleft()
+                for _ in range(min(self._batch_size, len(self._pending)))
+            ]
+            if not batch:
+                return 0
+            rows = [
+                {
+                    "user_id": item.user_id,
+                    "log_dt": item.log_dt,
+                    "log_operation": item.log_operation[:32],
+                    "log_operation_info": item.log_operation_info[:32],
+                }
+                for item in batch
+            ]
+            try:
+                async with self._db_pool.get_session() as session:
+                    await session.execute(insert(MyMtlWalletBotLog), rows)
+                    await session.commit()
+            except asyncio.CancelledError:
+                # stop() runs after the run task is cancelled and writes them.
+                self._requeue(batch)
+                raise
+            except Exception:
+                self.failed += len(rows)
+                self._requeue(batch)
+                logger.bind(event="callback_log_flush_failed", rows=len(rows)).opt(
+                    exception=True
+                ).warning("callback log batch was not written; retrying later")
+                return 0
+            self.written += len(rows)
+            self.batches += 1
+            if self._rollups is not None:
+                await self._rollups.record(batch)
+            logger.bind(event="callback_log_flushed", rows=len(rows)).debug(
+                "callback log batch written"
+            )
+            return len(rows)
+
+    def _requeue(self, batch: list[LogQuery]) -> None:
+        # The deque drops its newest rows when the batch no longer fits.
+        overflow = len(self._pending) + len(batch) - (self._pending.maxlen or 0)
+        if overflow > 0:
+            self.dropped += overflow
+        self._pending.extendleft(reversed(batch))
+
+    async def stop(self) -> None:
+        """Write every buffered row; call after the ``run`` task is cancelled."""
+        while self._pending:
+            if not await self.flush():
+                self.dropped += len(self._pending)
+                self._pending.clear()
+                break
+        logger.bind(event="callback_log_stopped", **self.as_dict()).info(
+            "callback log writer stopped"
+        )
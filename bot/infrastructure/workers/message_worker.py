@@ -1,16 +1,37 @@
-from dataclasses import dataclass
+import asyncio
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
 
 from aiogram.fsm.storage.base import StorageKey
 from loguru import logger
+from redis.asyncio import Redis
 
+from db.db_pool import DatabasePool
 from infrastructure.persistence.sqlalchemy_message_repository import (
     SqlAlchemyMessageRepository,
 )
 from infrastructure.utils.async_utils import with_timeout
 from infrastructure.services.app_context import AppContext
+from infrastructure.services.telegram_send_scheduler import (
+    SendPriority,
+    telegram_send_priority,
+)
 from other.loguru_tools import safe_catch_async
 from routers.start_msg import cmd_info_message
 
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CONCURRENCY = 10
+# Leaves the last batch time to finish inside the job's 60 s budget.
+DEFAULT_MAX_RUN_SECONDS = 40.0
+# Firebird accepts at most 1500 values in one IN list.
+MAX_BATCH_SIZE = 1000
+RATE_WINDOW_SECONDS = 60.0
+# Well above the 60 s job timeout, so a live batch never loses its claim.
+DEFAULT_CLAIM_LEASE_SECONDS = 300
+
 
 @dataclass(frozen=True)
 class QueuedMessage:
@@ -19,16 +40,164 @@ class QueuedMessage:
     user_message: str
 
 
-@with_timeout(60)
-@safe_catch_async
-async def cmd_send_message_1m(app_context: AppContext):
-    health_service = getattr(app_context, "bot_health_service", None)
-    if health_service is not None:
-        health_service.mark_scheduler_started()
-    try:
-        async with app_context.db_pool.get_session() as session:
-            msg_repo = SqlAlchemyMessageRepository(session)
-            rows = await msg_repo.get_unsent(10)
+@dataclass(frozen=True)
+class OutboxProgress:
+    sent: int
+    failed: int
+    pending: int
+    rate_per_second: float
+    eta_seconds: Optional[float]
+
+
+class OutboxClaimLeases:
+    """Redis leases on claimed outbox batches.
+
+    A batch's message IDs are stored under a random token, and a sorted set
+    keeps the token's expiry time. A batch that finishes ends its lease. If
+    its instance dies first, the lease expires and ``expired`` returns the
+    IDs so that a later drain can put them back in the queue.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        lease_seconds: int = DEFAULT_CLAIM_LEASE_SECONDS,
+        key_prefix: str = "",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if lease_seconds <= 0:
+            raise ValueError("lease_seconds must be positive")
+        self._redis = redis
+        self._lease_seconds = lease_seconds
+        self._expiry_key = f"{key_prefix}message_outbox:leases"
+        self._ids_key = f"{key_prefix}message_outbox:lease_ids"
+        self._clock = clock
+
+    async def grant(self, message_ids: list[int]) -> str:
+        token = uuid.uuid4().hex
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.hset(self._ids_key, token, ",".join(map(str, message_ids)))
+            pipeline.zadd(
+                self._expiry_key, {token: self._clock() + self._lease_seconds}
+            )
+            await pipeline.execute()
+        return token
+
+    async def end(self, token: str) -> None:
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.zrem(self._expiry_key, token)
+            pipeline.hdel(self._ids_key, token)
+            await pipeline.execute()
+
+    async def expired(self) -> dict[str, list[int]]:
+        """Message IDs of leases that ran out, by token."""
+        tokens = await self._redis.zrangebyscore(
+            self._expiry_key, "-inf", self._clock()
+        )
+        if not tokens:
+            return {}
+        values = await self._redis.hmget(self._ids_key, tokens)
+        return {
+            token: [int(item) for item in (value or "").split(",") if item]
+            for token, value in zip(tokens, values)
+        }
+
+
+class MessageOutbox:
+    """Send queued bot messages in claimed, concurrent batches.
+
+    A batch is claimed under row locks and marked as claimed, so several
+    instances can drain the queue without sending a message twice. Only with
+    ``skip_locked`` (Firebird 5) do they skip each other's rows instead of
+    waiting on them. Sends run
+    concurrently with broadcast priority. The Telegram send scheduler keeps
+    them within the global and per-chat limits. The results of a batch are
+    marked in one transaction. Messages that were not sent or failed, for
+    example on shutdown, go back to the queue. With ``leases``, each claim
+    holds a lease from before its commit. A drain starts by putting back the
+    messages of expired leases, left claimed by an instance that died
+    mid-batch. A drain stops when the queue is empty or after
+    ``max_run_seconds``.
+    """
+
+    def __init__(
+        self,
+        db_pool: DatabasePool,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_run_seconds: float = DEFAULT_MAX_RUN_SECONDS,
+        skip_locked: bool = False,
+        leases: Optional[OutboxClaimLeases] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not 0 < batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+        if concurrency <= 0:
+            raise ValueError("concurrency must be positive")
+        if max_run_seconds <= 0:
+            raise ValueError("max_run_seconds must be positive")
+        self._db_pool = db_pool
+        self._batch_size = batch_size
+        self._concurrency = concurrency
+        self._max_run_seconds = max_run_seconds
+        self._skip_locked = skip_locked
+        self._leases = leases
+        self._clock = clock
+        # (started, finished, handled) of recent batches, for the send rate.
+        self._recent: deque[tuple[float, float, int]] = deque()
+        self.sent = 0
+        self.failed = 0
+
+    async def drain(self, app_context: AppContext) -> int:
+        """Send batches until the queue is empty or the run time is used up."""
+        started = self._clock()
+        await self.requeue_expired_claims()
+        handled = 0
+        while True:
+            batch = await self.send_batch(app_context)
+            handled += batch
+            if (
+                batch < self._batch_size
+                or self._clock() - started >= self._max_run_seconds
+            ):
+                return handled
+
+    async def requeue_expired_claims(self) -> int:
+        """Put back messages whose claim lease ran out; return how many."""
+        if self._leases is None:
+            return 0
+        expired = await self._leases.expired()
+        requeued = 0
+        for token, message_ids in expired.items():
+            async with self._db_pool.get_session() as session:
+                await SqlAlchemyMessageRepository(session).release_claims(message_ids)
+            await self._leases.end(token)
+            requeued += len(message_ids)
+        if expired:
+            logger.bind(
+                event="message_outbox_claims_requeued",
+                batches=len(expired),
+                messages=requeued,
+            ).warning("expired outbox claims returned to the queue")
+        return requeued
+
+    async def send_batch(self, app_context: AppContext) -> int:
+        """Claim, send and mark one batch; return how many messages it had."""
+        started = self._clock()
+        lease: list[str] = []
+
+        async def take_lease(message_ids: list[int]) -> None:
+            if self._leases is not None:
+                lease.append(await self._leases.grant(message_ids))
+
+        async with self._db_pool.get_session() as session:
+            rows = await SqlAlchemyMessageRepository(session).claim_unsent(
+                self._batch_size,
+                skip_locked=self._skip_locked,
+                before_commit=take_lease,
+            )
             messages = []
             for row in rows:
                 assert row.message_id is not None, "message_id must not be None"
@@ -41,9 +210,73 @@ async def cmd_send_message_1m(app_context: AppContext):
                         user_message=row.user_message,
                     )
                 )
+        if not messages:
+            return 0
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+        sent_ids: list[int] = []
+        failed_ids: list[int] = []
+
+        async def send(message: QueuedMessage) -> None:
+            async with semaphore:
+                if await self._send(app_context, message):
+                    sent_ids.append(message.message_id)
+                else:
+                    failed_ids.append(message.message_id)
+
+        try:
+            await asyncio.gather(*(send(message) for message in messages))
+        finally:
+            done = set(sent_ids) | set(failed_ids)
+            async with self._db_pool.get_session() as session:
+                msg_repo = SqlAlchemyMessageRepository(session)
+                await msg_repo.mark_results(sent_ids, failed_ids)
+                await msg_repo.release_claims(
+                    message.message_id
+                    for message in messages
+                    if message.message_id not in done
+                )
+                pending = await msg_repo.count_pending()
+            if lease and self._leases is not None:
+                await self._leases.end(lease[0])
+
+        self.sent += len(sent_ids)
+        self.failed += len(failed_ids)
+        self._record_batch(started, len(messages))
+        logger.bind(
+            event="message_outbox_progress", **asdict(self.progress(pending))
+        ).info("outbox batch sent")
+        return len(messages)
+
+    def progress(self, pending: int) -> OutboxProgress:
+        """Totals of this instance and the time ``pending`` messages will take."""
+        rate = self._rate()
+        return OutboxProgress(
+            sent=self.sent,
+            failed=self.failed,
+            pending=pending,
+            rate_per_second=round(rate, 2),
+            eta_seconds=round(pending / rate, 1) if rate > 0 else None,
+        )
 
-        for message in messages:
-            try:
+    def _record_batch(self, started: float, handled: int) -> None:
+        finished = self._clock()
+        self._recent.append((started, finished, handled))
+        while finished - self._recent[0][1] > RATE_WINDOW_SECONDS:
+            self._recent.popleft()
+
+    def _rate(self) -> float:
+        if not self._recent:
+            return 0.0
+        elapsed = self._recent[-1][1] - self._recent[0][0]
+        if elapsed <= 0:
+            return 0.0
+        return sum(handled for _, _, handled in self._recent) / elapsed
+
+    @staticmethod
+    async def _send(app_context: AppContext, message: QueuedMessage) -> bool:
+        try:
+            with telegram_send_priority(SendPriority.BROADCAST):
                 await cmd_info_message(
                     None,
                     message.user_id,
@@ -51,28 +284,37 @@ async def cmd_send_message_1m(app_context: AppContext):
                     None,
                     app_context=app_context,
                 )
-                dispatcher = app_context.dispatcher
-                assert dispatcher is not None, (
-                    "Dispatcher must be initialized in app_context"
-                )
-                fsm_storage_key = StorageKey(
-                    bot_id=app_context.bot.id,
-                    user_id=message.user_id,
-                    chat_id=message.user_id,
-                )
-                await dispatcher.storage.update_data(
-                    key=fsm_storage_key, data={"last_message_id": 0}
-                )
-            except Exception as ex:
-                async with app_context.db_pool.get_session() as session:
-                    msg_repo = SqlAlchemyMessageRepository(session)
-                    await msg_repo.mark_failed(message.message_id)
-                logger.info(["cmd_send_message_1m", ex])
-                continue
-
-            async with app_context.db_pool.get_session() as session:
-                msg_repo = SqlAlchemyMessageRepository(session)
-                await msg_repo.mark_sent(message.message_id)
+            dispatcher = app_context.dispatcher
+            assert dispatcher is not None, (
+                "Dispatcher must be initialized in app_context"
+            )
+            fsm_storage_key = StorageKey(
+                bot_id=app_context.bot.id,
+                user_id=message.user_id,
+                chat_id=message.user_id,
+            )
+            await dispatcher.storage.update_data(
+                key=fsm_storage_key, data={"last_message_id": 0}
+            )
+        except Exception as ex:
+            logger.bind(
+                event="message_outbox_send_failed", message_id=message.message_id
+            ).info(f"queued message was not sent: {ex}")
+            return False
+        return True
+
+
+@with_timeout(60)
+@safe_catch_async
+async def cmd_send_message_1m(app_context: AppContext):
+    health_service = getattr(app_context, "bot_health_service", None)
+    if health_service is not None:
+        health_service.mark_scheduler_started()
+    try:
+        outbox = getattr(app_context, "message_outbox", None) or MessageOutbox(
+            app_context.db_pool
+        )
+        await outbox.drain(app_context)
     finally:
         if health_service is not None:
             health_service.mark_scheduler_completed()
@@ -0,0 +1,255 @@
+"""Periodic compaction of oversized pending notification queues."""
+
+import asyncio
+import heapq
+import math
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable, Sequence
+from dataclasses import dataclass
+from typing import Protocol
+
+from loguru import logger
+
+from core.models.blockchain_notification import BlockchainNotification
+from infrastructure.services.notification_redis_store import PendingQueueInfo
+
+SUMMARY_EVENT_TYPE = "queue_summary"
+DEFAULT_ARCHIVE_MAX_LENGTH = 1000
+DEFAULT_ARCHIVE_TTL_SECONDS = 30 * 24 * 60 * 60
+# Upper bound on items moved per user per run; longer queues take several runs.
+MAX_COMPACT_BATCH = 1000
+LARGEST_QUEUES_REPORTED = 5
+# Per-key dict entry, key string, and list header in Redis, in bytes.
+REDIS_KEY_OVERHEAD = 90
+# Listpack entry header and backlen per element.
+REDIS_ENTRY_OVERHEAD = 4
+
+
+class NotificationCompactionStore(Protocol):
+    """Queue operations required by the compaction job."""
+
+    def scan_pending_queues(
+        self, *, batch_size: int = 500
+    ) -> AsyncIterator[PendingQueueInfo]: ...
+
+    async def acquire_lock(self, user_id: int, token: str) -> bool: ...
+
+    async def release_lock(self, user_id: int, token: str) -> bool: ...
+
+    async def peek_many(
+        self, user_id: int, limit: int
+    ) -> list[BlockchainNotification]: ...
+
+    async def compact_if_lock_owned(
+        self,
+        user_id: int,
+        expected_head: Sequence[BlockchainNotification],
+        summary: BlockchainNotification,
+        token: str,
+        *,
+        archive_max_length: int,
+        archive_ttl_seconds: int,
+    ) -> bool: ...
+
+
+SummaryText = Callable[[int, int], str]
+
+
+@dataclass(frozen=True)
+class PendingQueueReport:
+    """Pending-queue totals seen by one compaction run."""
+
+    queues: int
+    items: int
+    bytes: int
+    estimated: bool
+    compacted_users: int
+    archived: int
+    largest: tuple[tuple[int, int], ...]
+
+
+class NotificationCompactionWorker:
+    """Archive the old head of queues that grew too long or too old.
+
+    A queue is compacted when it holds more than ``max_length`` items, or more
+    than ``keep_latest`` items with a head older than ``max_age_seconds``.
+    Everything but the newest ``keep_latest`` items moves to a cold Redis list
+    with a TTL, and one summary notification takes its place at the head. The
+    per-user flush lock keeps compaction and delivery apart.
+    """
+
+    def __init__(
+        self,
+        *,
+        store: NotificationCompactionStore,
+        interval_seconds: float,
+        max_length: int,
+        keep_latest: int,
+        max_age_seconds: int,
+        archive_max_length: int = DEFAULT_ARCHIVE_MAX_LENGTH,
+        archive_ttl_seconds: int = DEFAULT_ARCHIVE_TTL_SECONDS,
+        summary_text: SummaryText | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if not math.isfinite(interval_seconds) or interval_seconds <= 0:
+            raise ValueError("interval_seconds must be finite and positive")
+        if keep_latest <= 0:
+            raise ValueError("keep_latest must be positive")
+        if max_length <= keep_latest:
+            raise ValueError("max_length must be greater than keep_latest")
+        if max_age_seconds <= 0:
+            raise ValueError("max_age_seconds must be positive")
+        if archive_max_length <= 0 or archive_ttl_seconds <= 0:
+            raise ValueError("archive limits must be positive")
+        self._store = store
+        self._interval_seconds = interval_seconds
+        self._max_length = max_length
+        self._keep_latest = keep_latest
+        self._max_age_seconds = max_age_seconds
+        self._archive_max_length = archive_max_length
+        self._archive_ttl_seconds = archive_ttl_seconds
+        self._summary_text = summary_text or _default_summary_text
+        self._clock = clock
+        self.last_report: PendingQueueReport | None = None
+
+    async def run(self) -> None:
+        """Compact until cancelled; a failed run does not stop the worker."""
+        while True:
+            try:
+                await self.compact_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.bind(event="notification_compaction_failed").exception(
+                    "notification queue compaction failed"
+                )
+            await asyncio.sleep(self._interval_seconds)
+
+    async def compact_once(self) -> PendingQueueReport:
+        """Scan every pending queue, compact the oversized ones, and report."""
+        now = self._clock()
+        queues = items = size = compacted_users = archived = 0
+        estimated = False
+        largest: list[tuple[int, int]] = []
+        async for queue in self._store.scan_pending_queues():
+            queues += 1
+            items += queue.length
+            if queue.bytes is None:
+                estimated = True
+                size += REDIS_KEY_OVERHEAD + queue.length * (
+                    queue.head_size + REDIS_ENTRY_OVERHEAD
+                )
+            else:
+                size += queue.bytes
+            heapq.heappush(largest, (queue.length, queue.user_id))
+            if len(largest) > LARGEST_QUEUES_REPORTED:
+                heapq.heappop(largest)
+            if self._needs_compaction(queue, now):
+                moved = await self._compact(queue.user_id, queue.length, now)
+                if moved:
+                    compacted_users += 1
+                    archived += moved
+                    items -= moved - 1
+        report = PendingQueueReport(
+            queues=queues,
+            items=items,
+            bytes=size,
+            estimated=estimated,
+            compacted_users=compacted_users,
+            archived=archived,
+            largest=tuple(
+                (user_id, length) for length, user_id in sorted(largest, reverse=True)
+            ),
+        )
+        self.last_report = report
+        logger.bind(
+            event="notification_pending_queues_reported",
+            queues=report.queues,
+            items=report.items,
+            bytes=report.bytes,
+            estimated=report.estimated,
+            compacted_users=report.compacted_users,
+            archived=report.archived,
+            largest=list(report.largest),
+        ).info("notification pending queues reported")
+        return report
+
+    def _needs_compaction(self, queue: PendingQueueInfo, now: float) -> bool:
+        # Swapping a single item for a summary would not shrink the queue.
+        if queue.length - self._keep_latest < 2:
+            return False
+        if queue.length > self._max_length:
+            return True
+        return (
+            queue.head is not None
+            and queue.head.created_at <= now - self._max_age_seconds
+        )
+
+    async def _compact(self, user_id: int, length: int, now: float) -> int:
+        token = uuid.uuid4().hex
+        if not await self._store.acquire_lock(user_id, token):
+            return 0
+        try:
+            head = await self._store.peek_many(
+                user_id, min(length - self._keep_latest, MAX_COMPACT_BATCH)
+            )
+            if len(head) < 2:
+                return 0
+            summary = self._summary(user_id, head, now)
+            if not await self._store.compact_if_lock_owned(
+                user_id,
+                head,
+                summary,
+                token,
+                archive_max_length=self._archive_max_length,
+                archive_ttl_seconds=self._archive_ttl_seconds,
+            ):
+                return 0
+        finally:
+            await self._store.release_lock(user_id, token)
+        logger.bind(
+            event="notification_queue_compacted",
+            user_id=user_id,
+            archived=len(head),
+            total_archived=summary.data["archived"],
+        ).info("notification queue compacted")
+        return len(head)
+
+    def _summary(
+        self,
+        user_id: int,
+        head: Sequence[BlockchainNotification],
+        now: float,
+    ) -> BlockchainNotification:
+        # An earlier summary in the prefix carries its count forward.
+        archived = sum(
+            _archived_count(notification) if _is_summary(notification) else 1
+            for notification in head
+        )
+        created_at = int(now)
+        return BlockchainNotification(
+            notification_id=f"{SUMMARY_EVENT_TYPE}:{user_id}:{created_at}",
+            user_id=user_id,
+            event_type=SUMMARY_EVENT_TYPE,
+            text=self._summary_text(user_id, archived),
+            created_at=created_at,
+            transaction_hash=f"{SUMMARY_EVENT_TYPE}-{uuid.uuid4().hex}",
+            event_index=0,
+            data={"archived": archived},
+        )
+
+
+def _is_summary(notification: BlockchainNotification) -> bool:
+    return notification.event_type == SUMMARY_EVENT_TYPE
+
+
+def _archived_count(notification: BlockchainNotification) -> int:
+    archived = notification.data.get("archived")
+    if isinstance(archived, bool) or not isinstance(archived, int):
+        return 1
+    return archived
+
+
+def _default_summary_text(user_id: int, archived: int) -> str:
+    return f"{archived} older notifications were archived."
@@ -1,10 +1,11 @@
 """Bounded polling for durable delayed blockchain notification delivery."""
 
 import asyncio
+from contextlib import suppress
 from functools import partial
 import math
 import time
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from typing import Protocol
 
 from loguru import logger
@@ -15,7 +16,17 @@ from infrastructure.services.notification_coordinator import NotificationCoordin
 class NotificationDueStore(Protocol):
     """Persistence operations required by the expiry poller."""
 
-    async def due_users(self, *, now: int, limit: int) -> list[int]: ...
+    async def due_users(
+        self, *, now: int, limit: int, shards: Iterable[int] | None = None
+    ) -> list[int]: ...
+
+
+class NotificationShardOwnership(Protocol):
+    """Which due-set shards this instance currently owns."""
+
+    async def current(self) -> list[int]: ...
+
+    async def release_all(self) -> None: ...
 
 
 class NotificationDeliveryWorker:
@@ -29,6 +40,7 @@ class NotificationDeliveryWorker:
         poll_interval_seconds: float,
         batch_size: int,
         clock: Callable[[], int] | None = None,
+        shard_leases: NotificationShardOwnership | None = None,
     ) -> None:
         if not math.isfinite(poll_interval_seconds) or poll_interval_seconds <= 0:
             raise ValueError("poll_interval_seconds must be finite and positive")
@@ -40,6 +52,7 @@ class NotificationDeliveryWorker:
         self._batch_size = batch_size
         self._clock = clock or _unix_time
         self._active_flushes: dict[int, asyncio.Task[None]] = {}
+        self._shard_leases = shard_leases
 
     async def run(self) -> None:
         """Poll until cancelled; individual polling failures do not stop the worker."""
@@ -58,12 +71,22 @@ class NotificationDeliveryWorker:
                 await asyncio.sleep(max(0.0, self._poll_interval_seconds - elapsed))
         finally:
             self._cancel_active_flushes()
+            if self._shard_leases is not None:
+                with suppress(Exception):
+                    await self._shard_leases.release_all()
 
     async def poll_once(self) -> None:
         """Start one bounded batch and wait briefly for ordinary flushes."""
-        user_ids = await self._store.due_users(
-            now=self._clock(), limit=self._batch_size + len(self._active_flushes)
-        )
+        limit = self._batch_size + len(self._active_flushes)
+        if self._shard_leases is None:
+            user_ids = await self._store.due_users(now=self._clock(), limit=limit)
+        else:
+            shards = await self._shard_leases.current()
+            if not shards:
+                return
+            user_ids = await self._store.due_users(
+                now=self._clock(), limit=limit, shards=shards
+            )
         available_slots = self._batch_size - len(self._active_flushes)
         started: list[asyncio.Task[None]] = []
         for user_id in user_ids:
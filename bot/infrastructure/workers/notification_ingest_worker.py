@@ -0,0 +1,194 @@
+"""Consumer-group workers draining the notifier webhook ingest stream."""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import json
+import math
+import os
+import socket
+import time
+from typing import Any, Protocol
+
+from loguru import logger
+
+from infrastructure.services.notification_ingest_stream import IngestEntry, IngestLag
+
+
+class NotificationIngestQueue(Protocol):
+    """Stream operations required by the ingest consumers."""
+
+    async def read(
+        self, consumer: str, *, count: int, block_ms: int | None
+    ) -> list[IngestEntry]: ...
+
+    async def claim_stale(
+        self, consumer: str, *, min_idle_ms: int, count: int
+    ) -> list[IngestEntry]: ...
+
+    async def ack(self, entry_id: str) -> None: ...
+
+    async def dead_letter(self, entry: IngestEntry, reason: str) -> None: ...
+
+    async def lag(self) -> IngestLag: ...
+
+
+NotificationProcessor = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class NotificationIngestWorker:
+    """Process buffered webhooks with a fixed number of stream consumers.
+
+    An entry is acknowledged only after ``processor`` returns, so a failure or a
+    crashed process leaves it pending; another consumer claims it once it has
+    been idle for ``claim_idle_seconds``. Entries that keep failing are moved to
+    the dead-letter stream after ``max_deliveries`` attempts.
+    """
+
+    def __init__(
+        self,
+        *,
+        stream: NotificationIngestQueue,
+        processor: NotificationProcessor,
+        consumers: int,
+        batch_size: int,
+        claim_idle_seconds: float,
+        max_deliveries: int,
+        block_seconds: float = 1.0,
+        lag_log_interval_seconds: float = 60.0,
+        consumer_prefix: str | None = None,
+    ) -> None:
+        if consumers <= 0:
+            raise ValueError("consumers must be positive")
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        if max_deliveries <= 0:
+            raise ValueError("max_deliveries must be positive")
+        for name, value in (
+            ("claim_idle_seconds", claim_idle_seconds),
+            ("block_seconds", block_seconds),
+            ("lag_log_interval_seconds", lag_log_interval_seconds),
+        ):
+            if not math.isfinite(value) or value <= 0:
+                raise ValueError(f"{name} must be finite and positive")
+        self._stream = stream
+        self._processor = processor
+        self._consumers = consumers
+        self._batch_size = batch_size
+        self._claim_idle_ms = int(claim_idle_seconds * 1000)
+        self._max_deliveries = max_deliveries
+        self._block_ms = int(block_seconds * 1000)
+        self._lag_log_interval_seconds = lag_log_interval_seconds
+        self._consumer_prefix = consumer_prefix or (
+            f"{socket.gethostname()}-{os.getpid()}"
+        )
+        self.processed = 0
+        self.failed = 0
+        self.reclaimed = 0
+        self.dead_lettered = 0
+
+    def consumer_names(self) -> list[str]:
+        return [f"{self._consumer_prefix}-{index}" for index in range(self._consumers)]
+
+    async def run(self) -> None:
+        """Run every consumer and the lag reporter until cancelled."""
+        await asyncio.gather(
+            *(self._run_consumer(name) for name in self.consumer_names()),
+            self._report_lag(),
+        )
+
+    async def poll_once(self, consumer: str) -> int:
+        """Reclaim stale entries, then read new ones; return entries handled."""
+        stale = await self._stream.claim_stale(
+            consumer, min_idle_ms=self._claim_idle_ms, count=self._batch_size
+        )
+        self.reclaimed += len(stale)
+        for entry in stale:
+            await self._handle(entry)
+        fresh = await self._stream.read(
+            consumer,
+            count=self._batch_size,
+            block_ms=None if stale else self._block_ms,
+        )
+        for entry in fresh:
+            await self._handle(entry)
+        return len(stale) + len(fresh)
+
+    async def metrics(self) -> dict[str, int | None]:
+        """Worker counters merged with the consumer group backlog."""
+        lag = await self._stream.lag()
+        return {
+            **lag.as_dict(),
+            "processed": self.processed,
+            "failed": self.failed,
+            "reclaimed": self.reclaimed,
+            "dead_lettered": self.dead_lettered,
+        }
+
+    async def _run_consumer(self, consumer: str) -> None:
+        while True:
+            try:
+                await self.poll_once(consumer)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.bind(
+                    event="notification_ingest_poll_failed", consumer=consumer
+                ).exception("notification ingest poll failed")
+                await asyncio.sleep(self._block_ms / 1000)
+
+    async def _handle(self, entry: IngestEntry) -> None:
+        if entry.deliveries > self._max_deliveries:
+            await self._dead_letter(entry, "max_deliveries")
+            return
+        try:
+            payload = json.loads(entry.body)
+        except json.JSONDecodeError:
+            await self._dead_letter(entry, "invalid_json")
+            return
+        try:
+            await self._processor(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Left pending on purpose: claim_stale retries it after the idle window.
+            self.failed += 1
+            logger.bind(
+                event="notification_ingest_process_failed",
+                entry_id=entry.entry_id,
+                deliveries=entry.deliveries,
+            ).exception("notification ingest processing failed")
+            return
+        await self._stream.ack(entry.entry_id)
+        self.processed += 1
+        if entry.received_at is not None:
+            logger.bind(
+                event="notification_ingest_processed",
+                entry_id=entry.entry_id,
+                queued_seconds=round(time.time() - entry.received_at, 3),
+            ).debug("notification ingest entry processed")
+
+    async def _dead_letter(self, entry: IngestEntry, reason: str) -> None:
+        await self._stream.dead_letter(entry, reason)
+        self.dead_lettered += 1
+        logger.bind(
+            event="notification_ingest_dead_lettered",
+            entry_id=entry.entry_id,
+            deliveries=entry.deliveries,
+            reason=reason,
+        ).error("notification ingest entry dead-lettered")
+
+    async def _report_lag(self) -> None:
+        while True:
+            await asyncio.sleep(self._lag_log_interval_seconds)
+            try:
+                metrics = await self.metrics()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.bind(event="notification_ingest_lag_failed").exception(
+                    "notification ingest lag check failed"
+                )
+                continue
+            logger.bind(event="notification_ingest_lag", **metrics).info(
+                "notification ingest lag"
+            )
@@ -1,6 +1,6 @@
 """Worker for handling signed transactions from Web App."""
 
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import load_callback
 import inspect
 import redis.asyncio as aioredis
 from loguru import logger
@@ -89,7 +89,7 @@ async def handle_tx_signed(msg: TxSignedMessage) -> None:
 
             if signing_purpose == "sep10_auth" and fsm_func_pickled:
                 await state.update_data(sep10_signed_xdr=signed_xdr)
-                fsm_func = jsonpickle.loads(fsm_func_pickled)
+                fsm_func = load_callback(fsm_func_pickled)
                 logger.info(f"TX {tx_id}: SEP-10 auth flow, calling fsm_func")
 
                 kwargs = {}
@@ -148,7 +148,7 @@ async def handle_tx_signed(msg: TxSignedMessage) -> None:
                     # Вызываем fsm_after_send callback если транзакция успешна
                     if successful and fsm_after_send_pickled:
                         try:
-                            fsm_after_send = jsonpickle.loads(fsm_after_send_pickled)
+                            fsm_after_send = load_callback(fsm_after_send_pickled)
                             logger.info(f"TX {tx_id}: calling fsm_after_send callback")
 
                             await fsm_after_send(session, user_id, state)
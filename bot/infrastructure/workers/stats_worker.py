@@ -0,0 +1,13 @@
+from infrastructure.services.app_context import AppContext
+from infrastructure.utils.async_utils import with_timeout
+from other.loguru_tools import safe_catch_async
+
+
+@with_timeout(60)
+@safe_catch_async
+async def cmd_refresh_stats_totals(app_context: AppContext):
+    """Recount the table totals shown by ``/stats`` outside any user update."""
+    if app_context.activity_rollups is None:
+        return
+    async with app_context.db_pool.get_session() as session:
+        await app_context.activity_rollups.refresh_totals(session)
@@ -12,6 +12,10 @@ from infrastructure.persistence.sqlalchemy_user_repository import (
     SqlAlchemyUserRepository,
 )
 from db.db_pool import db_checkout_owner
+from infrastructure.persistence.identity_map import (
+    IDENTITY_MAP_KEY,
+    session_query_count,
+)
 
 
 class DbSessionMiddleware(BaseMiddleware):
@@ -35,7 +39,10 @@ class DbSessionMiddleware(BaseMiddleware):
     ) -> Any:
         async with self.session_pool.get_session() as session:
             data["session"] = session
-            return await handler(event, data)
+            try:
+                return await handler(event, data)
+            finally:
+                _log_update_queries(event, session)
 
     async def _dispatch(
         self,
@@ -104,3 +111,15 @@ class DbSessionMiddleware(BaseMiddleware):
             warning_task.cancel()
             with suppress(asyncio.CancelledError):
                 await warning_task
+
+
+def _log_update_queries(event: TelegramObject, session: Any) -> None:
+    info = getattr(session, "info", None)
+    identity_map = info.get(IDENTITY_MAP_KEY) if isinstance(info, dict) else None
+    logger.bind(
+        event="db_update_queries",
+        user_id=getattr(getattr(event, "from_user", None), "id", None),
+        update_type=type(event).__name__,
+        queries=session_query_count(session),
+        identity_map_hits=identity_map.hits if identity_map else 0,
+    ).debug("db update queries")
@@ -0,0 +1,344 @@
+"""Update-scoped FSM cache that batches storage writes into one flush."""
+
+import copy
+from collections.abc import Awaitable, Callable, Mapping
+from contextvars import ContextVar
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.types import TelegramObject
+from loguru import logger
+from redis.exceptions import WatchError
+
+_UNSET: Any = object()
+
+_active_context: ContextVar["CachedFSMContext | None"] = ContextVar(
+    "fsm_update_cache", default=None
+)
+
+
+class CachedFSMContext(FSMContext):
+    """FSM context that reads storage once and writes it back once per update.
+
+    State and data load lazily on first use and are then served from memory.
+    Writes only change the in-memory copy until ``flush()``. It merges just the
+    data keys this update set or removed into the stored record, so keys that
+    another task wrote meanwhile, such as ``last_message_id``, survive. On
+    Redis the merge runs under ``WATCH`` and is written with the state in one
+    ``MULTI``. Only a ``set_data`` without a prior read replaces the whole
+    record. After ``close()`` the context
+    behaves like a plain ``FSMContext``, so tasks that outlive the update still
+    see and write the shared storage directly.
+    """
+
+    def __init__(
+        self, storage: BaseStorage, key: StorageKey, *, state: Any = _UNSET
+    ) -> None:
+        super().__init__(storage, key)
+        self._stored_state: str | None = None if state is _UNSET else state
+        self._state: str | None = self._stored_state
+        self._state_loaded = state is not _UNSET
+        self._stored_data: dict[str, Any] | None = None
+        self._data: dict[str, Any] | None = None
+        self.closed = False
+        self.reads = 0
+        self.writes = 0
+        self.cached_calls = 0
+
+    @property
+    def dirty(self) -> bool:
+        return (self._state_loaded and self._state != self._stored_state) or (
+            self._data is not None and self._data != self._stored_data
+        )
+
+    async def get_state(self) -> str | None:
+        if self.closed:
+            return await super().get_state()
+        if self._state_loaded:
+            self.cached_calls += 1
+        else:
+            self._stored_state = await self.storage.get_state(key=self.key)
+            self._state = self._stored_state
+            self._state_loaded = True
+            self.reads += 1
+        return self._state
+
+    async def set_state(self, state: StateType = None) -> None:
+        if self.closed:
+            await super().set_state(state)
+            return
+        if not self._state_loaded:
+            # Nothing was read, so the stored value only matters for change tracking.
+            self._stored_state = _UNSET
+            self._state_loaded = True
+        self._state = state.state if isinstance(state, State) else state
+
+    async def get_data(self) -> dict[str, Any]:
+        if self.closed:
+            return await super().get_data()
+        return copy.deepcopy(await self._load_data())
+
+    async def get_value(self, key: str, default: Any | None = None) -> Any | None:
+        if self.closed:
+            return await super().get_value(key, default)
+        return copy.deepcopy((await self._load_data()).get(key, default))
+
+    async def set_data(self, data: Mapping[str, Any]) -> None:
+        if self.closed:
+            await super().set_data(data)
+            return
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        if self._data is None:
+            self._stored_data = _UNSET
+        self._data = copy.deepcopy(data)
+
+    async def update_data(
+        self,
+        data: Mapping[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        if self.closed:
+            return await super().update_data(data, **kwargs)
+        if data:
+            kwargs.update(data)
+        current = await self._load_data()
+        current.update(copy.deepcopy(kwargs))
+        return copy.deepcopy(current)
+
+    async def flush(self) -> None:
+        """Write pending changes so other tasks and later updates can see them."""
+        if self.closed or not self.dirty:
+            return
+        state_changed = self._state_loaded and self._state != self._stored_state
+        data_changed = self._data is not None and self._data != self._stored_data
+        state = self._state
+        changes = self._data_changes() if data_changed else None
+        if isinstance(self.storage, RedisStorage):
+            data = await self._flush_redis(
+                self.storage, state=state if state_changed else _UNSET, changes=changes
+            )
+            self.writes += 1
+        else:
+            data = None
+            if state_changed:
+                await self.storage.set_state(key=self.key, state=state)
+                self.writes += 1
+            if changes is not None:
+                data = changes.apply(await self.storage.get_data(key=self.key))
+                await self.storage.set_data(key=self.key, data=data)
+                self.writes += 1
+        if state_changed:
+            self._stored_state = state
+        if data is not None:
+            # Later reads in this update also see what other tasks wrote.
+            self._data = data
+            self._stored_data = copy.deepcopy(data)
+
+    async def close(self) -> None:
+        """Flush and hand later calls straight to the storage."""
+        try:
+            await self.flush()
+        finally:
+            self.closed = True
+
+    async def _load_data(self) -> dict[str, Any]:
+        if self._data is None:
+            self._data = await self.storage.get_data(key=self.key)
+            self._stored_data = copy.deepcopy(self._data)
+            self.reads += 1
+        else:
+            self.cached_calls += 1
+        return self._data
+
+    def _data_changes(self) -> "_DataChanges":
+        data = copy.deepcopy(self._data) or {}
+        if self._stored_data is _UNSET:
+            return _DataChanges(data, replace=True)
+        stored = self._stored_data or {}
+        return _DataChanges(
+            {
+                key: value
+                for key, value in data.items()
+                if stored.get(key, _UNSET) != value
+            },
+            removed=[key for key in stored if key not in data],
+        )
+
+    async def _flush_redis(
+        self,
+        storage: RedisStorage,
+        *,
+        state: Any,
+        changes: "_DataChanges | None",
+    ) -> dict[str, Any] | None:
+        # Mirrors RedisStorage.set_state/get_data/set_data in one transaction.
+        state_key = storage.key_builder.build(self.key, "state")
+        data_key = storage.key_builder.build(self.key, "data")
+        async with storage.redis.pipeline(transaction=True) as pipeline:
+            while True:
+                data = None
+                try:
+                    if changes is not None:
+                        await pipeline.watch(data_key)
+                        raw = await pipeline.get(data_key)
+                        if isinstance(raw, bytes):
+                            raw = raw.decode("utf-8")
+                        data = changes.apply(
+                            {} if raw is None else storage.json_loads(raw)
+                        )
+                    pipeline.multi()
+                    if state is not _UNSET:
+                        if state is None:
+                            pipeline.delete(state_key)
+                        else:
+                            pipeline.set(state_key, state, ex=storage.state_ttl)
+                    if data is not None:
+                        if data:
+                            pipeline.set(
+                                data_key, storage.json_dumps(data), ex=storage.data_ttl
+                            )
+                        else:
+                            pipeline.delete(data_key)
+                    await pipeline.execute()
+                    return data
+                except WatchError:
+                    continue
+
+
+class _DataChanges:
+    """Data keys an update set or removed, applied to the stored record."""
+
+    def __init__(
+        self,
+        updated: dict[str, Any],
+        *,
+        removed: list[str] | None = None,
+        replace: bool = False,
+    ) -> None:
+        self.updated = updated
+        self.removed = removed or []
+        self.replace = replace
+
+    def apply(self, stored: dict[str, Any]) -> dict[str, Any]:
+        data = {} if self.replace else dict(stored)
+        for key in self.removed:
+            data.pop(key, None)
+        data.update(copy.deepcopy(self.updated))
+        return data
+
+
+class FSMOpsStats:
+    """FSM storage round trips per update, summed over the process lifetime."""
+
+    def __init__(self) -> None:
+        self.updates = 0
+        self.reads = 0
+        self.writes = 0
+        self.cached_calls = 0
+        self.max_ops_per_update = 0
+
+    def record(self, context: CachedFSMContext) -> None:
+        self.updates += 1
+        self.reads += context.reads
+        self.writes += context.writes
+        self.cached_calls += context.cached_calls
+        self.max_ops_per_update = max(
+            self.max_ops_per_update, context.reads + context.writes
+        )
+
+    def as_dict(self) -> dict[str, float | int]:
+        ops = self.reads + self.writes
+        return {
+            "updates": self.updates,
+            "reads": self.reads,
+            "writes": self.writes,
+            "cached_calls": self.cached_calls,
+            "ops_per_update": round(ops / self.updates, 3) if self.updates else 0,
+            "max_ops_per_update": self.max_ops_per_update,
+        }
+
+
+class FSMUpdateCacheMiddleware(BaseMiddleware):
+    """Swap ``state`` for a ``CachedFSMContext`` for the length of one update.
+
+    Register it as an outer ``dp.update`` middleware so it runs inside
+    aiogram's own FSM middleware and before every event middleware. The state
+    aiogram already read for filters seeds the cache.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.stats = FSMOpsStats()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        state = data.get("state")
+        if not isinstance(state, FSMContext) or isinstance(state, CachedFSMContext):
+            return await handler(event, data)
+        context = CachedFSMContext(
+            state.storage, state.key, state=data.get("raw_state", _UNSET)
+        )
+        data["state"] = context
+        token = _active_context.set(context)
+        try:
+            return await handler(event, data)
+        finally:
+            _active_context.reset(token)
+            try:
+                await context.close()
+            finally:
+                self.stats.record(context)
+                logger.bind(
+                    event="fsm_update_ops",
+                    user_id=context.key.user_id,
+                    reads=context.reads,
+                    writes=context.writes,
+                    cached_calls=context.cached_calls,
+                ).debug("fsm update ops")
+
+
+def active_fsm_context(
+    storage: BaseStorage, key: StorageKey
+) -> CachedFSMContext | None:
+    """Return the open update cache for ``key``, if this task runs inside one."""
+    context = _active_context.get()
+    if (
+        context is None
+        or context.closed
+        or context.storage is not storage
+        or context.key != key
+    ):
+        return None
+    return context
+
+
+async def get_fsm_data(storage: BaseStorage, key: StorageKey) -> dict[str, Any]:
+    """Read FSM data through the current update cache when it covers ``key``."""
+    context = active_fsm_context(storage, key)
+    if context is None:
+        return await storage.get_data(key=key)
+    return await context.get_data()
+
+
+async def update_fsm_data(
+    storage: BaseStorage, key: StorageKey, data: Mapping[str, Any], *, flush: bool
+) -> None:
+    """Merge ``data`` into FSM data; ``flush`` publishes it before returning."""
+    context = active_fsm_context(storage, key)
+    if context is None:
+        await storage.update_data(key=key, data=data)
+        return
+    await context.update_data(data)
+    if flush:
+        await context.flush()
@@ -0,0 +1,49 @@
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from infrastructure.services.telegram_send_scheduler import TelegramSendScheduler
+
+
+_MESSAGE_METHOD_PREFIXES = ("Send", "Copy", "Forward")
+
+
+def _posts_message(method: TelegramMethod) -> bool:
+    name = type(method).__name__
+    return name.startswith(_MESSAGE_METHOD_PREFIXES) and name != "SendChatAction"
+
+
+class SendSchedulerRequestMiddleware(BaseRequestMiddleware):
+    """Take a send slot for every chat-addressed Bot API request.
+
+    Register after ``RetryRequestMiddleware`` so each retry is paced as well.
+    Only requests that post a new message (``Send*``, ``Copy*``, ``Forward*``)
+    take a per-chat token, since Telegram's per-chat limit covers new messages.
+    Edits, deletions and chat actions use the global budget only, so quick
+    taps in interactive flows are not held to one per second. Requests without
+    ``chat_id`` (updates, callback answers, file lookups) are not messages to a
+    chat and pass straight through.
+    """
+
+    __slots__ = ("scheduler",)
+
+    def __init__(self, scheduler: TelegramSendScheduler) -> None:
+        self.scheduler = scheduler
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if isinstance(chat_id, int) and _posts_message(method):
+            await self.scheduler.acquire(chat_id)
+        elif chat_id is not None:
+            # Edits and @channel usernames share the global budget only.
+            await self.scheduler.acquire(None)
+        return await make_request(bot, method)
@@ -55,10 +55,76 @@ class Settings(BaseSettings):
     webhook_public_url: Optional[str] = "http://mmwb_bot:8081/webhook"
     webhook_port: int = 8081
 
+    # Callback and signing activity log, written in batches.
+    log_writer_batch_size: int = 100
+    log_writer_flush_interval_seconds: float = 1.0
+    log_writer_max_pending: int = 10_000
+    # Rows older than log_retention_days move to daily gzip CSV files in
+    # log_archive_dir; 0 keeps every row in the table. With several instances
+    # the directory must be shared, or retention enabled on one host only.
+    log_retention_days: int = 0
+    log_archive_dir: str = "logs/callback_log_archive"
+    log_retention_interval_minutes: int = 60
+    log_retention_batch_size: int = 500
+    log_retention_batch_pause_seconds: float = 0.5
+    log_retention_max_batches: int = 100
+    log_retention_max_run_seconds: float = 45.0
+    # Table totals in the /stats rollups are recounted this often.
+    stats_totals_refresh_minutes: int = 15
+
+    # Queued bot messages (admin broadcasts) sent in claimed batches.
+    message_outbox_batch_size: int = 100
+    message_outbox_concurrency: int = 10
+    message_outbox_max_run_seconds: float = 40.0
+    # Claims of an instance that died mid-batch are requeued after this.
+    message_outbox_claim_lease_seconds: int = 300
+    # SKIP LOCKED needs Firebird 5. Enable it there to let several instances
+    # drain the outbox together; without it run the outbox on one instance.
+    message_outbox_skip_locked: bool = False
+
+    # Default-wallet and user profiles mirrored in Redis and process memory.
+    profile_cache_ttl_seconds: int = 24 * 60 * 60
+    profile_cache_local_entries: int = 10_000
+
+    # Outbound Telegram pacing shared by all instances through Redis.
+    telegram_send_scheduler_enabled: bool = True
+    telegram_global_send_rate: float = 30.0
+    telegram_chat_send_rate: float = 1.0
+    telegram_chat_send_burst: float = 3.0
+
     # Delayed blockchain notification delivery.
     notification_hold_seconds: int = 120
     notification_delivery_poll_interval_seconds: float = 5.0
     notification_delivery_batch_size: int = 100
+    # Due-set shards split between instances by Redis leases; 1 keeps one set.
+    notification_delivery_shards: int = 1
+    notification_shard_lease_seconds: float = 30.0
+    # Accepted-ID dedupe: time buckets per window and short-hash collision rate.
+    notification_dedupe_buckets: int = 6
+    notification_dedupe_false_positive_rate: float = 1e-9
+    # Pending-queue compaction; an interval of 0 disables the job.
+    notification_compaction_interval_seconds: float = 3600.0
+    notification_compaction_max_length: int = 200
+    notification_compaction_keep_latest: int = 50
+    notification_compaction_max_age_seconds: int = 7 * 24 * 60 * 60
+    # Skip hold touches while the hold is within this share of a full extension.
+    notification_touch_debounce_fraction: float = 0.1
+    # Webhook ingest stream; 0 consumers keeps the inline webhook processing.
+    notification_ingest_consumers: int = 4
+    notification_ingest_max_len: int = 100_000
+    notification_ingest_claim_idle_seconds: float = 60.0
+    notification_ingest_max_deliveries: int = 5
+    # Inline webhook processing: AIMD concurrency between min and max, then a
+    # bounded wait queue; overflow gets 503 with Retry-After.
+    notification_webhook_min_concurrency: int = 2
+    notification_webhook_initial_concurrency: int = 10
+    notification_webhook_max_concurrency: int = 64
+    notification_webhook_max_queue: int = 100
+    notification_webhook_queue_timeout_seconds: float = 5.0
+    notification_webhook_latency_target_seconds: float = 1.0
+    # Notifier subscription sync; signed-nonce auth always deletes sequentially.
+    notification_sync_delete_concurrency: int = 4
+    notification_sync_delete_rate: float = 10.0
 
     @field_validator("notification_delivery_poll_interval_seconds")
     @classmethod
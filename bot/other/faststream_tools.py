@@ -5,7 +5,7 @@ import uuid
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional
 
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import dump_callback, fsm_callback
 import redis.asyncio as aioredis
 from aiogram.fsm.context import FSMContext
 from faststream.redis import RedisBroker, BinaryMessageFormatV1
@@ -93,7 +93,7 @@ async def publish_pending_tx(
         wallet_address: Public key of the wallet (GXXX...)
         unsigned_xdr: XDR транзакции без подписи
         memo: Описание для пользователя ("Отправка 100 XLM на GXXX...")
-        fsm_after_send: jsonpickle-сериализованный callback для вызова после успешной отправки
+        fsm_after_send: сериализованный через dump_callback callback для вызова после успешной отправки
         success_msg: Сообщение об успехе для пользователя
         redis_client: Optional Redis client for dependency injection (uses global by default)
 
@@ -238,6 +238,7 @@ async def clear_pending_sealedbox(
 # --- Логика для WalletConnect ---
 
 
+@fsm_callback
 async def do_wc_sign_and_respond(
     session: AsyncSession, user_id: int, state: FSMContext
 ):
@@ -353,7 +354,7 @@ async def request_wc_signature(
     dapp_url = dapp_info.get("url", "Unknown URL")
 
     # Запаковываем колбэк и сохраняем все в состояние
-    wallet_connect_func = jsonpickle.dumps(do_wc_sign_and_respond)
+    wallet_connect_func = dump_callback(do_wc_sign_and_respond)
     logger.info(f"wallet_connect_func: {wallet_connect_func}")
     await state.update_data(
         internal_request_id=internal_request_id,
@@ -75,7 +75,7 @@ async def request_local_signature(
         memo: Описание транзакции
         app_context: Контекст приложения
         message: Telegram сообщение для ответа
-        fsm_after_send: jsonpickle-сериализованный callback для вызова после успешной отправки
+        fsm_after_send: сериализованный через dump_callback callback для вызова после успешной отправки
         success_msg: Сообщение об успехе для пользователя
 
     Returns:
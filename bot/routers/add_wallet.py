@@ -1,6 +1,6 @@
 from contextlib import suppress
 
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import load_callback
 from aiogram import Router, types, F
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
@@ -406,7 +406,7 @@ async def cq_add_new_key(
         data = await state.get_data()
         fsm_after_send = data.get("fsm_after_send")
         if fsm_after_send:
-            fsm_after_send_func = jsonpickle.loads(fsm_after_send)
+            fsm_after_send_func = load_callback(fsm_after_send)
             await fsm_after_send_func(
                 session, callback.from_user.id, state, app_context=app_context
             )
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from contextlib import suppress
 from datetime import datetime, timedelta
@@ -7,21 +8,23 @@ from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
+from loguru import logger
+from redis.exceptions import RedisError
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import (
     MyMtlWalletBotUsers,
     MyMtlWalletBot,
-    MyMtlWalletBotTransactions,
-    MyMtlWalletBotCheque,
-    MyMtlWalletBotLog,
 )
 from other.config_reader import config, horizont_urls
 
 # from other.global_data import global_data
 from other.stellar_tools import async_stellar_check_fee
 from infrastructure.services.app_context import AppContext
+from infrastructure.services.notification_subscription_sync import (
+    SubscriptionSyncProgress,
+)
 from routers.inout import get_usdt_balance
 
 
@@ -46,85 +49,52 @@ def _pin_label(use_pin: int) -> str:
     return "unknown"
 
 
-@router.message(Command(commands=["stats"]))
-async def cmd_stats(message: types.Message, session: AsyncSession):
-    user_count = (
-        await session.execute(select(func.count()).select_from(MyMtlWalletBotUsers))
-    ).scalar() or 0
-    wallet_count = (
-        await session.execute(select(func.count()).select_from(MyMtlWalletBot))
-    ).scalar() or 0
-    transaction_count = (
-        await session.execute(
-            select(func.count()).select_from(MyMtlWalletBotTransactions)
-        )
-    ).scalar() or 0
-    cheque_count = (
-        await session.execute(select(func.count()).select_from(MyMtlWalletBotCheque))
-    ).scalar() or 0
-    log_count = (
-        await session.execute(select(func.count()).select_from(MyMtlWalletBotLog))
-    ).scalar() or 0
+def _staleness(moment: datetime | None, now: datetime) -> str:
+    if moment is None:
+        return "ещё не подсчитано"
+    minutes = max(int((now - moment).total_seconds() // 60), 0)
+    return f"на {moment:%d.%m %H:%M}, {minutes} мин назад"
 
-    # Активность за последние 24 часа и неделю
-    activity_24h = (
-        await session.execute(
-            select(func.count())
-            .select_from(MyMtlWalletBotLog)
-            .filter(MyMtlWalletBotLog.log_dt > datetime.now() - timedelta(days=1))
-        )
-    ).scalar() or 0
-    activity_7d = (
-        await session.execute(
-            select(func.count())
-            .select_from(MyMtlWalletBotLog)
-            .filter(MyMtlWalletBotLog.log_dt > datetime.now() - timedelta(days=7))
-        )
-    ).scalar() or 0
 
-    # Уникальные пользователи за последние 24 часа и неделю
-    unique_users_24h = (
-        await session.execute(
-            select(func.count(MyMtlWalletBotLog.user_id.distinct())).filter(
-                MyMtlWalletBotLog.log_dt > datetime.now() - timedelta(days=1)
-            )
-        )
-    ).scalar() or 0
-    unique_users_7d = (
-        await session.execute(
-            select(func.count(MyMtlWalletBotLog.user_id.distinct())).filter(
-                MyMtlWalletBotLog.log_dt > datetime.now() - timedelta(days=7)
-            )
-        )
-    ).scalar() or 0
-
-    # Топ 5 операций за неделю
-    top_operations_query = (
-        select(
-            MyMtlWalletBotLog.log_operation_info,
-            func.count(MyMtlWalletBotLog.log_operation_info).label("count"),
+@router.message(Command(commands=["stats"]))
+async def cmd_stats(message: types.Message, app_context: AppContext):
+    rollups = app_context.activity_rollups
+    if rollups is None:
+        await message.answer("Статистика недоступна: сводки активности не настроены")
+        return
+    try:
+        snapshot = await rollups.snapshot()
+    except RedisError:
+        logger.bind(event="stats_snapshot_failed").opt(exception=True).warning(
+            "activity rollups are unavailable"
         )
-        .filter(MyMtlWalletBotLog.log_dt > datetime.now() - timedelta(days=7))
-        .group_by(MyMtlWalletBotLog.log_operation_info)
-        .order_by(func.count(MyMtlWalletBotLog.log_operation_info).desc())
-        .limit(5)
+        await message.answer("Статистика недоступна: Redis не отвечает")
+        return
+    now = datetime.now()
+    totals = snapshot.totals
+    top_operations_str = "\n".join(
+        [f"{op}: {count}" for op, count in snapshot.top_operations_7d]
     )
-    top_operations = (await session.execute(top_operations_query)).all()
-    top_operations_str = "\n".join([f"{op}: {count}" for op, count in top_operations])
 
     stats_message = (
         f"**Статистика бота**\n\n"
-        f"**Общая статистика:**\n"
-        f"Пользователи: {user_count}\n"
-        f"Кошельки: {wallet_count}\n"
-        f"Транзакции: {transaction_count}\n"
-        f"Чеки: {cheque_count}\n"
-        f"Логи: {log_count}\n\n"
-        f"**Активность:**\n"
-        f"За 24 часа: {activity_24h} действий от {unique_users_24h} уник. пользователей\n"
-        f"За 7 дней: {activity_7d} действий от {unique_users_7d} уник. пользователей\n\n"
+        f"**Общая статистика** ({_staleness(snapshot.totals_refreshed_at, now)}):\n"
+        f"Пользователи: {totals.get('users', '—')}\n"
+        f"Кошельки: {totals.get('wallets', '—')}\n"
+        f"Транзакции: {totals.get('transactions', '—')}\n"
+        f"Чеки: {totals.get('cheques', '—')}\n"
+        f"Логи: {totals.get('log', '—')}\n\n"
+        f"**Активность** ({_staleness(snapshot.updated_at, now)}):\n"
+        f"За 24 часа: {snapshot.actions_24h} действий от {snapshot.users_24h} уник. пользователей\n"
+        f"За 7 дней: {snapshot.actions_7d} действий от {snapshot.users_7d} уник. пользователей\n\n"
         f"**Топ-5 операций за неделю:**\n{top_operations_str}"
     )
+    since = snapshot.counting_since
+    if since is not None and since > now - timedelta(days=7):
+        stats_message += (
+            f"\n\nАктивность учитывается с {since:%d.%m.%Y %H:%M}, "
+            f"данные за 7 дней неполные."
+        )
 
     await message.answer(stats_message)
 
@@ -145,16 +115,36 @@ async def cmd_exit(message: types.Message, state: FSMContext, session: AsyncSess
             await message.reply(":'[")
 
 
+RESYNC_PROGRESS_INTERVAL_SECONDS = 15
+
+
 @router.message(Command(commands=["resync"]))
 async def cmd_resync(message: types.Message, app_context: AppContext):
     if message.from_user and message.from_user.username == "itolstov":
         if app_context.notification_service:
-            await message.reply("Starting subscription resync...")
+            status = await message.reply("Starting full subscription resync...")
+            progress = SubscriptionSyncProgress(mode="full")
+            sync = asyncio.create_task(
+                app_context.notification_service.sync_subscriptions(
+                    full=True, progress=progress
+                )
+            )
+            while not sync.done():
+                await asyncio.wait({sync}, timeout=RESYNC_PROGRESS_INTERVAL_SECONDS)
+                if not sync.done():
+                    with suppress(TelegramBadRequest):
+                        await status.edit_text(progress.as_text())
             try:
-                await app_context.notification_service.sync_subscriptions()
-                await message.reply("✅ Resync completed successfully!")
+                progress = sync.result()
             except Exception as e:
                 await message.reply(f"❌ Resync failed: {e}")
+                return
+            if progress.phase == "failed":
+                await message.reply(f"❌ Resync failed:\n{progress.as_text()}")
+            else:
+                await message.reply(
+                    f"✅ Resync completed successfully!\n{progress.as_text()}"
+                )
         else:
             await message.reply("⚠️ Notification service not available")
 
@@ -317,7 +307,9 @@ async def cmd_address_info(message: types.Message, session: AsyncSession):
 
 
 @router.message(Command(commands=["delete_address"]))
-async def cmd_delete_address(message: types.Message, session: AsyncSession):
+async def cmd_delete_address(
+    message: types.Message, session: AsyncSession, app_context: AppContext
+):
     if not message.text:
         return
     args = message.text.split()
@@ -339,8 +331,9 @@ async def cmd_delete_address(message: types.Message, session: AsyncSession):
         await message.answer("Адрес уже помечен удалённым")
         return
 
-    wallet.need_delete = 1
-    await session.commit()
+    assert wallet.id is not None, "wallet id must not be None"
+    wallets = app_context.repository_factory.get_wallet_repository(session)
+    await wallets.mark_deleted_by_id(wallet.id)
     await message.answer("Адрес помечен удалённым")
 
 
@@ -484,6 +477,30 @@ async def cmd_crypto_migration_status(message: types.Message, session: AsyncSess
     )
 
 
+@router.message(Command(commands=["outbox"]))
+async def cmd_outbox(
+    message: types.Message, session: AsyncSession, app_context: AppContext
+):
+    repo = app_context.repository_factory.get_message_repository(session)
+    pending = await repo.count_pending()
+    if app_context.message_outbox is None:
+        await message.answer(f"📤 Очередь рассылки\nОжидают отправки: {pending}")
+        return
+    progress = app_context.message_outbox.progress(pending)
+    eta = (
+        "неизвестно"
+        if progress.eta_seconds is None
+        else str(timedelta(seconds=round(progress.eta_seconds)))
+    )
+    await message.answer(
+        "📤 Очередь рассылки\n"
+        f"Ожидают отправки: {progress.pending}\n"
+        f"Отправлено этим экземпляром: {progress.sent}, ошибок: {progress.failed}\n"
+        f"Скорость: {progress.rate_per_second:g} сообщ./с\n"
+        f"Осталось: {eta}"
+    )
+
+
 @router.message(Command(commands=["help"]))
 async def cmd_help(message: types.Message):
     await message.answer(
@@ -499,6 +516,7 @@ async def cmd_help(message: types.Message):
         "/check_usdt @user — сверка баланса БД и блокчейна\n"
         "/set_usdt @user amount — установка баланса БД\n"
         "/crypto_migration_status — прогресс миграции wallet_crypto_v2\n"
+        "/outbox — очередь рассылки, скорость и оставшееся время\n"
         "/balance — проверить баланс"
     )
 
@@ -2,7 +2,7 @@ from aiogram import F, Router, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from html import escape
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import dump_callback, fsm_callback
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.domain.value_objects import Asset
@@ -166,7 +166,7 @@ async def cmd_asset_requests(
     await state.update_data(
         anchor_request_asset=asset.to_string(),
         anchor_request_key=callback_data.key,
-        fsm_func=jsonpickle.dumps(fsm_func),
+        fsm_func=dump_callback(fsm_func),
         operation=f"SEP requests for {asset.code}",
         sign_msg=my_gettext(
             callback,
@@ -195,7 +195,7 @@ async def cmd_asset_requests(
                 app_context=app_context,
             ),
             prompt_msg=f"Sign SEP-10 challenge to show {asset.code} requests.",
-            fsm_func=jsonpickle.dumps(fsm_func),
+            fsm_func=dump_callback(fsm_func),
             metadata={"asset": asset.to_string(), "action": "requests"},
         ),
         app_context=app_context,
@@ -247,7 +247,7 @@ async def cmd_asset_transfer(
         anchor_transfer_asset=asset.to_string(),
         anchor_transfer_key=callback_data.key,
         anchor_transfer_operation=callback_data.action,
-        fsm_func=jsonpickle.dumps(fsm_func),
+        fsm_func=dump_callback(fsm_func),
         operation=f"SEP-24 {callback_data.action} for {asset.code}",
         sign_msg=my_gettext(
             callback,
@@ -278,7 +278,7 @@ async def cmd_asset_transfer(
             prompt_msg=(
                 f"Sign SEP-10 challenge to start {asset.code} {callback_data.action}."
             ),
-            fsm_func=jsonpickle.dumps(fsm_func),
+            fsm_func=dump_callback(fsm_func),
             metadata={"asset": asset.to_string(), "action": callback_data.action},
         ),
         app_context=app_context,
@@ -316,6 +316,7 @@ async def _asset_from_state(state: FSMContext, key: str) -> Asset | None:
     return Asset(code, issuer)
 
 
+@fsm_callback
 async def _show_asset_requests_after_pin(
     session: AsyncSession,
     user_id: int,
@@ -375,6 +376,7 @@ async def _show_asset_requests_after_pin(
     )
 
 
+@fsm_callback
 async def _show_sep24_interactive_after_pin(
     session: AsyncSession,
     user_id: int,
@@ -476,6 +478,7 @@ async def _get_sep10_webapp_token(
     return support, token
 
 
+@fsm_callback
 async def _show_asset_requests_after_webapp_sep10(
     session: AsyncSession,
     user_id: int,
@@ -531,6 +534,7 @@ async def _show_asset_requests_after_webapp_sep10(
     )
 
 
+@fsm_callback
 async def _show_sep24_interactive_after_webapp_sep10(
     session: AsyncSession,
     user_id: int,
@@ -3,7 +3,11 @@ from enum import Enum
 from collections import defaultdict
 from dataclasses import dataclass
 
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import (
+    dump_values,
+    load_values,
+    register_value_type,
+)
 from aiogram import F, Router
 from aiogram.filters import Command, CommandObject
 from aiogram.fsm.state import StatesGroup, State
@@ -256,6 +260,53 @@ class BSNData:
     def changed_items(self) -> tuple[BSNRow, ...]:
         return tuple(filter(lambda _row: _row.is_modify, self._map.values()))
 
+    def to_dict(self) -> dict:
+        return {
+            "address": str(self.address),
+            "rows": [
+                {
+                    "key": str(row.tag.key),
+                    "num": row.tag.num,
+                    "value": str(row.value),
+                    "action": row.action_type.value,
+                    "old_value": str(row.old_value) if row.old_value else None,
+                }
+                for row in self._map.values()
+            ],
+            "numbers": {
+                str(key): sorted(nums)
+                for key, nums in self._multiple_tag_numbers.items()
+                if nums
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, obj: dict) -> "BSNData":
+        rows = [
+            BSNRow(
+                Tag(Key(row["key"]), row.get("num")),
+                Value(row["value"]),
+                ActionType(row["action"]),
+                Value(row["old_value"]) if row.get("old_value") else None,
+            )
+            for row in obj["rows"]
+        ]
+        bsn_data = cls(Address(obj["address"]), rows)
+        # Deleted rows stay in the map but free their number.
+        bsn_data._multiple_tag_numbers = defaultdict(
+            set, {Key(key): set(nums) for key, nums in obj.get("numbers", {}).items()}
+        )
+        return bsn_data
+
+
+register_value_type(
+    BSNData,
+    "bsn",
+    to_dict=BSNData.to_dict,
+    from_dict=BSNData.from_dict,
+    legacy_types=(Address, ActionType, BSNRow, Key, Tag, Value),
+)
+
 
 def format_bsn_row(bsn_row: BSNRow) -> str:
     action_map = {
@@ -436,7 +487,7 @@ async def process_tags(
     tags_json = data.get("tags")
     if not tags_json:
         return
-    tags: BSNData = jsonpickle.loads(tags_json)
+    tags: BSNData = load_values(tags_json)
 
     text = message.text
     if text.lower().startswith("/bsn"):
@@ -454,7 +505,7 @@ async def process_tags(
             app_context=app_context,
         )
 
-    await state.update_data(tags=jsonpickle.dumps(tags))
+    await state.update_data(tags=dump_values(tags))
     await clear_last_message_id(message.chat.id, app_context=app_context)
     await send_message(
         session,
@@ -498,7 +549,7 @@ async def bsn_mode_command(
         app_context=app_context,
     )
     await state.set_state(BSNStates.waiting_for_tags)
-    await state.update_data(tags=jsonpickle.dumps(tags))
+    await state.update_data(tags=dump_values(tags))
 
 
 @bsn_router.callback_query(BSNStates.waiting_for_tags, F.data == SEND_CALLBACK_DATA)
@@ -516,7 +567,7 @@ async def finish_send_bsn(
     tags_json = data.get("tags")
     if not tags_json:
         return
-    bsn_data: BSNData = jsonpickle.loads(tags_json)
+    bsn_data: BSNData = load_values(tags_json)
 
     if not await have_free_xlm(
         session=session, user_id=callback_query.from_user.id, app_context=app_context
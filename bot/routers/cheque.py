@@ -1,5 +1,5 @@
 import uuid
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import dump_callback, fsm_callback
 from dataclasses import dataclass
 from typing import Union
 from aiogram import types, Router, F
@@ -340,7 +340,7 @@ async def cmd_cheque_execute(
         ),
         app_context=app_context,
     )
-    fsm_after_send = jsonpickle.dumps(cheque_after_send)
+    fsm_after_send = dump_callback(cheque_after_send)
     await state.update_data(fsm_after_send=fsm_after_send)
     xdr = data.get("xdr")
     if xdr and callback.from_user:
@@ -361,6 +361,7 @@ async def cmd_cheque_execute(
     await callback.answer()
 
 
+@fsm_callback
 async def cheque_after_send(
     session: AsyncSession,
     user_id: int,
@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 from typing import Optional
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import dump_callback, fsm_callback
 from aiogram import Router, types, Bot, F
 from aiogram.enums import ChatAction
 from aiogram.filters import Command
@@ -324,6 +324,7 @@ async def cmd_donate(
     )
 
 
+@fsm_callback
 async def cmd_after_donate(
     session: AsyncSession,
     user_id: int,
@@ -415,7 +416,7 @@ async def get_donate_sum(
                 await state.update_data(
                     xdr=xdr,
                     donate_sum=donate_sum,
-                    fsm_after_send=jsonpickle.dumps(cmd_after_donate),
+                    fsm_after_send=dump_callback(cmd_after_donate),
                 )
                 msg = my_gettext(
                     user_id,
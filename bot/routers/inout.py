@@ -1,6 +1,6 @@
 import asyncio
 import html
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import dump_callback, fsm_callback
 from asyncio import sleep
 from decimal import Decimal
 from datetime import datetime, timedelta
@@ -431,6 +431,7 @@ async def cmd_usdt_out(
         await state.set_state(StateInOut.sending_usdt_address)
 
 
+@fsm_callback
 async def cmd_after_send_usdt(
     session: AsyncSession, user_id: int, state: FSMContext, *, app_context: AppContext
 ):
@@ -570,7 +571,7 @@ async def cmd_send_get_address(
         ##    raise ValueError
         await state.update_data(
             usdt_address=message.text,
-            fsm_after_send=jsonpickle.dumps(cmd_after_send_usdt),
+            fsm_after_send=dump_callback(cmd_after_send_usdt),
         )
         await state.set_state(None)
         usdm_balance = 0
@@ -20,7 +20,7 @@ class NotificationFilterAction(CallbackData, prefix="notif_filter"):
 
 
 class NotificationMenuAction(CallbackData, prefix="notif_menu"):
-    action: str  # 'list', 'delete_all'
+    action: str  # 'list', 'delete_all', 'toggle_digest'
     page: int = 0
 
 
@@ -267,6 +267,12 @@ async def notification_settings_callback(
         await callback.answer()
         return
 
+    notification_store = app_context.notification_store
+    if callback_data.action == "toggle_digest" and notification_store is not None:
+        await notification_store.set_digest_enabled(
+            user_id, not await notification_store.digest_enabled(user_id)
+        )
+
     # List action
     filters = await repo.get_by_user_id(user_id)
     filters_count = len(filters)
@@ -363,6 +369,24 @@ async def notification_settings_callback(
         ]
     )
 
+    if notification_store is not None:
+        digest_enabled = await notification_store.digest_enabled(user_id)
+        buttons.append(
+            [
+                types.InlineKeyboardButton(
+                    text=my_gettext(
+                        user_id,
+                        "kb_notification_digest",
+                        ("✅" if digest_enabled else "❌",),
+                        app_context=app_context,
+                    ),
+                    callback_data=NotificationMenuAction(
+                        action="toggle_digest", page=page
+                    ).pack(),
+                )
+            ]
+        )
+
     # Delete all button (only if there are filters)
     if filters_count > 0:
         buttons.append(
@@ -513,7 +537,7 @@ async def add_filter_menu_callback(
         )
         return
 
-    recent_ops = app_context.notification_history.get_recent(user_id, limit=10)
+    recent_ops = await app_context.notification_history.get_recent(user_id, limit=10)
 
     if not recent_ops:
         text = my_gettext(user_id, "no_recent_operations", app_context=app_context)
@@ -574,7 +598,7 @@ async def create_filter_from_history_callback(
         )
         return
 
-    record = app_context.notification_history.get_by_id(user_id, record_id)
+    record = await app_context.notification_history.get_by_id(user_id, record_id)
 
     if not record:
         await callback.answer(
@@ -6,7 +6,7 @@ import base64
 from io import BytesIO
 import re
 
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import dump_callback, fsm_callback
 from aiogram import F, Router, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
@@ -493,7 +493,7 @@ async def receive_decrypt_file(
                 prompt_msg=my_gettext(
                     user_id, "sealedbox_enter_password", app_context=app_context
                 ),
-                fsm_func=jsonpickle.dumps(_decrypt_after_auth),
+                fsm_func=dump_callback(_decrypt_after_auth),
                 decode_enabled=False,
                 metadata={"flow": "sealedbox_decrypt"},
             ),
@@ -512,6 +512,7 @@ async def receive_decrypt_file(
     )
 
 
+@fsm_callback
 async def _decrypt_after_auth(
     session: AsyncSession,
     user_id: int,
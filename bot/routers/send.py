@@ -1,6 +1,6 @@
 from typing import List, Union
 
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import dump_values, load_values
 from aiogram import Router, types, F
 from aiogram.filters import Command
 from aiogram.filters.callback_data import CallbackData
@@ -614,7 +614,7 @@ async def cmd_send_choose_token(
         need_new_msg=True,
         app_context=app_context,
     )
-    await state.update_data(assets=jsonpickle.encode(asset_list))
+    await state.update_data(assets=dump_values(asset_list))
     await state.set_state(StateSendToken.choosing_token)
 
 
@@ -628,7 +628,7 @@ async def cb_send_choose_token(
 ):
     answer = callback_data.answer
     data = await state.get_data()
-    asset_list: List[Balance] = jsonpickle.decode(data["assets"])
+    asset_list: List[Balance] = load_values(data["assets"])
 
     for asset in asset_list:
         if asset.asset_code == answer:
@@ -2,7 +2,7 @@ import asyncio
 from datetime import datetime, timedelta
 from html import escape
 from urllib.parse import urlsplit
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import load_callback
 from aiogram import Router, types, F
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.filters import StateFilter
@@ -585,7 +585,7 @@ async def sign_xdr(session: AsyncSession, state, user_id, *, app_context: AppCon
     try:
         if user_id > 0:
             if fsm_func:
-                fsm_func = jsonpickle.loads(fsm_func)
+                fsm_func = load_callback(fsm_func)
                 # Safely pass app_context if supported
                 kwargs = {}
                 sig = inspect.signature(fsm_func)
@@ -639,7 +639,7 @@ async def sign_xdr(session: AsyncSession, state, user_id, *, app_context: AppCon
                         await state.update_data(last_message_id=0)
 
                     if fsm_after_send:
-                        fsm_after_send = jsonpickle.loads(fsm_after_send)
+                        fsm_after_send = load_callback(fsm_after_send)
                         # Safely pass app_context if supported
                         kwargs = {}
                         sig = inspect.signature(fsm_after_send)
@@ -662,8 +662,7 @@ async def sign_xdr(session: AsyncSession, state, user_id, *, app_context: AppCon
                         app_context=app_context,
                     )
 
-                log_queue = app_context.log_queue
-                log_queue.put_nowait(
+                app_context.log_writer.put_nowait(
                     LogQuery(
                         user_id=user_id,
                         log_operation="sign",
@@ -941,7 +940,7 @@ async def cmd_show_send_tr(
                     )
             elif wallet_connect:
                 try:
-                    wallet_connect_func = jsonpickle.loads(wallet_connect)
+                    wallet_connect_func = load_callback(wallet_connect)
                     # Safely pass app_context if supported
                     kwargs = {}
                     sig = inspect.signature(wallet_connect_func)
@@ -1,7 +1,7 @@
 from contextlib import suppress
 from typing import Union, Optional, Any
 
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import dump_callback, fsm_callback
 from aiogram import types, Bot, Dispatcher
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters.callback_data import CallbackData
@@ -28,6 +28,7 @@ from infrastructure.utils.common_utils import get_user_id
 from other.lang_tools import my_gettext
 from infrastructure.utils.common_utils import float2str
 from infrastructure.services.app_context import AppContext
+from middleware.fsm_cache import get_fsm_data
 from services.ton_service import TonService
 
 
@@ -145,7 +146,7 @@ async def get_kb_default(
         )
 
         wallet_repo = app_context.repository_factory.get_wallet_repository(session)
-        default_wallet = await wallet_repo.get_default_wallet(chat_id)
+        default_wallet = await wallet_repo.get_default_wallet_profile(chat_id)
         is_free = default_wallet.is_free if default_wallet else False
         if not is_free:
             buttons.append(
@@ -179,6 +180,7 @@ async def get_kb_default(
     return types.InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@fsm_callback
 async def cmd_show_balance(
     session: AsyncSession,
     user_id: int,
@@ -191,10 +193,10 @@ async def cmd_show_balance(
     **kwargs,
 ):
     user_repo = app_context.repository_factory.get_user_repository(session)
-    user = await user_repo.get_by_id(user_id)
+    user = await user_repo.get_profile(user_id)
     # new user ?
     if not user:
-        await state.update_data(fsm_after_send=jsonpickle.dumps(cmd_show_balance))
+        await state.update_data(fsm_after_send=dump_callback(cmd_show_balance))
         await cmd_change_wallet(user_id, state, session, app_context=app_context)
     else:
         try:
@@ -424,7 +426,7 @@ async def cmd_info_message(
             bot_id=current_bot.id, user_id=user_id, chat_id=user_id
         )
         if current_dp and current_dp.storage:
-            data = await current_dp.storage.get_data(key=fsm_storage_key)
+            data = await get_fsm_data(current_dp.storage, fsm_storage_key)
             with suppress(TelegramBadRequest):
                 await current_bot.delete_message(
                     user_id, data.get("last_message_id", 0)
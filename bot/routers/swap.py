@@ -10,7 +10,7 @@ from infrastructure.services.signing_facade import (
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import dump_values, load_values
 from aiogram import Router, types, F
 from aiogram.filters import Command
 from aiogram.filters.callback_data import CallbackData
@@ -644,7 +644,7 @@ async def cmd_swap_01(
         reply_markup=types.InlineKeyboardMarkup(inline_keyboard=kb_tmp),
         app_context=app_context,
     )
-    await state.update_data(assets=jsonpickle.encode(asset_list))
+    await state.update_data(assets=dump_values(asset_list))
     await state.set_state(StateSwapToken.choosing_from)
     await callback.answer()
 
@@ -661,7 +661,7 @@ async def cq_swap_choose_token_from(
         return
     answer = callback_data.answer
     data = await state.get_data()
-    asset_list: List[Balance] = jsonpickle.decode(data["assets"])
+    asset_list: List[Balance] = load_values(data["assets"])
 
     for asset in asset_list:
         if asset.asset_code == answer:
@@ -776,7 +776,7 @@ async def cq_swap_choose_token_for(
         return
     answer = callback_data.answer
     data = await state.get_data()
-    asset_list: List[Balance] = jsonpickle.decode(data["assets"])
+    asset_list: List[Balance] = load_values(data["assets"])
 
     for asset in asset_list:
         if asset.asset_code == answer:
@@ -1,4 +1,4 @@
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import dump_values, load_values
 from typing import List, Union
 
 from infrastructure.services.app_context import AppContext
@@ -569,7 +569,7 @@ async def cmd_sale_new_order(
         reply_markup=types.InlineKeyboardMarkup(inline_keyboard=kb_tmp),
         app_context=app_context,
     )
-    await state.update_data(assets=jsonpickle.encode(asset_list))
+    await state.update_data(assets=dump_values(asset_list))
     await callback.answer()
 
 
@@ -583,7 +583,7 @@ async def cq_trade_choose_token_sell(
 ):
     answer = callback_data.answer
     data = await state.get_data()
-    asset_list: List[Balance] = jsonpickle.decode(data["assets"])
+    asset_list: List[Balance] = load_values(data["assets"])
     for asset in asset_list:
         if asset.asset_code == answer:
             if my_float(asset.balance) == 0.0:
@@ -644,7 +644,7 @@ async def cq_trade_choose_token_buy(
 ):
     answer = callback_data.answer
     data = await state.get_data()
-    asset_list: List[Balance] = jsonpickle.decode(data["assets"])
+    asset_list: List[Balance] = load_values(data["assets"])
     for asset in asset_list:
         if asset.asset_code == answer:
             send_asset_code = data.get("send_asset_code")
@@ -900,7 +900,7 @@ async def cmd_show_orders(
     )
     offers = [MyOffer.from_dict(o) for o in offers_dicts]
 
-    await state.update_data(offers=jsonpickle.encode(offers))
+    await state.update_data(offers=dump_values(offers))
 
     kb_tmp = []
     for offer in offers:
@@ -942,7 +942,7 @@ async def cb_edit_order(
     await state.update_data(edit_offer_id=answer)
 
     data = await state.get_data()
-    offers = jsonpickle.decode(data["offers"])
+    offers = load_values(data["offers"])
     offer_id = int(answer)
 
     offer = list(filter(lambda x: x.id == offer_id, offers))
@@ -1019,7 +1019,7 @@ async def cmd_edit_order_amount(
     if callback.from_user is None:
         return
     data = await state.get_data()
-    offers = jsonpickle.decode(data["offers"])
+    offers = load_values(data["offers"])
     offer_id = int(data.get("edit_offer_id", 0))
 
     tmp = list(filter(lambda x: x.id == offer_id, offers))
@@ -1141,7 +1141,7 @@ async def cmd_edit_order_price(
     if callback.from_user is None:
         return
     data = await state.get_data()
-    offers = jsonpickle.decode(data["offers"])
+    offers = load_values(data["offers"])
     offer_id = int(data.get("edit_offer_id", 0))
 
     tmp = list(filter(lambda x: x.id == offer_id, offers))
@@ -1242,7 +1242,7 @@ async def cmd_delete_order(
     if callback.from_user is None:
         return
     data = await state.get_data()
-    offers = jsonpickle.decode(data["offers"])
+    offers = load_values(data["offers"])
     offer_id = int(data.get("edit_offer_id", 0))
 
     tmp = list(filter(lambda x: x.id == offer_id, offers))
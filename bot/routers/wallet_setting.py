@@ -1,5 +1,10 @@
 from typing import List
-import jsonpickle  # type: ignore
+from infrastructure.utils.serialization import (
+    dump_callback,
+    dump_values,
+    fsm_callback,
+    load_values,
+)
 from aiogram import Router, types, F
 from aiogram.filters import Command
 from aiogram.filters.callback_data import CallbackData
@@ -652,7 +657,7 @@ async def cmd_add_asset_del(
 
     kb_tmp.append(get_return_button(callback, app_context=app_context))
 
-    await state.update_data(assets=jsonpickle.encode(assets_to_store))
+    await state.update_data(assets=dump_values(assets_to_store))
 
     msg = my_gettext(callback, "delete_asset2", app_context=app_context)
     await send_message(
@@ -679,7 +684,7 @@ async def cq_swap_choose_token_from(
 
     data = await state.get_data()
 
-    asset_list: List[Balance] = jsonpickle.decode(data["assets"])
+    asset_list: List[Balance] = load_values(data["assets"])
 
     asset = list(filter(lambda x: x.asset_code == answer, asset_list))
 
@@ -864,7 +869,7 @@ async def cmd_add_asset_add(
         app_context=app_context,
     )
 
-    await state.update_data(assets=jsonpickle.encode(good_asset))
+    await state.update_data(assets=dump_values(good_asset))
 
 
 @router.callback_query(AddAssetCallbackData.filter())
@@ -877,7 +882,7 @@ async def cq_add_asset(
 ):
     answer = callback_data.answer
     data = await state.get_data()
-    asset_list: List[Balance] = jsonpickle.decode(data["assets"])
+    asset_list: List[Balance] = load_values(data["assets"])
 
     asset = list(filter(lambda x: x.asset_code == answer, asset_list))
     if asset:
@@ -1106,6 +1111,7 @@ async def cmd_add_asset_end(
 ########################################################################################################################
 
 
+@fsm_callback
 async def remove_password(
     session: AsyncSession, user_id: int, state: FSMContext, app_context: AppContext
 ):
@@ -1152,7 +1158,7 @@ async def cmd_remove_password(
     wallet = await repo.get_default_wallet(callback.from_user.id)
     pin_type = wallet.use_pin if wallet else 0
     if pin_type in (1, 2):
-        await state.update_data(fsm_func=jsonpickle.dumps(remove_password))
+        await state.update_data(fsm_func=dump_callback(remove_password))
         await state.set_state(PinState.sign)
         await cmd_ask_pin(
             session, callback.from_user.id, state, app_context=app_context
@@ -1202,6 +1208,7 @@ async def cmd_set_password(
             await callback.answer()
 
 
+@fsm_callback
 async def send_private_key(
     session: AsyncSession, user_id: int, state: FSMContext, app_context: AppContext
 ):
@@ -1256,7 +1263,7 @@ async def cmd_get_private_key(
         if pin_type == 10:
             await callback.answer("You have read only account", show_alert=True)
         else:
-            await state.update_data(fsm_func=jsonpickle.dumps(send_private_key))
+            await state.update_data(fsm_func=dump_callback(send_private_key))
             await state.set_state(PinState.sign)
             await cmd_ask_pin(
                 session, callback.from_user.id, state, app_context=app_context
@@ -1264,6 +1271,7 @@ async def cmd_get_private_key(
             await callback.answer()
 
 
+@fsm_callback
 async def cmd_after_buy(
     session: AsyncSession,
     user_id: int,
@@ -1315,7 +1323,7 @@ async def cmd_buy_private_key(
             return
         father_key = father_wallet.public_key
         await state.update_data(
-            buy_address=public_key, fsm_after_send=jsonpickle.dumps(cmd_after_buy)
+            buy_address=public_key, fsm_after_send=dump_callback(cmd_after_buy)
         )
         # Refactored to use UseCaseFactory
         balance_use_case = app_context.use_case_factory.create_get_wallet_balance(
@@ -1355,7 +1363,7 @@ async def cmd_buy_private_key(
                 xdr=xdr,
                 purpose=SignaturePurpose.PAYMENT,
                 operation=f"Buy address {config.wallet_cost} {eurmtl_asset.code}",
-                fsm_after_send=jsonpickle.dumps(cmd_after_buy),
+                fsm_after_send=dump_callback(cmd_after_buy),
                 metadata={
                     "destination_address": father_key,
                     "memo": memo,
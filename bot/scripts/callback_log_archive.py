@@ -0,0 +1,154 @@
+"""Run callback log retention and read the archive it writes.
+
+Usage:
+    uv run python scripts/callback_log_archive.py archive [--days N]
+    uv run python scripts/callback_log_archive.py query --from 2026-01-01 \\
+        --to 2026-01-31 [--user-id ID] [--operation NAME]
+    uv run python scripts/callback_log_archive.py report
+
+``archive`` runs retention passes until no expired rows are left. Each pass
+takes the same Redis lease as the bot's scheduled job, so the two never run
+at once. The window is ``log_retention_days``, or ``--days`` when that is not
+set. ``query``
+prints the archived rows of a date range as CSV with a header. ``report``
+prints the recorded table size samples and the archive size per month. All
+commands use ``log_archive_dir`` unless ``--dir`` is given.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import os
+import sys
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+from typing import Iterable, TextIO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from infrastructure.services.log_archive import (  # noqa: E402
+    COLUMNS,
+    ArchivedLogRow,
+    LogArchive,
+)
+from other.config_reader import config  # noqa: E402
+
+
+def write_rows(rows: Iterable[ArchivedLogRow], out: TextIO) -> int:
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(
+            (
+                row.log_id,
+                "" if row.user_id is None else row.user_id,
+                row.log_dt.isoformat(sep=" "),
+                row.log_operation,
+                row.log_operation_info,
+            )
+        )
+        count += 1
+    return count
+
+
+def format_report(archive: LogArchive) -> list[str]:
+    lines = ["Table size samples:"]
+    history = archive.size_history()
+    if not history:
+        lines.append("  none recorded yet")
+    for sample in history:
+        oldest = "-" if sample.oldest is None else f"{sample.oldest:%Y-%m-%d}"
+        lines.append(
+            f"  {sample.taken_at:%Y-%m-%d %H:%M}  rows={sample.rows}"
+            f"  oldest={oldest}  archived={sample.archived}"
+        )
+    months: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    for day, _, size in archive.day_files():
+        totals = months[f"{day:%Y-%m}"]
+        totals[0] += 1
+        totals[1] += size
+    lines.append("Archive by month:")
+    if not months:
+        lines.append("  empty")
+    for month, (days, size) in sorted(months.items()):
+        lines.append(f"  {month}  days={days}  bytes={size}")
+    return lines
+
+
+async def run_archive(archive: LogArchive, retention_days: int) -> int:
+    from redis.asyncio import Redis
+
+    from db.db_pool import db_pool
+    from infrastructure.workers.log_retention_worker import (
+        CallbackLogRetention,
+        RetentionRunLease,
+        run_under_lease,
+    )
+
+    retention = CallbackLogRetention(
+        db_pool,
+        archive,
+        retention_days=retention_days,
+        batch_size=config.log_retention_batch_size,
+        batch_pause_seconds=config.log_retention_batch_pause_seconds,
+        max_batches=config.log_retention_max_batches,
+        max_run_seconds=config.log_retention_max_run_seconds,
+    )
+    redis = Redis.from_url(config.redis_url, decode_responses=True)
+    lease = RetentionRunLease(redis)
+    archived = 0
+    try:
+        while True:
+            result = await run_under_lease(retention, lease)
+            if result is None:
+                print("retention is running on a bot instance; retrying in 60 s")
+                await asyncio.sleep(60)
+                continue
+            archived += result.archived
+            print(
+                f"archived {result.archived} rows; {result.sample.rows} left in table"
+            )
+            if result.complete:
+                return archived
+    finally:
+        await redis.aclose()
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", type=Path, default=Path(config.log_archive_dir))
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive_command = commands.add_parser("archive")
+    archive_command.add_argument("--days", type=int, default=config.log_retention_days)
+    query_command = commands.add_parser("query")
+    query_command.add_argument("--from", dest="start", type=date.fromisoformat)
+    query_command.add_argument("--to", dest="end", type=date.fromisoformat)
+    query_command.add_argument("--user-id", type=int)
+    query_command.add_argument("--operation")
+    commands.add_parser("report")
+    args = parser.parse_args()
+
+    archive = LogArchive(args.dir)
+    if args.command == "archive":
+        if args.days <= 0:
+            parser.error("set log_retention_days or pass --days")
+        await run_archive(archive, args.days)
+    elif args.command == "query":
+        rows = archive.read(
+            args.start or date.min,
+            args.end or date.max,
+            user_id=args.user_id,
+            operation=args.operation,
+        )
+        write_rows(rows, sys.stdout)
+    else:
+        print("\n".join(format_report(archive)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
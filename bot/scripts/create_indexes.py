@@ -0,0 +1,114 @@
+"""Create the secondary indexes declared in ``db/models.py`` that are missing.
+
+Usage:
+    uv run python scripts/create_indexes.py [--dry-run]
+
+An index is skipped when an index with its name exists, or when an existing
+index or primary key starts with the same columns. On Firebird this
+includes foreign keys, because Firebird backs each one with an index that
+already serves lookups by the key's columns. Each index is created and
+committed on its own, so the script can be rerun after a failure.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+from dataclasses import dataclass
+
+from loguru import logger
+from sqlalchemy import Index, MetaData, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateIndex
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db.models import Base  # noqa: E402
+
+
+@dataclass(frozen=True)
+class ExistingIndexes:
+    names: frozenset[str]
+    columns: dict[str, list[tuple[str, ...]]]
+
+
+def _columns(index: Index) -> tuple[str, ...]:
+    return tuple(column.name.upper() for column in index.columns)
+
+
+def missing_indexes(metadata: MetaData, existing: ExistingIndexes) -> list[Index]:
+    """Declared indexes that neither exist by name nor are covered."""
+    missing = []
+    for table in metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda item: str(item.name)):
+            if str(index.name).upper() in existing.names:
+                continue
+            wanted = _columns(index)
+            covering = existing.columns.get(table.name.upper(), [])
+            if any(columns[: len(wanted)] == wanted for columns in covering):
+                continue
+            missing.append(index)
+    return missing
+
+
+def _inspect_indexes(connection, metadata: MetaData) -> ExistingIndexes:
+    inspector = inspect(connection)
+    names: set[str] = set()
+    columns: dict[str, list[tuple[str, ...]]] = {}
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        found = columns.setdefault(table.name.upper(), [])
+        for index in inspector.get_indexes(table.name):
+            if index["name"]:
+                names.add(index["name"].upper())
+            found.append(tuple(str(name).upper() for name in index["column_names"]))
+        primary_key = inspector.get_pk_constraint(table.name)
+        found.append(tuple(name.upper() for name in primary_key["constrained_columns"]))
+        if not connection.dialect.name.startswith("firebird"):
+            continue
+        # Firebird backs every foreign key with an index of its own.
+        for foreign_key in inspector.get_foreign_keys(table.name):
+            found.append(
+                tuple(name.upper() for name in foreign_key["constrained_columns"])
+            )
+    return ExistingIndexes(frozenset(names), columns)
+
+
+async def create_missing_indexes(
+    engine: AsyncEngine,
+    metadata: MetaData = Base.metadata,
+    *,
+    dry_run: bool = False,
+) -> list[str]:
+    """Create the missing declared indexes and return their names."""
+    async with engine.connect() as connection:
+        existing = await connection.run_sync(_inspect_indexes, metadata)
+    missing = missing_indexes(metadata, existing)
+    for index in missing:
+        if dry_run:
+            logger.info("would create index {}", index.name)
+            continue
+        async with engine.begin() as connection:
+            await connection.execute(CreateIndex(index))
+        logger.info("created index {}", index.name)
+    return [str(index.name) for index in missing]
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    from db.db_pool import db_pool
+
+    created = await create_missing_indexes(db_pool.engine, dry_run=args.dry_run)
+    if not created:
+        logger.info("all declared indexes exist")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,182 @@
+"""Compare pool use of plain and lazy sessions while handlers wait on Horizon.
+
+Usage:
+    uv run python scripts/db_pool_benchmark.py [--handlers 60] [--pool-size 5]
+        [--horizon-ms 200] [--reads 2]
+
+Every simulated handler opens a session the way ``DbSessionMiddleware`` does.
+It reads ``reads`` times and waits ``horizon-ms`` after each read, the way a
+Horizon call would. Then it writes one row and commits. The SQLite pool has
+no overflow. For each session class, the report shows the wall time, the
+handler latency, the statement latency including any wait for a free
+connection, and the peak and mean checked-out connections.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db.session import LazyAsyncSession  # noqa: E402
+from infrastructure.services.notification_metrics import StageHistogram  # noqa: E402
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Event(Base):
+    __tablename__ = "events"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    handler: Mapped[int]
+
+
+@dataclass(frozen=True)
+class PoolReport:
+    wall_seconds: float
+    handlers: StageHistogram
+    statement_times: StageHistogram
+    peak_checked_out: int
+    mean_checked_out: float
+
+
+async def run_benchmark(
+    session_class: type[AsyncSession],
+    *,
+    handlers: int,
+    pool_size: int,
+    horizon_seconds: float,
+    reads: int,
+) -> PoolReport:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(directory, 'pool.db')}",
+            pool_size=pool_size,
+            max_overflow=0,
+            pool_timeout=60,
+        )
+        try:
+            return await _measure(
+                engine,
+                session_class,
+                handlers=handlers,
+                horizon_seconds=horizon_seconds,
+                reads=reads,
+            )
+        finally:
+            await engine.dispose()
+
+
+async def _measure(
+    engine, session_class, *, handlers, horizon_seconds, reads
+) -> PoolReport:
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(
+        bind=engine, expire_on_commit=False, class_=session_class
+    )
+    checked_out = 0
+    peak = 0
+    busy_area = 0.0
+    last_change = time.perf_counter()
+
+    def track(delta: int) -> None:
+        nonlocal checked_out, peak, busy_area, last_change
+        now = time.perf_counter()
+        busy_area += checked_out * (now - last_change)
+        last_change = now
+        checked_out += delta
+        peak = max(peak, checked_out)
+
+    event.listen(engine.sync_engine, "checkout", lambda *_: track(1))
+    event.listen(engine.sync_engine, "checkin", lambda *_: track(-1))
+    handler_times = StageHistogram(sample_size=handlers)
+    statement_times = StageHistogram(sample_size=handlers * (reads + 1))
+
+    async def timed(session: AsyncSession, statement):
+        started = time.perf_counter()
+        result = await session.execute(statement)
+        statement_times.observe(time.perf_counter() - started)
+        return result
+
+    async def handler(index: int) -> None:
+        started = time.perf_counter()
+        async with factory() as session:
+            for _ in range(reads):
+                await timed(session, select(Event.id).limit(1))
+                await asyncio.sleep(horizon_seconds)
+            await timed(session, insert(Event).values(handler=index))
+            await session.commit()
+        handler_times.observe(time.perf_counter() - started)
+
+    started = last_change = time.perf_counter()
+    await asyncio.gather(*(handler(index) for index in range(handlers)))
+    wall = time.perf_counter() - started
+    track(0)
+    return PoolReport(
+        wall_seconds=wall,
+        handlers=handler_times,
+        statement_times=statement_times,
+        peak_checked_out=peak,
+        mean_checked_out=busy_area / wall,
+    )
+
+
+def _print_report(name: str, report: PoolReport) -> None:
+    handlers = report.handlers.as_dict()
+    statements = report.statement_times.as_dict()
+    print(f"{name}:")
+    print(f"  wall {report.wall_seconds:.2f} s")
+    print(f"  handler p50 {handlers['p50_ms']} ms, p95 {handlers['p95_ms']} ms")
+    print(f"  statement p50 {statements['p50_ms']} ms, p95 {statements['p95_ms']} ms")
+    print(
+        f"  connections peak {report.peak_checked_out}, "
+        f"mean {report.mean_checked_out:.2f}"
+    )
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--handlers", type=int, default=60)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--horizon-ms", type=float, default=200.0)
+    parser.add_argument("--reads", type=int, default=2)
+    args = parser.parse_args()
+
+    print(
+        f"{args.handlers} handlers, pool {args.pool_size}, "
+        f"{args.reads} reads x {args.horizon_ms:g} ms Horizon wait"
+    )
+    for name, session_class in (
+        ("AsyncSession", AsyncSession),
+        ("LazyAsyncSession", LazyAsyncSession),
+    ):
+        report = await run_benchmark(
+            session_class,
+            handlers=args.handlers,
+            pool_size=args.pool_size,
+            horizon_seconds=args.horizon_ms / 1000,
+            reads=args.reads,
+        )
+        _print_report(name, report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
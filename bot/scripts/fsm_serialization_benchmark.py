@@ -0,0 +1,139 @@
+"""Compare jsonpickle with the registry serializer on typical FSM records.
+
+Usage:
+    uv run python scripts/fsm_serialization_benchmark.py [--items 15]
+        [--number 2000]
+
+Each record is built the way a router builds it: the asset list of the send
+and swap screens, the offers of the trade screen, the cached balances of a
+wallet row, a BSN edit session, and an ``fsm_after_send`` callback. For each
+record and serializer, the report shows the payload size and the best
+per-call encode and decode time over five runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import timeit
+from typing import Any, Callable
+
+import jsonpickle  # type: ignore
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.domain.value_objects import Balance as DomainBalance  # noqa: E402
+from infrastructure.utils.serialization import (  # noqa: E402
+    dump_callback,
+    dump_values,
+    load_callback,
+    load_values,
+)
+from other.mytypes import Balance, MyOffer  # noqa: E402
+from routers.bsn import Address, BSNData, BSNRow, Key, Value  # noqa: E402
+from routers.start_msg import cmd_show_balance  # noqa: E402
+
+ISSUER = "GACKTN5DAZGWXRWB2WLM6OPBDHAMT6SJNGLJZPQMEZBUR4JUGBX2UK7V"
+
+
+def _records(items: int) -> dict[str, Any]:
+    balances = [
+        Balance(
+            balance=f"{index}.1234567",
+            limit="922337203685.4775807",
+            asset_type="credit_alphanum12",
+            asset_code=f"ASSET{index}",
+            asset_issuer=ISSUER,
+        )
+        for index in range(items)
+    ]
+    offers = [
+        MyOffer.from_dict(
+            {
+                "id": str(1000 + index),
+                "paging_token": str(1000 + index),
+                "seller": ISSUER,
+                "selling": {
+                    "asset_type": "credit_alphanum12",
+                    "asset_code": f"ASSET{index}",
+                    "asset_issuer": ISSUER,
+                },
+                "buying": {"asset_type": "native"},
+                "amount": "10.0000000",
+                "price_r": {"n": 1, "d": 2},
+                "price": "0.5000000",
+                "last_modified_ledger": 50_000_000 + index,
+                "last_modified_time": "2026-01-01T00:00:00Z",
+            }
+        )
+        for index in range(items)
+    ]
+    cached = [
+        DomainBalance(f"ASSET{index}", ISSUER, "credit_alphanum12", f"{index}.5")
+        for index in range(items)
+    ]
+    bsn = BSNData(
+        Address(ISSUER),
+        [BSNRow.from_str(f"Partner{index}", ISSUER) for index in range(items)],
+    )
+    bsn.add_new_data_row(Key("Name"), Value("Alice"))
+    return {
+        "assets": balances,
+        "offers": offers,
+        "wallet balances": cached,
+        "bsn tags": bsn,
+    }
+
+
+def _best_time(func: Callable[[], Any], number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def _report(
+    name: str,
+    value: Any,
+    number: int,
+    pairs: list[tuple[str, Callable[[Any], str], Callable[[str], Any]]],
+) -> None:
+    print(f"{name}:")
+    for label, dump, load in pairs:
+        payload = dump(value)
+        encode = _best_time(lambda: dump(value), number)
+        decode = _best_time(lambda: load(payload), number)
+        print(
+            f"  {label:<10} {len(payload):>7} bytes  "
+            f"encode {encode * 1e6:8.1f} us  decode {decode * 1e6:8.1f} us"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=15)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    for name, value in _records(args.items).items():
+        _report(
+            name,
+            value,
+            args.number,
+            [
+                ("jsonpickle", jsonpickle.encode, jsonpickle.decode),
+                ("registry", dump_values, load_values),
+            ],
+        )
+    _report(
+        "fsm_after_send",
+        cmd_show_balance,
+        args.number,
+        [
+            ("jsonpickle", jsonpickle.dumps, jsonpickle.loads),
+            ("registry", dump_callback, load_callback),
+        ],
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+"""Report the Redis memory held by notification dedupe state, per user.
+
+Usage:
+    uv run python scripts/notification_dedupe_report.py --redis-url redis://localhost:6379/0
+        [--key-prefix ""] [--top 20]
+
+Covers the time-bucketed dedupe sets, the legacy exact dedupe sets that are
+still expiring, and the pending-ID sets. Key sizes come from ``MEMORY USAGE``;
+on servers without it they are estimated from the member lengths.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+# Per-key dict entry, key string, and set header in Redis, in bytes.
+REDIS_KEY_OVERHEAD = 90
+# Listpack entry header and backlen per member.
+REDIS_ENTRY_OVERHEAD = 4
+SCAN_COUNT = 1000
+
+
+@dataclass
+class DedupeUsage:
+    user_id: int
+    bucket_ids: int = 0
+    legacy_ids: int = 0
+    pending_ids: int = 0
+    keys: int = 0
+    bytes: int = 0
+    estimated: bool = False
+
+
+async def collect_dedupe_usage(
+    redis: Redis, *, key_prefix: str = ""
+) -> list[DedupeUsage]:
+    """Per-user dedupe usage, largest first."""
+    usage: dict[int, DedupeUsage] = {}
+    for pattern, field_for in (
+        (f"{key_prefix}notification:dedupe:*", _dedupe_field),
+        (f"{key_prefix}notification:pending_ids:*", lambda parts: "pending_ids"),
+    ):
+        async for key in redis.scan_iter(match=pattern, count=SCAN_COUNT):
+            key = _as_str(key)
+            parts = key[len(key_prefix) :].split(":")
+            try:
+                user_id = int(parts[2])
+            except (IndexError, ValueError):
+                continue
+            entry = usage.setdefault(user_id, DedupeUsage(user_id))
+            members = await redis.scard(key)
+            field_name = field_for(parts)
+            setattr(entry, field_name, getattr(entry, field_name) + members)
+            size, estimated = await _key_bytes(redis, key)
+            entry.keys += 1
+            entry.bytes += size
+            entry.estimated = entry.estimated or estimated
+    return sorted(usage.values(), key=lambda entry: (-entry.bytes, entry.user_id))
+
+
+async def _key_bytes(redis: Redis, key: str) -> tuple[int, bool]:
+    try:
+        size = await redis.memory_usage(key)
+    except ResponseError:
+        size = None
+    if size is not None:
+        return size, False
+    members = await redis.smembers(key)
+    size = REDIS_KEY_OVERHEAD + len(key)
+    size += sum(len(member) + REDIS_ENTRY_OVERHEAD for member in members)
+    return size, True
+
+
+def _dedupe_field(parts: list[str]) -> str:
+    # notification:dedupe:{user} is the legacy set; buckets add a suffix.
+    return "bucket_ids" if len(parts) > 3 else "legacy_ids"
+
+
+def _as_str(value: str | bytes) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def kib(value: int) -> str:
+    return f"{value / 1024:10.1f} KiB"
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis-url", required=True)
+    parser.add_argument("--key-prefix", default="")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    redis = Redis.from_url(args.redis_url, decode_responses=True)
+    try:
+        usage = await collect_dedupe_usage(redis, key_prefix=args.key_prefix)
+    finally:
+        await redis.aclose()
+
+    total = sum(entry.bytes for entry in usage)
+    label = "estimated" if any(entry.estimated for entry in usage) else "measured"
+    print(f"Notification dedupe state, {len(usage)} users ({label})")
+    print(f"  total:    {kib(total)}")
+    if usage:
+        print(f"  per user: {kib(total // len(usage))}")
+    print(
+        f"  {'user':>12} {'size':>14} {'keys':>5} {'buckets':>8} {'legacy':>7} {'pending':>8}"
+    )
+    for entry in usage[: args.top]:
+        print(
+            f"  {entry.user_id:>12} {kib(entry.bytes)} {entry.keys:>5} "
+            f"{entry.bucket_ids:>8} {entry.legacy_ids:>7} {entry.pending_ids:>8}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
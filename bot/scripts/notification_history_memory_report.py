@@ -0,0 +1,125 @@
+"""Compare the memory footprint of the in-process and Redis notification history.
+
+Usage:
+    uv run python scripts/notification_history_memory_report.py [--users 100000]
+        [--records 10] [--redis-url redis://localhost:6379/15]
+
+Without ``--redis-url`` the Redis side is estimated from the encoded record
+size. With it, records for a sample of users are written under a temporary
+prefix, measured with ``MEMORY USAGE`` and removed again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.models.blockchain_notification import BlockchainNotification  # noqa: E402
+from infrastructure.services.notification_history_service import (  # noqa: E402
+    NotificationHistoryService,
+    RedisNotificationHistoryService,
+    record_from_notification,
+)
+
+# Per-key dict entry, key string, and list header in Redis, in bytes.
+REDIS_KEY_OVERHEAD = 90
+# Listpack entry header and backlen per element.
+REDIS_ENTRY_OVERHEAD = 4
+SAMPLE_USERS = 1000
+KEY_PREFIX = "memory-report:"
+
+
+def make_notification(user_id: int, index: int) -> BlockchainNotification:
+    return BlockchainNotification(
+        notification_id=f"{user_id}:{index}:0123456789abcdef",
+        user_id=user_id,
+        event_type="payment",
+        text="-",
+        created_at=1,
+        transaction_hash="0" * 64,
+        event_index=index,
+        data={
+            "wallet_id": user_id,
+            "public_key": "G" + "A" * 55,
+            "operation_type": "payment",
+            "asset_code": "EURMTL",
+            "amount": "123.4567",
+        },
+    )
+
+
+async def measure_in_process(users: int, records: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    history = NotificationHistoryService()
+    for user_id in range(users):
+        for index in range(records):
+            await history.add_delivered(make_notification(user_id, index))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+def estimate_redis(users: int, records: int) -> int:
+    encoder = RedisNotificationHistoryService(None)  # type: ignore[arg-type]
+    entry = len(encoder._encode(record_from_notification(make_notification(1, 1))))
+    return users * (REDIS_KEY_OVERHEAD + records * (entry + REDIS_ENTRY_OVERHEAD))
+
+
+async def measure_redis(redis_url: str, users: int, records: int) -> int:
+    from redis.asyncio import Redis
+
+    redis = Redis.from_url(redis_url, decode_responses=True)
+    history = RedisNotificationHistoryService(
+        redis, cache_size=0, key_prefix=KEY_PREFIX
+    )
+    sample = min(users, SAMPLE_USERS)
+    try:
+        for user_id in range(sample):
+            for index in range(records):
+                await history.add_delivered(make_notification(user_id, index))
+        used = 0
+        for user_id in range(sample):
+            used += await redis.memory_usage(history._key(user_id)) or 0
+        return used * users // sample
+    finally:
+        keys = [history._key(user_id) for user_id in range(sample)]
+        if keys:
+            await redis.delete(*keys)
+        await redis.aclose()
+
+
+def mib(value: int) -> str:
+    return f"{value / 1024 / 1024:8.1f} MiB"
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--records", type=int, default=10)
+    parser.add_argument("--redis-url")
+    args = parser.parse_args()
+
+    in_process = await measure_in_process(args.users, args.records)
+    if args.redis_url:
+        redis_bytes = await measure_redis(args.redis_url, args.users, args.records)
+        redis_label = "measured"
+    else:
+        redis_bytes = estimate_redis(args.users, args.records)
+        redis_label = "estimated"
+
+    print(f"Notification history, {args.users} users x {args.records} records")
+    print(f"  in-process dict (bot heap): {mib(in_process)}")
+    print(f"  Redis lists ({redis_label}):  {mib(redis_bytes)}")
+    print(f"  per user: {in_process // args.users} B vs {redis_bytes // args.users} B")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
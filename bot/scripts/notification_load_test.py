@@ -0,0 +1,597 @@
+"""Replay synthetic notifier webhooks through the notification pipeline.
+
+Usage:
+    uv run python scripts/notification_load_test.py [--events 1000] [--rate 100]
+        [--users 500] [--makers 20] [--trade-share 0.2] [--self-share 0.1]
+        [--redis-url redis://localhost:6379/15] [--send-scheduler]
+
+Signed payments, trades with many makers, and self-payments are POSTed at a
+fixed rate to ``NotificationService.handle_webhook``. From there they go
+through the real coordinator, Redis store, and ``cmd_info_message`` to a
+local mock Telegram. The mock answers 429 with ``retry_after`` once the
+per-chat or global send rate is exceeded, like the Bot API does. Wallets live
+in an in-memory SQLite database.
+
+Without ``--redis-url`` fakeredis is used. It has no Lua, so the store runs
+its WATCH fallbacks and the Redis round trips are higher than in production.
+Point ``--redis-url`` at a disposable database for production-like numbers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import aiohttp  # noqa: E402
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.default import DefaultBotProperties  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiohttp import web  # noqa: E402
+from loguru import logger  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.ext.asyncio import (  # noqa: E402
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from stellar_sdk import Keypair  # noqa: E402
+
+from db.models import Base, MyMtlWalletBot, MyMtlWalletBotUsers  # noqa: E402
+from infrastructure.services.localization_service import (  # noqa: E402
+    LocalizationService,
+)
+from infrastructure.services.notification_badge_service import (  # noqa: E402
+    NotificationBadgeService,
+)
+from infrastructure.services.notification_coordinator import (  # noqa: E402
+    NotificationCoordinator,
+)
+from infrastructure.services.notification_history_service import (  # noqa: E402
+    RedisNotificationHistoryService,
+)
+from infrastructure.services.notification_metrics import (  # noqa: E402
+    STAGE_LEDGER_TO_DELIVERED,
+    STAGE_WEBHOOK,
+    NotificationMetrics,
+)
+from infrastructure.services.notification_redis_store import (  # noqa: E402
+    NotificationRedisStore,
+)
+from infrastructure.services.notification_service import (  # noqa: E402
+    NotificationService,
+)
+from infrastructure.workers.notification_delivery_worker import (  # noqa: E402
+    NotificationDeliveryWorker,
+)
+from middleware.retry import RetryRequestMiddleware  # noqa: E402
+
+BOT_TOKEN = "123456:LOAD-TEST"
+KEY_PREFIX = "load-test:"
+LANGS_PATH = os.path.join(os.path.dirname(__file__), "..", "langs")
+# Telegram's documented limits: about one message per second per chat,
+# with short bursts, and 30 messages per second overall.
+TELEGRAM_CHAT_RATE = 1.0
+TELEGRAM_CHAT_BURST = 3.0
+TELEGRAM_GLOBAL_RATE = 30.0
+SEND_METHODS = {"sendmessage", "sendphoto", "editmessagetext"}
+
+
+@dataclass
+class LoadProfile:
+    events: int = 1000
+    rate: float = 100.0
+    users: int = 500
+    makers: int = 20
+    trade_share: float = 0.2
+    self_share: float = 0.1
+    chat_rate: float = TELEGRAM_CHAT_RATE
+    chat_burst: float = TELEGRAM_CHAT_BURST
+    global_rate: float = TELEGRAM_GLOBAL_RATE
+    send_scheduler: bool = False
+    drain_seconds: float = 5.0
+    timeout_seconds: float = 300.0
+    seed: int = 1
+
+    def __post_init__(self) -> None:
+        if self.events <= 0 or self.users <= 0 or self.makers < 0:
+            raise ValueError("events and users must be positive, makers non-negative")
+        for name in ("rate", "chat_rate", "chat_burst", "global_rate"):
+            value = getattr(self, name)
+            if not math.isfinite(value) or value <= 0:
+                raise ValueError(f"{name} must be finite and positive")
+        if not 0 <= self.trade_share + self.self_share <= 1:
+            raise ValueError("trade_share + self_share must be within [0, 1]")
+        if self.makers > self.users - 1 and self.trade_share > 0:
+            raise ValueError("makers must leave at least one taker among users")
+
+
+@dataclass
+class LoadReport:
+    profile: LoadProfile
+    posted: int
+    failed_posts: int
+    delivered: int
+    rate_limited: int
+    post_seconds: float
+    total_seconds: float
+    redis_round_trips: int
+    db_statements: int
+    stages: dict[str, dict[str, float | int | None]] = field(default_factory=dict)
+
+    @property
+    def events_per_second(self) -> float:
+        return self.posted / self.total_seconds if self.total_seconds else 0.0
+
+    def as_text(self) -> str:
+        posted = max(self.posted, 1)
+        lines = [
+            f"Notification load test: {self.posted} events at "
+            f"{self.profile.rate:g}/s, {self.profile.users} users, "
+            f"{self.profile.makers} makers per trade",
+            f"  posted in {self.post_seconds:.1f}s, drained in "
+            f"{self.total_seconds:.1f}s ({self.failed_posts} non-200 responses)",
+            f"  sustained: {self.events_per_second:.1f} events/s, "
+            f"{self.delivered / self.total_seconds if self.total_seconds else 0:.1f}"
+            f" messages/s ({self.delivered} delivered, "
+            f"{self.rate_limited} Telegram 429s)",
+            f"  Redis round trips per event: {self.redis_round_trips / posted:.1f}",
+            f"  DB statements per event: {self.db_statements / posted:.1f}",
+            "  stage latency (ms):      count  fail     p50     p95     p99",
+        ]
+        for stage, summary in self.stages.items():
+            lines.append(
+                f"    {stage:<20} {summary['count']:>8} {summary['failures']:>5} "
+                f"{_fmt(summary['p50_ms'])} {_fmt(summary['p95_ms'])} "
+                f"{_fmt(summary['p99_ms'])}"
+            )
+        return "\n".join(lines)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consume a token; return 0 on success or the seconds until one frees up."""
+        now = time.monotonic()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self._rate
+
+    def refund(self) -> None:
+        self._tokens = min(self._burst, self._tokens + 1)
+
+
+class MockTelegram:
+    """Bot API stand-in that rate-limits sends with 429 and retry_after."""
+
+    def __init__(self, *, chat_rate: float, chat_burst: float, global_rate: float):
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: dict[int, TokenBucket] = {}
+        self._message_id = 0
+        self._runner: web.AppRunner | None = None
+        self.delivered = 0
+        self.rate_limited = 0
+        self.last_delivery_at = 0.0
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        if request.content_type == "application/json":
+            data = await request.json()
+        else:
+            data = dict(await request.post())
+        chat_id = int(data.get("chat_id") or 0)
+        if method not in SEND_METHODS:
+            return web.json_response({"ok": True, "result": True})
+        chat = self._chats.setdefault(
+            chat_id, TokenBucket(self._chat_rate, self._chat_burst)
+        )
+        wait = chat.take()
+        if wait == 0:
+            wait = self._global.take()
+            if wait > 0:
+                chat.refund()
+        if wait > 0:
+            self.rate_limited += 1
+            retry_after = max(1, math.ceil(wait))
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                },
+                status=429,
+            )
+        self._message_id += 1
+        self.delivered += 1
+        self.last_delivery_at = time.perf_counter()
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {
+                    "message_id": self._message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": str(data.get("text", "")),
+                },
+            }
+        )
+
+
+class SqlitePool:
+    """``DatabasePool`` stand-in that counts executed SQL statements."""
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self._sessions = async_sessionmaker(engine, class_=AsyncSession)
+        self.statements = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args: Any) -> None:
+        self.statements += 1
+
+    @asynccontextmanager
+    async def get_session(self):
+        async with self._sessions() as session:
+            yield session
+
+
+def count_redis_round_trips(redis: Any) -> Callable[[], int]:
+    """Count packed commands sent by ``redis``; a pipeline counts once."""
+    pool = redis.connection_pool
+    counter = [0]
+
+    class CountingConnection(pool.connection_class):  # type: ignore[name-defined]
+        async def send_packed_command(self, command, check_health=True):
+            counter[0] += 1
+            return await super().send_packed_command(command, check_health)
+
+    pool.connection_class = CountingConnection
+    return lambda: counter[0]
+
+
+class PayloadFactory:
+    """Deterministic notifier payloads over a fixed set of user accounts."""
+
+    def __init__(self, accounts: list[str], profile: LoadProfile) -> None:
+        self._accounts = accounts
+        self._profile = profile
+        self._random = random.Random(profile.seed)
+        self._external = Keypair.random().public_key
+        self._operation_id = 10**12
+
+    def next(self) -> dict[str, Any]:
+        self._operation_id += 1
+        roll = self._random.random()
+        if roll < self._profile.trade_share:
+            operation = self._trade()
+        elif roll < self._profile.trade_share + self._profile.self_share:
+            account = self._random.choice(self._accounts)
+            operation = self._payment(account, account)
+        else:
+            operation = self._payment(
+                self._external, self._random.choice(self._accounts)
+            )
+        operation["id"] = str(self._operation_id)
+        return {
+            "operation": operation,
+            "transaction": {
+                "hash": f"{self._operation_id:064x}",
+                # Stamped at send time: ledger-to-delivered is the pipeline time.
+                "closed_at": datetime.now(timezone.utc).isoformat(),
+            },
+        }
+
+    @staticmethod
+    def _payment(source: str, destination: str) -> dict[str, Any]:
+        return {
+            "type": "payment",
+            "source_account": source,
+            "to": destination,
+            "amount": "12.5",
+            "asset": {"asset_type": "credit_alphanum12", "asset_code": "EURMTL"},
+        }
+
+    def _trade(self) -> dict[str, Any]:
+        taker, *makers = self._random.sample(self._accounts, self._profile.makers + 1)
+        return {
+            "type": "manage_sell_offer",
+            "source_account": taker,
+            "account": taker,
+            "amount": str(self._profile.makers),
+            "price": "2",
+            "offer_id": "0",
+            "source_asset": {"asset_type": "native"},
+            "asset": {"asset_type": "credit_alphanum12", "asset_code": "EURMTL"},
+            "trades": [
+                {
+                    "type": "order_book",
+                    "seller_id": maker,
+                    "amount_sold": "2",
+                    "sold_asset_code": "EURMTL",
+                    "amount_bought": "1",
+                    "bought_asset_type": "native",
+                }
+                for maker in makers
+            ],
+        }
+
+
+async def seed_wallets(pool: SqlitePool, engine: AsyncEngine, users: int) -> list[str]:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    accounts = [Keypair.random().public_key for _ in range(users)]
+    async with pool.get_session() as session:
+        for user_id, account in enumerate(accounts, start=1):
+            session.add(MyMtlWalletBotUsers(user_id=user_id, lang="en"))
+            session.add(
+                MyMtlWalletBot(
+                    user_id=user_id,
+                    public_key=account,
+                    need_delete=0,
+                    default_wallet=1,
+                )
+            )
+        await session.commit()
+    return accounts
+
+
+async def run_load(
+    profile: LoadProfile,
+    *,
+    redis: Any,
+    database_url: str = "sqlite+aiosqlite:///:memory:",
+) -> LoadReport:
+    engine = create_async_engine(database_url)
+    pool = SqlitePool(engine)
+    accounts = await seed_wallets(pool, engine, profile.users)
+    statements_before = pool.statements
+    redis_round_trips = count_redis_round_trips(redis)
+
+    telegram = MockTelegram(
+        chat_rate=profile.chat_rate,
+        chat_burst=profile.chat_burst,
+        global_rate=profile.global_rate,
+    )
+    session = AiohttpSession(api=TelegramAPIServer.from_base(await telegram.start()))
+    session.middleware(RetryRequestMiddleware())
+    send_scheduler = None
+    if profile.send_scheduler:
+        from infrastructure.services.telegram_send_scheduler import (
+            RedisSendBuckets,
+            TelegramSendScheduler,
+        )
+        from middleware.send_scheduler import SendSchedulerRequestMiddleware
+
+        send_scheduler = TelegramSendScheduler(
+            RedisSendBuckets(
+                redis,
+                global_rate=profile.global_rate,
+                chat_rate=profile.chat_rate,
+                chat_burst=profile.chat_burst,
+                key_prefix=KEY_PREFIX,
+            )
+        )
+        session.middleware(SendSchedulerRequestMiddleware(send_scheduler))
+    bot = Bot(
+        token=BOT_TOKEN,
+        session=session,
+        default=DefaultBotProperties(parse_mode="HTML"),
+    )
+
+    localization = LocalizationService(pool)  # type: ignore[arg-type]
+    await localization.load_languages(LANGS_PATH)
+    # Every delivered notification is one sample of each per-event stage.
+    metrics = NotificationMetrics(
+        sample_size=max(2048, profile.events * (profile.makers + 2))
+    )
+    service = NotificationService(
+        SimpleNamespace(admins=[], notifier_url=None),
+        pool,  # type: ignore[arg-type]
+        bot,
+        localization,
+        Dispatcher(),
+        RedisNotificationHistoryService(redis, key_prefix=KEY_PREFIX),
+        metrics=metrics,
+    )
+    store = NotificationRedisStore(
+        redis, hold_seconds=60, lock_ttl_seconds=30, key_prefix=KEY_PREFIX
+    )
+    coordinator = NotificationCoordinator(
+        store=store,
+        sender=service,
+        badge_refresher=NotificationBadgeService(bot=bot, redis=redis, store=store),
+        claim_store=store,
+        hold_seconds=60,
+        metrics=metrics,
+    )
+    service.set_notification_coordinator(coordinator)
+    worker_task = asyncio.create_task(
+        NotificationDeliveryWorker(
+            store=store,
+            coordinator=coordinator,
+            poll_interval_seconds=0.5,
+            batch_size=100,
+        ).run()
+    )
+
+    notifier = Keypair.random()
+    service._notifier_public_key = notifier.public_key
+    app = web.Application()
+    app.router.add_post("/webhook", service.handle_webhook)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    webhook_url = f"http://127.0.0.1:{port}/webhook"
+
+    payloads = PayloadFactory(accounts, profile)
+    failed_posts = 0
+
+    async def post(http: aiohttp.ClientSession, body: bytes) -> None:
+        nonlocal failed_posts
+        signature = base64.b64encode(notifier.sign(body)).decode()
+        async with http.post(
+            webhook_url,
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-Request-ED25519-Signature": signature,
+            },
+        ) as response:
+            await response.read()
+            if response.status != 200:
+                failed_posts += 1
+
+    started = time.perf_counter()
+    try:
+        async with aiohttp.ClientSession() as http:
+            posts: list[asyncio.Task[None]] = []
+            for index in range(profile.events):
+                delay = started + index / profile.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                body = json.dumps(payloads.next()).encode()
+                posts.append(asyncio.create_task(post(http, body)))
+            await asyncio.gather(*posts)
+        post_seconds = time.perf_counter() - started
+
+        # Drained once nothing was delivered for drain_seconds.
+        deadline = started + profile.timeout_seconds
+        while time.perf_counter() < deadline:
+            last = max(telegram.last_delivery_at, started + post_seconds)
+            if time.perf_counter() - last >= profile.drain_seconds:
+                break
+            await asyncio.sleep(0.1)
+        finished = telegram.last_delivery_at or time.perf_counter()
+    finally:
+        worker_task.cancel()
+        await asyncio.gather(worker_task, return_exceptions=True)
+        await runner.cleanup()
+        if send_scheduler is not None:
+            await send_scheduler.close()
+        await bot.session.close()
+        await telegram.stop()
+        await engine.dispose()
+
+    stages = metrics.as_dict()
+    ordered = {
+        name: stages.pop(name)
+        for name in (STAGE_WEBHOOK, STAGE_LEDGER_TO_DELIVERED)
+        if name in stages
+    }
+    ordered.update(stages)
+    return LoadReport(
+        profile=profile,
+        posted=profile.events,
+        failed_posts=failed_posts,
+        delivered=telegram.delivered,
+        rate_limited=telegram.rate_limited,
+        post_seconds=post_seconds,
+        total_seconds=max(finished - started, post_seconds),
+        redis_round_trips=redis_round_trips(),
+        db_statements=pool.statements - statements_before,
+        stages=ordered,
+    )
+
+
+def _fmt(value: float | int | None) -> str:
+    return f"{value:7.1f}" if value is not None else "      -"
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = LoadProfile()
+    parser.add_argument("--events", type=int, default=defaults.events)
+    parser.add_argument("--rate", type=float, default=defaults.rate)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--makers", type=int, default=defaults.makers)
+    parser.add_argument("--trade-share", type=float, default=defaults.trade_share)
+    parser.add_argument("--self-share", type=float, default=defaults.self_share)
+    parser.add_argument("--chat-rate", type=float, default=defaults.chat_rate)
+    parser.add_argument("--global-rate", type=float, default=defaults.global_rate)
+    parser.add_argument("--send-scheduler", action="store_true")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--redis-url")
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///:memory:")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    # The retry middleware logs every 429 through stdlib logging.
+    logging.basicConfig(level=args.log_level)
+    logging.getLogger("middleware.retry").setLevel(logging.CRITICAL)
+    profile = LoadProfile(
+        events=args.events,
+        rate=args.rate,
+        users=args.users,
+        makers=args.makers,
+        trade_share=args.trade_share,
+        self_share=args.self_share,
+        chat_rate=args.chat_rate,
+        global_rate=args.global_rate,
+        send_scheduler=args.send_scheduler,
+        seed=args.seed,
+    )
+    if args.redis_url:
+        from redis.asyncio import Redis
+
+        redis = Redis.from_url(args.redis_url, decode_responses=True)
+    else:
+        import fakeredis.aioredis
+
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    try:
+        report = await run_load(profile, redis=redis, database_url=args.database_url)
+    finally:
+        await redis.aclose()
+    print(report.as_text())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,193 @@
+"""Fail when a hot repository query reads a whole table.
+
+Usage:
+    uv run python scripts/query_plan_audit.py
+
+Run it against a populated test database, after ``scripts/create_indexes.py``.
+The script takes the user and public key of one stored wallet and runs each
+hot query with them, mostly through the repositories. It records the SQL
+that reaches the driver and gets the plan of every statement. On Firebird
+the plan comes from preparing the statement, and a ``NATURAL`` table is a
+full scan. On SQLite it comes from ``EXPLAIN QUERY PLAN``, and a ``SCAN`` of
+a table is a full scan. The exit status is 1 if any hot query does a full
+scan.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from db.models import MyMtlWalletBot, MyMtlWalletBotLog  # noqa: E402
+from infrastructure.persistence.sqlalchemy_message_repository import (  # noqa: E402
+    SqlAlchemyMessageRepository,
+)
+from infrastructure.persistence.sqlalchemy_notification_repository import (  # noqa: E402
+    SqlAlchemyNotificationRepository,
+)
+from infrastructure.persistence.sqlalchemy_wallet_repository import (  # noqa: E402
+    SqlAlchemyWalletRepository,
+)
+
+_FIREBIRD_NATURAL = re.compile(r'([\w$"]+) NATURAL')
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+
+@dataclass(frozen=True)
+class Sample:
+    user_id: int
+    public_key: str
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    name: str
+    run: Callable[[AsyncSession, Sample], Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class PlanReport:
+    query: str
+    statement: str
+    plan: str
+    full_scans: tuple[str, ...]
+
+
+async def _log_activity(session: AsyncSession, sample: Sample) -> None:
+    since = datetime.now() - timedelta(days=1)
+    await session.execute(
+        select(func.count(MyMtlWalletBotLog.user_id.distinct())).where(
+            MyMtlWalletBotLog.log_dt > since
+        )
+    )
+
+
+HOT_QUERIES = (
+    HotQuery(
+        "wallet by public key",
+        lambda session, sample: SqlAlchemyWalletRepository(session).get_by_public_key(
+            sample.public_key
+        ),
+    ),
+    HotQuery(
+        "default wallet",
+        lambda session, sample: SqlAlchemyWalletRepository(session).get_default_wallet(
+            sample.user_id
+        ),
+    ),
+    HotQuery(
+        "notification filters of user",
+        lambda session, sample: SqlAlchemyNotificationRepository(
+            session
+        ).get_by_user_id(sample.user_id),
+    ),
+    HotQuery(
+        "unsent messages",
+        lambda session, sample: SqlAlchemyMessageRepository(session).get_unsent(),
+    ),
+    HotQuery("log activity of the last day", _log_activity),
+)
+
+
+def firebird_full_scans(plan: str) -> tuple[str, ...]:
+    return tuple(name.strip('"') for name in _FIREBIRD_NATURAL.findall(plan))
+
+
+def sqlite_full_scans(plan: str) -> tuple[str, ...]:
+    scans = []
+    for line in plan.splitlines():
+        match = _SQLITE_SCAN.match(line.strip())
+        if match and match.group(1) != "CONSTANT":
+            scans.append(match.group(1))
+    return tuple(scans)
+
+
+async def _statement_plan(
+    session: AsyncSession, statement: str, parameters: Any
+) -> tuple[str, tuple[str, ...]]:
+    connection = await session.connection()
+    if connection.dialect.name == "sqlite":
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        )
+        plan = "\n".join(str(row[-1]) for row in result)
+        return plan, sqlite_full_scans(plan)
+    if not connection.dialect.name.startswith("firebird"):
+        raise ValueError(f"plans are not supported for {connection.dialect.name}")
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    if driver_connection is None:
+        raise ValueError("the pooled connection has no open driver connection")
+    cursor = driver_connection.cursor()
+    try:
+        prepared = cursor.prepare(statement)
+        plan = prepared.plan or ""
+        prepared.free()
+    finally:
+        cursor.close()
+    return plan, firebird_full_scans(plan)
+
+
+async def _pick_sample(session: AsyncSession) -> Sample:
+    row = (
+        await session.execute(
+            select(MyMtlWalletBot.user_id, MyMtlWalletBot.public_key).limit(1)
+        )
+    ).first()
+    if row is None:
+        raise ValueError("the database has no wallets; populate it first")
+    return Sample(user_id=row.user_id, public_key=row.public_key)
+
+
+async def audit(
+    session: AsyncSession, queries: tuple[HotQuery, ...] = HOT_QUERIES
+) -> list[PlanReport]:
+    """Run every hot query and return the plan of each statement it sent."""
+    sample = await _pick_sample(session)
+    sync_engine = (await session.connection()).engine.sync_engine
+    reports = []
+    for query in queries:
+        statements: list[tuple[str, Any]] = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(sync_engine, "before_cursor_execute", record)
+        try:
+            await query.run(session, sample)
+        finally:
+            event.remove(sync_engine, "before_cursor_execute", record)
+        for statement, parameters in statements:
+            plan, full_scans = await _statement_plan(session, statement, parameters)
+            reports.append(PlanReport(query.name, statement, plan, full_scans))
+    await session.rollback()
+    return reports
+
+
+async def main() -> int:
+    from db.db_pool import db_pool
+
+    async with db_pool.get_session() as session:
+        reports = await audit(session)
+    failed = False
+    for report in reports:
+        status = "FULL SCAN" if report.full_scans else "ok"
+        print(f"{report.query}: {status}")
+        print(f"  {' '.join(report.statement.split())}")
+        print(f"  {report.plan}")
+        failed = failed or bool(report.full_scans)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,105 @@
+"""Measure UI markup lock wait times and Redis traffic under contention.
+
+Usage:
+    uv run python scripts/ui_markup_lock_benchmark.py [--instances 2]
+        [--contenders 20] [--hold-ms 20] [--rounds 5]
+        [--redis-url redis://localhost:6379/15]
+
+Each round starts ``contenders`` tasks spread over ``instances`` badge
+services that share one Redis. Every task takes the same user's lock and holds
+it for ``hold-ms``. The report lists the time from request to acquisition, and
+the Redis commands sent per acquisition.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from infrastructure.services.notification_badge_service import (  # noqa: E402
+    NotificationBadgeService,
+)
+from infrastructure.services.notification_metrics import StageHistogram  # noqa: E402
+from infrastructure.services.notification_redis_store import (  # noqa: E402
+    NotificationRedisStore,
+)
+from scripts.notification_load_test import count_redis_round_trips  # noqa: E402
+
+USER_ID = 42
+
+
+async def run_benchmark(
+    redis, *, instances: int, contenders: int, hold_seconds: float, rounds: int
+) -> tuple[StageHistogram, float]:
+    """Return the wait histogram and Redis commands per acquisition."""
+    round_trips = count_redis_round_trips(redis)
+    store = NotificationRedisStore(redis, hold_seconds=120, lock_ttl_seconds=30)
+    services = [
+        NotificationBadgeService(bot=MagicMock(), redis=redis, store=store)
+        for _ in range(instances)
+    ]
+    waits = StageHistogram(sample_size=contenders * rounds)
+
+    async def contend(service: NotificationBadgeService) -> None:
+        requested = time.perf_counter()
+        async with service.ui_markup_lock(USER_ID):
+            waits.observe(time.perf_counter() - requested)
+            await asyncio.sleep(hold_seconds)
+
+    before = round_trips()
+    for _ in range(rounds):
+        await asyncio.gather(
+            *(contend(services[index % instances]) for index in range(contenders))
+        )
+    return waits, (round_trips() - before) / (contenders * rounds)
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--instances", type=int, default=2)
+    parser.add_argument("--contenders", type=int, default=20)
+    parser.add_argument("--hold-ms", type=float, default=20.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--redis-url")
+    args = parser.parse_args()
+
+    if args.redis_url:
+        from redis.asyncio import Redis
+
+        redis = Redis.from_url(args.redis_url, decode_responses=True)
+    else:
+        import fakeredis.aioredis
+
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    try:
+        waits, commands = await run_benchmark(
+            redis,
+            instances=args.instances,
+            contenders=args.contenders,
+            hold_seconds=args.hold_ms / 1000,
+            rounds=args.rounds,
+        )
+    finally:
+        await redis.aclose()
+
+    summary = waits.as_dict()
+    print(
+        f"UI markup lock, {args.instances} instances x {args.contenders} contenders, "
+        f"hold {args.hold_ms:g} ms, {args.rounds} rounds"
+    )
+    print(
+        f"  wait p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, "
+        f"max {summary['max_ms']} ms"
+    )
+    print(f"  Redis commands per acquisition: {commands:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
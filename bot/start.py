@@ -14,6 +14,7 @@ from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.client.telegram import TelegramAPIServer
 
 from middleware.retry import RetryRequestMiddleware
+from middleware.send_scheduler import SendSchedulerRequestMiddleware
 from routers.inout import usdt_worker
 from routers.monitoring import register_handlers
 import sentry_sdk
@@ -33,9 +34,10 @@ from sqlalchemy.orm import sessionmaker
 from sulguk import AiogramSulgukMiddleware  # type: ignore[import-untyped]
 from other.config_reader import config
 from middleware.db import DbSessionMiddleware
+from middleware.fsm_cache import FSMUpdateCacheMiddleware
 from middleware.old_buttons import CheckOldButtonCallbackMiddleware
 from middleware.notification_activity import NotificationActivityMiddleware
-from middleware.log import LogButtonClickCallbackMiddleware, log_worker
+from middleware.log import LogButtonClickCallbackMiddleware
 from routers.cheque import cheque_worker
 from routers import (
     add_wallet,
@@ -102,6 +104,13 @@ async def bot_add_routers(
 ):
     bot.session.middleware(AiogramSulgukMiddleware())
 
+    # Runs inside aiogram's FSM middleware, so every event middleware and
+    # handler shares one cached FSM record per update.
+    fsm_cache = FSMUpdateCacheMiddleware()
+    dp.update.outer_middleware(fsm_cache)
+    if app_context.notification_service:
+        app_context.notification_service.set_fsm_stats(fsm_cache.stats)
+
     # DI Middlewares
     dp.message.middleware(AppContextMiddleware(app_context))
     dp.callback_query.middleware(AppContextMiddleware(app_context))
@@ -224,14 +233,15 @@ async def on_startup(bot: Bot, dispatcher: Dispatcher):
     if config.test_mode:
         task_list = [
             # asyncio.create_task(cheque_worker(app_context)),
-            # asyncio.create_task(log_worker(app_context)),
             # asyncio.create_task(events_worker(global_data.db_pool, dp=dispatcher)),
         ]
     else:
         # Import db_pool here? accessing from app_context.db_pool
         task_list = [
             asyncio.create_task(cheque_worker(app_context)),
-            asyncio.create_task(log_worker(app_context)),
+            asyncio.create_task(
+                app_context.log_writer.run(), name="callback-log-writer"
+            ),
             asyncio.create_task(usdt_worker(bot, app_context)),
         ]
 
@@ -251,6 +261,28 @@ async def on_startup(bot: Bot, dispatcher: Dispatcher):
             )
         )
 
+    notification_ingest_worker = getattr(
+        app_context, "notification_ingest_worker", None
+    )
+    if notification_ingest_worker:
+        task_list.append(
+            asyncio.create_task(
+                notification_ingest_worker.run(),
+                name="notification-ingest-worker",
+            )
+        )
+
+    notification_compaction_worker = getattr(
+        app_context, "notification_compaction_worker", None
+    )
+    if notification_compaction_worker:
+        task_list.append(
+            asyncio.create_task(
+                notification_compaction_worker.run(),
+                name="notification-compaction-worker",
+            )
+        )
+
     dispatcher["task_list"] = task_list
 
 
@@ -274,6 +306,9 @@ async def on_shutdown_dispatcher(dispatcher: Dispatcher, bot: Bot):
                     "background task stopped with an error"
                 )
 
+    if not config.test_mode:
+        await app_context.log_writer.stop()
+
     if app_context.notification_redis:
         await app_context.notification_redis.aclose()  # type: ignore[attr-defined]
 
@@ -302,6 +337,24 @@ async def main():
         logger.info(f"Using custom Telegram Bot API server: {config.telegram_api_url}")
     session: AiohttpSession = AiohttpSession(**session_kwargs)
     session.middleware(RetryRequestMiddleware())
+    # Shared Redis client; closed in on_shutdown_dispatcher.
+    notification_redis = Redis.from_url(config.redis_url, decode_responses=True)
+    if config.telegram_send_scheduler_enabled:
+        from infrastructure.services.telegram_send_scheduler import (
+            RedisSendBuckets,
+            TelegramSendScheduler,
+        )
+
+        send_buckets = RedisSendBuckets(
+            notification_redis,
+            global_rate=config.telegram_global_send_rate,
+            chat_rate=config.telegram_chat_send_rate,
+            chat_burst=config.telegram_chat_send_burst,
+        )
+        # Inner to the retry middleware: every retry takes a fresh slot.
+        session.middleware(
+            SendSchedulerRequestMiddleware(TelegramSendScheduler(send_buckets))
+        )
     if config.test_mode:
         bot = Bot(
             token=config.test_bot_token.get_secret_value(),
@@ -325,10 +378,11 @@ async def main():
 
     # Create Queues
     cheque_queue = asyncio.Queue()
-    log_queue = asyncio.Queue()
 
     # Initialize Services
     from infrastructure.services.app_context import AppContext
+    from infrastructure.workers.log_writer import CallbackLogWriter
+    from infrastructure.workers.message_worker import MessageOutbox, OutboxClaimLeases
     from infrastructure.services.localization_service import LocalizationService
     from infrastructure.persistence.repository_factory import (
         SqlAlchemyRepositoryFactory,
@@ -345,18 +399,45 @@ async def main():
     )
     from infrastructure.services.notification_coordinator import NotificationCoordinator
     from infrastructure.services.notification_redis_store import NotificationRedisStore
+    from infrastructure.services.notification_subscription_sync import (
+        SubscriptionSyncStateStore,
+    )
+    from infrastructure.services.notification_shard_leases import (
+        NotificationShardLeases,
+    )
     from infrastructure.services.notification_badge_service import (
         NotificationBadgeService,
     )
     from infrastructure.workers.notification_delivery_worker import (
         NotificationDeliveryWorker,
     )
+    from infrastructure.services.notification_ingest_stream import (
+        NotificationIngestStream,
+    )
+    from infrastructure.workers.notification_ingest_worker import (
+        NotificationIngestWorker,
+    )
+    from infrastructure.workers.notification_compaction_worker import (
+        NotificationCompactionWorker,
+    )
     from infrastructure.services.bot_health_service import BotHealthService
+    from infrastructure.services.adaptive_concurrency import (
+        AdaptiveConcurrencyLimiter,
+    )
 
     localization_service = LocalizationService(db_pool)
     await localization_service.load_languages(f"{config.start_path}/langs/")
 
-    repository_factory = SqlAlchemyRepositoryFactory()
+    from infrastructure.services.activity_rollups import ActivityRollups
+    from infrastructure.services.profile_cache import ProfileCache
+
+    activity_rollups = ActivityRollups(notification_redis)
+    profile_cache = ProfileCache(
+        notification_redis,
+        ttl_seconds=config.profile_cache_ttl_seconds,
+        local_entries=config.profile_cache_local_entries,
+    )
+    repository_factory = SqlAlchemyRepositoryFactory(profile_cache=profile_cache)
     stellar_service = StellarService(horizon_url=config.horizon_url)
     encryption_service = EncryptionService()
     stellar_sealedbox_service = StellarSealedBoxService()
@@ -371,10 +452,12 @@ async def main():
     )
 
     from infrastructure.services.notification_history_service import (
-        NotificationHistoryService,
+        RedisNotificationHistoryService,
     )
 
-    notification_history = NotificationHistoryService(ttl_hours=12, max_per_user=50)
+    notification_history = RedisNotificationHistoryService(
+        notification_redis, ttl_hours=12, max_per_user=50
+    )
     bot_health_service = BotHealthService(db_pool=db_pool)
 
     notification_service = NotificationService(
@@ -385,35 +468,99 @@ async def main():
         dp,
         notification_history,
         bot_health_service=bot_health_service,
+        webhook_limiter=AdaptiveConcurrencyLimiter(
+            initial_limit=config.notification_webhook_initial_concurrency,
+            min_limit=config.notification_webhook_min_concurrency,
+            max_limit=config.notification_webhook_max_concurrency,
+            max_queue=config.notification_webhook_max_queue,
+            queue_timeout_seconds=config.notification_webhook_queue_timeout_seconds,
+            latency_target_seconds=config.notification_webhook_latency_target_seconds,
+        ),
+        profile_cache=profile_cache,
     )
-    notification_redis = Redis.from_url(config.redis_url, decode_responses=True)
     notification_store = NotificationRedisStore(
         notification_redis,
         hold_seconds=config.notification_hold_seconds,
         lock_ttl_seconds=30,
+        due_shards=config.notification_delivery_shards,
+        dedupe_buckets=config.notification_dedupe_buckets,
+        dedupe_false_positive_rate=config.notification_dedupe_false_positive_rate,
     )
     notification_badge_service = NotificationBadgeService(
-        bot=bot, redis=notification_redis, store=notification_store
+        bot=bot,
+        redis=notification_redis,
+        store=notification_store,
+        metrics=notification_service.metrics,
     )
     notification_coordinator = NotificationCoordinator(
         store=notification_store,
         sender=notification_service,
         badge_refresher=notification_badge_service,
+        claim_store=notification_store,
+        hold_seconds=config.notification_hold_seconds,
+        touch_debounce_fraction=config.notification_touch_debounce_fraction,
+        metrics=notification_service.metrics,
     )
     notification_service.set_notification_coordinator(notification_coordinator)
+    notification_service.set_subscription_sync(
+        notification_service.build_subscription_sync(
+            SubscriptionSyncStateStore(notification_redis)
+        )
+    )
+    notification_shard_leases = None
+    if config.notification_delivery_shards > 1:
+        notification_shard_leases = NotificationShardLeases(
+            notification_redis,
+            shard_count=config.notification_delivery_shards,
+            lease_seconds=config.notification_shard_lease_seconds,
+        )
     notification_delivery_worker = NotificationDeliveryWorker(
         store=notification_store,
         coordinator=notification_coordinator,
         poll_interval_seconds=config.notification_delivery_poll_interval_seconds,
         batch_size=config.notification_delivery_batch_size,
+        shard_leases=notification_shard_leases,
     )
+    notification_ingest_worker = None
+    if config.notification_ingest_consumers > 0:
+        notification_ingest_stream = NotificationIngestStream(
+            notification_redis, max_len=config.notification_ingest_max_len
+        )
+        notification_service.set_notification_ingest_stream(notification_ingest_stream)
+        notification_ingest_worker = NotificationIngestWorker(
+            stream=notification_ingest_stream,
+            processor=notification_service.process_notification,
+            consumers=config.notification_ingest_consumers,
+            batch_size=10,
+            claim_idle_seconds=config.notification_ingest_claim_idle_seconds,
+            max_deliveries=config.notification_ingest_max_deliveries,
+        )
+
+    notification_compaction_worker = None
+    if config.notification_compaction_interval_seconds > 0:
+        notification_compaction_worker = NotificationCompactionWorker(
+            store=notification_store,
+            interval_seconds=config.notification_compaction_interval_seconds,
+            max_length=config.notification_compaction_max_length,
+            keep_latest=config.notification_compaction_keep_latest,
+            max_age_seconds=config.notification_compaction_max_age_seconds,
+            summary_text=lambda user_id, archived: localization_service.get_text(
+                user_id, "notification_queue_compacted", (archived,)
+            ),
+        )
 
     app_context = AppContext(
         bot=bot,
         db_pool=db_pool,
         admin_id=config.admins[0],
         cheque_queue=cheque_queue,
-        log_queue=log_queue,
+        log_writer=CallbackLogWriter(
+            db_pool,
+            batch_size=config.log_writer_batch_size,
+            flush_interval_seconds=config.log_writer_flush_interval_seconds,
+            max_pending=config.log_writer_max_pending,
+            rollups=activity_rollups,
+        ),
         repository_factory=repository_factory,
         stellar_service=stellar_service,
         ton_service=ton_service,
@@ -428,8 +575,22 @@ async def main():
         notification_store=notification_store,
         notification_delivery_worker=notification_delivery_worker,
         notification_badge_service=notification_badge_service,
+        notification_ingest_worker=notification_ingest_worker,
+        notification_compaction_worker=notification_compaction_worker,
         bot_health_service=bot_health_service,
         stellar_sealedbox_service=stellar_sealedbox_service,
+        message_outbox=MessageOutbox(
+            db_pool,
+            batch_size=config.message_outbox_batch_size,
+            concurrency=config.message_outbox_concurrency,
+            max_run_seconds=config.message_outbox_max_run_seconds,
+            skip_locked=config.message_outbox_skip_locked,
+            leases=OutboxClaimLeases(
+                notification_redis,
+                lease_seconds=config.message_outbox_claim_lease_seconds,
+            ),
+        ),
+        activity_rollups=activity_rollups,
     )
 
     dp["app_context"] = app_context
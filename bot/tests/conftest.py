@@ -88,6 +88,7 @@ def mock_app_context():
     # Optional production dependency: tests opt out explicitly instead of
     # allowing MagicMock to masquerade as an async badge service.
     ctx.notification_badge_service = None
+    ctx.notification_store = None
     return ctx
 
 
@@ -6,12 +6,19 @@ suite.  The test uses a unique key prefix and removes all keys it creates.
 
 import os
 import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from redis.asyncio import Redis
+from redis.exceptions import ResponseError
 
 from core.models.blockchain_notification import BlockchainNotification
-from infrastructure.services.notification_redis_store import NotificationRedisStore
+from infrastructure.services.notification_redis_store import (
+    NotificationClaim,
+    NotificationRedisStore,
+)
 
 
 pytestmark = pytest.mark.external
@@ -44,10 +51,12 @@ async def redis_store() -> NotificationRedisStore:
         await redis.aclose()
 
 
-def _notification(transaction_hash: str = "tx-1") -> BlockchainNotification:
+def _notification(
+    transaction_hash: str = "tx-1", user_id: int = 42
+) -> BlockchainNotification:
     return BlockchainNotification(
         notification_id=f"notification-{transaction_hash}",
-        user_id=42,
+        user_id=user_id,
         event_type="payment",
         text="First payment",
         created_at=1_720_000_000,
@@ -57,6 +66,53 @@ def _notification(transaction_hash: str = "tx-1") -> BlockchainNotification:
     )
 
 
+async def _state(store: NotificationRedisStore) -> dict[str, tuple[Any, bool]]:
+    """Every key under the store prefix, with its value and whether it expires."""
+    redis = store._redis
+    state: dict[str, tuple[Any, bool]] = {}
+    for key in await redis.keys(f"{store._key_prefix}*"):
+        kind = await redis.type(key)
+        if kind == "list":
+            value: Any = await redis.lrange(key, 0, -1)
+        elif kind == "set":
+            value = await redis.smembers(key)
+        elif kind == "zset":
+            value = await redis.zrange(key, 0, -1, withscores=True)
+        else:
+            value = await redis.get(key)
+        state[key.removeprefix(store._key_prefix)] = (value, await redis.ttl(key) > 0)
+    return state
+
+
+async def _assert_lua_matches_fallback(
+    redis_store: NotificationRedisStore,
+    scenario: Callable[[NotificationRedisStore], Awaitable[Any]],
+    **options: Any,
+) -> Any:
+    """Run ``scenario`` on the Lua scripts and on the WATCH fallbacks.
+
+    Both runs must return the same values and leave the same keys behind.
+    """
+    redis = redis_store._redis
+    stores = {
+        name: NotificationRedisStore(
+            redis,
+            hold_seconds=120,
+            lock_ttl_seconds=30,
+            key_prefix=f"{redis_store._key_prefix}{name}:",
+            **options,
+        )
+        for name in ("lua", "fallback")
+    }
+    lua_result = await scenario(stores["lua"])
+    unsupported = ResponseError("unknown command 'eval', with args beginning with:")
+    with patch.object(redis, "eval", AsyncMock(side_effect=unsupported)):
+        fallback_result = await scenario(stores["fallback"])
+    assert lua_result == fallback_result
+    assert await _state(stores["lua"]) == await _state(stores["fallback"])
+    return lua_result
+
+
 @pytest.mark.asyncio
 async def test_real_redis_lua_paths_preserve_due_and_pending_invariants(
     redis_store: NotificationRedisStore,
@@ -64,7 +120,7 @@ async def test_real_redis_lua_paths_preserve_due_and_pending_invariants(
     redis = redis_store._redis
     hold_until = await redis_store.touch(42, now=1_000)
     assert hold_until == 1_120
-    assert await redis.zscore(redis_store._due_key(), "42") == 1_120
+    assert await redis.zscore(redis_store._due_key(42), "42") == 1_120
     assert (
         await redis_store.release_due_hold_if_unchanged(42, hold_until - 1, now=1_120)
         is False
@@ -104,12 +160,12 @@ async def test_real_redis_lua_paths_preserve_due_and_pending_invariants(
     )
     assert await redis_store.release_lock(42, "owner-token") is True
 
-    await redis.zadd(redis_store._due_key(), {"1": 1_000, "42": 1_000})
+    await redis.zadd(redis_store._due_key(42), {"1": 1_000, "42": 1_000})
     await redis.set(redis_store._hold_key(42), 1_120)
 
     assert await redis_store.due_users(now=1_000) == []
-    assert await redis.zscore(redis_store._due_key(), "1") is None
-    assert await redis.zscore(redis_store._due_key(), "42") == 1_120
+    assert await redis.zscore(redis_store._due_key(42), "1") is None
+    assert await redis.zscore(redis_store._due_key(42), "42") == 1_120
     assert await redis_store.release_hold_if_unchanged(42, 1_120, now=1_120) is True
 
     event = _notification()
@@ -177,12 +233,210 @@ async def test_real_redis_lua_due_scan_cleans_a_stale_prefix_without_starving_du
 ) -> None:
     redis = redis_store._redis
     await redis.zadd(
-        redis_store._due_key(), {str(user_id): 1_000 for user_id in range(1, 8)}
+        redis_store._due_shard_key(0), {str(user_id): 1_000 for user_id in range(1, 8)}
     )
-    await redis.zadd(redis_store._due_key(), {"90": 1_000, "91": 1_000})
+    await redis.zadd(redis_store._due_shard_key(0), {"90": 1_000, "91": 1_000})
     await redis.set(redis_store._hold_key(90), 1_000)
     await redis.set(redis_store._hold_key(91), 1_000)
 
     assert await redis_store.due_users(now=1_000, limit=2) == [90, 91]
-    assert await redis.zscore(redis_store._due_key(), "1") is None
-    assert await redis.zscore(redis_store._due_key(), "7") is None
+    assert await redis.zscore(redis_store._due_shard_key(0), "1") is None
+    assert await redis.zscore(redis_store._due_shard_key(0), "7") is None
+
+
+@pytest.mark.asyncio
+async def test_real_redis_lua_sharded_due_scan_drains_legacy_entries_from_shard_zero(
+    redis_store: NotificationRedisStore,
+) -> None:
+    redis = redis_store._redis
+    store = NotificationRedisStore(
+        redis,
+        hold_seconds=120,
+        lock_ttl_seconds=30,
+        key_prefix=redis_store._key_prefix,
+        due_shards=4,
+    )
+    for user_id in (5, 6, 9):
+        event = _notification(f"tx-{user_id}", user_id)
+        assert await store.claim_accept(user_id, event, now=1_000) == "direct"
+    # Scheduled by an instance that ran before sharding was enabled: 8 still
+    # has pending work, 12 is a stale entry without a hold or a queue.
+    await store.enqueue(8, _notification("tx-legacy", 8))
+    await redis.zadd(store._legacy_due_key(), {"8": 1_000, "12": 1_000})
+
+    assert await redis.zrange(store._due_shard_key(1), 0, -1) == ["5", "9"]
+    assert await store.due_users(now=1_000, shards=[1]) == [5, 9]
+    assert await store.due_users(now=1_000, shards=[2]) == [6]
+    assert await store.due_users(now=1_000, shards=[1, 2]) == [5, 9, 6]
+    assert await store.due_users(now=1_000, shards=[0]) == [8]
+    assert await redis.zscore(store._legacy_due_key(), "12") is None
+    assert await store.due_users(now=1_000, shards=[0, 1]) == [5, 9, 8]
+    assert await store.due_users(now=1_000) == [5, 9, 6, 8]
+    assert await store.due_users(now=1_000, limit=2) == [5, 9]
+
+
+@pytest.mark.asyncio
+async def test_real_redis_lua_claim_next_matches_the_watch_fallback(
+    redis_store: NotificationRedisStore,
+) -> None:
+    events = [_notification(f"tx-{index}") for index in range(3)]
+
+    async def scenario(store: NotificationRedisStore) -> list[NotificationClaim]:
+        for event in events:
+            await store.enqueue(42, event, now=1_000)
+        await store.acquire_lock(42, "token")
+        await store.touch(42, now=1_000)
+        claims = [
+            await store.claim_next(42, "token", now=1_100, check_hold=True, limit=2),
+            await store.claim_next(42, "token", now=1_120, check_hold=True, limit=2),
+            await store.claim_next(42, "other", now=1_120, check_hold=True, limit=2),
+        ]
+        await store.set_digest_enabled(42, True)
+        claims.append(
+            await store.claim_next(42, "token", now=1_120, check_hold=False, limit=2)
+        )
+        return claims
+
+    held, ready, lost, digest = await _assert_lua_matches_fallback(
+        redis_store, scenario
+    )
+
+    assert held == NotificationClaim("held", hold_until=1_120)
+    assert ready == NotificationClaim("ready", events[:1], hold_until=1_120)
+    assert lost == NotificationClaim("lost")
+    assert digest == NotificationClaim("ready", events[:2], digest=True)
+
+
+@pytest.mark.asyncio
+async def test_real_redis_lua_acknowledge_and_claim_next_matches_the_watch_fallback(
+    redis_store: NotificationRedisStore,
+) -> None:
+    events = [_notification(f"tx-{index}") for index in range(4)]
+
+    async def scenario(
+        store: NotificationRedisStore,
+    ) -> list[NotificationClaim | None]:
+        for event in events:
+            await store.enqueue(42, event, now=1_000)
+        await store.acquire_lock(42, "token")
+        await store.set_digest_enabled(42, True)
+        claims = [
+            await store.acknowledge_and_claim_next(
+                42, events[1:2], "token", now=1_000, check_hold=False, limit=2
+            ),
+            await store.acknowledge_and_claim_next(
+                42, events[:1], "other", now=1_000, check_hold=False, limit=2
+            ),
+            await store.acknowledge_and_claim_next(
+                42, events[:1], "token", now=1_000, check_hold=False, limit=2
+            ),
+        ]
+        await store.touch(42, now=1_000)
+        claims.append(
+            await store.acknowledge_and_claim_next(
+                42, events[1:3], "token", now=1_000, check_hold=True, limit=2
+            )
+        )
+        return claims
+
+    stale, foreign, ready, held = await _assert_lua_matches_fallback(
+        redis_store, scenario
+    )
+
+    assert stale is None
+    assert foreign is None
+    assert ready == NotificationClaim("ready", events[1:3], digest=True)
+    assert held == NotificationClaim("held", hold_until=1_120)
+    assert await redis_store._redis.lrange(
+        f"{redis_store._key_prefix}lua:notification:pending:42", 0, -1
+    ) == [events[3].to_json()]
+
+
+@pytest.mark.asyncio
+async def test_real_redis_lua_dedupe_buckets_match_the_watch_fallback(
+    redis_store: NotificationRedisStore,
+) -> None:
+    event = _notification("tx-1")
+    legacy_event = _notification("tx-legacy")
+    accepted_event = _notification("tx-accepted")
+
+    async def scenario(store: NotificationRedisStore) -> list[bool | str]:
+        await store._redis.sadd(
+            store._legacy_dedupe_key(42), legacy_event.idempotency_key
+        )
+        results: list[bool | str] = [
+            await store.enqueue(42, event, now=1_000),
+            await store.enqueue(42, event, now=1_005),
+            await store.claim_accept(42, event, now=1_005),
+            await store.acknowledge(42, event),
+            # Bucket 100 closes at 1_010 and is still read for one window.
+            await store.enqueue(42, event, now=1_069),
+            await store.enqueue(42, event, now=1_070),
+            await store.enqueue(42, legacy_event, now=1_070),
+            await store.claim_accept(42, legacy_event, now=1_070),
+            await store.claim_accept(42, accepted_event, now=1_070),
+            await store.claim_accept(42, accepted_event, now=1_075),
+        ]
+        return results
+
+    results = await _assert_lua_matches_fallback(
+        redis_store, scenario, dedupe_ttl_seconds=60, dedupe_buckets=6
+    )
+
+    assert results == [
+        True,
+        False,
+        "duplicate",
+        True,
+        False,
+        True,
+        False,
+        "duplicate",
+        "direct",
+        "duplicate",
+    ]
+    bucket_key = f"{redis_store._key_prefix}lua:notification:dedupe:42:100"
+    assert 0 < await redis_store._redis.pttl(bucket_key) <= 70_000
+
+
+@pytest.mark.asyncio
+async def test_real_redis_lua_compaction_matches_the_watch_fallback(
+    redis_store: NotificationRedisStore,
+) -> None:
+    events = [_notification(f"tx-{index}") for index in range(4)]
+    summary = _notification("tx-summary")
+
+    async def scenario(
+        store: NotificationRedisStore,
+    ) -> tuple[list[bool], list[BlockchainNotification], list[BlockchainNotification]]:
+        for event in events:
+            await store.enqueue(42, event, now=1_000)
+        await store.acquire_lock(42, "token")
+        options = {"archive_max_length": 2, "archive_ttl_seconds": 60}
+        results = [
+            await store.compact_if_lock_owned(
+                42, events[:3], summary, "other", **options
+            ),
+            await store.compact_if_lock_owned(
+                42, events[1:4], summary, "token", **options
+            ),
+            await store.compact_if_lock_owned(
+                42, events[:3], summary, "token", **options
+            ),
+        ]
+        return results, await store.peek_many(42, 10), await store.archived(42, 10)
+
+    results, pending, archived = await _assert_lua_matches_fallback(
+        redis_store, scenario
+    )
+
+    assert results == [False, False, True]
+    assert pending == [summary, events[3]]
+    assert archived == events[1:3]
+    lua_prefix = f"{redis_store._key_prefix}lua:"
+    assert await redis_store._redis.smembers(
+        f"{lua_prefix}notification:pending_ids:42"
+    ) == {summary.idempotency_key, events[3].idempotency_key}
+    assert (
+        0 < await redis_store._redis.ttl(f"{lua_prefix}notification:archive:42") <= 60
+    )
@@ -0,0 +1,112 @@
+"""Tests for the Redis activity rollups behind /stats."""
+
+from datetime import datetime, timedelta
+
+import fakeredis.aioredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from db.models import Base, MyMtlWalletBot, MyMtlWalletBotUsers
+from infrastructure.log_models import LogQuery
+from infrastructure.services.activity_rollups import ActivityRollups
+
+NOW = datetime(2026, 10, 19, 12, 30)
+
+
+@pytest.fixture
+async def redis():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+def click(user_id: int, operation: str, *, ago: timedelta = timedelta()) -> LogQuery:
+    item = LogQuery(
+        user_id=user_id, log_operation="callback", log_operation_info=operation
+    )
+    item.log_dt = NOW - ago
+    return item
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reads_the_last_24_hours_and_7_days(redis):
+    rollups = ActivityRollups(redis, clock=lambda: NOW)
+
+    await rollups.record(
+        [
+            click(1, "Send"),
+            click(1, "Send"),
+            click(2, "Receive", ago=timedelta(hours=23)),
+            click(3, "Send", ago=timedelta(hours=25)),
+            click(4, "Swap", ago=timedelta(days=6)),
+            click(5, "Swap", ago=timedelta(days=7)),
+        ]
+    )
+    snapshot = await rollups.snapshot()
+
+    assert (snapshot.actions_24h, snapshot.users_24h) == (3, 2)
+    assert (snapshot.actions_7d, snapshot.users_7d) == (5, 4)
+    assert snapshot.top_operations_7d == [("Send", 3), ("Receive", 1), ("Swap", 1)]
+    assert snapshot.counting_since == snapshot.updated_at == NOW
+    assert (snapshot.totals, snapshot.totals_refreshed_at) == ({}, None)
+
+
+@pytest.mark.asyncio
+async def test_counting_since_keeps_the_first_record(redis):
+    current = [NOW]
+    rollups = ActivityRollups(redis, clock=lambda: current[0])
+    for moment in (NOW - timedelta(days=1), NOW):
+        current[0] = moment
+        await rollups.record([click(1, "Send")])
+
+    snapshot = await rollups.snapshot()
+    assert snapshot.counting_since == NOW - timedelta(days=1)
+    assert snapshot.updated_at == NOW
+
+
+@pytest.mark.asyncio
+async def test_refresh_totals_stores_table_counts(redis):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine)
+    async with sessions() as session:
+        session.add_all(
+            [
+                MyMtlWalletBotUsers(user_id=1, user_name="a"),
+                MyMtlWalletBotUsers(user_id=2, user_name="b"),
+                MyMtlWalletBot(user_id=1, public_key="G1"),
+            ]
+        )
+        await session.commit()
+    rollups = ActivityRollups(redis, clock=lambda: NOW)
+
+    async with sessions() as session:
+        await rollups.refresh_totals(session)
+    await engine.dispose()
+    snapshot = await rollups.snapshot()
+
+    assert snapshot.totals == {
+        "users": 2,
+        "wallets": 1,
+        "transactions": 0,
+        "cheques": 0,
+        "log": 0,
+    }
+    assert snapshot.totals_refreshed_at == NOW
+
+
+@pytest.mark.asyncio
+async def test_record_does_not_raise_when_redis_fails(redis, monkeypatch):
+    async def broken(*_args, **_kwargs):
+        raise RedisConnectionError("redis is down")
+
+    rollups = ActivityRollups(redis, clock=lambda: NOW)
+    pipeline = redis.pipeline(transaction=False)
+    monkeypatch.setattr(pipeline, "execute", broken)
+    monkeypatch.setattr(redis, "pipeline", lambda **_kwargs: pipeline)
+
+    await rollups.record([click(1, "Send")])
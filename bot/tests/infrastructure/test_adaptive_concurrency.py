@@ -0,0 +1,131 @@
+"""Tests for the AIMD webhook concurrency limiter."""
+
+import asyncio
+
+import pytest
+
+from infrastructure.services.adaptive_concurrency import (
+    AdaptiveConcurrencyLimiter,
+    ConcurrencyLimitExceeded,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def run(limiter: AdaptiveConcurrencyLimiter, clock: FakeClock, seconds: float):
+    async with limiter.slot():
+        clock.now += seconds
+
+
+@pytest.mark.asyncio
+async def test_fast_completions_raise_the_limit_additively():
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=6, clock=clock)
+
+    for _ in range(4):
+        await run(limiter, clock, 0.1)
+    assert limiter.limit == 4
+    for _ in range(40):
+        await run(limiter, clock, 0.1)
+
+    assert limiter.limit == 6
+
+
+@pytest.mark.asyncio
+async def test_slow_completions_back_off_once_per_target_interval():
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(
+        initial_limit=20, latency_target_seconds=1.0, backoff_ratio=0.5, clock=clock
+    )
+    finish = asyncio.Event()
+
+    async def slow() -> None:
+        async with limiter.slot():
+            await finish.wait()
+
+    # A burst of requests that all finish slowly is one congestion signal.
+    burst = [asyncio.create_task(slow()) for _ in range(3)]
+    await asyncio.sleep(0)
+    clock.now += 2.0
+    finish.set()
+    await asyncio.gather(*burst)
+    assert limiter.limit == 10
+
+    await run(limiter, clock, 1.5)
+    assert limiter.limit == 5
+
+
+@pytest.mark.asyncio
+async def test_failures_back_off_down_to_the_minimum():
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=2, clock=clock)
+
+    with pytest.raises(RuntimeError):
+        async with limiter.slot():
+            raise RuntimeError("db unavailable")
+
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_in_order_and_overflow_is_rejected():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1, max_queue=2)
+    release = asyncio.Event()
+    order: list[int] = []
+
+    async def worker(index: int) -> None:
+        async with limiter.slot():
+            order.append(index)
+            await release.wait()
+
+    tasks = [asyncio.create_task(worker(index)) for index in range(3)]
+    await asyncio.sleep(0)
+    assert (limiter.in_flight, limiter.queued) == (1, 2)
+
+    with pytest.raises(ConcurrencyLimitExceeded) as rejected:
+        async with limiter.slot():
+            pass
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert rejected.value.retry_after >= 1
+    assert order == [0, 1, 2]
+    assert limiter.as_dict()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_times_out_without_leaking_a_slot():
+    limiter = AdaptiveConcurrencyLimiter(
+        initial_limit=1, max_limit=1, queue_timeout_seconds=0.05
+    )
+    release = asyncio.Event()
+
+    async def hold() -> None:
+        async with limiter.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    with pytest.raises(ConcurrencyLimitExceeded):
+        async with limiter.slot():
+            pass
+    release.set()
+    await holder
+
+    assert (limiter.in_flight, limiter.queued, limiter.timed_out) == (0, 0, 1)
+    async with limiter.slot():
+        assert limiter.in_flight == 1
+
+
+def test_rejects_invalid_limits():
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(initial_limit=5, max_limit=4)
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyLimiter(backoff_ratio=1.0)
@@ -1,6 +1,12 @@
 from types import SimpleNamespace
 
+import pytest
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
 from db.db_pool import DbCheckoutTracker, db_checkout_owner
+from db.session import LazyAsyncSession
 
 
 class FakeClock:
@@ -50,3 +56,91 @@ def test_checkout_tracker_supports_checkout_without_asyncio_task() -> None:
     observation = tracker.finish(connection_record)
     assert observation is not None
     assert observation.task_name == "no-asyncio-task"
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Wallet(Base):
+    __tablename__ = "wallets"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str]
+
+
+@pytest.fixture
+async def lazy_sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    checked_out = []
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out.append(connection_record)
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        checked_out.remove(connection_record)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(Wallet).values(id=1, name="main"))
+    factory = async_sessionmaker(
+        bind=engine, expire_on_commit=False, class_=LazyAsyncSession
+    )
+    try:
+        yield factory, checked_out
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_lazy_session_returns_connection_after_a_read(lazy_sessions) -> None:
+    factory, checked_out = lazy_sessions
+    async with factory() as session:
+        assert checked_out == []
+        wallet = (await session.execute(select(Wallet))).scalar_one()
+
+        assert checked_out == []
+        assert wallet.name == "main"
+        assert await session.scalar(select(Wallet.name)) == "main"
+        assert (await session.get(Wallet, 1)) is wallet
+        assert checked_out == []
+
+
+@pytest.mark.asyncio
+async def test_lazy_session_keeps_connection_for_pending_writes(lazy_sessions) -> None:
+    factory, checked_out = lazy_sessions
+    async with factory() as session:
+        wallet = await session.get(Wallet, 1)
+        wallet.name = "renamed"
+        session.add(Wallet(id=2, name="second"))
+        await session.flush()
+        await session.execute(select(Wallet))
+
+        assert len(checked_out) == 1
+        await session.commit()
+        assert checked_out == []
+
+    async with factory() as session:
+        names = (await session.scalars(select(Wallet.name).order_by(Wallet.id))).all()
+    assert names == ["renamed", "second"]
+
+
+@pytest.mark.asyncio
+async def test_lazy_session_keeps_locking_and_explicit_transactions(
+    lazy_sessions,
+) -> None:
+    factory, checked_out = lazy_sessions
+    async with factory() as session:
+        await session.execute(select(Wallet).with_for_update())
+        assert len(checked_out) == 1
+        await session.rollback()
+
+        async with session.begin():
+            await session.execute(select(Wallet))
+            assert len(checked_out) == 1
+        assert checked_out == []
+
+        await session.execute(update(Wallet).values(name="updated"))
+        assert len(checked_out) == 1
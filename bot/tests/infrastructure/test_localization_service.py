@@ -0,0 +1,75 @@
+"""Tests for batched user language preload and the bounded language cache."""
+
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from db.models import Base, MyMtlWalletBotUsers
+from infrastructure.services.localization_service import (
+    LocalizationService,
+    UserLanguageCache,
+)
+
+
+class SqlitePool:
+    def __init__(self, engine) -> None:
+        self._sessions = async_sessionmaker(engine, class_=AsyncSession)
+        self.queries = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args) -> None:
+        self.queries += 1
+
+    @asynccontextmanager
+    async def get_session(self):
+        async with self._sessions() as session:
+            yield session
+
+
+@pytest.fixture
+async def pool():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine)() as session:
+        session.add_all(
+            [
+                MyMtlWalletBotUsers(user_id=1, lang="ru"),
+                MyMtlWalletBotUsers(user_id=2, lang="ua"),
+            ]
+        )
+        await session.commit()
+    yield SqlitePool(engine)
+    await engine.dispose()
+
+
+async def test_preload_resolves_uncached_users_with_one_query(pool):
+    service = LocalizationService(pool)
+    service.set_user_language(2, "en")
+    pool.queries = 0
+
+    await service.preload_user_languages([1, 2, 3])
+    await service.preload_user_languages([1, 2, 3])
+
+    assert pool.queries == 1
+    assert service.get_user_language(1) == "ru"
+    # Cached languages are not overwritten; unknown users are cached as English.
+    assert service.get_user_language(2) == "en"
+    assert service.get_user_language(3) == "en"
+    assert 3 in service.user_lang_cache
+
+
+def test_user_language_cache_is_bounded_and_expires():
+    now = [0.0]
+    cache = UserLanguageCache(max_size=2, ttl_seconds=10, clock=lambda: now[0])
+    cache.set(1, "ru")
+    cache.set(2, "ua")
+    assert cache.get(1) == "ru"
+    cache.set(3, "en")
+
+    assert cache.get(2) is None
+    assert len(cache) == 2
+    now[0] = 10.0
+    assert cache.get(1) is None
@@ -0,0 +1,219 @@
+"""Tests for callback log retention and its daily archive."""
+
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+
+import fakeredis.aioredis
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from db.models import Base, MyMtlWalletBotLog
+from infrastructure.services.log_archive import ArchivedLogRow, LogArchive
+from infrastructure.workers.log_retention_worker import (
+    CallbackLogRetention,
+    RetentionRunLease,
+    run_under_lease,
+)
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+class SqlitePool:
+    def __init__(self, engine) -> None:
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def get_session(self):
+        async with self.sessions() as session:
+            yield session
+
+    async def log_ids(self) -> list[int]:
+        async with self.sessions() as session:
+            result = await session.execute(
+                select(MyMtlWalletBotLog.log_id).order_by(MyMtlWalletBotLog.log_id)
+            )
+            return [log_id for log_id in result.scalars() if log_id is not None]
+
+
+@pytest.fixture
+async def pool():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine)() as session:
+        for log_id, (days_ago, user_id, operation) in enumerate(
+            [
+                (40, 1, "Send"),
+                (40, 2, "Receive"),
+                (35, 1, "Swap"),
+                (31, 3, "Send"),
+                (29, 1, "Send"),
+                (0, 2, "Receive"),
+            ],
+            start=1,
+        ):
+            session.add(
+                MyMtlWalletBotLog(
+                    log_id=log_id,
+                    user_id=user_id,
+                    log_dt=NOW - timedelta(days=days_ago, hours=log_id),
+                    log_operation="callback",
+                    log_operation_info=operation,
+                )
+            )
+        await session.commit()
+    try:
+        yield SqlitePool(engine)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_expired_rows_move_to_daily_files_in_batches(pool, tmp_path):
+    archive = LogArchive(tmp_path)
+    retention = CallbackLogRetention(
+        pool,
+        archive,
+        retention_days=30,
+        batch_size=3,
+        batch_pause_seconds=0,
+        clock=lambda: NOW,
+    )
+
+    result = await retention.run_once()
+
+    assert (result.archived, result.batches, result.complete) == (4, 2, True)
+    assert await pool.log_ids() == [5, 6]
+    assert [day for day, _, _ in archive.day_files()] == [
+        date(2026, 9, 9),
+        date(2026, 9, 14),
+        date(2026, 9, 18),
+    ]
+    rows = list(archive.read(date(2026, 9, 1), date(2026, 9, 30)))
+    assert sorted(row.log_id for row in rows) == [1, 2, 3, 4]
+    assert (result.sample.rows, result.sample.archived) == (2, 4)
+    assert archive.size_history() == [result.sample]
+
+
+@pytest.mark.asyncio
+async def test_run_stops_after_max_batches(pool, tmp_path):
+    retention = CallbackLogRetention(
+        pool,
+        LogArchive(tmp_path),
+        retention_days=30,
+        batch_size=1,
+        batch_pause_seconds=0,
+        max_batches=2,
+        clock=lambda: NOW,
+    )
+
+    result = await retention.run_once()
+
+    assert (result.archived, result.complete) == (2, False)
+    assert await pool.log_ids() == [3, 4, 5, 6]
+
+
+@pytest.mark.asyncio
+async def test_run_stops_before_its_time_budget_and_still_records_a_sample(
+    pool, tmp_path
+):
+    archive = LogArchive(tmp_path)
+    elapsed = [0.0]
+
+    def timer() -> float:
+        elapsed[0] += 25.0
+        return elapsed[0]
+
+    retention = CallbackLogRetention(
+        pool,
+        archive,
+        retention_days=30,
+        batch_size=1,
+        batch_pause_seconds=0,
+        max_run_seconds=45.0,
+        clock=lambda: NOW,
+        timer=timer,
+    )
+
+    result = await retention.run_once()
+
+    # Each batch takes 25 s; after the second, 50 s exceed the 45 s budget.
+    assert (result.archived, result.batches, result.complete) == (2, 2, False)
+    assert await pool.log_ids() == [3, 4, 5, 6]
+    assert archive.size_history() == [result.sample]
+    assert (result.sample.rows, result.sample.archived) == (4, 2)
+
+
+@pytest.mark.asyncio
+async def test_only_the_lease_holder_runs_retention(pool, tmp_path):
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    archive = LogArchive(tmp_path)
+    retention = CallbackLogRetention(
+        pool, archive, retention_days=30, batch_pause_seconds=0, clock=lambda: NOW
+    )
+    lease = RetentionRunLease(redis)
+    other_instance = RetentionRunLease(redis)
+    try:
+        token = await other_instance.acquire()
+        assert token is not None
+        assert await lease.acquire() is None
+
+        assert await run_under_lease(retention, lease) is None
+        assert await pool.log_ids() == [1, 2, 3, 4, 5, 6]
+        assert archive.size_history() == []
+
+        await other_instance.release(token)
+        result = await run_under_lease(retention, lease)
+
+        assert result is not None and result.archived == 4
+        assert await pool.log_ids() == [5, 6]
+        assert await redis.exists("callback_log_retention:lease") == 0
+    finally:
+        await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_lease_release_keeps_a_lease_taken_over_after_expiry():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    lease = RetentionRunLease(redis, lease_seconds=120)
+    try:
+        token = await lease.acquire()
+        assert token is not None
+        assert 0 < await redis.ttl("callback_log_retention:lease") <= 120
+        # The lease ran out and another instance took it.
+        await redis.set("callback_log_retention:lease", "other-token")
+
+        await lease.release(token)
+
+        assert await redis.get("callback_log_retention:lease") == "other-token"
+    finally:
+        await redis.aclose()
+
+
+def test_lease_rejects_a_non_positive_duration():
+    with pytest.raises(ValueError, match="lease_seconds"):
+        RetentionRunLease(fakeredis.aioredis.FakeRedis(), lease_seconds=0)
+
+
+def test_archive_read_filters_and_skips_rows_archived_twice(tmp_path):
+    archive = LogArchive(tmp_path)
+    day = date(2026, 1, 5)
+
+    def row(log_id: int, user_id: int, operation: str) -> ArchivedLogRow:
+        return ArchivedLogRow(
+            log_id=log_id,
+            user_id=user_id,
+            log_dt=datetime(2026, 1, 5, 10, log_id),
+            log_operation="callback",
+            log_operation_info=operation,
+        )
+
+    archive.append(day, [row(1, 7, "Send"), row(2, 8, "Send")])
+    # A crash after the append and before the delete archives rows again.
+    archive.append(day, [row(2, 8, "Send"), row(3, 7, "Swap")])
+
+    assert [r.log_id for r in archive.read(day, day)] == [1, 2, 3]
+    assert [r.log_id for r in archive.read(day, day, user_id=7)] == [1, 3]
+    assert [r.log_id for r in archive.read(day, day, operation="Send")] == [1, 2]
+    assert list(archive.read(date(2026, 1, 6), date(2026, 1, 9))) == []
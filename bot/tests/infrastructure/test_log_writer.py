@@ -0,0 +1,224 @@
+"""Tests for the batched callback log writer."""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from db.models import Base, MyMtlWalletBotLog
+from infrastructure.log_models import LogQuery
+from infrastructure.workers.log_writer import CallbackLogWriter
+
+
+class SqlitePool:
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+        self.inserts: list[bool] = []
+        self.fail = False
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT"):
+                if self.fail:
+                    raise RuntimeError("database is down")
+                self.inserts.append(executemany)
+
+    @asynccontextmanager
+    async def get_session(self):
+        async with self.sessions() as session:
+            yield session
+
+    async def operations(self) -> list[str]:
+        async with self.sessions() as session:
+            result = await session.execute(
+                select(MyMtlWalletBotLog.log_operation_info).order_by(
+                    MyMtlWalletBotLog.log_id
+                )
+            )
+            return list(result.scalars())
+
+
+@pytest.fixture
+async def pool():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    try:
+        yield SqlitePool(engine)
+    finally:
+        await engine.dispose()
+
+
+def click(index: int) -> LogQuery:
+    return LogQuery(
+        user_id=index, log_operation="callback", log_operation_info=f"b{index}"
+    )
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_written_with_one_executemany_insert(pool):
+    writer = CallbackLogWriter(pool, batch_size=3, flush_interval_seconds=60)
+    task = asyncio.create_task(writer.run())
+    try:
+        for index in range(3):
+            writer.put_nowait(click(index))
+        for _ in range(100):
+            if writer.written == 3:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+
+    assert await pool.operations() == ["b0", "b1", "b2"]
+    assert pool.inserts == [True]
+    assert writer.batches == 1
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_is_written_after_the_interval(pool):
+    writer = CallbackLogWriter(pool, batch_size=100, flush_interval_seconds=0.05)
+    task = asyncio.create_task(writer.run())
+    try:
+        writer.put_nowait(click(1))
+        await asyncio.sleep(0.2)
+    finally:
+        task.cancel()
+
+    assert await pool.operations() == ["b1"]
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_drops_oldest_and_stop_writes_the_rest(pool):
+    writer = CallbackLogWriter(pool, batch_size=2, max_pending=3)
+
+    for index in range(5):
+        writer.put_nowait(click(index))
+    await writer.stop()
+
+    assert await pool.operations() == ["b2", "b3", "b4"]
+    assert writer.as_dict() == {
+        "pending": 0,
+        "enqueued": 5,
+        "written": 3,
+        "dropped": 2,
+        "failed": 0,
+        "batches": 2,
+    }
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_requeued_and_written_on_the_next_flush(pool):
+    writer = CallbackLogWriter(pool, batch_size=2)
+    for index in range(3):
+        writer.put_nowait(click(index))
+    pool.fail = True
+
+    assert await writer.flush() == 0
+    assert (writer.failed, writer.as_dict()["pending"]) == (2, 3)
+
+    pool.fail = False
+    writer.put_nowait(click(3))
+    await writer.stop()
+    assert await pool.operations() == ["b0", "b1", "b2", "b3"]
+    assert (writer.written, writer.dropped) == (4, 0)
+
+
+@pytest.mark.asyncio
+async def test_run_backs_off_after_a_failed_batch(pool):
+    writer = CallbackLogWriter(pool, batch_size=2, flush_interval_seconds=0.1)
+    pool.fail = True
+    attempts = 0
+    sessions = pool.sessions
+
+    @asynccontextmanager
+    async def counting_session():
+        nonlocal attempts
+        attempts += 1
+        async with sessions() as session:
+            yield session
+
+    pool.get_session = counting_session
+    for index in range(2):
+        writer.put_nowait(click(index))
+    task = asyncio.create_task(writer.run())
+    try:
+        await asyncio.sleep(0.25)
+        assert 2 <= attempts <= 4
+        assert writer.as_dict()["pending"] == 2
+        pool.fail = False
+        for _ in range(100):
+            if writer.written == 2:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+
+    assert await pool.operations() == ["b0", "b1"]
+    assert writer.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_gives_up_when_the_database_stays_down(pool):
+    writer = CallbackLogWriter(pool, batch_size=2)
+    for index in range(3):
+        writer.put_nowait(click(index))
+    pool.fail = True
+
+    await writer.stop()
+
+    assert writer.as_dict()["pending"] == 0
+    assert (writer.failed, writer.dropped) == (2, 3)
+    async with pool.sessions() as session:
+        assert await session.scalar(select(func.count(MyMtlWalletBotLog.log_id))) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_flush_keeps_its_batch_for_stop(pool):
+    writer = CallbackLogWriter(pool, batch_size=2)
+    for index in range(3):
+        writer.put_nowait(click(index))
+    inserting = asyncio.Event()
+    sessions = pool.sessions
+
+    @asynccontextmanager
+    async def slow_session():
+        inserting.set()
+        await asyncio.Event().wait()
+        async with sessions() as session:
+            yield session
+
+    pool.get_session = slow_session
+    flush = asyncio.create_task(writer.flush())
+    await inserting.wait()
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+    del pool.get_session
+
+    assert writer.as_dict()["pending"] == 3
+    await writer.stop()
+    assert await pool.operations() == ["b0", "b1", "b2"]
+    assert (writer.written, writer.dropped) == (3, 0)
+
+
+class RecordingRollups:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    async def record(self, items) -> None:
+        self.batches.append([item.log_operation_info for item in items])
+
+
+@pytest.mark.asyncio
+async def test_written_batches_are_added_to_the_rollups(pool):
+    rollups = RecordingRollups()
+    writer = CallbackLogWriter(pool, batch_size=2, rollups=rollups)
+    for index in range(3):
+        writer.put_nowait(click(index))
+
+    await writer.stop()
+
+    assert rollups.batches == [["b0", "b1"], ["b2"]]
@@ -1,10 +1,27 @@
+import asyncio
 from contextlib import asynccontextmanager
 from types import SimpleNamespace
 
+import fakeredis.aioredis
 import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 import infrastructure.workers.message_worker as message_worker
-from infrastructure.workers.message_worker import cmd_send_message_1m
+from db.models import Base, MyMtlWalletBotMessages, MyMtlWalletBotUsers
+from infrastructure.persistence.sqlalchemy_message_repository import (
+    MESSAGE_CLAIMED,
+    MESSAGE_FAILED,
+    MESSAGE_SENT,
+    MESSAGE_UNSENT,
+    SqlAlchemyMessageRepository,
+)
+from infrastructure.workers.message_worker import (
+    MessageOutbox,
+    OutboxClaimLeases,
+    OutboxProgress,
+    cmd_send_message_1m,
+)
 
 
 class EmptyScalarResult:
@@ -16,6 +33,9 @@ class EmptyScalarResult:
 
 
 class EmptyMessageSession:
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="sqlite"))
+
     async def execute(self, _statement: object) -> EmptyScalarResult:
         return EmptyScalarResult()
 
@@ -55,11 +75,17 @@ class QueueSession:
         self._messages = messages
         self.commits = 0
 
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="sqlite"))
+
     async def execute(self, _statement: object):
         return SimpleNamespace(
             scalars=lambda: SimpleNamespace(all=lambda: self._messages)
         )
 
+    async def scalar(self, _statement: object) -> int:
+        return 0
+
     async def commit(self) -> None:
         self.commits += 1
 
@@ -115,3 +141,182 @@ async def test_message_worker_releases_read_session_before_external_io(
     assert db_pool.active_sessions == 0
     assert len(db_pool.opened_sessions) == 2
     assert db_pool.opened_sessions[1].commits == 1
+
+
+class SqliteDbPool:
+    def __init__(self, engine) -> None:
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def get_session(self):
+        async with self.sessions() as session:
+            yield session
+
+    async def states(self) -> dict[int, int]:
+        async with self.sessions() as session:
+            result = await session.execute(
+                select(MyMtlWalletBotMessages.user_id, MyMtlWalletBotMessages.was_send)
+            )
+            return dict(result.all())
+
+
+@pytest.fixture
+async def outbox_db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine)() as session:
+        for user_id in range(1, 8):
+            session.add(MyMtlWalletBotUsers(user_id=user_id, user_name=f"u{user_id}"))
+            session.add(
+                MyMtlWalletBotMessages(user_id=user_id, user_message=f"hi {user_id}")
+            )
+        await session.commit()
+    try:
+        yield SqliteDbPool(engine)
+    finally:
+        await engine.dispose()
+
+
+def outbox_app_context(db_pool):
+    return SimpleNamespace(
+        db_pool=db_pool,
+        bot=SimpleNamespace(id=1),
+        dispatcher=SimpleNamespace(storage=FakeStorage()),
+        bot_health_service=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_outbox_sends_concurrently_and_marks_results_in_bulk(
+    monkeypatch: pytest.MonkeyPatch, outbox_db
+) -> None:
+    in_flight = 0
+    peak = 0
+
+    async def send_message(_session, user_id, *_args, **_kwargs) -> None:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if user_id == 3:
+            raise RuntimeError("bot was blocked by the user")
+
+    monkeypatch.setattr(message_worker, "cmd_info_message", send_message)
+    outbox = MessageOutbox(outbox_db, batch_size=4, concurrency=3)
+
+    assert await outbox.drain(outbox_app_context(outbox_db)) == 7
+
+    assert peak == 3
+    assert await outbox_db.states() == {
+        1: MESSAGE_SENT,
+        2: MESSAGE_SENT,
+        3: MESSAGE_FAILED,
+        4: MESSAGE_SENT,
+        5: MESSAGE_SENT,
+        6: MESSAGE_SENT,
+        7: MESSAGE_SENT,
+    }
+    assert (outbox.sent, outbox.failed) == (6, 1)
+
+
+@pytest.mark.asyncio
+async def test_claimed_messages_are_not_claimed_again(outbox_db) -> None:
+    async with outbox_db.get_session() as session:
+        first = await SqlAlchemyMessageRepository(session).claim_unsent(3)
+    async with outbox_db.get_session() as session:
+        repo = SqlAlchemyMessageRepository(session)
+        second = await repo.claim_unsent(10)
+        pending = await repo.count_pending()
+
+    assert [row.user_id for row in first] == [1, 2, 3]
+    assert [row.user_id for row in second] == [4, 5, 6, 7]
+    assert pending == 7
+    assert set((await outbox_db.states()).values()) == {MESSAGE_CLAIMED}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_batch_returns_unfinished_messages_to_the_queue(
+    monkeypatch: pytest.MonkeyPatch, outbox_db
+) -> None:
+    blocked = asyncio.Event()
+
+    async def send_message(_session, user_id, *_args, **_kwargs) -> None:
+        if user_id > 2:
+            await blocked.wait()
+
+    monkeypatch.setattr(message_worker, "cmd_info_message", send_message)
+    outbox = MessageOutbox(outbox_db, batch_size=5, concurrency=5)
+    task = asyncio.create_task(outbox.send_batch(outbox_app_context(outbox_db)))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert await outbox_db.states() == {
+        1: MESSAGE_SENT,
+        2: MESSAGE_SENT,
+        3: MESSAGE_UNSENT,
+        4: MESSAGE_UNSENT,
+        5: MESSAGE_UNSENT,
+        6: MESSAGE_UNSENT,
+        7: MESSAGE_UNSENT,
+    }
+
+
+@pytest.mark.asyncio
+async def test_outbox_progress_estimates_time_left_from_recent_batches(
+    monkeypatch: pytest.MonkeyPatch, outbox_db
+) -> None:
+    now = [100.0]
+
+    async def send_message(*_args, **_kwargs) -> None:
+        now[0] += 0.5
+
+    monkeypatch.setattr(message_worker, "cmd_info_message", send_message)
+    outbox = MessageOutbox(outbox_db, batch_size=4, concurrency=1, clock=lambda: now[0])
+    assert outbox.progress(10).eta_seconds is None
+
+    await outbox.send_batch(outbox_app_context(outbox_db))
+
+    assert outbox.progress(10) == OutboxProgress(
+        sent=4, failed=0, pending=10, rate_per_second=2.0, eta_seconds=5.0
+    )
+
+
+@pytest.mark.asyncio
+async def test_drain_requeues_claims_whose_lease_expired(
+    monkeypatch: pytest.MonkeyPatch, outbox_db
+) -> None:
+    async def send_message(*_args, **_kwargs) -> None:
+        return None
+
+    monkeypatch.setattr(message_worker, "cmd_info_message", send_message)
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    now = [1_000.0]
+    leases = OutboxClaimLeases(redis, lease_seconds=300, clock=lambda: now[0])
+
+    async def crashed_instance(message_ids: list[int]) -> None:
+        await leases.grant(message_ids)
+
+    async with outbox_db.get_session() as session:
+        await SqlAlchemyMessageRepository(session).claim_unsent(
+            3, before_commit=crashed_instance
+        )
+    outbox = MessageOutbox(outbox_db, batch_size=10, leases=leases)
+    app_context = outbox_app_context(outbox_db)
+
+    now[0] += 100
+    assert await outbox.drain(app_context) == 4
+    assert [state for _, state in sorted((await outbox_db.states()).items())] == [
+        MESSAGE_CLAIMED
+    ] * 3 + [MESSAGE_SENT] * 4
+
+    now[0] += 300
+    assert await outbox.drain(app_context) == 3
+    assert set((await outbox_db.states()).values()) == {MESSAGE_SENT}
+    now[0] += 10_000
+    assert await leases.expired() == {}
+    assert await redis.exists("message_outbox:lease_ids") == 0
+    await redis.aclose()
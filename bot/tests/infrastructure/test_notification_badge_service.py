@@ -1,6 +1,7 @@
 """Tests for Redis-backed pending-notification keyboard badges."""
 
 import asyncio
+import time
 from contextlib import asynccontextmanager
 from unittest.mock import AsyncMock, MagicMock, create_autospec
 
@@ -13,10 +14,14 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from loguru import logger
 
+import infrastructure.services.notification_badge_service as badge_module
 from infrastructure.services.notification_badge_service import (
+    UI_MARKUP_LOCK_BLOCK_SECONDS,
+    UI_MARKUP_LOCK_MIN_BLOCK_SECONDS,
     NotificationBadgeService,
     UiMarkupLockUnavailable,
 )
+from infrastructure.services.notification_metrics import NotificationMetrics
 from infrastructure.services.notification_redis_store import NotificationRedisStore
 from infrastructure.utils.telegram_utils import send_message
 
@@ -424,3 +429,117 @@ def _notification(user_id: int, suffix: str):
         transaction_hash=f"transaction-{suffix}",
         event_index=0,
     )
+
+
+def _count_calls(redis, name: str) -> list[int]:
+    calls = [0]
+    original = getattr(redis, name)
+
+    async def counted(*args, **kwargs):
+        calls[0] += 1
+        return await original(*args, **kwargs)
+
+    setattr(redis, name, counted)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_same_instance_contenders_queue_locally_without_polling_redis(
+    badge_service,
+) -> None:
+    service, _, _ = badge_service
+    set_calls = _count_calls(service._redis, "set")
+    blpop_calls = _count_calls(service._redis, "blpop")
+    order: list[int] = []
+
+    async def contend(index: int) -> None:
+        async with service.ui_markup_lock(42):
+            order.append(index)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(contend(index) for index in range(5)))
+
+    assert order == [0, 1, 2, 3, 4]
+    assert set_calls[0] == 5
+    assert blpop_calls[0] == 0
+    assert service._local_ui_locks == {}
+
+
+@pytest.mark.asyncio
+async def test_release_wakes_a_waiter_on_another_instance(badge_service) -> None:
+    holder, store, bot = badge_service
+    metrics = NotificationMetrics()
+    waiter = NotificationBadgeService(
+        bot=bot, redis=holder._redis, store=store, metrics=metrics
+    )
+    acquired = asyncio.Event()
+
+    async def wait_for_lock() -> float:
+        started = asyncio.get_running_loop().time()
+        async with waiter.ui_markup_lock(42):
+            acquired.set()
+            return asyncio.get_running_loop().time() - started
+
+    async with holder.ui_markup_lock(42):
+        waiting = asyncio.create_task(wait_for_lock())
+        await asyncio.sleep(0.05)
+        assert not acquired.is_set()
+
+    waited = await waiting
+
+    # Woken by the release, well before the next BLPOP timeout.
+    assert waited < 0.05 + UI_MARKUP_LOCK_BLOCK_SECONDS / 2
+    assert metrics.as_dict()["ui_lock_wait"]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_waiter_takes_over_an_expired_lease_without_a_release(
+    badge_service,
+) -> None:
+    service, _, _ = badge_service
+    await service._redis.set(
+        "notification:ui_markup_lock:42", "crashed-instance", px=100
+    )
+
+    async with service.ui_markup_lock(42) as lease_lost:
+        assert not lease_lost.is_set()
+
+
+@pytest.mark.asyncio
+async def test_local_contender_times_out_behind_a_long_holder(
+    badge_service, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    service, _, _ = badge_service
+    monkeypatch.setattr(badge_module, "UI_MARKUP_LOCK_WAIT_SECONDS", 0.05)
+    release = asyncio.Event()
+
+    async def hold() -> None:
+        async with service.ui_markup_lock(42):
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    with pytest.raises(UiMarkupLockUnavailable):
+        async with service.ui_markup_lock(42):
+            pass
+    release.set()
+    await holder
+
+    assert service._local_ui_locks == {}
+
+
+@pytest.mark.asyncio
+async def test_wait_under_the_blpop_resolution_times_out_instead_of_blocking(
+    badge_service,
+) -> None:
+    service, _, _ = badge_service
+    key = "notification:ui_markup_lock:42"
+    await service._redis.set(key, "other-instance", px=10_000)
+    blpop_calls = _count_calls(service._redis, "blpop")
+
+    with pytest.raises(UiMarkupLockUnavailable):
+        await service._acquire_ui_markup_lock(
+            42, key, "token", time.monotonic() + UI_MARKUP_LOCK_MIN_BLOCK_SECONDS / 10
+        )
+
+    assert blpop_calls[0] == 0
@@ -0,0 +1,143 @@
+"""Tests for pending notification queue compaction."""
+
+import fakeredis.aioredis
+import pytest
+
+from core.models.blockchain_notification import BlockchainNotification
+from infrastructure.services.notification_redis_store import NotificationRedisStore
+from infrastructure.workers.notification_compaction_worker import (
+    SUMMARY_EVENT_TYPE,
+    NotificationCompactionWorker,
+)
+
+NOW = 1_720_000_000
+
+
+@pytest.fixture
+async def redis():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+@pytest.fixture
+def store(redis) -> NotificationRedisStore:
+    return NotificationRedisStore(redis, hold_seconds=120, lock_ttl_seconds=30)
+
+
+def notification(user_id: int, index: int, *, created_at: int = NOW):
+    return BlockchainNotification(
+        notification_id=f"notification-{user_id}-{index}",
+        user_id=user_id,
+        event_type="payment",
+        text=f"Payment {index}",
+        created_at=created_at,
+        transaction_hash=f"tx-{index}",
+        event_index=0,
+    )
+
+
+def worker(store: NotificationRedisStore, **options) -> NotificationCompactionWorker:
+    settings = {
+        "store": store,
+        "interval_seconds": 60,
+        "max_length": 5,
+        "keep_latest": 2,
+        "max_age_seconds": 3600,
+        "clock": lambda: NOW,
+    }
+    settings.update(options)
+    return NotificationCompactionWorker(**settings)
+
+
+async def fill(store: NotificationRedisStore, user_id: int, count: int, **options):
+    for index in range(count):
+        await store.enqueue(user_id, notification(user_id, index, **options), now=NOW)
+
+
+@pytest.mark.asyncio
+async def test_long_queue_keeps_latest_items_behind_a_summary(store):
+    await fill(store, 42, 8)
+    await fill(store, 7, 3)
+
+    report = await worker(store).compact_once()
+
+    queue = await store.peek_many(42, 10)
+    assert [item.text for item in queue] == [
+        "6 older notifications were archived.",
+        "Payment 6",
+        "Payment 7",
+    ]
+    assert queue[0].event_type == SUMMARY_EVENT_TYPE
+    assert [item.text for item in await store.archived(42, 10)] == [
+        f"Payment {index}" for index in range(6)
+    ]
+    assert await store.pending_count(7) == 3
+    assert (report.queues, report.items, report.compacted_users, report.archived) == (
+        2,
+        6,
+        1,
+        6,
+    )
+    assert report.estimated and report.bytes > 0
+    assert report.largest == ((42, 8), (7, 3))
+
+
+@pytest.mark.asyncio
+async def test_old_queue_is_compacted_even_below_the_length_limit(store):
+    await fill(store, 42, 4, created_at=NOW - 7200)
+
+    await worker(store).compact_once()
+
+    assert await store.pending_count(42) == 3
+    assert (await store.peek(42)).data == {"archived": 2}
+
+
+@pytest.mark.asyncio
+async def test_recompaction_folds_the_previous_summary_count(store):
+    await fill(store, 42, 8)
+    subject = worker(store)
+    await subject.compact_once()
+    for index in range(8, 12):
+        await store.enqueue(42, notification(42, index), now=NOW)
+
+    await subject.compact_once()
+
+    summary = await store.peek(42)
+    assert summary.data == {"archived": 10}
+    assert summary.text == "10 older notifications were archived."
+    assert await store.pending_count(42) == 3
+
+
+@pytest.mark.asyncio
+async def test_queue_being_flushed_is_left_for_the_next_run(store):
+    await fill(store, 42, 8)
+    assert await store.acquire_lock(42, "delivery-worker")
+
+    report = await worker(store).compact_once()
+
+    assert report.compacted_users == 0
+    assert await store.pending_count(42) == 8
+
+
+@pytest.mark.asyncio
+async def test_compaction_rejects_a_changed_prefix(store):
+    await fill(store, 42, 4)
+    head = await store.peek_many(42, 3)
+    summary = notification(42, 99)
+    assert await store.acquire_lock(42, "token")
+    await store.acknowledge_if_lock_owned(42, head[0], "token")
+
+    assert not await store.compact_if_lock_owned(
+        42, head, summary, "token", archive_max_length=10, archive_ttl_seconds=60
+    )
+    assert await store.pending_count(42) == 3
+
+
+def test_worker_rejects_invalid_limits(store):
+    with pytest.raises(ValueError, match="max_length"):
+        worker(store, max_length=2)
+    with pytest.raises(ValueError, match="interval_seconds"):
+        worker(store, interval_seconds=0)
@@ -15,6 +15,7 @@ from infrastructure.services.notification_coordinator import (
     NotificationSender,
     NotificationStore,
 )
+from infrastructure.services.notification_metrics import NotificationMetrics
 from infrastructure.services.notification_redis_store import NotificationRedisStore
 
 
@@ -1043,3 +1044,278 @@ async def test_flush_does_not_enter_when_another_owner_has_the_lock(
     )
     assert "user_id=42" in contention_record["message"]
     assert "reason=worker" in contention_record["message"]
+
+
+@pytest.mark.asyncio
+async def test_digest_user_receives_queued_notifications_in_one_message(
+    badge_refresher: MagicMock,
+) -> None:
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    store = NotificationRedisStore(redis, hold_seconds=120, lock_ttl_seconds=30)
+    sender = create_autospec(NotificationSender, instance=True, spec_set=True)
+    subject = NotificationCoordinator(
+        store=store,
+        sender=sender,
+        badge_refresher=badge_refresher,
+        clock=lambda: 1_000,
+        digest_store=store,
+    )
+    events = [notification(f"n{index}", f"fill {index}") for index in range(3)]
+    for event in events:
+        await store.enqueue(42, event)
+    await store.set_digest_enabled(42, True)
+
+    await subject.flush(42, reason="hold_expired")
+
+    sender.send_notification_digest.assert_awaited_once_with(events)
+    sender.send_notification.assert_not_awaited()
+    assert await store.pending_count(42) == 0
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_digest_splits_at_the_telegram_length_limit(
+    badge_refresher: MagicMock,
+) -> None:
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    store = NotificationRedisStore(redis, hold_seconds=120, lock_ttl_seconds=30)
+    sender = create_autospec(NotificationSender, instance=True, spec_set=True)
+    subject = NotificationCoordinator(
+        store=store,
+        sender=sender,
+        badge_refresher=badge_refresher,
+        clock=lambda: 1_000,
+        digest_store=store,
+    )
+    events = [notification(f"n{index}", "x" * 1_500) for index in range(3)]
+    for event in events:
+        await store.enqueue(42, event)
+    await store.set_digest_enabled(42, True)
+
+    await subject.flush(42, reason="hold_expired")
+
+    sender.send_notification_digest.assert_awaited_once_with(events[:2])
+    sender.send_notification.assert_awaited_once_with(events[2])
+    assert await store.pending_count(42) == 0
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_digest_send_retains_every_included_notification(
+    badge_refresher: MagicMock,
+) -> None:
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    store = NotificationRedisStore(redis, hold_seconds=120, lock_ttl_seconds=30)
+    sender = create_autospec(NotificationSender, instance=True, spec_set=True)
+    sender.send_notification_digest.side_effect = RuntimeError("telegram down")
+    subject = NotificationCoordinator(
+        store=store,
+        sender=sender,
+        badge_refresher=badge_refresher,
+        clock=lambda: 1_000,
+        digest_store=store,
+    )
+    for index in range(2):
+        await store.enqueue(42, notification(f"n{index}", f"fill {index}"))
+    await store.set_digest_enabled(42, True)
+
+    await subject.flush(42, reason="hold_expired")
+
+    assert await store.pending_count(42) == 2
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_claim_store_flush_uses_one_store_call_per_delivery(
+    badge_refresher: MagicMock,
+) -> None:
+    class RecordingStore(NotificationRedisStore):
+        calls: list[str] = []
+
+        async def claim_next(self, *args, **kwargs):
+            self.calls.append("claim_next")
+            return await super().claim_next(*args, **kwargs)
+
+        async def acknowledge_and_claim_next(self, *args, **kwargs):
+            self.calls.append("acknowledge_and_claim_next")
+            return await super().acknowledge_and_claim_next(*args, **kwargs)
+
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    store = RecordingStore(redis, hold_seconds=120, lock_ttl_seconds=30)
+    store.peek = AsyncMock()
+    store.renew_lock = AsyncMock()
+    store.hold_until = AsyncMock()
+    sender = create_autospec(NotificationSender, instance=True, spec_set=True)
+    subject = NotificationCoordinator(
+        store=store,
+        sender=sender,
+        badge_refresher=badge_refresher,
+        clock=lambda: 1_000,
+        claim_store=store,
+    )
+    events = [notification(f"n{index}", f"payment {index}") for index in range(3)]
+    for event in events:
+        await store.enqueue(42, event)
+
+    await subject.flush(42, reason="hold_expired")
+
+    assert sender.send_notification.await_args_list == [call(event) for event in events]
+    assert store.calls == ["claim_next"] + ["acknowledge_and_claim_next"] * 3
+    store.peek.assert_not_awaited()
+    store.renew_lock.assert_not_awaited()
+    store.hold_until.assert_not_awaited()
+    assert await store.pending_count(42) == 0
+    badge_refresher.refresh.assert_awaited_once_with(42)
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_claim_store_flush_stops_when_hold_is_renewed_between_sends(
+    badge_refresher: MagicMock,
+) -> None:
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    store = NotificationRedisStore(redis, hold_seconds=120, lock_ttl_seconds=30)
+    sender = create_autospec(NotificationSender, instance=True, spec_set=True)
+
+    async def send_then_touch(_: BlockchainNotification) -> None:
+        await store.touch(42, now=1_000)
+
+    sender.send_notification.side_effect = send_then_touch
+    subject = NotificationCoordinator(
+        store=store,
+        sender=sender,
+        badge_refresher=badge_refresher,
+        clock=lambda: 1_000,
+        claim_store=store,
+    )
+    events = [notification(f"n{index}", f"payment {index}") for index in range(2)]
+    for event in events:
+        await store.enqueue(42, event)
+
+    await subject.flush(42, reason="hold_expired")
+
+    sender.send_notification.assert_awaited_once_with(events[0])
+    assert await store.pending_count(42) == 1
+    await redis.aclose()
+
+
+def debouncing_coordinator(
+    store: MagicMock, sender: MagicMock, badge_refresher: MagicMock
+) -> NotificationCoordinator:
+    return NotificationCoordinator(
+        store=store,
+        sender=sender,
+        badge_refresher=badge_refresher,
+        clock=lambda: 1_000,
+        hold_seconds=120,
+        touch_debounce_fraction=0.1,
+    )
+
+
+@pytest.mark.asyncio
+async def test_touch_is_debounced_while_the_hold_was_just_extended(
+    store: MagicMock, sender: MagicMock, badge_refresher: MagicMock
+) -> None:
+    subject = debouncing_coordinator(store, sender, badge_refresher)
+    store.hold_snapshot.side_effect = [(1_115, 7), (1_100, 8)]
+    store.touch_with_generation.return_value = (1_120, 8)
+    store.release_hold_generation_if_unchanged.return_value = True
+
+    token = await subject.capture_flow_generation(42)
+    assert await subject.touch(42) == 1_115
+    await subject.complete_flow(42)
+    subject.reset_flow_generation(token)
+    token = await subject.capture_flow_generation(42)
+    assert await subject.touch(42) == 1_120
+    assert await subject.touch(42) == 1_120
+    subject.reset_flow_generation(token)
+
+    store.touch_with_generation.assert_awaited_once_with(42, now=1_000)
+    # The debounced update still completes with the generation it observed.
+    store.release_hold_generation_if_unchanged.assert_awaited_once_with(
+        42, 7, now=1_000
+    )
+    assert subject.touch_stats.as_dict() == {
+        "updates": 2,
+        "touches": 1,
+        "debounced": 2,
+        "redis_calls_saved_per_update": 1.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_touch_is_not_debounced_while_another_update_is_in_flight(
+    store: MagicMock, sender: MagicMock, badge_refresher: MagicMock
+) -> None:
+    subject = debouncing_coordinator(store, sender, badge_refresher)
+    store.hold_snapshot.return_value = (1_120, 7)
+    store.touch_with_generation.return_value = (1_120, 8)
+    other_update_captured = asyncio.Event()
+    touched = asyncio.Event()
+
+    async def other_update() -> None:
+        token = await subject.capture_flow_generation(42)
+        other_update_captured.set()
+        await touched.wait()
+        subject.reset_flow_generation(token)
+
+    async def touching_update() -> None:
+        await other_update_captured.wait()
+        token = await subject.capture_flow_generation(42)
+        await subject.touch(42)
+        touched.set()
+        subject.reset_flow_generation(token)
+
+    await asyncio.gather(other_update(), touching_update())
+
+    store.touch_with_generation.assert_awaited_once_with(42, now=1_000)
+    assert subject._updates_in_flight == {}
+
+
+def test_coordinator_rejects_an_invalid_touch_debounce_fraction(
+    store: MagicMock, sender: MagicMock, badge_refresher: MagicMock
+) -> None:
+    with pytest.raises(ValueError, match="touch_debounce_fraction"):
+        NotificationCoordinator(
+            store=store,
+            sender=sender,
+            badge_refresher=badge_refresher,
+            touch_debounce_fraction=1.0,
+        )
+
+
+@pytest.mark.asyncio
+async def test_delivery_records_stage_latency_and_ledger_age(
+    sender: MagicMock, badge_refresher: MagicMock
+) -> None:
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    store = NotificationRedisStore(redis, hold_seconds=120, lock_ttl_seconds=30)
+    metrics = NotificationMetrics(wall_clock=lambda: 1_010.0)
+    subject = NotificationCoordinator(
+        store=store,
+        sender=sender,
+        badge_refresher=badge_refresher,
+        claim_store=store,
+        clock=lambda: 1_004,
+        metrics=metrics,
+    )
+    event = BlockchainNotification(
+        notification_id="ledger",
+        user_id=42,
+        event_type="payment",
+        text="Payment",
+        created_at=1_004,
+        transaction_hash="ledger",
+        event_index=0,
+        data={"ledger_closed_at": 1_000},
+    )
+
+    await subject.accept(event)
+
+    sender.send_notification.assert_awaited_once_with(event)
+    stages = metrics.as_dict()
+    assert stages["claim_accept"]["count"] == 1
+    assert stages["flush"]["count"] == 1
+    assert stages["hold_wait"]["p50_ms"] == 6000.0
+    assert stages["ledger_to_delivered"]["p50_ms"] == 10000.0
+    await redis.aclose()
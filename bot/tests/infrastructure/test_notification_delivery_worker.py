@@ -15,6 +15,7 @@ from infrastructure.services.notification_coordinator import (
     NotificationSender,
 )
 from infrastructure.services.notification_redis_store import NotificationRedisStore
+from infrastructure.services.notification_shard_leases import NotificationShardLeases
 from infrastructure.workers.notification_delivery_worker import (
     NotificationDeliveryWorker,
     NotificationDueStore,
@@ -138,6 +139,57 @@ async def test_two_workers_exclude_each_other_with_shared_redis(redis, sender):
     sender.send_notification.assert_awaited_once_with(notification("once"))
 
 
+@pytest.mark.asyncio
+async def test_sharded_workers_only_poll_the_shards_they_own(redis, sender):
+    store = NotificationRedisStore(
+        redis, hold_seconds=120, lock_ttl_seconds=30, due_shards=2
+    )
+    for user_id in (1, 2):
+        await store.claim_accept(
+            user_id, notification(str(user_id), user_id=user_id), now=1_000
+        )
+    first_leases = NotificationShardLeases(redis, shard_count=2, instance_id="a")
+    second_leases = NotificationShardLeases(redis, shard_count=2, instance_id="b")
+    await first_leases.refresh()
+    await second_leases.refresh()
+    await first_leases.refresh()
+    await second_leases.refresh()
+    first_sender = create_autospec(NotificationSender, instance=True, spec_set=True)
+
+    for leases, worker_sender in (
+        (first_leases, first_sender),
+        (second_leases, sender),
+    ):
+        await NotificationDeliveryWorker(
+            store=store,
+            coordinator=coordinator(store, worker_sender, clock=lambda: 1_000),
+            poll_interval_seconds=1,
+            batch_size=10,
+            clock=lambda: 1_000,
+            shard_leases=leases,
+        ).poll_once()
+
+    first_sender.send_notification.assert_awaited_once_with(notification("2", 2))
+    sender.send_notification.assert_awaited_once_with(notification("1", 1))
+
+
+@pytest.mark.asyncio
+async def test_worker_without_owned_shards_skips_polling():
+    store = create_autospec(NotificationDueStore, instance=True, spec_set=True)
+    leases = AsyncMock()
+    leases.current.return_value = []
+
+    await NotificationDeliveryWorker(
+        store=store,
+        coordinator=MagicMock(),
+        poll_interval_seconds=1,
+        batch_size=10,
+        shard_leases=leases,
+    ).poll_once()
+
+    store.due_users.assert_not_awaited()
+
+
 @pytest.mark.asyncio
 async def test_new_worker_recovers_due_work_from_same_redis_after_restart(
     redis, sender
@@ -0,0 +1,140 @@
+"""Tests for the Redis Stream webhook ingest queue and its consumers."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import fakeredis.aioredis
+import pytest
+
+from infrastructure.services.notification_ingest_stream import NotificationIngestStream
+from infrastructure.workers.notification_ingest_worker import NotificationIngestWorker
+
+
+PAYLOAD = {"operation": {"id": "op-1", "type": "payment"}}
+
+
+@pytest.fixture
+async def redis():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+@pytest.fixture
+def stream(redis) -> NotificationIngestStream:
+    return NotificationIngestStream(redis, clock=lambda: 1_000.0)
+
+
+def worker(
+    stream: NotificationIngestStream,
+    processor: AsyncMock,
+    *,
+    max_deliveries: int = 3,
+) -> NotificationIngestWorker:
+    return NotificationIngestWorker(
+        stream=stream,
+        processor=processor,
+        consumers=2,
+        batch_size=10,
+        claim_idle_seconds=0.001,
+        max_deliveries=max_deliveries,
+        block_seconds=0.01,
+        consumer_prefix="test",
+    )
+
+
+async def test_processed_entry_is_acknowledged(stream):
+    processor = AsyncMock()
+    await stream.append(json.dumps(PAYLOAD))
+
+    handled = await worker(stream, processor).poll_once("test-0")
+
+    assert handled == 1
+    processor.assert_awaited_once_with(PAYLOAD)
+    lag = await stream.lag()
+    assert lag.pending == 0
+    assert lag.lag == 0
+
+
+async def test_entry_of_crashed_consumer_is_reclaimed_by_another(stream):
+    entry_id = await stream.append(json.dumps(PAYLOAD))
+    # A consumer that read the entry and died before acknowledging it.
+    assert [
+        entry.entry_id for entry in await stream.read("gone", count=10, block_ms=None)
+    ] == [entry_id]
+    await asyncio.sleep(0.01)
+    processor = AsyncMock()
+    ingest_worker = worker(stream, processor)
+
+    await ingest_worker.poll_once("test-1")
+
+    processor.assert_awaited_once_with(PAYLOAD)
+    assert ingest_worker.reclaimed == 1
+    assert (await stream.lag()).pending == 0
+
+
+async def test_failed_entry_stays_pending_until_retried(stream):
+    processor = AsyncMock(side_effect=[RuntimeError("db down"), None])
+    ingest_worker = worker(stream, processor)
+    await stream.append(json.dumps(PAYLOAD))
+
+    await ingest_worker.poll_once("test-0")
+    assert (await stream.lag()).pending == 1
+
+    await asyncio.sleep(0.01)
+    await ingest_worker.poll_once("test-0")
+
+    assert processor.await_count == 2
+    assert ingest_worker.failed == 1
+    assert ingest_worker.processed == 1
+    assert (await stream.lag()).pending == 0
+
+
+async def test_poison_entries_are_dead_lettered(redis, stream):
+    processor = AsyncMock(side_effect=RuntimeError("always fails"))
+    ingest_worker = worker(stream, processor, max_deliveries=1)
+    await stream.append("not json")
+    await stream.append(json.dumps(PAYLOAD))
+
+    await ingest_worker.poll_once("test-0")
+    await asyncio.sleep(0.01)
+    await ingest_worker.poll_once("test-0")
+
+    dead = await redis.xrange("notification:ingest:dead")
+    assert [fields["reason"] for _entry_id, fields in dead] == [
+        "invalid_json",
+        "max_deliveries",
+    ]
+    assert ingest_worker.dead_lettered == 2
+    assert (await stream.lag()).pending == 0
+
+
+async def test_metrics_report_unread_backlog(stream):
+    ingest_worker = worker(stream, AsyncMock())
+    await stream.ensure_group()
+    for _ in range(3):
+        await stream.append(json.dumps(PAYLOAD))
+    await stream.read("gone", count=1, block_ms=None)
+
+    metrics = await ingest_worker.metrics()
+
+    assert metrics["length"] == 3
+    assert metrics["lag"] == 2
+    assert metrics["pending"] == 1
+    assert metrics["oldest_pending_idle_ms"] is not None
+    assert metrics["processed"] == 0
+
+
+def test_worker_rejects_non_positive_consumers(stream):
+    with pytest.raises(ValueError, match="consumers"):
+        NotificationIngestWorker(
+            stream=stream,
+            processor=AsyncMock(),
+            consumers=0,
+            batch_size=10,
+            claim_idle_seconds=60,
+            max_deliveries=3,
+        )
@@ -0,0 +1,86 @@
+"""Tests for notification pipeline latency histograms."""
+
+import pytest
+
+from infrastructure.services.notification_metrics import (
+    NotificationMetrics,
+    StageHistogram,
+    ledger_closed_at,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_histogram_reports_nearest_rank_quantiles_and_failures():
+    histogram = StageHistogram()
+    for millis in range(1, 101):
+        histogram.observe(millis / 1000, failed=millis % 10 == 0)
+
+    summary = histogram.as_dict()
+
+    assert summary["count"] == 100
+    assert summary["failures"] == 10
+    assert summary["p50_ms"] == 50.0
+    assert summary["p95_ms"] == 95.0
+    assert summary["p99_ms"] == 99.0
+    assert summary["max_ms"] == 100.0
+
+
+def test_histogram_window_is_bounded_but_counts_are_cumulative():
+    histogram = StageHistogram(sample_size=3)
+    for seconds in (10.0, 10.0, 0.001, 0.001, 0.001):
+        histogram.observe(seconds)
+
+    assert histogram.count == 5
+    assert histogram.as_dict()["max_ms"] == 1.0
+
+
+def test_span_records_duration_and_marks_escaping_errors_as_failures():
+    clock = FakeClock()
+    metrics = NotificationMetrics(clock=clock)
+
+    with metrics.span("send"):
+        clock.now += 0.25
+    with pytest.raises(RuntimeError):
+        with metrics.span("send"):
+            clock.now += 0.75
+            raise RuntimeError("telegram down")
+
+    summary = metrics.as_dict()["send"]
+    assert summary["count"] == 2
+    assert summary["failures"] == 1
+    assert summary["p50_ms"] == 250.0
+    assert summary["max_ms"] == 750.0
+
+
+def test_observe_since_measures_wall_clock_age():
+    metrics = NotificationMetrics(wall_clock=lambda: 1_700_000_012.5)
+
+    metrics.observe_since("ledger_to_delivered", 1_700_000_010)
+
+    assert metrics.as_dict()["ledger_to_delivered"]["p50_ms"] == 2500.0
+
+
+@pytest.mark.parametrize(
+    ("payload", "expected"),
+    [
+        ({"transaction": {"closed_at": "2024-01-01T00:00:00Z"}}, 1_704_067_200),
+        ({"transaction": {"created_at": 1_704_067_200_000}}, 1_704_067_200),
+        ({"operation": {"created_at": "2024-01-01T00:00:00"}}, 1_704_067_200),
+        ({"transaction": {"hash": "tx"}}, None),
+        ({"transaction": {"closed_at": "not a date"}}, None),
+    ],
+)
+def test_ledger_closed_at_reads_known_payload_timestamps(payload, expected):
+    assert ledger_closed_at(payload) == expected
+
+
+def test_rejects_empty_sample_window():
+    with pytest.raises(ValueError):
+        NotificationMetrics(sample_size=0)
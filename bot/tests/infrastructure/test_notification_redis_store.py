@@ -2,14 +2,17 @@ import asyncio
 from contextlib import asynccontextmanager
 from dataclasses import replace
 from types import MappingProxyType
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 import fakeredis.aioredis
 import pytest
 from redis.exceptions import ResponseError
 
 from core.models.blockchain_notification import BlockchainNotification
-from infrastructure.services.notification_redis_store import NotificationRedisStore
+from infrastructure.services.notification_redis_store import (
+    NotificationClaim,
+    NotificationRedisStore,
+)
 
 
 @pytest.fixture
@@ -33,6 +36,18 @@ def notification(transaction_hash: str, text: str) -> BlockchainNotification:
     )
 
 
+def notification_for(user_id: int, transaction_hash: str) -> BlockchainNotification:
+    return BlockchainNotification(
+        notification_id=f"notification-{transaction_hash}",
+        user_id=user_id,
+        event_type="payment",
+        text="text",
+        created_at=1_720_000_000,
+        transaction_hash=transaction_hash,
+        event_index=0,
+    )
+
+
 def test_notification_serialization_is_canonical_and_uses_stable_primitives():
     event = notification("tx-1", "First payment")
 
@@ -436,6 +451,30 @@ async def test_due_users_skips_expired_holds_and_fills_a_limited_page():
         await redis.aclose()
 
 
+@pytest.mark.asyncio
+async def test_sharded_due_sets_schedule_by_user_id_and_drain_legacy_entries():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    store = NotificationRedisStore(
+        redis, hold_seconds=120, lock_ttl_seconds=30, due_shards=4
+    )
+    try:
+        for user_id in (5, 6, 9):
+            event = notification_for(user_id, f"n{user_id}")
+            assert await store.claim_accept(user_id, event, now=1_000) == "direct"
+        # Scheduled by an instance that ran before sharding was enabled.
+        await store.enqueue(8, notification_for(8, "legacy"))
+        await redis.zadd("notification:due", {"8": 1_000})
+
+        assert await redis.zrange("notification:due:1", 0, -1) == ["5", "9"]
+        assert await store.due_users(now=1_000, shards=[1]) == [5, 9]
+        assert await store.due_users(now=1_000, shards=[2]) == [6]
+        assert await store.due_users(now=1_000, shards=[0]) == [8]
+        assert await store.due_users(now=1_000) == [5, 9, 6, 8]
+        assert await store.due_users(now=1_000, limit=2) == [5, 9]
+    finally:
+        await redis.aclose()
+
+
 @pytest.mark.asyncio
 async def test_due_users_lua_uses_bounded_queries_and_reaches_users_after_a_stale_prefix():
     redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
@@ -604,30 +643,79 @@ async def test_holds_expire_after_the_configured_ttl():
 
 
 @pytest.mark.asyncio
-async def test_enqueue_sets_and_refreshes_configured_dedupe_ttl_without_expiring_queue():
+async def test_enqueue_keeps_short_ids_in_expiring_buckets_without_expiring_queue():
     redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
     store = NotificationRedisStore(
         redis,
         hold_seconds=120,
         lock_ttl_seconds=30,
-        dedupe_ttl_seconds=2,
+        dedupe_ttl_seconds=60,
+        dedupe_buckets=6,
     )
-    first = notification("tx-1", "First payment")
-    second = notification("tx-2", "Second payment")
+    event = notification("tx-1", "First payment")
     try:
-        assert await store.enqueue(42, first) is True
-        assert 0 < await redis.ttl("notification:dedupe:42") <= 2
+        assert await store.enqueue(42, event, now=1_000) is True
+        assert await redis.smembers("notification:dedupe:42:100") == {
+            store._dedupe_id(event)
+        }
+        # The 10-second bucket closes at 1_010 and is kept for one window.
+        assert 60_000 < await redis.pttl("notification:dedupe:42:100") <= 70_000
         assert await redis.ttl("notification:pending:42") == -1
+        assert await store.acknowledge(42, event) is True
 
-        await asyncio.sleep(1.1)
-        assert await store.enqueue(42, first) is False
-        assert await store.enqueue(42, second) is True
-        assert 0 < await redis.ttl("notification:dedupe:42") <= 2
-        assert await redis.ttl("notification:pending:42") == -1
+        assert await store.enqueue(42, event, now=1_069) is False
+        assert await store.enqueue(42, event, now=1_070) is True
+        assert await redis.exists("notification:dedupe:42") == 0
     finally:
         await redis.aclose()
 
 
+@pytest.mark.asyncio
+async def test_enqueue_still_honours_the_legacy_exact_dedupe_set():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    store = NotificationRedisStore(redis, hold_seconds=120, lock_ttl_seconds=30)
+    event = notification("tx-1", "First payment")
+    try:
+        await redis.sadd("notification:dedupe:42", event.idempotency_key)
+
+        assert await store.enqueue(42, event) is False
+        assert await store.claim_accept(42, event, now=1_000) == "duplicate"
+    finally:
+        await redis.aclose()
+
+
+def test_dedupe_hash_width_follows_the_configured_false_positive_rate():
+    event = notification("tx-1", "First payment")
+    loose = NotificationRedisStore(
+        MagicMock(),
+        hold_seconds=120,
+        lock_ttl_seconds=30,
+        dedupe_false_positive_rate=1e-3,
+    )
+    strict = NotificationRedisStore(MagicMock(), hold_seconds=120, lock_ttl_seconds=30)
+
+    # 100_000 IDs per user at 1e-3 need 27 bits; the default 1e-9 needs 47.
+    assert int(loose._dedupe_id(event)) < 2**27
+    assert int(strict._dedupe_id(event)) < 2**47
+    assert len(strict._dedupe_id(event)) < len(event.idempotency_key)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"dedupe_buckets": 0},
+        {"dedupe_false_positive_rate": 0.0},
+        {"dedupe_false_positive_rate": 1.0},
+        {"dedupe_false_positive_rate": float("nan")},
+    ],
+)
+def test_store_rejects_invalid_dedupe_options(options: dict):
+    with pytest.raises(ValueError, match="dedupe"):
+        NotificationRedisStore(
+            MagicMock(), hold_seconds=120, lock_ttl_seconds=30, **options
+        )
+
+
 @pytest.mark.asyncio
 async def test_enqueue_rejects_an_unacknowledged_id_after_historical_dedupe_expires():
     redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
@@ -640,7 +728,8 @@ async def test_enqueue_rejects_an_unacknowledged_id_after_historical_dedupe_expi
     event = notification("tx-1", "First payment")
     try:
         assert await store.enqueue(42, event) is True
-        await asyncio.sleep(1.1)
+        # Retention is one window plus up to one bucket.
+        await asyncio.sleep(1.3)
 
         assert await redis.exists("notification:dedupe:42") == 0
         assert await store.enqueue(42, event) is False
@@ -664,7 +753,8 @@ async def test_enqueue_accepts_after_acknowledgement_and_historical_retention_ex
         assert await store.acknowledge(42, event) is True
         assert await store.enqueue(42, event) is False
 
-        await asyncio.sleep(1.1)
+        # Retention is one window plus up to one bucket.
+        await asyncio.sleep(1.3)
 
         assert await store.enqueue(42, event) is True
     finally:
@@ -684,3 +774,81 @@ async def test_store_supports_default_binary_redis_responses():
         assert await store.release_lock(42, "owner-token") is True
     finally:
         await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_acknowledge_many_removes_the_whole_digest_prefix_atomically(
+    redis_store: NotificationRedisStore,
+):
+    events = [notification(f"tx-{index}", f"Payment {index}") for index in range(3)]
+    for event in events:
+        await redis_store.enqueue(42, event)
+    assert await redis_store.acquire_lock(42, "owner") is True
+
+    assert await redis_store.peek_many(42, 2) == events[:2]
+    assert await redis_store.acknowledge_many_if_lock_owned(42, events[:2], "owner")
+    assert await redis_store.peek_many(42, 10) == events[2:]
+    # Already removed items no longer form the head, so nothing else is touched.
+    assert not await redis_store.acknowledge_many_if_lock_owned(42, events[:2], "owner")
+    assert not await redis_store.acknowledge_many_if_lock_owned(
+        42, events[2:], "stale-owner"
+    )
+    assert await redis_store.pending_count(42) == 1
+
+
+@pytest.mark.asyncio
+async def test_digest_preference_is_per_user(redis_store: NotificationRedisStore):
+    await redis_store.set_digest_enabled(42, True)
+
+    assert await redis_store.digest_enabled(42) is True
+    assert await redis_store.digest_enabled(43) is False
+    await redis_store.set_digest_enabled(42, False)
+    assert await redis_store.digest_enabled(42) is False
+
+
+async def test_claim_next_renews_owned_lease_and_reports_hold_and_head(
+    redis_store: NotificationRedisStore,
+):
+    first = notification("tx-1", "First payment")
+    await redis_store.enqueue(42, first)
+    await redis_store.acquire_lock(42, "token")
+    await redis_store.touch(42, now=1_000)
+
+    held = await redis_store.claim_next(
+        42, "token", now=1_100, check_hold=True, limit=10
+    )
+    ready = await redis_store.claim_next(
+        42, "token", now=1_120, check_hold=True, limit=10
+    )
+    lost = await redis_store.claim_next(
+        42, "other", now=1_120, check_hold=True, limit=10
+    )
+
+    assert held == NotificationClaim("held", hold_until=1_120)
+    assert ready == NotificationClaim("ready", [first], hold_until=1_120)
+    assert lost.status == "lost"
+    assert await redis_store._redis.ttl(redis_store._lock_key(42)) == 30
+
+
+async def test_acknowledge_and_claim_next_pops_prefix_and_returns_next_head(
+    redis_store: NotificationRedisStore,
+):
+    events = [notification(f"tx-{index}", f"Payment {index}") for index in range(4)]
+    for event in events:
+        await redis_store.enqueue(42, event)
+    await redis_store.acquire_lock(42, "token")
+    await redis_store.set_digest_enabled(42, True)
+
+    stale = await redis_store.acknowledge_and_claim_next(
+        42, events[1:2], "token", now=1_000, check_hold=False, limit=2
+    )
+    claim = await redis_store.acknowledge_and_claim_next(
+        42, events[:1], "token", now=1_000, check_hold=False, limit=2
+    )
+
+    assert stale is None
+    assert claim == NotificationClaim("ready", events[1:3], digest=True)
+    assert await redis_store.pending_count(42) == 3
+    assert not await redis_store._redis.sismember(
+        redis_store._pending_id_key(42), events[0].idempotency_key
+    )
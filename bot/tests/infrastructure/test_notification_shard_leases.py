@@ -0,0 +1,84 @@
+"""Tests for lease-based due-set shard assignment."""
+
+import asyncio
+
+import fakeredis.aioredis
+import pytest
+
+from infrastructure.services.notification_shard_leases import NotificationShardLeases
+
+
+@pytest.fixture
+async def redis():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+def leases(redis, instance_id: str, **options) -> NotificationShardLeases:
+    return NotificationShardLeases(
+        redis, shard_count=8, instance_id=instance_id, **options
+    )
+
+
+async def test_single_instance_owns_every_shard(redis):
+    assert await leases(redis, "a").refresh() == list(range(8))
+
+
+async def test_joining_instance_takes_half_after_the_owner_rebalances(redis):
+    first = leases(redis, "a")
+    second = leases(redis, "b")
+    await first.refresh()
+
+    # The new member targets shards the first instance still holds.
+    assert await second.refresh() == []
+    assert await first.refresh() == [0, 2, 4, 6]
+    assert await second.refresh() == [1, 3, 5, 7]
+
+
+async def test_leaving_instance_hands_its_shards_over(redis):
+    first = leases(redis, "a")
+    second = leases(redis, "b")
+    await first.refresh()
+    await second.refresh()
+    await first.refresh()
+    await second.refresh()
+
+    await second.release_all()
+
+    assert await first.refresh() == list(range(8))
+
+
+async def test_crashed_instance_shards_move_after_its_lease_expires(redis):
+    first = leases(redis, "a", lease_seconds=0.2)
+    second = leases(redis, "b", lease_seconds=0.2)
+    await first.refresh()
+    await second.refresh()
+    await first.refresh()
+    assert await second.refresh() == [1, 3, 5, 7]
+
+    await asyncio.sleep(0.3)
+
+    assert await first.refresh() == list(range(8))
+
+
+async def test_current_refreshes_only_after_a_third_of_the_lease(redis):
+    now = [1_000.0]
+    subject = leases(redis, "a", lease_seconds=30, clock=lambda: now[0])
+    await subject.current()
+    await redis.delete("notification:delivery_shard:0")
+
+    assert 0 in await subject.current()
+    assert await redis.get("notification:delivery_shard:0") is None
+    now[0] += 10
+    await subject.current()
+    assert await redis.get("notification:delivery_shard:0") == "a"
+
+
+def test_rejects_invalid_options(redis):
+    with pytest.raises(ValueError):
+        NotificationShardLeases(redis, shard_count=0)
+    with pytest.raises(ValueError):
+        NotificationShardLeases(redis, shard_count=4, lease_seconds=float("nan"))
@@ -0,0 +1,296 @@
+"""Tests for full and incremental notifier subscription sync."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import fakeredis.aioredis
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from db.models import Base, MyMtlWalletBot
+from infrastructure.services import notification_service as notification_module
+from infrastructure.services.notification_service import NotificationService
+from infrastructure.services.notification_subscription_sync import (
+    NotificationSubscriptionSync,
+    SubscriptionSyncStateStore,
+)
+
+WEBHOOK = "http://bot/webhook"
+
+
+class SqlitePool:
+    def __init__(self, engine) -> None:
+        self._sessions = async_sessionmaker(engine, class_=AsyncSession)
+
+    @asynccontextmanager
+    async def get_session(self):
+        async with self._sessions() as session:
+            yield session
+
+
+class FakeNotifier:
+    def __init__(self, subscriptions: list[dict], *, signed: bool = False) -> None:
+        self.subscriptions = subscriptions
+        self.uses_signed_nonce = signed
+        self.list_calls = 0
+        self.subscribed: list[str] = []
+        self.unsubscribed: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def list_subscriptions(self) -> list[dict]:
+        self.list_calls += 1
+        return list(self.subscriptions)
+
+    async def subscribe_batch(self, http_session, keys: list[str]) -> int:
+        self.subscribed.extend(keys)
+        return len(keys)
+
+    async def unsubscribe(self, http_session, subscription_id: str) -> bool:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        self.unsubscribed.append(subscription_id)
+        return True
+
+
+@asynccontextmanager
+async def no_http_session():
+    yield None
+
+
+async def no_sleep(seconds: float) -> None:
+    return None
+
+
+@pytest.fixture
+async def pool():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield SqlitePool(engine)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def redis():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+async def add_wallets(pool: SqlitePool, *wallets: tuple[int, str, int]) -> None:
+    async with pool.get_session() as session:
+        for wallet_id, public_key, need_delete in wallets:
+            session.add(
+                MyMtlWalletBot(
+                    id=wallet_id,
+                    user_id=wallet_id,
+                    public_key=public_key,
+                    need_delete=need_delete,
+                )
+            )
+        await session.commit()
+
+
+async def mark_deleted(
+    pool: SqlitePool, wallet_id: int, at: datetime | None = None
+) -> None:
+    async with pool.get_session() as session:
+        wallet = await session.get(MyMtlWalletBot, wallet_id)
+        wallet.need_delete = 1
+        wallet.last_use_day = at or datetime.now()
+        await session.commit()
+
+
+class FakeResponse:
+    status = 201
+
+    def __init__(self, body: dict) -> None:
+        self._body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    async def json(self, content_type=None) -> dict:
+        return self._body
+
+
+class FakeClientSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    def post(self, url, data, headers) -> FakeResponse:
+        return FakeResponse({"id": "c"})
+
+
+def make_sync(notifier, pool, redis=None, **options) -> NotificationSubscriptionSync:
+    return NotificationSubscriptionSync(
+        notifier=notifier,
+        db_pool=pool,
+        webhook_url=WEBHOOK,
+        state_store=None if redis is None else SubscriptionSyncStateStore(redis),
+        session_factory=no_http_session,  # type: ignore[arg-type]
+        sleep=no_sleep,
+        **options,
+    )
+
+
+async def test_full_sync_removes_stale_duplicate_and_misrouted_subscriptions(pool):
+    await add_wallets(
+        pool, (1, "GOK", 0), (2, "GDUP", 0), (3, "GURL", 0), (4, "GNEW", 0)
+    )
+    notifier = FakeNotifier(
+        [
+            {"id": "ok", "account": "GOK", "reaction_url": WEBHOOK},
+            {"id": "dup1", "account": "GDUP", "reaction_url": WEBHOOK},
+            {"id": "dup2", "account": "GDUP", "reaction_url": WEBHOOK},
+            {"id": "url", "account": "GURL", "reaction_url": "http://old"},
+            {"id": "gone", "account": "GGONE", "reaction_url": WEBHOOK},
+        ]
+    )
+
+    progress = await make_sync(notifier, pool).run()
+
+    assert sorted(notifier.unsubscribed) == ["dup1", "dup2", "gone", "url"]
+    assert sorted(notifier.subscribed) == ["GDUP", "GNEW", "GURL"]
+    assert progress.mode == "full"
+    assert progress.phase == "done"
+    assert progress.deleted == 4
+
+
+async def test_incremental_sync_only_touches_new_and_deleted_wallets(pool, redis):
+    await add_wallets(pool, (1, "GA", 0), (2, "GB", 0), (3, "GSHARED", 0))
+    notifier = FakeNotifier(
+        [
+            {"id": "a", "account": "GA", "reaction_url": WEBHOOK},
+            {"id": "b", "account": "GB", "reaction_url": WEBHOOK},
+            {"id": "s", "account": "GSHARED", "reaction_url": WEBHOOK},
+        ]
+    )
+    sync = make_sync(notifier, pool, redis)
+    await sync.run()
+    await add_wallets(pool, (4, "GC", 0), (5, "GSHARED", 0))
+    await mark_deleted(pool, 2)
+    await mark_deleted(pool, 3)
+
+    progress = await sync.run()
+
+    assert progress.mode == "incremental"
+    assert notifier.list_calls == 1
+    # GSHARED is still backed by wallet 5, so only GB is unsubscribed.
+    assert notifier.unsubscribed == ["b"]
+    assert notifier.subscribed == ["GC"]
+    state = SubscriptionSyncStateStore(redis)
+    assert await state.watermark() == 5
+    assert await state.known(["GA", "GB", "GC"]) == {"GA": ["a"], "GC": []}
+
+
+async def test_deletes_run_concurrently_unless_nonces_are_signed(pool):
+    subscriptions = [
+        {"id": str(index), "account": f"GX{index}", "reaction_url": WEBHOOK}
+        for index in range(6)
+    ]
+    token_notifier = FakeNotifier(subscriptions)
+    signed_notifier = FakeNotifier(subscriptions, signed=True)
+
+    await make_sync(token_notifier, pool, delete_concurrency=3).run()
+    await make_sync(signed_notifier, pool, delete_concurrency=3).run()
+
+    assert token_notifier.max_in_flight > 1
+    assert signed_notifier.max_in_flight == 1
+    assert len(signed_notifier.unsubscribed) == 6
+
+
+async def test_sync_failure_is_reported_in_progress(pool):
+    class BrokenNotifier(FakeNotifier):
+        async def list_subscriptions(self) -> list[dict]:
+            raise ConnectionError("notifier down")
+
+    progress = await make_sync(BrokenNotifier([]), pool).run()
+
+    assert progress.phase == "failed"
+    assert "notifier down" in progress.as_text()
+
+
+def test_rejects_invalid_delete_rate(pool):
+    with pytest.raises(ValueError):
+        make_sync(FakeNotifier([]), pool, delete_rate_per_second=float("inf"))
+
+
+async def test_wallet_added_between_syncs_is_not_subscribed_twice(
+    pool, redis, monkeypatch
+):
+    await add_wallets(pool, (1, "GA", 0))
+    notifier = FakeNotifier([{"id": "a", "account": "GA", "reaction_url": WEBHOOK}])
+    sync = make_sync(notifier, pool, redis)
+    await sync.run()
+    config = MagicMock(
+        notifier_url="http://notifier",
+        webhook_public_url=WEBHOOK,
+        notifier_auth_token="token",
+        test_mode=False,
+    )
+    service = NotificationService(config, pool, None, None)
+    service.set_subscription_sync(sync)
+    service._nonce = 1
+    monkeypatch.setattr(notification_module.aiohttp, "ClientSession", FakeClientSession)
+    public_key = "G" + "C" * 55
+
+    # What add_wallet does: store the wallet, then subscribe it directly.
+    await add_wallets(pool, (2, public_key, 0))
+    await service.subscribe(public_key)
+    progress = await sync.run()
+
+    assert progress.mode == "incremental"
+    assert notifier.subscribed == []
+    state = SubscriptionSyncStateStore(redis)
+    assert await state.known([public_key]) == {public_key: ["c"]}
+    assert await state.watermark() == 2
+
+
+async def test_incremental_sync_resolves_ids_of_bulk_subscribed_accounts(pool, redis):
+    await add_wallets(pool, (1, "GA", 0))
+    notifier = FakeNotifier([])
+    sync = make_sync(notifier, pool, redis)
+    await sync.run()
+    assert await SubscriptionSyncStateStore(redis).known(["GA"]) == {"GA": []}
+    notifier.subscriptions = [{"id": "a", "account": "GA", "reaction_url": WEBHOOK}]
+    await mark_deleted(pool, 1)
+
+    progress = await sync.run()
+
+    assert progress.mode == "incremental"
+    assert notifier.list_calls == 2
+    assert notifier.unsubscribed == ["a"]
+    assert await SubscriptionSyncStateStore(redis).known(["GA"]) == {}
+
+
+async def test_incremental_sync_reads_only_wallets_deleted_since_last_run(pool, redis):
+    await add_wallets(pool, (1, "GA", 0), (2, "GB", 0))
+    notifier = FakeNotifier(
+        [
+            {"id": "a", "account": "GA", "reaction_url": WEBHOOK},
+            {"id": "b", "account": "GB", "reaction_url": WEBHOOK},
+        ]
+    )
+    sync = make_sync(notifier, pool, redis)
+    await sync.run()
+    # Deleted long before the previous run; only a full sync looks at it again.
+    await mark_deleted(pool, 1, at=datetime.now() - timedelta(days=1))
+    await mark_deleted(pool, 2)
+
+    await sync.run()
+
+    assert notifier.unsubscribed == ["b"]
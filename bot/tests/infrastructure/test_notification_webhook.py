@@ -15,14 +15,17 @@ import json
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 import pytest
-from unittest.mock import ANY, MagicMock, AsyncMock
+from unittest.mock import ANY, MagicMock, AsyncMock, call
 from aiogram import Dispatcher
 from aiogram.exceptions import TelegramForbiddenError
+from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.methods import SendMessage
 import pytest_asyncio
 import fakeredis.aioredis
 
+from infrastructure.services.adaptive_concurrency import AdaptiveConcurrencyLimiter
 from infrastructure.services.notification_service import (
     NotificationService,
 )
@@ -30,7 +33,9 @@ from infrastructure.services.notification_coordinator import (
     NotificationCoordinator,
     NotificationSender,
 )
+from infrastructure.services.notification_ingest_stream import NotificationIngestStream
 from infrastructure.services.notification_redis_store import NotificationRedisStore
+from infrastructure.services.profile_cache import ProfileCache
 from infrastructure.services.notification_coordinator import NotificationBadgeRefresher
 from infrastructure.workers.notification_delivery_worker import (
     NotificationDeliveryWorker,
@@ -41,6 +46,7 @@ from infrastructure.services.bot_health_service import (
 )
 from core.models.blockchain_notification import BlockchainNotification
 from core.models.notification import NotificationOperation
+from middleware.fsm_cache import FSMUpdateCacheMiddleware
 from db.models import MyMtlWalletBot
 from tests.conftest import get_telegram_request
 
@@ -385,6 +391,13 @@ def test_payload_event_index_uses_notifier_index_then_numeric_operation_id(
 async def test_forbidden_notification_marks_wallet_deleted(
     notification_service, mock_db_pool
 ):
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    notification_service.profile_cache = ProfileCache(redis)
+    wallet = notification_wallet()
+    wallet.need_delete = 0
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = wallet
+    mock_db_pool._session.execute.return_value = result
     notification_service.bot = MagicMock(id=1)
     notification_service.bot.send_message = AsyncMock(
         side_effect=TelegramForbiddenError(
@@ -392,7 +405,7 @@ async def test_forbidden_notification_marks_wallet_deleted(
             message="Forbidden: bot was blocked by the user",
         )
     )
-    history = MagicMock()
+    history = AsyncMock()
     notification_service.notification_history = history
     event = BlockchainNotification(
         notification_id="forbidden",
@@ -412,14 +425,18 @@ async def test_forbidden_notification_marks_wallet_deleted(
     # it after the wallet is marked for deletion.
     mock_db_pool._session.add.assert_not_called()
     mock_db_pool._session.commit.assert_awaited_once()
-    history.add_delivered.assert_not_called()
+    history.add_delivered.assert_not_awaited()
+    assert wallet.need_delete == 1
+    # Cached profiles of the owner are retired with the wallet.
+    assert await redis.get("profile:version:12345") == "1"
+    await redis.aclose()
 
 
 @pytest.mark.asyncio
 async def test_delivery_records_history_only_after_telegram_success(
     notification_service,
 ):
-    history = MagicMock()
+    history = AsyncMock()
     notification_service.notification_history = history
     notification_service.bot = MagicMock(id=1)
     notification_service.bot.send_message = AsyncMock(
@@ -446,7 +463,39 @@ async def test_delivery_records_history_only_after_telegram_success(
     await notification_service.send_notification(event)
 
     notification_service.bot.send_message.assert_awaited_once()
-    history.add_delivered.assert_called_once_with(event)
+    history.add_delivered.assert_awaited_once_with(event)
+
+
+@pytest.mark.asyncio
+async def test_digest_delivery_sends_one_message_and_records_each_event(
+    notification_service,
+):
+    history = AsyncMock()
+    notification_service.notification_history = history
+    notification_service.bot = MagicMock(id=1)
+    notification_service.bot.send_message = AsyncMock(
+        return_value=MagicMock(message_id=1)
+    )
+    events = [
+        BlockchainNotification(
+            notification_id=f"fill-{index}",
+            user_id=12345,
+            event_type="trade",
+            text=f"fill {index}",
+            created_at=1,
+            transaction_hash=f"tx-{index}",
+            event_index=0,
+            data={"operation_id": str(index)},
+        )
+        for index in range(3)
+    ]
+
+    await notification_service.send_notification_digest(events)
+
+    notification_service.bot.send_message.assert_awaited_once()
+    sent_text = notification_service.bot.send_message.await_args.args[1]
+    assert sent_text == "fill 0\n\nfill 1\n\nfill 2"
+    assert history.add_delivered.call_args_list == [call(event) for event in events]
 
 
 @pytest.mark.asyncio
@@ -641,12 +690,80 @@ async def test_process_notification_closes_lookup_session_before_sending(
     )
 
 
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_stage_latency_and_ledger_age(
+    notification_service,
+):
+    wallet = notification_wallet()
+    coordinator = AsyncMock(spec=NotificationCoordinator)
+    notification_service.notification_coordinator = coordinator
+    notification_service._verify_webhook_signature = MagicMock(return_value=True)
+    wallets = MagicMock()
+    wallets.scalars.return_value.all.return_value = [wallet]
+    empty = MagicMock()
+    empty.scalars.return_value.all.return_value = []
+    empty.all.return_value = []
+    notification_service.db_pool._session.execute.side_effect = [wallets, empty, empty]
+    body = json.dumps(
+        {
+            "operation": {
+                "id": "7",
+                "type": "payment",
+                "source_account": "GFROM" + "A" * 51,
+                "to": wallet.public_key,
+                "amount": "1.0",
+                "asset": {"asset_type": "native"},
+            },
+            "transaction": {
+                "hash": "tx-metrics",
+                "closed_at": "2024-01-01T00:00:00Z",
+            },
+        }
+    ).encode()
+
+    class RequestStub:
+        async def read(self):
+            return body
+
+    response = await notification_service.handle_webhook(RequestStub())
+    metrics_response = await notification_service.handle_metrics(None)
+
+    assert response.status == 200
+    accepted = coordinator.accept.await_args.args[0]
+    assert accepted.data["ledger_closed_at"] == 1_704_067_200
+    stages = json.loads(metrics_response.text)["stages"]
+    assert stages["webhook"]["count"] == 1
+    assert stages["webhook"]["failures"] == 0
+    assert stages["account_lookup"]["count"] == 1
+    assert stages["decode"]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_fsm_round_trips(notification_service):
+    middleware = FSMUpdateCacheMiddleware()
+    notification_service.set_fsm_stats(middleware.stats)
+    storage = MemoryStorage()
+
+    async def handler(_event, data):
+        await data["state"].update_data(amount="10")
+
+    context = FSMContext(storage, StorageKey(bot_id=1, chat_id=42, user_id=42))
+    await middleware(handler, MagicMock(), {"state": context, "raw_state": None})
+    report = json.loads((await notification_service.handle_metrics(None)).text)
+
+    assert report["fsm"]["updates"] == 1
+    assert report["fsm"]["reads"] == 1
+    assert report["fsm"]["writes"] == 1
+
+
 @pytest.mark.asyncio
 async def test_handle_webhook_limits_concurrent_notification_processing(
     notification_service,
 ):
     limit = 2
-    notification_service._webhook_processing_semaphore = asyncio.Semaphore(limit)
+    notification_service.webhook_limiter = AdaptiveConcurrencyLimiter(
+        initial_limit=limit, max_limit=limit
+    )
     active = 0
     max_active = 0
     release = asyncio.Event()
@@ -676,6 +793,45 @@ async def test_handle_webhook_limits_concurrent_notification_processing(
     assert max_active <= limit
 
 
+@pytest.mark.asyncio
+async def test_handle_webhook_sheds_load_with_retry_after_when_the_queue_is_full(
+    notification_service,
+):
+    notification_service.webhook_limiter = AdaptiveConcurrencyLimiter(
+        initial_limit=1, max_limit=1, max_queue=1
+    )
+    release = asyncio.Event()
+
+    async def slow_process_notification(payload):
+        await release.wait()
+
+    class RequestStub:
+        async def read(self):
+            return b'{"operation": {"id": "op", "type": "payment"}}'
+
+    notification_service._verify_webhook_signature = MagicMock(return_value=True)
+    notification_service.process_notification = slow_process_notification
+
+    admitted = [
+        asyncio.create_task(notification_service.handle_webhook(RequestStub()))
+        for _ in range(2)
+    ]
+    await asyncio.sleep(0)
+    rejected = await notification_service.handle_webhook(RequestStub())
+    concurrency = json.loads((await notification_service.handle_metrics(None)).text)[
+        "webhook_concurrency"
+    ]
+    release.set()
+    responses = await asyncio.gather(*admitted)
+
+    assert rejected.status == 503
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert [response.status for response in responses] == [200, 200]
+    assert concurrency["in_flight"] == 1
+    assert concurrency["queued"] == 1
+    assert concurrency["rejected"] == 1
+
+
 @pytest.mark.asyncio
 async def test_webhook_returns_retryable_failure_when_durable_accept_fails(
     notification_service,
@@ -740,6 +896,47 @@ async def test_webhook_keeps_filtered_notification_as_a_successful_noop(
     coordinator.accept.assert_not_awaited()
 
 
+@pytest.mark.asyncio
+async def test_webhook_with_ingest_stream_acknowledges_after_append_only(
+    notification_service,
+):
+    """A configured ingest stream takes the body; processing happens in the worker."""
+    body = b'{"operation": {"id": "op", "type": "payment"}}'
+    stream = AsyncMock(spec=NotificationIngestStream)
+    notification_service.set_notification_ingest_stream(stream)
+    notification_service._verify_webhook_signature = MagicMock(return_value=True)
+    notification_service.process_notification = AsyncMock(
+        side_effect=AssertionError("must not process inline")
+    )
+
+    class RequestStub:
+        async def read(self):
+            return body
+
+    response = await notification_service.handle_webhook(RequestStub())
+
+    assert response.status == 200
+    stream.append.assert_awaited_once_with(body.decode())
+
+
+@pytest.mark.asyncio
+async def test_webhook_with_ingest_stream_asks_for_retry_when_append_fails(
+    notification_service,
+):
+    stream = AsyncMock(spec=NotificationIngestStream)
+    stream.append.side_effect = RuntimeError("redis unavailable")
+    notification_service.set_notification_ingest_stream(stream)
+    notification_service._verify_webhook_signature = MagicMock(return_value=True)
+
+    class RequestStub:
+        async def read(self):
+            return b'{"operation": {"id": "op", "type": "payment"}}'
+
+    response = await notification_service.handle_webhook(RequestStub())
+
+    assert response.status == 500
+
+
 @pytest.mark.asyncio
 async def test_create_account_uses_destination_for_new_account(notification_service):
     """create_account must point to the newly created destination account."""
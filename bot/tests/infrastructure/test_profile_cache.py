@@ -0,0 +1,191 @@
+"""Tests for the Redis-mirrored profile cache."""
+
+import asyncio
+
+import fakeredis.aioredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from core.domain.entities import User, UserProfile, Wallet, WalletProfile
+from db.session import LazyAsyncSession
+from db.models import Base
+from infrastructure.persistence.repository_factory import (
+    SqlAlchemyRepositoryFactory,
+)
+from infrastructure.services.profile_cache import ProfileCache
+
+USER_ID = 42
+PROFILE = UserProfile(id=USER_ID, username="owner", language="en")
+
+
+@pytest.fixture
+async def redis():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+class Loader:
+    def __init__(self, profile) -> None:
+        self.profile = profile
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.profile
+
+
+@pytest.mark.asyncio
+async def test_profiles_are_shared_through_redis_and_process_memory(redis):
+    first, second = ProfileCache(redis), ProfileCache(redis)
+    loader = Loader(PROFILE)
+
+    assert await first.user_profile(USER_ID, loader) == PROFILE
+    assert await first.user_profile(USER_ID, loader) == PROFILE
+    assert await second.user_profile(USER_ID, loader) == PROFILE
+
+    assert loader.calls == 1
+    assert (first.misses, first.local_hits, second.redis_hits) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_every_instance(redis):
+    first, second = ProfileCache(redis), ProfileCache(redis)
+    wallet = WalletProfile(
+        id=1,
+        user_id=USER_ID,
+        public_key="GOLD",
+        is_free=True,
+        use_pin=0,
+        assets_visibility="{}",
+    )
+    await first.wallet_profile(USER_ID, Loader(wallet))
+    await second.wallet_profile(USER_ID, Loader(wallet))
+
+    await first.invalidate(USER_ID)
+    changed = Loader(None)
+
+    assert await second.wallet_profile(USER_ID, changed) is None
+    assert await first.wallet_profile(USER_ID, changed) is None
+    assert changed.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_profile_loaded_during_a_write_is_not_served(redis):
+    cache = ProfileCache(redis, local_entries=0)
+    loading = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_load():
+        loading.set()
+        await release.wait()
+        return PROFILE
+
+    reader = asyncio.create_task(cache.user_profile(USER_ID, slow_load))
+    await loading.wait()
+    await cache.invalidate(USER_ID)
+    release.set()
+    await reader
+
+    fresh = Loader(UserProfile(id=USER_ID, username="owner", language="ru"))
+    assert (await cache.user_profile(USER_ID, fresh)).language == "ru"
+
+
+@pytest.mark.asyncio
+async def test_unavailable_redis_falls_back_to_the_loader(redis):
+    cache = ProfileCache(redis)
+
+    async def fail(*_args):
+        raise RedisConnectionError("down")
+
+    redis.mget = fail
+    loader = Loader(PROFILE)
+
+    assert await cache.user_profile(USER_ID, loader) == PROFILE
+    assert loader.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_repository_writes_publish_after_commit(redis, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'profile.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(
+        engine, class_=LazyAsyncSession, expire_on_commit=False
+    )
+    factory = SqlAlchemyRepositoryFactory(profile_cache=ProfileCache(redis))
+    try:
+        async with sessions() as session:
+            await factory.get_user_repository(session).create(
+                User(id=USER_ID, username="owner", language="en")
+            )
+            await factory.get_wallet_repository(session).create(
+                Wallet(
+                    id=0,
+                    user_id=USER_ID,
+                    public_key="GMAIN",
+                    is_default=True,
+                    is_free=True,
+                )
+            )
+            await session.commit()
+
+        async with sessions() as writer, sessions() as reader:
+            writer_users = factory.get_user_repository(writer)
+            reader_users = factory.get_user_repository(reader)
+            assert (await reader_users.get_by_id(USER_ID)).language == "en"
+            assert (await reader_users.get_profile(USER_ID)).language == "en"
+
+            await writer_users.update_lang(USER_ID, "ru")
+            assert (await writer_users.get_profile(USER_ID)).language == "ru"
+            assert (await reader_users.get_profile(USER_ID)).language == "en"
+
+            await writer.commit()
+            assert (await reader_users.get_profile(USER_ID)).language == "ru"
+
+        async with sessions() as session:
+            wallets = factory.get_wallet_repository(session)
+            assert (await wallets.get_default_wallet_profile(USER_ID)).is_free
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_marking_a_wallet_deleted_by_id_retires_the_cached_profile(
+    redis, tmp_path
+):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'profile.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(
+        engine, class_=LazyAsyncSession, expire_on_commit=False
+    )
+    factory = SqlAlchemyRepositoryFactory(profile_cache=ProfileCache(redis))
+    try:
+        async with sessions() as session:
+            wallet = await factory.get_wallet_repository(session).create(
+                Wallet(
+                    id=0,
+                    user_id=USER_ID,
+                    public_key="GMAIN",
+                    is_default=True,
+                    is_free=True,
+                )
+            )
+            await session.commit()
+
+        async with sessions() as session:
+            wallets = factory.get_wallet_repository(session)
+            assert await wallets.get_default_wallet_profile(USER_ID) is not None
+
+            assert await wallets.mark_deleted_by_id(wallet.id) is True
+            assert await wallets.mark_deleted_by_id(wallet.id) is False
+
+        async with sessions() as session:
+            wallets = factory.get_wallet_repository(session)
+            assert await wallets.get_default_wallet_profile(USER_ID) is None
+    finally:
+        await engine.dispose()
@@ -0,0 +1,118 @@
+"""Tests for the session-scoped repository identity map."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.domain.entities import User, Wallet
+from db.models import Base
+from infrastructure.persistence.identity_map import session_query_count
+from infrastructure.persistence.repository_factory import (
+    SqlAlchemyRepositoryFactory,
+)
+
+USER_ID = 777
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as db_session:
+        users = SqlAlchemyRepositoryFactory().get_user_repository(db_session)
+        wallets = SqlAlchemyRepositoryFactory().get_wallet_repository(db_session)
+        await users.create(User(id=USER_ID, username="owner", language="en"))
+        await wallets.create(
+            Wallet(
+                id=0,
+                user_id=USER_ID,
+                public_key="GDEFAULT",
+                is_default=True,
+                is_free=False,
+            )
+        )
+        await db_session.commit()
+        yield db_session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_repositories_of_one_session_share_loaded_entities(session):
+    factory = SqlAlchemyRepositoryFactory()
+    before = session_query_count(session)
+
+    first = await factory.get_wallet_repository(session).get_default_wallet(USER_ID)
+    second = await factory.get_wallet_repository(session).get_default_wallet(USER_ID)
+    by_id = factory.get_wallet_repository(session)
+    await by_id.get_by_id(first.id)
+    await by_id.get_by_id(first.id)
+    await factory.get_user_repository(session).get_by_id(USER_ID)
+    user = await factory.get_user_repository(session).get_by_id(USER_ID)
+
+    assert session_query_count(session) - before == 3
+    assert second == first and second is not first
+    assert user.username == "owner"
+
+
+@pytest.mark.asyncio
+async def test_changing_a_returned_entity_does_not_change_the_cache(session):
+    wallets = SqlAlchemyRepositoryFactory().get_wallet_repository(session)
+
+    wallet = await wallets.get_default_wallet(USER_ID)
+    wallet.balances = ["changed"]
+
+    assert (await wallets.get_default_wallet(USER_ID)).balances is None
+
+
+@pytest.mark.asyncio
+async def test_writes_through_the_repositories_drop_cached_entities(session):
+    factory = SqlAlchemyRepositoryFactory()
+    wallets = factory.get_wallet_repository(session)
+    users = factory.get_user_repository(session)
+    wallet = await wallets.get_default_wallet(USER_ID)
+    await users.get_by_id(USER_ID)
+
+    await factory.get_wallet_repository(session).create(
+        Wallet(
+            id=0, user_id=USER_ID, public_key="GSECOND", is_default=False, is_free=False
+        )
+    )
+    await wallets.set_default_wallet(USER_ID, "GSECOND")
+    await users.update_lang(USER_ID, "ru")
+
+    assert (await wallets.get_default_wallet(USER_ID)).public_key == "GSECOND"
+    assert (await wallets.get_by_id(wallet.id)).is_default is False
+    assert (await users.get_by_id(USER_ID)).language == "ru"
+
+
+@pytest.mark.asyncio
+async def test_rollback_drops_cached_entities(session):
+    wallets = SqlAlchemyRepositoryFactory().get_wallet_repository(session)
+    await wallets.get_default_wallet(USER_ID)
+    before = session_query_count(session)
+
+    await session.rollback()
+    await wallets.get_default_wallet(USER_ID)
+
+    assert session_query_count(session) - before == 1
+
+
+def test_importing_the_identity_map_does_not_build_the_database_pool():
+    code = (
+        "import sys, infrastructure.persistence.identity_map; "
+        "print('db.db_pool' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,112 @@
+"""Tests for the registry-based FSM serializer."""
+
+import json
+
+import jsonpickle  # type: ignore
+import pytest
+
+from core.domain.value_objects import Balance as DomainBalance
+from infrastructure.utils.serialization import (
+    SerializationError,
+    dump_callback,
+    dump_values,
+    fsm_callback,
+    load_callback,
+    load_values,
+)
+from other.mytypes import Balance, MyOffer
+from routers.bsn import Address, BSNData, BSNRow, Key, Value
+
+OFFER = MyOffer.from_dict(
+    {
+        "id": "12",
+        "paging_token": "12",
+        "seller": "GSELLER",
+        "selling": {
+            "asset_type": "credit_alphanum12",
+            "asset_code": "EURMTL",
+            "asset_issuer": "GISSUER",
+        },
+        "buying": {"asset_type": "native"},
+        "amount": "10.0000000",
+        "price_r": {"n": 1, "d": 2},
+        "price": "0.5000000",
+        "last_modified_ledger": 5,
+        "last_modified_time": "2024-01-01T00:00:00Z",
+    }
+)
+
+
+@fsm_callback
+async def registered_callback(session, user_id, state):
+    return None
+
+
+async def unregistered_callback(session, user_id, state):
+    return None
+
+
+def test_callbacks_round_trip_by_name():
+    payload = dump_callback(registered_callback)
+
+    assert json.loads(payload) == {"fn": f"{__name__}.registered_callback"}
+    assert load_callback(payload) is registered_callback
+    assert load_callback(jsonpickle.dumps(registered_callback)) is registered_callback
+
+
+def test_unregistered_callbacks_are_refused():
+    with pytest.raises(SerializationError):
+        dump_callback(unregistered_callback)
+    with pytest.raises(SerializationError):
+        load_callback(jsonpickle.dumps(unregistered_callback))
+    with pytest.raises(SerializationError):
+        load_callback('{"fn": "os.system"}')
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        [
+            Balance(
+                balance="1.0",
+                asset_code="EURMTL",
+                asset_issuer="GISSUER",
+                asset_type="credit_alphanum12",
+            )
+        ],
+        [DomainBalance("XLM", None, "native", "5.0", selling_liabilities="1.5")],
+        [OFFER],
+    ],
+)
+def test_values_round_trip_and_decode_legacy_payloads(value):
+    payload = dump_values(value)
+
+    assert load_values(payload) == value
+    assert load_values(jsonpickle.encode(value)) == value
+    assert len(payload) < len(jsonpickle.encode(value))
+
+
+def test_bsn_data_keeps_row_actions_and_free_numbers():
+    data = BSNData(
+        Address("GADDRESS"),
+        [BSNRow.from_str("Name", "Alice"), BSNRow.from_str("A1", "x")],
+    )
+    data.add_new_data_row(Key("About"), Value("Designer"))
+    data.del_data_row(Key("A1"))
+
+    restored = load_values(dump_values(data))
+    restored.add_new_data_row(Key("A"), Value("y"))
+    data.add_new_data_row(Key("A"), Value("y"))
+
+    assert [str(row) for row in restored.changed_items()] == [
+        str(row) for row in data.changed_items()
+    ]
+
+
+def test_legacy_payloads_naming_unknown_code_are_refused():
+    payload = json.dumps([{"py/object": "subprocess.Popen", "args": "id"}])
+
+    with pytest.raises(SerializationError):
+        load_values(payload)
+    with pytest.raises(SerializationError):
+        dump_values([object()])
@@ -0,0 +1,130 @@
+"""Tests for Redis token buckets and the priority-aware Telegram send scheduler."""
+
+import asyncio
+
+import fakeredis.aioredis
+import pytest
+
+from infrastructure.services.telegram_send_scheduler import (
+    RedisSendBuckets,
+    SendPriority,
+    TelegramSendScheduler,
+    TokenGrant,
+    current_send_priority,
+    telegram_send_priority,
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+async def redis():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+def buckets(redis, clock: Clock, **overrides) -> RedisSendBuckets:
+    options = {"global_rate": 10.0, "chat_rate": 1.0, "chat_burst": 2.0}
+    options.update(overrides)
+    return RedisSendBuckets(redis, clock=clock, **options)
+
+
+async def test_chat_bucket_limits_one_chat_and_refills(redis):
+    clock = Clock()
+    limiter = buckets(redis, clock)
+
+    first = await limiter.take(1, SendPriority.INTERACTIVE)
+    second = await limiter.take(1, SendPriority.INTERACTIVE)
+    third = await limiter.take(1, SendPriority.INTERACTIVE)
+    other_chat = await limiter.take(2, SendPriority.INTERACTIVE)
+    clock.now += 1.0
+    refilled = await limiter.take(1, SendPriority.INTERACTIVE)
+
+    assert first.granted and second.granted
+    assert third == TokenGrant(False, pytest.approx(1.0), "chat")
+    assert other_chat.granted
+    assert refilled.granted
+
+
+async def test_lower_priority_leaves_global_headroom_for_interactive(redis):
+    clock = Clock()
+    limiter = buckets(redis, clock, chat_burst=100.0)
+
+    broadcasts = [
+        await limiter.take(chat_id, SendPriority.BROADCAST) for chat_id in range(10)
+    ]
+    interactive = [
+        await limiter.take(100 + chat_id, SendPriority.INTERACTIVE)
+        for chat_id in range(5)
+    ]
+
+    # Broadcasts stop once half of the 10-token burst is left for higher classes.
+    assert sum(grant.granted for grant in broadcasts) == 5
+    assert broadcasts[-1].blocked_by == "global"
+    assert all(grant.granted for grant in interactive)
+
+
+class ScriptedBuckets:
+    """Grants a fixed number of slots, recording who received them."""
+
+    def __init__(self, slots: int) -> None:
+        self.slots = slots
+        self.granted: list[tuple[int | None, SendPriority]] = []
+
+    async def take(self, chat_id: int | None, priority: SendPriority) -> TokenGrant:
+        if self.slots <= 0:
+            return TokenGrant(False, 0.01, "global")
+        self.slots -= 1
+        self.granted.append((chat_id, priority))
+        return TokenGrant(True)
+
+
+async def test_scheduler_serves_priorities_first_and_rotates_chats():
+    limiter = ScriptedBuckets(slots=0)
+    scheduler = TelegramSendScheduler(limiter)  # type: ignore[arg-type]
+    waiters = [
+        asyncio.create_task(scheduler.acquire(1, SendPriority.BROADCAST)),
+        asyncio.create_task(scheduler.acquire(1, SendPriority.BROADCAST)),
+        asyncio.create_task(scheduler.acquire(2, SendPriority.BROADCAST)),
+        asyncio.create_task(scheduler.acquire(3, SendPriority.INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    limiter.slots = 4
+
+    await asyncio.wait_for(asyncio.gather(*waiters), timeout=1)
+
+    assert limiter.granted == [
+        (3, SendPriority.INTERACTIVE),
+        (1, SendPriority.BROADCAST),
+        (2, SendPriority.BROADCAST),
+        (1, SendPriority.BROADCAST),
+    ]
+    assert scheduler.stats()["granted_broadcast"] == 3
+    await scheduler.close()
+
+
+async def test_scheduler_fails_open_when_redis_is_unavailable():
+    class BrokenBuckets:
+        async def take(self, chat_id, priority):
+            raise ConnectionError("redis down")
+
+    scheduler = TelegramSendScheduler(BrokenBuckets())  # type: ignore[arg-type]
+
+    await asyncio.wait_for(scheduler.acquire(1), timeout=1)
+
+    await scheduler.close()
+
+
+def test_priority_context_is_restored():
+    with telegram_send_priority(SendPriority.BROADCAST):
+        assert current_send_priority() is SendPriority.BROADCAST
+    assert current_send_priority() is SendPriority.INTERACTIVE
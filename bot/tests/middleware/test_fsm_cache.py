@@ -0,0 +1,201 @@
+"""Tests for the update-scoped FSM cache."""
+
+import json
+from types import SimpleNamespace
+
+import fakeredis.aioredis
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
+
+from middleware.fsm_cache import (
+    CachedFSMContext,
+    FSMUpdateCacheMiddleware,
+    get_fsm_data,
+    update_fsm_data,
+)
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+
+@pytest.fixture
+async def storage():
+    redis_storage = RedisStorage(fakeredis.aioredis.FakeRedis(decode_responses=True))
+    try:
+        yield redis_storage
+    finally:
+        await redis_storage.close()
+
+
+@pytest.mark.asyncio
+async def test_reads_come_from_one_load_and_writes_flush_together(storage):
+    await storage.set_data(KEY, {"user_lang": "en", "last_message_id": 5})
+    context = CachedFSMContext(storage, KEY, state=None)
+
+    assert (await context.get_data())["user_lang"] == "en"
+    await context.update_data(amount="10")
+    await context.update_data({"asset": "EURMTL"})
+    await context.set_state("SendStates:amount")
+    assert await context.get_value("amount") == "10"
+    assert await context.get_state() == "SendStates:amount"
+    assert await storage.get_data(KEY) == {"user_lang": "en", "last_message_id": 5}
+
+    await context.close()
+
+    assert await storage.get_state(KEY) == "SendStates:amount"
+    assert await storage.get_data(KEY) == {
+        "user_lang": "en",
+        "last_message_id": 5,
+        "amount": "10",
+        "asset": "EURMTL",
+    }
+    assert (context.reads, context.writes) == (1, 1)
+    assert context.cached_calls == 4
+
+
+@pytest.mark.asyncio
+async def test_unchanged_record_is_not_written_back(storage):
+    await storage.set_data(KEY, {"show_more": False})
+    context = CachedFSMContext(storage, KEY, state=None)
+
+    await context.update_data(show_more=False)
+    await context.set_state(None)
+    await context.close()
+
+    assert context.writes == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_keeps_keys_written_by_another_task(storage):
+    await storage.set_data(KEY, {"user_lang": "en", "amount": "5", "memo": "x"})
+    context = CachedFSMContext(storage, KEY, state=None)
+    await context.get_data()
+    await context.update_data(amount="10")
+    data = await context.get_data()
+    data.pop("memo")
+    await context.set_data(data)
+
+    await storage.update_data(KEY, {"last_message_id": 99})
+    await context.flush()
+
+    assert await storage.get_data(KEY) == {
+        "user_lang": "en",
+        "amount": "10",
+        "last_message_id": 99,
+    }
+    assert await context.get_value("last_message_id") == 99
+
+
+@pytest.mark.asyncio
+async def test_flush_retries_when_the_record_changes_under_watch():
+    server = fakeredis.FakeServer()
+    storage = RedisStorage(
+        fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    )
+    other_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    data_key = storage.key_builder.build(KEY, "data")
+    await storage.set_data(KEY, {"amount": "5"})
+    context = CachedFSMContext(storage, KEY, state=None)
+    await context.update_data(amount="10")
+    loads = storage.json_loads
+    calls = []
+
+    def racing_loads(raw):
+        calls.append(raw)
+        if len(calls) == 1:
+            other_client.set(data_key, '{"amount": "5", "last_message_id": 7}')
+        return loads(raw)
+
+    storage.json_loads = racing_loads
+    await context.flush()
+
+    assert len(calls) == 2
+    assert json.loads(other_client.get(data_key)) == {
+        "amount": "10",
+        "last_message_id": 7,
+    }
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_clear_deletes_both_records(storage):
+    await storage.set_state(KEY, "SendStates:amount")
+    await storage.set_data(KEY, {"amount": "10"})
+    context = CachedFSMContext(storage, KEY)
+
+    await context.clear()
+    await context.close()
+
+    assert await storage.get_state(KEY) is None
+    assert await storage.redis.exists(storage.key_builder.build(KEY, "data")) == 0
+
+
+@pytest.mark.asyncio
+async def test_mutating_returned_data_does_not_change_the_cache():
+    context = CachedFSMContext(MemoryStorage(), KEY, state=None)
+    await context.set_data({"assets": ["XLM"]})
+
+    (await context.get_data())["assets"].append("EURMTL")
+
+    assert await context.get_value("assets") == ["XLM"]
+
+
+@pytest.mark.asyncio
+async def test_closed_context_writes_straight_to_storage():
+    storage = MemoryStorage()
+    context = CachedFSMContext(storage, KEY, state=None)
+    await context.close()
+
+    await context.update_data(last_message_id=7)
+
+    assert await storage.get_data(KEY) == {"last_message_id": 7}
+
+
+@pytest.mark.asyncio
+async def test_middleware_shares_one_record_with_direct_storage_helpers():
+    storage = MemoryStorage()
+    await storage.set_data(KEY, {"user_lang": "en"})
+    middleware = FSMUpdateCacheMiddleware()
+    seen = {}
+
+    async def handler(_event, data):
+        state = data["state"]
+        seen["state"] = state
+        await state.update_data(amount="10")
+        seen["helper"] = await get_fsm_data(storage, KEY)
+        await update_fsm_data(storage, KEY, {"last_message_id": 9}, flush=True)
+        seen["flushed"] = await storage.get_data(KEY)
+        await state.set_state("SendStates:amount")
+        return "done"
+
+    result = await middleware(
+        handler,
+        SimpleNamespace(),
+        {"state": FSMContext(storage, KEY), "raw_state": None},
+    )
+
+    assert result == "done"
+    assert isinstance(seen["state"], CachedFSMContext)
+    assert seen["state"].closed
+    assert seen["helper"] == {"user_lang": "en", "amount": "10"}
+    assert seen["flushed"] == {"user_lang": "en", "amount": "10", "last_message_id": 9}
+    assert await storage.get_state(KEY) == "SendStates:amount"
+    assert middleware.stats.as_dict() == {
+        "updates": 1,
+        "reads": 1,
+        "writes": 2,
+        "cached_calls": 2,
+        "ops_per_update": 3,
+        "max_ops_per_update": 3,
+    }
+
+
+@pytest.mark.asyncio
+async def test_helpers_outside_an_update_use_the_storage():
+    storage = MemoryStorage()
+
+    await update_fsm_data(storage, KEY, {"last_message_id": 3}, flush=False)
+
+    assert await get_fsm_data(storage, KEY) == {"last_message_id": 3}
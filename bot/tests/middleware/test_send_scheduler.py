@@ -0,0 +1,42 @@
+from unittest.mock import AsyncMock, create_autospec
+
+from aiogram.methods import (
+    AnswerCallbackQuery,
+    DeleteMessage,
+    EditMessageText,
+    SendMessage,
+)
+
+from infrastructure.services.telegram_send_scheduler import TelegramSendScheduler
+from middleware.send_scheduler import SendSchedulerRequestMiddleware
+
+
+async def test_chat_requests_wait_for_a_slot_and_others_pass_through():
+    scheduler = create_autospec(TelegramSendScheduler, instance=True, spec_set=True)
+    make_request = AsyncMock(return_value="response")
+    middleware = SendSchedulerRequestMiddleware(scheduler)
+
+    sent = await middleware(make_request, None, SendMessage(chat_id=42, text="hi"))
+    answered = await middleware(
+        make_request, None, AnswerCallbackQuery(callback_query_id="1")
+    )
+
+    assert sent == answered == "response"
+    scheduler.acquire.assert_awaited_once_with(42)
+    assert make_request.await_count == 2
+
+
+async def test_edits_and_deletes_skip_the_chat_bucket():
+    scheduler = create_autospec(TelegramSendScheduler, instance=True, spec_set=True)
+    make_request = AsyncMock(return_value="response")
+    middleware = SendSchedulerRequestMiddleware(scheduler)
+
+    await middleware(
+        make_request, None, EditMessageText(chat_id=42, message_id=7, text="hi")
+    )
+    await middleware(make_request, None, DeleteMessage(chat_id=42, message_id=7))
+
+    assert [call.args for call in scheduler.acquire.await_args_list] == [
+        (None,),
+        (None,),
+    ]
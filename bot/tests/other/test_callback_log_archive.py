@@ -0,0 +1,54 @@
+"""Tests for the callback log archive CLI."""
+
+import io
+from datetime import date, datetime
+
+from infrastructure.services.log_archive import (
+    ArchivedLogRow,
+    LogArchive,
+    TableSizeSample,
+)
+from scripts.callback_log_archive import format_report, write_rows
+
+
+def test_query_output_is_csv_with_a_header():
+    out = io.StringIO()
+    rows = [
+        ArchivedLogRow(
+            log_id=1,
+            user_id=None,
+            log_dt=datetime(2026, 1, 5, 10, 30),
+            log_operation="callback",
+            log_operation_info="Send",
+        )
+    ]
+
+    assert write_rows(rows, out) == 1
+    assert out.getvalue().splitlines() == [
+        "log_id,user_id,log_dt,log_operation,log_operation_info",
+        "1,,2026-01-05 10:30:00,callback,Send",
+    ]
+
+
+def test_report_lists_size_samples_and_archive_months(tmp_path):
+    archive = LogArchive(tmp_path)
+    row = ArchivedLogRow(1, 7, datetime(2026, 1, 5), "callback", "Send")
+    archive.append(date(2026, 1, 5), [row])
+    archive.append(date(2026, 1, 9), [row])
+    archive.record_size(
+        TableSizeSample(
+            taken_at=datetime(2026, 4, 5, 3, 0),
+            rows=1200,
+            oldest=datetime(2026, 1, 10),
+            archived=2,
+        )
+    )
+
+    report = format_report(archive)
+
+    assert report[:2] == [
+        "Table size samples:",
+        "  2026-04-05 03:00  rows=1200  oldest=2026-01-10  archived=2",
+    ]
+    assert report[2] == "Archive by month:"
+    assert report[3].startswith("  2026-01  days=2  bytes=")
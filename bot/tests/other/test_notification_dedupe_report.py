@@ -0,0 +1,52 @@
+"""Tests for the notification dedupe memory report."""
+
+import fakeredis.aioredis
+
+from core.models.blockchain_notification import BlockchainNotification
+from infrastructure.services.notification_redis_store import NotificationRedisStore
+from scripts.notification_dedupe_report import collect_dedupe_usage
+
+
+def notification(user_id: int, transaction_hash: str) -> BlockchainNotification:
+    return BlockchainNotification(
+        notification_id=f"notification-{transaction_hash}",
+        user_id=user_id,
+        event_type="payment",
+        text="Payment",
+        created_at=1_720_000_000,
+        transaction_hash=transaction_hash,
+        event_index=0,
+    )
+
+
+async def test_report_groups_buckets_legacy_and_pending_ids_per_user():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    store = NotificationRedisStore(
+        redis, hold_seconds=120, lock_ttl_seconds=30, dedupe_ttl_seconds=60
+    )
+    try:
+        for index in range(3):
+            await store.enqueue(
+                7, notification(7, f"tx-{index}"), now=1_000 + 20 * index
+            )
+        await store.enqueue(9, notification(9, "tx-9"), now=1_000)
+        await redis.sadd("notification:dedupe:9", "tx-old:payment:0:9")
+
+        usage = await collect_dedupe_usage(redis)
+    finally:
+        await redis.aclose()
+
+    by_user = {entry.user_id: entry for entry in usage}
+    assert [entry.user_id for entry in usage] == [7, 9]
+    assert (by_user[7].bucket_ids, by_user[7].legacy_ids, by_user[7].pending_ids) == (
+        3,
+        0,
+        3,
+    )
+    assert by_user[7].keys == 4
+    assert (by_user[9].bucket_ids, by_user[9].legacy_ids, by_user[9].pending_ids) == (
+        1,
+        1,
+        1,
+    )
+    assert all(entry.estimated and entry.bytes > 0 for entry in usage)
@@ -0,0 +1,47 @@
+"""Smoke test for the notification load-test harness."""
+
+import fakeredis.aioredis
+
+from scripts.notification_load_test import LoadProfile, PayloadFactory, run_load
+
+
+def test_payload_mix_is_reproducible_for_a_seed():
+    profile = LoadProfile(events=20, users=10, makers=3, trade_share=0.5, seed=7)
+    accounts = [f"G{index}" for index in range(10)]
+
+    def mix() -> list[str]:
+        payloads = PayloadFactory(accounts, profile)
+        return [payloads.next()["operation"]["type"] for _ in range(profile.events)]
+
+    first = mix()
+
+    assert first == mix()
+    assert {"payment", "manage_sell_offer"} <= set(first)
+
+
+async def test_harness_reports_deliveries_and_per_event_costs():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    profile = LoadProfile(
+        events=12,
+        rate=200,
+        users=10,
+        makers=2,
+        trade_share=0.25,
+        self_share=0.25,
+        chat_rate=100,
+        global_rate=1000,
+        drain_seconds=0.3,
+        timeout_seconds=20,
+    )
+    try:
+        report = await run_load(profile, redis=redis)
+    finally:
+        await redis.aclose()
+
+    assert report.failed_posts == 0
+    assert report.delivered >= profile.events
+    assert report.stages["webhook"]["count"] == profile.events
+    assert report.stages["ledger_to_delivered"]["count"] == report.delivered
+    assert report.redis_round_trips > 0
+    assert report.db_statements > 0
+    assert "events/s" in report.as_text()
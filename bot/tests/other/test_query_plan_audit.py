@@ -0,0 +1,102 @@
+"""Tests for the index migration and the hot-query plan audit."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from db.models import (
+    Base,
+    MyMtlWalletBot,
+    MyMtlWalletBotLog,
+    MyMtlWalletBotMessages,
+    MyMtlWalletBotUsers,
+    NotificationFilter,
+)
+from scripts.create_indexes import create_missing_indexes
+from scripts.query_plan_audit import audit, firebird_full_scans
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'plans.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine)() as session:
+        for user_id in range(1, 51):
+            session.add(MyMtlWalletBotUsers(user_id=user_id, user_name=f"u{user_id}"))
+            session.add(
+                MyMtlWalletBot(
+                    user_id=user_id, public_key=f"G{user_id:055d}", default_wallet=1
+                )
+            )
+            session.add(
+                NotificationFilter(
+                    user_id=user_id, asset_code="XLM", operation_type="payment"
+                )
+            )
+            session.add(
+                MyMtlWalletBotMessages(user_id=user_id, user_message="hi", was_send=1)
+            )
+            session.add(MyMtlWalletBotLog(user_id=user_id, log_dt=datetime.now()))
+        await session.commit()
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+
+
+async def _drop(engine, *names: str) -> None:
+    async with engine.begin() as connection:
+        for name in names:
+            await connection.execute(text(f'DROP INDEX "{name}"'))
+
+
+@pytest.mark.asyncio
+async def test_declared_indexes_keep_hot_queries_off_full_scans(engine):
+    async with async_sessionmaker(engine)() as session:
+        reports = await audit(session)
+
+    assert {report.query for report in reports} == {
+        "wallet by public key",
+        "default wallet",
+        "notification filters of user",
+        "unsent messages",
+        "log activity of the last day",
+    }
+    assert [report for report in reports if report.full_scans] == []
+
+
+@pytest.mark.asyncio
+async def test_audit_reports_a_full_scan_without_the_index(engine):
+    await _drop(engine, "IX_MMWB_PUBLIC_KEY")
+
+    async with async_sessionmaker(engine)() as session:
+        reports = await audit(session)
+
+    assert [(r.query, r.full_scans) for r in reports if r.full_scans] == [
+        ("wallet by public key", ("MYMTLWALLETBOT",))
+    ]
+
+
+@pytest.mark.asyncio
+async def test_index_migration_creates_only_missing_indexes(engine):
+    await _drop(engine, "IX_MMWB_PUBLIC_KEY", "IX_NOTIFICATION_FILTERS_USER")
+
+    assert await create_missing_indexes(engine, dry_run=True) == [
+        "IX_MMWB_PUBLIC_KEY",
+        "IX_NOTIFICATION_FILTERS_USER",
+    ]
+    assert await create_missing_indexes(engine) == [
+        "IX_MMWB_PUBLIC_KEY",
+        "IX_NOTIFICATION_FILTERS_USER",
+    ]
+    assert await create_missing_indexes(engine) == []
+
+
+def test_firebird_plans_name_naturally_scanned_tables():
+    plan = "PLAN JOIN (MYMTLWALLETBOT NATURAL, MYMTLWALLETBOT_USERS INDEX (PK))"
+
+    assert firebird_full_scans(plan) == ("MYMTLWALLETBOT",)
+    assert firebird_full_scans("PLAN SORT (T INDEX (IX_MMWB_LOG_DT))") == ()
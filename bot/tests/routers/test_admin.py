@@ -1,7 +1,9 @@
 import pytest
 import os
+from datetime import datetime, timedelta
 from unittest.mock import MagicMock, AsyncMock
 from aiogram.fsm.storage.base import StorageKey
+from redis.exceptions import ConnectionError as RedisConnectionError
 
 from routers.admin import router as admin_router, ExitState
 from other.config_reader import config
@@ -65,11 +67,6 @@ def setup_admin_mocks(router_app_context):
             # but usually we just configure result_mock for execute()
             self.query_mock = MagicMock()
 
-        def set_stats_data(self, top_ops):
-            """Configure data for /stats command."""
-            # The last query in cmd_stats calls .all()
-            self.result_mock.all.return_value = top_ops
-
         def set_user_wallets(self, user, wallets):
             """Configure data for /user_wallets command."""
             # First query fetches user via scalar_one_or_none
@@ -103,8 +100,24 @@ def setup_admin_mocks(router_app_context):
 
 @pytest.mark.asyncio
 async def test_cmd_stats(mock_telegram, router_app_context, setup_admin_mocks):
-    """Test /stats: should show aggregated statistics."""
-    setup_admin_mocks.set_stats_data([("op1", 5), ("op2", 3)])
+    """Test /stats: reads the activity rollups and says how fresh they are."""
+    from infrastructure.services.activity_rollups import ActivitySnapshot
+
+    now = datetime.now()
+    router_app_context.activity_rollups = MagicMock()
+    router_app_context.activity_rollups.snapshot = AsyncMock(
+        return_value=ActivitySnapshot(
+            totals={"users": 10, "wallets": 12, "transactions": 3, "cheques": 1},
+            totals_refreshed_at=now - timedelta(minutes=5),
+            actions_24h=7,
+            users_24h=4,
+            actions_7d=20,
+            users_7d=6,
+            top_operations_7d=[("op1", 5), ("op2", 3)],
+            counting_since=now - timedelta(days=2),
+            updated_at=now,
+        )
+    )
 
     dp = router_app_context.dispatcher
     dp.include_router(admin_router)
@@ -114,9 +127,68 @@ async def test_cmd_stats(mock_telegram, router_app_context, setup_admin_mocks):
         bot=router_app_context.bot, update=update, app_context=router_app_context
     )
 
-    req = get_telegram_request(mock_telegram, "sendMessage")
-    assert "Статистика бота" in req["data"]["text"]
-    assert "op1: 5" in req["data"]["text"]
+    text = get_telegram_request(mock_telegram, "sendMessage")["data"]["text"]
+    assert "Статистика бота" in text
+    assert "Пользователи: 10" in text
+    assert "Логи: —" in text
+    assert "5 мин назад" in text
+    assert "За 24 часа: 7 действий от 4 уник. пользователей" in text
+    assert "op1: 5" in text
+    assert "данные за 7 дней неполные" in text
+    setup_admin_mocks.mock_session.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_cmd_stats_reports_unavailable_redis(
+    mock_telegram, router_app_context, setup_admin_mocks
+):
+    """Test /stats: a Redis failure gets a reply instead of an error."""
+    router_app_context.activity_rollups = MagicMock()
+    router_app_context.activity_rollups.snapshot = AsyncMock(
+        side_effect=RedisConnectionError("down")
+    )
+
+    dp = router_app_context.dispatcher
+    dp.include_router(admin_router)
+
+    update = create_message_update(user_id=123, text="/stats", username="itolstov")
+    await dp.feed_update(
+        bot=router_app_context.bot, update=update, app_context=router_app_context
+    )
+
+    text = get_telegram_request(mock_telegram, "sendMessage")["data"]["text"]
+    assert text == "Статистика недоступна: Redis не отвечает"
+
+
+@pytest.mark.asyncio
+async def test_cmd_outbox_reports_progress_and_eta(
+    mock_telegram, router_app_context, setup_admin_mocks
+):
+    """Test /outbox: pending messages, this instance's rate and the ETA."""
+    from infrastructure.workers.message_worker import OutboxProgress
+
+    repo = router_app_context.repository_factory.get_message_repository.return_value
+    repo.count_pending = AsyncMock(return_value=1500)
+    router_app_context.message_outbox = MagicMock()
+    router_app_context.message_outbox.progress.return_value = OutboxProgress(
+        sent=300, failed=2, pending=1500, rate_per_second=12.5, eta_seconds=120.0
+    )
+
+    dp = router_app_context.dispatcher
+    dp.include_router(admin_router)
+
+    await dp.feed_update(
+        bot=router_app_context.bot,
+        update=create_message_update(user_id=123, text="/outbox"),
+        app_context=router_app_context,
+    )
+
+    router_app_context.message_outbox.progress.assert_called_once_with(1500)
+    text = get_telegram_request(mock_telegram, "sendMessage")["data"]["text"]
+    assert "Ожидают отправки: 1500" in text
+    assert "Отправлено этим экземпляром: 300, ошибок: 2" in text
+    assert "Скорость: 12.5 сообщ./с" in text
+    assert "Осталось: 0:02:00" in text
 
 
 @pytest.mark.asyncio
@@ -354,8 +426,11 @@ async def test_cmd_delete_address(mock_telegram, router_app_context, setup_admin
     dp = router_app_context.dispatcher
     dp.include_router(admin_router)
 
-    wallet = MagicMock(need_delete=0)
+    wallet = MagicMock(id=7, need_delete=0)
     setup_admin_mocks.result_mock.scalar_one_or_none.return_value = wallet
+    wallets = MagicMock()
+    wallets.mark_deleted_by_id = AsyncMock(return_value=True)
+    router_app_context.repository_factory.get_wallet_repository.return_value = wallets
 
     await dp.feed_update(
         bot=router_app_context.bot,
@@ -363,8 +438,11 @@ async def test_cmd_delete_address(mock_telegram, router_app_context, setup_admin
         app_context=router_app_context,
     )
 
-    assert wallet.need_delete == 1
-    assert setup_admin_mocks.mock_session.commit.called
+    # The repository publishes the owner's profile change after its commit.
+    router_app_context.repository_factory.get_wallet_repository.assert_called_once_with(
+        setup_admin_mocks.mock_session
+    )
+    wallets.mark_deleted_by_id.assert_awaited_once_with(7)
 
 
 @pytest.mark.asyncio
@@ -401,3 +479,34 @@ async def test_cmd_test(mock_telegram, router_app_context):
         app_context=router_app_context,
     )
     assert any(r["method"] == "sendMessage" for r in mock_telegram)
+
+
+@pytest.mark.asyncio
+async def test_cmd_resync_reports_progress_of_full_sync(
+    mock_telegram, router_app_context
+):
+    """Test /resync: runs a full sync and replies with its final counters."""
+    dp = router_app_context.dispatcher
+    dp.message.middleware(RouterTestMiddleware(router_app_context))
+    dp.include_router(admin_router)
+
+    async def sync_subscriptions(*, full, progress):
+        assert full is True
+        progress.to_delete = progress.deleted = 2
+        progress.phase = "done"
+        return progress
+
+    router_app_context.notification_service = MagicMock()
+    router_app_context.notification_service.sync_subscriptions = AsyncMock(
+        side_effect=sync_subscriptions
+    )
+
+    await dp.feed_update(
+        bot=router_app_context.bot,
+        update=create_message_update(123, "/resync", username="itolstov"),
+        app_context=router_app_context,
+    )
+
+    req = get_telegram_request(mock_telegram, "sendMessage")
+    assert "Resync completed" in req["data"]["text"]
+    assert "deleted=2/2" in req["data"]["text"]
@@ -43,6 +43,7 @@ def setup_common_start_mocks(router_app_context):
             self.user.default_address = None
             self.user_repo = MagicMock()
             self.user_repo.get_by_id = AsyncMock(return_value=self.user)
+            self.user_repo.get_profile = AsyncMock(return_value=self.user)
             self.user_repo.update = AsyncMock()
             self.ctx.repository_factory.get_user_repository.return_value = (
                 self.user_repo
@@ -57,6 +58,9 @@ def setup_common_start_mocks(router_app_context):
             self.wallet.assets_visibility = "{}"
             self.wallet_repo = MagicMock()
             self.wallet_repo.get_default_wallet = AsyncMock(return_value=self.wallet)
+            self.wallet_repo.get_default_wallet_profile = AsyncMock(
+                return_value=self.wallet
+            )
             self.wallet_repo.get_info = AsyncMock(return_value="[Info]")
             self.wallet_repo.reset_balance_cache = AsyncMock()
             self.wallet_repo.normalize_default_wallets = AsyncMock(return_value=False)
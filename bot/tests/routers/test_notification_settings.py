@@ -406,3 +406,27 @@ async def test_create_filter_from_history(
     data = await dp.storage.get_data(state_key)
     assert data["asset_code"] == "EURMTL"
     assert data["operation_type"] == "payment"
+
+
+@pytest.mark.asyncio
+async def test_notification_settings_toggles_digest_mode(
+    mock_telegram, router_app_context, setup_notification_mocks
+):
+    store = MagicMock()
+    store.digest_enabled = AsyncMock(side_effect=[False, True])
+    store.set_digest_enabled = AsyncMock()
+    router_app_context.notification_store = store
+    dp = router_app_context.dispatcher
+    dp.callback_query.middleware(RouterTestMiddleware(router_app_context))
+    dp.include_router(notification_router)
+
+    await dp.feed_update(
+        router_app_context.bot,
+        create_callback_update(
+            123, NotificationMenuAction(action="toggle_digest").pack()
+        ),
+    )
+
+    store.set_digest_enabled.assert_awaited_once_with(123, True)
+    req = get_latest_msg(mock_telegram)
+    assert "kb_notification_digest" in req["data"]["reply_markup"]
@@ -39,6 +39,9 @@ def setup_start_mocks(router_app_context):
 
             self.wallet_repo = MagicMock()
             self.wallet_repo.get_default_wallet = AsyncMock(return_value=self.wallet)
+            self.wallet_repo.get_default_wallet_profile = AsyncMock(
+                return_value=self.wallet
+            )
             self.wallet_repo.get_info = AsyncMock(return_value="[Info]")
             self.wallet_repo.get_all_active = AsyncMock(return_value=[self.wallet])
             self.wallet_repo.normalize_default_wallets = AsyncMock(return_value=False)
@@ -51,6 +54,7 @@ def setup_start_mocks(router_app_context):
             self.user.user_id = 123
             self.user_repo = MagicMock()
             self.user_repo.get_by_id = AsyncMock(return_value=self.user)
+            self.user_repo.get_profile = AsyncMock(return_value=self.user)
             self.ctx.repository_factory.get_user_repository.return_value = (
                 self.user_repo
             )
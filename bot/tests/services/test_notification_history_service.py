@@ -1,9 +1,14 @@
 from datetime import datetime, timedelta
+import time
 from unittest.mock import MagicMock
 
+import fakeredis.aioredis
+import pytest
+
 from infrastructure.services.notification_history_service import (
     NotificationHistoryService,
     NotificationRecord,
+    RedisNotificationHistoryService,
 )
 from core.models.blockchain_notification import BlockchainNotification
 
@@ -72,7 +77,7 @@ class TestNotificationHistoryService:
         assert record.wallet_id == 1
         assert record.public_key == "GKEY"
 
-    def test_add_delivered_preserves_filter_fields_for_non_payment(self):
+    async def test_add_delivered_preserves_filter_fields_for_non_payment(self):
         service = NotificationHistoryService()
         notification = BlockchainNotification(
             notification_id="delivered",
@@ -92,14 +97,14 @@ class TestNotificationHistoryService:
             },
         )
 
-        service.add_delivered(notification)
+        await service.add_delivered(notification)
 
-        record = service.get_recent(123)[0]
+        record = (await service.get_recent(123))[0]
         assert record.operation_type == "manage_sell_offer"
         assert record.asset_code == "EURMTL"
         assert record.amount == 10.5
 
-    def test_add_delivered_ignores_resend_after_lease_loss(self):
+    async def test_add_delivered_ignores_resend_after_lease_loss(self):
         service = NotificationHistoryService()
         notification = BlockchainNotification(
             notification_id="retried-delivery",
@@ -118,10 +123,10 @@ class TestNotificationHistoryService:
             },
         )
 
-        service.add_delivered(notification)
-        service.add_delivered(notification)
+        await service.add_delivered(notification)
+        await service.add_delivered(notification)
 
-        records = service.get_recent(123)
+        records = await service.get_recent(123)
         assert len(records) == 1
         assert records[0].operation_type == "payment"
 
@@ -189,7 +194,7 @@ class TestNotificationHistoryService:
         assert service._history[123][0].operation_type == "payment_9"
         assert service._history[123][4].operation_type == "payment_5"
 
-    def test_get_recent(self):
+    async def test_get_recent(self):
         """Test getting recent operations."""
         service = NotificationHistoryService()
 
@@ -202,17 +207,17 @@ class TestNotificationHistoryService:
                 user_id=123, operation=operation, wallet_id=1, public_key="GKEY"
             )
 
-        recent = service.get_recent(123, limit=3)
+        recent = await service.get_recent(123, limit=3)
         assert len(recent) == 3
         assert recent[0].operation_type == "payment_4"
 
-    def test_get_recent_empty(self):
+    async def test_get_recent_empty(self):
         """Test getting recent from empty history."""
         service = NotificationHistoryService()
-        recent = service.get_recent(123, limit=10)
+        recent = await service.get_recent(123, limit=10)
         assert recent == []
 
-    def test_get_recent_less_than_limit(self):
+    async def test_get_recent_less_than_limit(self):
         """Test getting recent when fewer records exist than limit."""
         service = NotificationHistoryService()
 
@@ -222,10 +227,10 @@ class TestNotificationHistoryService:
         operation.display_amount_value = "10"
         service.add(user_id=123, operation=operation, wallet_id=1, public_key="GKEY")
 
-        recent = service.get_recent(123, limit=10)
+        recent = await service.get_recent(123, limit=10)
         assert len(recent) == 1
 
-    def test_get_by_id(self):
+    async def test_get_by_id(self):
         """Test getting a specific record by ID."""
         service = NotificationHistoryService()
 
@@ -236,18 +241,18 @@ class TestNotificationHistoryService:
         service.add(user_id=123, operation=operation, wallet_id=1, public_key="GKEY")
 
         record_id = service._history[123][0].id
-        found = service.get_by_id(123, record_id)
+        found = await service.get_by_id(123, record_id)
 
         assert found is not None
         assert found.id == record_id
 
-    def test_get_by_id_not_found(self):
+    async def test_get_by_id_not_found(self):
         """Test getting a non-existent record."""
         service = NotificationHistoryService()
-        found = service.get_by_id(123, "nonexistent")
+        found = await service.get_by_id(123, "nonexistent")
         assert found is None
 
-    def test_get_by_id_wrong_user(self):
+    async def test_get_by_id_wrong_user(self):
         """Test getting record for wrong user."""
         service = NotificationHistoryService()
 
@@ -258,11 +263,11 @@ class TestNotificationHistoryService:
         service.add(user_id=123, operation=operation, wallet_id=1, public_key="GKEY")
 
         record_id = service._history[123][0].id
-        found = service.get_by_id(456, record_id)
+        found = await service.get_by_id(456, record_id)
 
         assert found is None
 
-    def test_cleanup_user_removes_expired(self):
+    async def test_cleanup_user_removes_expired(self):
         """Test that cleanup removes expired records."""
         service = NotificationHistoryService(ttl_hours=1)
 
@@ -279,12 +284,12 @@ class TestNotificationHistoryService:
         service._history[123] = [old_record]
 
         # Trigger cleanup via get_recent
-        recent = service.get_recent(123, limit=10)
+        recent = await service.get_recent(123, limit=10)
 
         assert recent == []
         assert 123 not in service._history
 
-    def test_cleanup_keeps_fresh_records(self):
+    async def test_cleanup_keeps_fresh_records(self):
         """Test that cleanup keeps non-expired records."""
         service = NotificationHistoryService(ttl_hours=1)
 
@@ -294,7 +299,7 @@ class TestNotificationHistoryService:
         operation.display_amount_value = "10"
         service.add(user_id=123, operation=operation, wallet_id=1, public_key="GKEY")
 
-        recent = service.get_recent(123, limit=10)
+        recent = await service.get_recent(123, limit=10)
         assert len(recent) == 1
 
     def test_global_cleanup(self):
@@ -329,7 +334,7 @@ class TestNotificationHistoryService:
         # User 456's expired record should be removed
         assert 456 not in service._history
 
-    def test_multiple_users(self):
+    async def test_multiple_users(self):
         """Test that history is isolated per user."""
         service = NotificationHistoryService()
 
@@ -343,6 +348,83 @@ class TestNotificationHistoryService:
             )
 
         assert len(service._history) == 3
-        assert service.get_recent(123, limit=10)[0].operation_type == "payment_123"
-        assert service.get_recent(456, limit=10)[0].operation_type == "payment_456"
-        assert service.get_recent(789, limit=10)[0].operation_type == "payment_789"
+        assert (await service.get_recent(123, limit=10))[
+            0
+        ].operation_type == "payment_123"
+        assert (await service.get_recent(456, limit=10))[
+            0
+        ].operation_type == "payment_456"
+        assert (await service.get_recent(789, limit=10))[
+            0
+        ].operation_type == "payment_789"
+
+
+class TestRedisNotificationHistoryService:
+    """Tests for the Redis-backed history with its in-process LRU."""
+
+    @staticmethod
+    def _notification(notification_id: str, user_id: int = 123):
+        return BlockchainNotification(
+            notification_id=notification_id,
+            user_id=user_id,
+            event_type="payment",
+            text="message",
+            created_at=1,
+            transaction_hash=f"tx-{notification_id}",
+            event_index=1,
+            data={
+                "wallet_id": 7,
+                "public_key": "GKEY",
+                "operation_type": "payment",
+                "asset_code": "EURMTL",
+                "amount": "12.5",
+            },
+        )
+
+    @pytest.fixture
+    async def redis(self):
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        try:
+            yield client
+        finally:
+            await client.aclose()
+
+    async def test_records_survive_a_new_instance_and_are_capped(self, redis):
+        writer = RedisNotificationHistoryService(redis, max_per_user=3)
+        for index in range(5):
+            await writer.add_delivered(self._notification(f"n{index}"))
+        await writer.add_delivered(self._notification("n4"))
+
+        reader = RedisNotificationHistoryService(redis, max_per_user=3)
+        records = await reader.get_recent(123)
+
+        assert [record.notification_id for record in records] == ["n4", "n3", "n2"]
+        assert records[0].asset_code == "EURMTL"
+        assert records[0].amount == 12.5
+        assert await reader.get_by_id(123, records[1].id) == records[1]
+        assert 0 < await redis.ttl("notification:history:123") <= 12 * 3600
+
+    async def test_hot_user_is_served_from_lru_until_cache_ttl(self, redis):
+        now = [time.time()]
+        history = RedisNotificationHistoryService(
+            redis, cache_size=1, cache_ttl_seconds=5, clock=lambda: now[0]
+        )
+        other_instance = RedisNotificationHistoryService(redis)
+        await history.add_delivered(self._notification("first"))
+        await other_instance.add_delivered(self._notification("second"))
+
+        cached = await history.get_recent(123)
+        now[0] += 6
+        refreshed = await history.get_recent(123)
+
+        assert [record.notification_id for record in cached] == ["first"]
+        assert [record.notification_id for record in refreshed] == ["second", "first"]
+        assert history.cache_hits == 1
+
+    async def test_lru_evicts_least_recent_user(self, redis):
+        history = RedisNotificationHistoryService(redis, cache_size=1)
+        await history.add_delivered(self._notification("a", user_id=1))
+        await history.add_delivered(self._notification("b", user_id=2))
+
+        assert list(history._cache) == [2]
+        assert len(await history.get_recent(1)) == 1
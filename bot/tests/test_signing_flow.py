@@ -2,7 +2,6 @@
 
 import asyncio
 
-import jsonpickle  # type: ignore
 import pytest
 
 import fakeredis.aioredis
@@ -25,6 +24,7 @@ from shared.constants import (
     STATUS_SIGNED,
 )
 from infrastructure.services.signing_facade import SignaturePurpose
+from infrastructure.utils.serialization import dump_callback, fsm_callback
 
 
 SEP10_WEBAPP_CALLBACK_CALLS = []
@@ -32,6 +32,7 @@ WEBAPP_NOTIFICATION_COMPLETION_EVENTS = []
 WC_NOTIFICATION_COMPLETION_EVENTS = []
 
 
+@fsm_callback
 async def sep10_webapp_test_callback(
     session,
     user_id: int,
@@ -51,6 +52,7 @@ async def sep10_webapp_test_callback(
     )
 
 
+@fsm_callback
 async def webapp_after_send_test_callback(session, user_id: int, state):
     WEBAPP_NOTIFICATION_COMPLETION_EVENTS.append("fsm_after_send")
 
@@ -703,7 +705,7 @@ class TestHandleTxSigned:
                 FIELD_MEMO: "Swap",
                 FIELD_STATUS: STATUS_SIGNED,
                 FIELD_CREATED_AT: "2026-07-15T00:00:00Z",
-                FIELD_FSM_AFTER_SEND: jsonpickle.dumps(webapp_after_send_test_callback),
+                FIELD_FSM_AFTER_SEND: dump_callback(webapp_after_send_test_callback),
             },
         )
 
@@ -786,7 +788,7 @@ class TestHandleTxSigned:
 
         state_data = {
             "signing_purpose": SignaturePurpose.SEP10_AUTH.value,
-            "fsm_func": jsonpickle.dumps(sep10_webapp_test_callback),
+            "fsm_func": dump_callback(sep10_webapp_test_callback),
         }
 
         mock_state = AsyncMock()